@@ -0,0 +1,188 @@
+"""
+Local pub/sub broker shared by all services on one box.
+
+Frames on the Unix socket are length-prefixed binary:
+
+    u32 length | u8 op | u16 topic_len | topic (utf-8) | data
+
+`length` counts everything after itself. The broker never decodes `data`:
+a PUB frame is re-tagged as MSG and the same bytes go to every subscriber.
+
+It also keeps a small key/value table for state that worker processes of one
+service must share (libs/event_bus/kv.py); the key travels in the topic slot:
+
+    KSET  data = u32 ttl_ms (0 = no expiry) | value
+    KGET  data = u32 request id       -> KVAL  data = u32 request id | u8 found | value
+    KDEL  data = empty
+
+  python -m libs.event_bus.broker [--path /tmp/cockpit_bus.sock]
+"""
+import argparse
+import asyncio
+import os
+import struct
+import time
+from typing import Dict, Optional, Set, Tuple
+
+DEFAULT_SOCKET = os.getenv("EVENT_BUS_SOCKET") or "/tmp/cockpit_bus.sock"
+
+OP_SUB = 1
+OP_UNSUB = 2
+OP_PUB = 3
+OP_MSG = 4
+OP_KSET = 5
+OP_KGET = 6
+OP_KDEL = 7
+OP_KVAL = 8
+
+_HEAD = struct.Struct("!IBH")
+_U32 = struct.Struct("!I")
+_KVAL = struct.Struct("!IB")
+MAX_FRAME = 16 * 1024 * 1024
+CONN_QUEUE = 1024
+KV_SWEEP_EVERY = 4096   # KSETs between scans for expired keys nobody reads any more
+
+
+def pack_frame(op: int, topic: str, data: bytes = b"") -> bytes:
+    t = topic.encode("utf-8")
+    return _HEAD.pack(3 + len(t) + len(data), op, len(t)) + t + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+    head = await reader.readexactly(_HEAD.size)
+    length, op, tlen = _HEAD.unpack(head)
+    if length > MAX_FRAME or length < 3 + tlen:
+        raise ValueError(f"bad frame length: {length}")
+    body = await reader.readexactly(length - 3)
+    return op, body[:tlen].decode("utf-8"), body[tlen:]
+
+
+class _Conn:
+    __slots__ = ("writer", "queue", "task", "topics", "dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CONN_QUEUE)
+        self.task = None
+        self.topics: Set[str] = set()
+        self.dropped = 0
+
+
+class Broker:
+    def __init__(self, path: str = DEFAULT_SOCKET) -> None:
+        self.path = path
+        self._topics: Dict[str, Set[_Conn]] = {}
+        self._kv: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._sets = 0
+        self._server = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = _Conn(writer)
+        conn.task = asyncio.create_task(self._writer(conn))
+        try:
+            while True:
+                op, topic, data = await read_frame(reader)
+                if op == OP_PUB:
+                    self._fanout(topic, pack_frame(OP_MSG, topic, data))
+                elif op == OP_SUB:
+                    conn.topics.add(topic)
+                    self._topics.setdefault(topic, set()).add(conn)
+                elif op == OP_UNSUB:
+                    conn.topics.discard(topic)
+                    self._drop(topic, conn)
+                elif op == OP_KGET:
+                    value = self._kv_get(topic)
+                    # replies skip the drop-oldest queue: losing one would stall the caller
+                    writer.write(pack_frame(OP_KVAL, topic, _KVAL.pack(_U32.unpack_from(data)[0], value is not None)
+                                            + (value or b"")))
+                elif op == OP_KSET:
+                    ttl_ms = _U32.unpack_from(data)[0]
+                    self._kv[topic] = (data[4:], time.monotonic() + ttl_ms / 1000 if ttl_ms else None)
+                    self._sets += 1
+                    if self._sets % KV_SWEEP_EVERY == 0:
+                        self._kv_sweep()
+                elif op == OP_KDEL:
+                    self._kv.pop(topic, None)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            for topic in conn.topics:
+                self._drop(topic, conn)
+            conn.task.cancel()
+            writer.close()
+
+    def _kv_get(self, key: str) -> Optional[bytes]:
+        hit = self._kv.get(key)
+        if hit is None:
+            return None
+        value, deadline = hit
+        if deadline is not None and deadline <= time.monotonic():
+            del self._kv[key]   # expired entries go lazily, on read
+            return None
+        return value
+
+    def _kv_sweep(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (_v, d) in self._kv.items() if d is not None and d <= now]:
+            del self._kv[key]
+
+    def _fanout(self, topic: str, frame: bytes) -> None:
+        for conn in self._topics.get(topic, ()):
+            q = conn.queue
+            if q.full():
+                # drop-oldest, same as the in-process TopicBus default
+                q.get_nowait()
+                conn.dropped += 1
+            q.put_nowait(frame)
+
+    def _drop(self, topic: str, conn: _Conn) -> None:
+        subs = self._topics.get(topic)
+        if subs is not None:
+            subs.discard(conn)
+            if not subs:
+                del self._topics[topic]
+
+    @staticmethod
+    async def _writer(conn: _Conn) -> None:
+        q, w = conn.queue, conn.writer
+        try:
+            while True:
+                w.write(await q.get())
+                # coalesce whatever else is already queued into one drain
+                while not q.empty():
+                    w.write(q.get_nowait())
+                await w.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--path", default=DEFAULT_SOCKET)
+    args = ap.parse_args()
+    print(f"event bus broker on {args.path}")
+    try:
+        asyncio.run(Broker(args.path).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,187 @@
 import asyncio
 import json
-from typing import Dict, Set
+from typing import Dict, List, Optional, Set, Tuple, Union
 from fastapi import WebSocket
 
-class TopicBus:
+# Overflow policies, applied when a subscriber's queue is full
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+DEFAULT_MAXSIZE = 256
+
+
+class _Subscription:
+    __slots__ = ("topic", "ws", "queue", "task", "policy", "dropped", "sent")
+
+    def __init__(self, topic: str, ws: WebSocket, maxsize: int, policy: str) -> None:
+        self.topic = topic
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.task: Optional[asyncio.Task] = None
+        self.policy = policy
+        self.dropped = 0
+        self.sent = 0
+
+
+class _TopicStats:
+    __slots__ = ("published", "dropped", "disconnected")
+
     def __init__(self) -> None:
-        self._topics: Dict[str, Set[WebSocket]] = {}
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+
+class TopicBus:
+    """
+    Topic fan-out to WebSockets. Every subscription owns a bounded queue and a
+    sender task, so publish() never waits on a socket and one slow client
+    cannot stall the others. Per-topic stats live as long as the topic has
+    subscribers.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, policy: str = DROP_OLDEST) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy: {policy}")
+        self._topics: Dict[str, Dict[WebSocket, _Subscription]] = {}
+        self._config: Dict[str, Tuple[int, str]] = {}
+        self._stats: Dict[str, _TopicStats] = {}
+        self._default = (maxsize, policy)
         self._lock = asyncio.Lock()
+        self._closing: Set[asyncio.Task] = set()   # the loop only keeps weak references to tasks
+
+    def configure(self, topic: str, maxsize: Optional[int] = None, policy: Optional[str] = None) -> None:
+        # applies to subscriptions created afterwards
+        if policy is not None and policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy: {policy}")
+        cur_size, cur_policy = self._config.get(topic, self._default)
+        self._config[topic] = (maxsize or cur_size, policy or cur_policy)
 
     async def subscribe(self, topic: str, ws: WebSocket) -> None:
+        maxsize, policy = self._config.get(topic, self._default)
         async with self._lock:
-            self._topics.setdefault(topic, set()).add(ws)
+            subs = self._topics.setdefault(topic, {})
+            if ws in subs:
+                return
+            sub = _Subscription(topic, ws, maxsize, policy)
+            sub.task = asyncio.create_task(self._sender(sub))
+            subs[ws] = sub
+            self._stats.setdefault(topic, _TopicStats())
 
     async def unsubscribe(self, topic: str, ws: WebSocket) -> None:
         async with self._lock:
-            if topic in self._topics:
-                self._topics[topic].discard(ws)
-                if not self._topics[topic]:
-                    del self._topics[topic]
+            sub = self._remove(topic, ws)
+        if sub is not None and sub.task is not None and sub.task is not asyncio.current_task():
+            sub.task.cancel()
 
-    async def publish(self, topic: str, message: dict) -> None:
-        # Broadcast best-effort
-        async with self._lock:
-            conns = list(self._topics.get(topic, set()))
-        if not conns:
-            return
-        data = json.dumps(message, ensure_ascii=False)
-        dead = []
-        for ws in conns:
-            try:
+    async def publish(self, topic: str, message: Union[dict, str]) -> int:
+        """Serialize once and enqueue for every subscriber; returns how many got it queued."""
+        subs = self._topics.get(topic)
+        if not subs:
+            return 0
+        data = message if isinstance(message, str) else json.dumps(message, ensure_ascii=False)
+        stats = self._stats[topic]
+        stats.published += 1
+        queued = 0
+        for sub in list(subs.values()):
+            q = sub.queue
+            if not q.full():
+                q.put_nowait(data)
+                queued += 1
+                continue
+            sub.dropped += 1
+            stats.dropped += 1
+            if sub.policy == DROP_OLDEST:
+                q.get_nowait()
+                q.put_nowait(data)
+                queued += 1
+            elif sub.policy == DISCONNECT:
+                stats.disconnected += 1
+                self._remove(topic, sub.ws)
+                if sub.task is not None:
+                    sub.task.cancel()
+                task = asyncio.create_task(self._close(sub.ws))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            # DROP_NEWEST: leave the queue as is
+        return queued
+
+    async def send(self, topic: str, ws: WebSocket, frames: List[str], replace: bool = False) -> bool:
+        """
+        Queue frames for one subscriber only (catch-up, replay), in order and
+        as a single queue slot, so its sender task stays the only writer on
+        the socket. replace=True first discards what is queued for it (the
+        frames supersede it). False if ws is not subscribed to topic.
+        """
+        sub = self._topics.get(topic, {}).get(ws)
+        if sub is None:
+            return False
+        if not frames:
+            return True
+        q = sub.queue
+        if replace:
+            while not q.empty():
+                q.get_nowait()
+        elif q.full():
+            q.get_nowait()
+            sub.dropped += 1
+            self._stats[topic].dropped += 1
+        q.put_nowait(list(frames))
+        return True
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._topics.get(topic))
+
+    def stats(self) -> dict:
+        out = {}
+        for topic, st in self._stats.items():
+            subs = self._topics.get(topic, {})
+            out[topic] = {
+                "published": st.published,
+                "dropped": st.dropped,
+                "disconnected": st.disconnected,
+                "subscribers": len(subs),
+                "queue_depth": [s.queue.qsize() for s in subs.values()],
+                "queue_depth_max": max((s.queue.qsize() for s in subs.values()), default=0),
+            }
+        return out
+
+    def _remove(self, topic: str, ws: WebSocket) -> Optional[_Subscription]:
+        subs = self._topics.get(topic)
+        if not subs:
+            return None
+        sub = subs.pop(ws, None)
+        if not subs:
+            # per-session topics come and go; their counters go with them (and out of /metrics)
+            del self._topics[topic]
+            self._stats.pop(topic, None)
+        return sub
+
+    async def _sender(self, sub: _Subscription) -> None:
+        q, ws = sub.queue, sub.ws
+        try:
+            while True:
+                data = await q.get()
+                if isinstance(data, list):   # send(): one subscriber's catch-up frames
+                    for frame in data:
+                        await ws.send_text(frame)
+                    sub.sent += len(data)
+                    continue
                 await ws.send_text(data)
-            except Exception:
-                dead.append(ws)
-        if dead:
+                sub.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # dead socket: drop the subscription
             async with self._lock:
-                for ws in dead:
-                    self._topics.get(topic, set()).discard(ws)
\ No newline at end of file
+                if self._topics.get(sub.topic, {}).get(ws) is sub:
+                    self._remove(sub.topic, ws)
+
+    @staticmethod
+    async def _close(ws: WebSocket) -> None:
+        try:
+            await ws.close(code=1013)  # try again later
+        except Exception:
+            pass
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+from typing import List, Optional, Set, Union
+from fastapi import WebSocket
+
+from .broker import DEFAULT_SOCKET, OP_MSG, OP_PUB, OP_SUB, OP_UNSUB, pack_frame, read_frame
+from .bus import TopicBus
+
+RECONNECT_S = 1.0
+
+
+class BrokerBus:
+    """
+    TopicBus-compatible client of the local broker (libs/event_bus/broker.py).
+
+    Local WebSockets are fanned out by an in-process TopicBus; the broker only
+    sees one SUB per topic per process. publish() goes through the broker, so a
+    message published once reaches subscribers in every service. While the
+    broker is unreachable, publish() falls back to local delivery.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, local: Optional[TopicBus] = None) -> None:
+        self.path = path
+        self.local = local or TopicBus()
+        self._remote: Set[str] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        if self.connected:
+            return True
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (OSError, ConnectionError):
+                return False
+            self._writer = writer
+            for topic in self._remote:
+                writer.write(pack_frame(OP_SUB, topic))
+            await writer.drain()
+            self._reader_task = asyncio.create_task(self._read_loop(reader))
+            return True
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def subscribe(self, topic: str, ws: WebSocket) -> None:
+        await self.local.subscribe(topic, ws)
+        if topic not in self._remote:
+            self._remote.add(topic)
+            await self._send(pack_frame(OP_SUB, topic))
+
+    async def unsubscribe(self, topic: str, ws: WebSocket) -> None:
+        await self.local.unsubscribe(topic, ws)
+        if topic in self._remote and not self.local.has_subscribers(topic):
+            self._remote.discard(topic)
+            await self._send(pack_frame(OP_UNSUB, topic))
+
+    async def publish(self, topic: str, message: Union[dict, str]) -> int:
+        """Returns local deliveries when offline, 0 when handed to the broker."""
+        data = message if isinstance(message, str) else json.dumps(message, ensure_ascii=False)
+        if await self._send(pack_frame(OP_PUB, topic, data.encode("utf-8"))):
+            return 0
+        return await self.local.publish(topic, data)
+
+    async def send(self, topic: str, ws: WebSocket, frames: List[str], replace: bool = False) -> bool:
+        """Per-subscriber frames never leave this process."""
+        return await self.local.send(topic, ws, frames, replace)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "topics": self.local.stats()}
+
+    async def _send(self, frame: bytes) -> bool:
+        if not self.connected and not await self.connect():
+            return False
+        try:
+            self._writer.write(frame)
+            await self._writer.drain()
+            return True
+        except (ConnectionError, RuntimeError):
+            self._writer = None
+            return False
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                op, topic, data = await read_frame(reader)
+                if op == OP_MSG:
+                    await self.local.publish(topic, data.decode("utf-8"))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        self._writer = None
+        # keep trying in the background so remote subscriptions come back
+        while not await self.connect():
+            await asyncio.sleep(RECONNECT_S)
+
+
+_BUS: Optional[Union[TopicBus, BrokerBus]] = None
+
+
+def get_bus() -> Union[TopicBus, BrokerBus]:
+    """Process-wide bus: broker-backed when EVENT_BUS_SOCKET is set, in-process otherwise."""
+    global _BUS
+    if _BUS is None:
+        path = os.getenv("EVENT_BUS_SOCKET")
+        _BUS = BrokerBus(path) if path else TopicBus()
+    return _BUS
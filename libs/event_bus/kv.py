@@ -0,0 +1,128 @@
+"""
+Shared key/value state for services that run several worker processes.
+
+    kv = get_kv()
+    await kv.set("agent:session:abc", blob, ttl_s=600)
+    blob = await kv.get("agent:session:abc")
+
+With EVENT_BUS_SOCKET set this is the broker's table (one copy for every
+worker on the box); without it, a process-local dict with the same API.
+Values are bytes; callers pick the encoding.
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Dict, Optional, Tuple, Union
+from .broker import DEFAULT_SOCKET, OP_KDEL, OP_KGET, OP_KSET, OP_KVAL, _KVAL, _U32, pack_frame, read_frame
+
+KV_TIMEOUT_S = float(os.getenv("KV_TIMEOUT_S", "1.0"))
+
+
+class LocalKV:
+    def __init__(self) -> None:
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        hit = self._data.get(key)
+        if hit is None:
+            return None
+        if hit[1] is not None and hit[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return hit[0]
+
+    async def set(self, key: str, value: bytes, ttl_s: float = 0) -> None:
+        self._data[key] = (value, time.monotonic() + ttl_s if ttl_s else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def close(self) -> None:
+        pass
+
+
+class BrokerKV:
+    """
+    KV client of the local broker on its own connection. set/delete are
+    fire-and-forget but ordered, so a get() after a set() from this process
+    always sees it. get() raises ConnectionError when the broker is down.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout_s: float = KV_TIMEOUT_S) -> None:
+        self.path = path
+        self.timeout_s = timeout_s
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _conn(self) -> asyncio.StreamWriter:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+                self._reader_task = asyncio.create_task(self._read_loop(reader))
+        return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                op, _key, data = await read_frame(reader)
+                if op != OP_KVAL:
+                    continue
+                req_id, found = _KVAL.unpack_from(data)
+                fut = self._pending.pop(req_id, None)
+                if fut is not None and not fut.done():
+                    fut.set_result(data[_KVAL.size:] if found else None)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        self._writer = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("event bus broker went away"))
+        self._pending.clear()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        w = await self._conn()
+        req_id = next(self._ids) & 0xFFFFFFFF
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        w.write(pack_frame(OP_KGET, key, _U32.pack(req_id)))
+        try:
+            return await asyncio.wait_for(fut, self.timeout_s)
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def set(self, key: str, value: bytes, ttl_s: float = 0) -> None:
+        w = await self._conn()
+        w.write(pack_frame(OP_KSET, key, _U32.pack(int(ttl_s * 1000)) + value))
+        await w.drain()
+
+    async def delete(self, key: str) -> None:
+        w = await self._conn()
+        w.write(pack_frame(OP_KDEL, key))
+        await w.drain()
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+_KV: Optional[Union[LocalKV, BrokerKV]] = None
+
+
+def get_kv() -> Union[LocalKV, BrokerKV]:
+    """Process-wide store: broker-backed when EVENT_BUS_SOCKET is set, in-process otherwise."""
+    global _KV
+    if _KV is None:
+        path = os.getenv("EVENT_BUS_SOCKET")
+        _KV = BrokerKV(path) if path else LocalKV()
+    return _KV
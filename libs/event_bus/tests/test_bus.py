@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from libs.event_bus.bus import DISCONNECT, DROP_NEWEST, DROP_OLDEST, TopicBus
+
+
+class Socket:
+    """Fake WebSocket whose writes block until released."""
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.frames = []
+        self.closed = None
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def send_text(self, data: str) -> None:
+        await self.gate.wait()
+        self.frames.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = code
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize("policy, expected", [
+    (DROP_OLDEST, ["m0", "m3", "m4"]),   # m0 was already taken by the sender when the queue filled
+    (DROP_NEWEST, ["m0", "m1", "m2"]),
+])
+def test_drop_policies(policy, expected):
+    async def go():
+        bus, slow = TopicBus(maxsize=2, policy=policy), Socket(blocked=True)
+        await bus.subscribe("t", slow)
+        await bus.publish("t", "m0")
+        await settle()                   # sender is now stuck writing m0
+        queued = [await bus.publish("t", f"m{i}") for i in range(1, 5)]
+        assert queued == ([1, 1, 1, 1] if policy == DROP_OLDEST else [1, 1, 0, 0])
+        st = bus.stats()["t"]
+        assert (st["published"], st["dropped"], st["queue_depth_max"]) == (5, 2, 2)
+        slow.gate.set()
+        await settle()
+        assert slow.frames == expected
+        await bus.unsubscribe("t", slow)
+
+    asyncio.run(go())
+
+
+def test_disconnect_policy_only_drops_the_slow_subscriber():
+    async def go():
+        bus = TopicBus(maxsize=1)
+        bus.configure("t", policy=DISCONNECT)
+        slow, fast = Socket(blocked=True), Socket()
+        await bus.subscribe("t", slow)
+        await bus.subscribe("t", fast)
+        for i in range(3):
+            await bus.publish("t", f"m{i}")
+            await settle()
+        assert slow.closed == 1013
+        assert not bus._closing                       # close tasks are kept until they finish
+        st = bus.stats()["t"]
+        assert (st["subscribers"], st["disconnected"], st["dropped"]) == (1, 1, 1)
+        assert fast.frames == ["m0", "m1", "m2"]
+        await bus.unsubscribe("t", fast)
+
+    asyncio.run(go())
+
+
+def test_close_tasks_are_referenced_until_done():
+    async def go():
+        bus = TopicBus(maxsize=1, policy=DISCONNECT)
+        slow = Socket(blocked=True)
+        await bus.subscribe("t", slow)
+        for i in range(3):
+            await bus.publish("t", f"m{i}")
+        assert len(bus._closing) == 1
+        await settle()
+        assert not bus._closing and slow.closed == 1013
+
+    asyncio.run(go())
+
+
+def test_stats_follow_subscribers():
+    async def go():
+        bus, a, b = TopicBus(), Socket(), Socket()
+        assert await bus.publish("t", "nobody") == 0
+        assert "t" not in bus.stats()
+        await bus.subscribe("t", a)
+        await bus.subscribe("t", b)
+        await bus.subscribe("t", a)                   # idempotent
+        assert await bus.publish("t", {"k": "值"}) == 2
+        await settle()
+        assert a.frames == b.frames == ['{"k": "值"}']
+        assert bus.stats()["t"]["subscribers"] == 2 and bus.stats()["t"]["published"] == 1
+        await bus.unsubscribe("t", a)
+        assert bus.stats()["t"]["subscribers"] == 1
+        await bus.unsubscribe("t", b)
+        assert "t" not in bus.stats()                 # per-session topics don't pile up
+        assert not bus.has_subscribers("t")
+
+    asyncio.run(go())
+
+
+def test_dead_socket_is_unsubscribed():
+    class Dead(Socket):
+        async def send_text(self, data: str) -> None:
+            raise ConnectionError("gone")
+
+    async def go():
+        bus, dead, ok = TopicBus(), Dead(), Socket()
+        await bus.subscribe("t", dead)
+        await bus.subscribe("t", ok)
+        await bus.publish("t", "x")
+        await settle()
+        assert bus.stats()["t"]["subscribers"] == 1 and ok.frames == ["x"]
+        await bus.unsubscribe("t", ok)
+
+    asyncio.run(go())
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TopicBus(policy="block")
+    with pytest.raises(ValueError):
+        TopicBus().configure("t", policy="block")
@@ -0,0 +1,96 @@
+"""
+/debug/traces and /metrics for every service, plus install() to wire span
+recording and request metrics into an app.
+
+    from libs.log.debug import install
+    install(app, "agent")
+"""
+from contextlib import asynccontextmanager
+from typing import Dict
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.responses import Response
+from libs.replay.recorder import RECORDING, RecorderMiddleware
+from .metrics import CONTENT_TYPE, MetricsMiddleware, bus_collector, register_collector, render
+from .spans import EXPORTER, RECORDER, SpanMiddleware, build_tree, load_trace
+
+router = APIRouter()
+
+
+def install(app: FastAPI, service: str) -> None:
+    if not RECORDER.service:
+        RECORDER.service = service
+    app.add_middleware(SpanMiddleware, service=service)
+    # outside the span middleware, so the histogram includes its cost
+    app.add_middleware(MetricsMiddleware, service=service)
+    if RECORDING.enabled:
+        # closest to the wire: recorded timings are what a client would see
+        app.add_middleware(RecorderMiddleware, service=service)
+        RECORDING.start(service)
+        _release_on_shutdown(app)
+    app.include_router(router)
+    register_collector(bus_collector)
+    EXPORTER.start()
+
+
+def _release_on_shutdown(app: FastAPI) -> None:
+    # uvicorn re-raises a second stop signal (run_all sends SIGINT then SIGTERM) after shutdown, which
+    # skips atexit; seal the envelope log when the app's lifespan ends instead
+    inner = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(a):
+        try:
+            async with inner(a) as state:
+                yield state
+        finally:
+            RECORDING.release()
+
+    app.router.lifespan_context = lifespan
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of this process's metrics."""
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+@router.get("/debug/traces")
+def recent_traces(limit: int = 50):
+    """Latest traces this process took part in, newest first."""
+    traces: Dict[str, dict] = {}
+    for _seq, trace_id, _sid, _parent, name, _svc, start, end, _attrs, _err in RECORDER.snapshot():
+        t = traces.get(trace_id)
+        if t is None:
+            t = traces[trace_id] = {"trace_id": trace_id, "root": name, "spans": 0, "start_ns": start, "end_ns": end}
+        t["spans"] += 1
+        if start < t["start_ns"]:
+            t["start_ns"], t["root"] = start, name
+        t["end_ns"] = max(t["end_ns"], end)
+    rows = sorted(traces.values(), key=lambda t: t["end_ns"], reverse=True)[:limit]
+    for t in rows:
+        t["duration_ms"] = round((t.pop("end_ns") - t.pop("start_ns")) / 1e6, 3)
+    return {
+        "service": RECORDER.service,
+        "recorded": RECORDER.head,
+        "exported": EXPORTER.exported,
+        "lost": EXPORTER.lost,
+        "traces": rows,
+    }
+
+
+@router.get("/debug/traces/{trace_id}")
+def trace_tree(trace_id: str):
+    """Span tree: local ring plus, with TRACE_DIR set, what every service has exported so far."""
+    if EXPORTER.running:
+        EXPORTER.flush()   # our own latest spans; other services flush on their own timer
+    spans = load_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail={"code": "trace_not_found", "message": f"no spans for trace {trace_id}",
+                                                     "retryable": True})
+    return {
+        "trace_id": trace_id,
+        "spans": len(spans),
+        "services": sorted({s.get("service") or "" for s in spans}),
+        "duration_ms": round((max(s["end_ns"] for s in spans) - spans[0]["start_ns"]) / 1e6, 3),
+        "tree": build_tree(spans),
+    }
@@ -0,0 +1,351 @@
+"""
+Process-wide counters, gauges and fixed-bucket latency histograms, served as
+Prometheus text on /metrics (install() in libs/log/debug.py adds it to every
+service, next to the request middleware).
+
+    HITS = counter("cockpit_cache_hits_total", "Cache hits.", ("cache",))
+    HITS.labels("poi").inc()
+    with WS_MESSAGE_SECONDS.labels("audio", "audio.ingest").time():
+        ...
+    register_collector(lambda: [("cockpit_queue_depth", "gauge", "Frames queued.", [({}, len(q))])])
+
+Nothing on the write path takes a lock: each thread increments its own
+shard (a plain list) and a scrape sums the shards, so observations from the
+event loop and from executor threads never contend. Histogram values are
+integer nanoseconds bucketed with bisect; they only become seconds at
+render time. Collectors are called at scrape time for values a service
+already keeps (TopicBus stats, queue lengths), so those cost nothing per
+event.
+
+With multi-worker services each worker has its own registry; scrape every
+worker on its control port (see libs/serving/worker.py).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; 250 us .. 10 s covers everything from a KV read to a slow LLM turn
+DEFAULT_BUCKETS = (0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_clock = time.perf_counter_ns
+
+# (name, kind, help, [(labels, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class _Sharded:
+    """Per-thread cells: a thread only ever writes its own list; readers sum them."""
+
+    __slots__ = ("_width", "_local", "_shards")
+
+    def __init__(self, width: int) -> None:
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[list] = []
+
+    def _cell(self) -> list:
+        try:
+            return self._local.c
+        except AttributeError:
+            c = self._local.c = [0] * self._width
+            self._shards.append(c)   # list.append is atomic under the GIL
+            return c
+
+    def _totals(self) -> list:
+        out = [0] * self._width
+        for c in list(self._shards):
+            for i, v in enumerate(c):
+                out[i] += v
+        return out
+
+
+class Counter(_Sharded):
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__(1)
+
+    def inc(self, n: float = 1) -> None:
+        try:
+            self._local.c[0] += n
+        except AttributeError:
+            self._cell()[0] += n
+
+    @property
+    def value(self) -> float:
+        return self._totals()[0]
+
+
+class Gauge(Counter):
+    """Up/down count (in-flight requests, open sockets); set-style values belong in a collector."""
+
+    __slots__ = ()
+
+    def dec(self, n: float = 1) -> None:
+        try:
+            self._local.c[0] -= n
+        except AttributeError:
+            self._cell()[0] -= n
+
+
+class Histogram(_Sharded):
+    """Fixed buckets; cell layout is [count per bucket..., +Inf count, sum_ns]."""
+
+    __slots__ = ("bounds_ns", "bounds")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(len(buckets) + 2)
+        self.bounds = tuple(buckets)
+        self.bounds_ns = tuple(int(b * 1e9) for b in buckets)
+
+    def observe_ns(self, ns: int) -> None:
+        try:
+            c = self._local.c     # inlined _cell(): this is the hot path
+        except AttributeError:
+            c = self._cell()
+        c[bisect_left(self.bounds_ns, ns)] += 1   # le is inclusive, as Prometheus wants
+        c[-1] += ns
+
+    def observe(self, seconds: float) -> None:
+        self.observe_ns(int(seconds * 1e9))
+
+    def since(self, start_ns: int) -> None:
+        self.observe_ns(_clock() - start_ns)
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """(cumulative bucket counts incl. +Inf, count, sum in seconds)."""
+        t = self._totals()
+        cum, run = [], 0
+        for v in t[:-1]:
+            run += v
+            cum.append(run)
+        return cum, run, t[-1] / 1e9
+
+
+class _Timer:
+    __slots__ = ("h", "t0")
+
+    def __init__(self, h: Histogram) -> None:
+        self.h = h
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = _clock()
+        return self
+
+    def __exit__(self, et, ev, tb) -> None:
+        self.h.observe_ns(_clock() - self.t0)
+
+
+class Metric:
+    """One named family; labels(...) returns (and caches) the child for those label values."""
+
+    def __init__(self, kind: str, name: str, help: str, labelnames: Sequence[str] = (),
+                 factory: Callable[[], _Sharded] = Counter) -> None:
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], _Sharded] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            # setdefault is atomic under the GIL: two racing threads end up sharing one child
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def collect(self) -> Iterable[Tuple[Dict[str, str], _Sharded]]:
+        for values, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, values)), child
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def add(self, m: Metric) -> Metric:
+        # idempotent, so module reloads and the monolith's shared registry don't double-register
+        return self._metrics.setdefault(m.name, m)
+
+    def register_collector(self, fn: Callable[[], Iterable[Family]]) -> None:
+        if fn not in self._collectors:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        out: List[str] = []
+        for m in self._metrics.values():
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            for labels, child in m.collect():
+                if m.kind == "histogram":
+                    cum, count, total = child.snapshot()
+                    for le, v in zip(child.bounds + ("+Inf",), cum):
+                        out.append(f"{m.name}_bucket{_fmt_labels(labels, le=_fmt_le(le))} {v}")
+                    out.append(f"{m.name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+                    out.append(f"{m.name}_count{_fmt_labels(labels)} {count}")
+                else:
+                    out.append(f"{m.name}{_fmt_labels(labels)} {_fmt_value(child.value)}")
+        for fn in list(self._collectors):
+            try:
+                families = list(fn())
+            except Exception as e:
+                # a broken collector must not take /metrics down with it
+                out.append(f"# collector {getattr(fn, '__qualname__', fn)} failed: {type(e).__name__}")
+                continue
+            for name, kind, help, samples in families:
+                out.append(f"# HELP {name} {help}")
+                out.append(f"# TYPE {name} {kind}")
+                for labels, v in samples:
+                    out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+        out.append("")
+        return "\n".join(out)
+
+
+def _fmt_le(le) -> str:
+    return le if isinstance(le, str) else repr(float(le))
+
+
+def _fmt_value(v: float) -> str:
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, int):
+        return str(v)
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Dict[str, str], **extra: str) -> str:
+    if extra:
+        labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Metric:
+    return REGISTRY.add(Metric("counter", name, help, labelnames, Counter))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Metric:
+    return REGISTRY.add(Metric("gauge", name, help, labelnames, Gauge))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+    return REGISTRY.add(Metric("histogram", name, help, labelnames, lambda: Histogram(buckets)))
+
+
+def register_collector(fn: Callable[[], Iterable[Family]]) -> None:
+    REGISTRY.register_collector(fn)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+REQUEST_SECONDS = histogram("cockpit_http_request_duration_seconds", "HTTP request latency by route.",
+                            ("service", "method", "route", "code"))
+IN_FLIGHT = gauge("cockpit_http_requests_in_flight", "HTTP requests being handled.", ("service",))
+WS_OPEN = gauge("cockpit_ws_connections", "Open WebSocket connections by route.", ("service", "route"))
+WS_MESSAGE_SECONDS = histogram("cockpit_ws_message_duration_seconds",
+                               "Time from receiving a WebSocket message to having handled it, by message type.",
+                               ("service", "type"))
+
+
+def observe_ws(service: str, typ: str, start_ns: int) -> None:
+    if METRICS_ENABLED:
+        WS_MESSAGE_SECONDS.labels(service, typ).observe_ns(_clock() - start_ns)
+
+
+def _route(scope) -> str:
+    # the route template, not the raw path: /debug/traces/{trace_id} is one series, not one per id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency histogram and in-flight gauge for HTTP, open-socket gauge for WS."""
+
+    SKIP = ("/metrics",)
+
+    def __init__(self, app, service: str = "") -> None:
+        self.app = app
+        self.service = service
+        self.in_flight = IN_FLIGHT.labels(service)
+        self._children: Dict[Tuple[str, int, int], Histogram] = {}
+
+    async def __call__(self, scope, receive, send):
+        typ = scope["type"]
+        if not METRICS_ENABLED or typ not in ("http", "websocket") or scope["path"].endswith(self.SKIP):
+            return await self.app(scope, receive, send)
+        if typ == "websocket":
+            # long-lived and not routed yet; the path relative to a monolith mount is bounded enough
+            g = WS_OPEN.labels(self.service, scope["path"][len(scope.get("root_path", "")):])
+            g.inc()
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                g.dec()
+        status = [500]
+
+        async def send_wrapper(msg):
+            if msg["type"] == "http.response.start":
+                status[0] = msg["status"]
+            await send(msg)
+
+        in_flight = self.in_flight
+        in_flight.inc()
+        t0 = _clock()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = _clock() - t0
+            in_flight.dec()
+            # keyed on the route object's identity (routes define __eq__ but aren't hashable; they live
+            # as long as the app): no string building per request
+            key = (scope["method"], id(scope.get("route")), status[0])
+            h = self._children.get(key)
+            if h is None:
+                h = self._children[key] = REQUEST_SECONDS.labels(self.service, key[0], _route(scope), str(key[2]))
+            h.observe_ns(dt)
+
+
+def bus_collector() -> List[Family]:
+    """TopicBus counters (they already live on the bus) as metric families."""
+    from libs.event_bus.client import get_bus
+    bus = get_bus()
+    stats = bus.stats()
+    families: List[Family] = []
+    if "topics" in stats:   # BrokerBus wraps the local fan-out
+        families.append(("cockpit_bus_broker_connected", "gauge", "1 while connected to the event broker.",
+                         [({}, int(stats["connected"]))]))
+        stats = stats["topics"]
+    rows = sorted(stats.items())
+    for key, kind, help in (
+        ("published", "counter", "Messages published to local subscribers."),
+        ("dropped", "counter", "Messages dropped by a full subscriber queue."),
+        ("disconnected", "counter", "Subscribers disconnected by the overflow policy."),
+        ("subscribers", "gauge", "Current subscribers."),
+        ("queue_depth_max", "gauge", "Deepest subscriber queue."),
+    ):
+        name = f"cockpit_bus_{key}" + ("_total" if kind == "counter" else "")
+        families.append((name, kind, help, [({"topic": t}, st[key]) for t, st in rows]))
+    return families
@@ -0,0 +1,451 @@
+"""
+Span recorder for the traces mk_trace() stamps on envelopes.
+
+    with span("agent.plan", intent=name):          # child of the active span
+        ...
+    @traced("nav.search")                           # same, as a decorator (sync or async)
+    def search(...): ...
+    bind(meta.get("trace"))                         # re-parent the request span under the
+                                                    # envelope's trace once the body is parsed
+    with hop_span("vehicle POST /command", env["meta"]["trace"]):
+        ...                                         # the sending side of one envelope hop
+
+Spans are slotted objects; when one finishes it becomes a flat tuple in a
+fixed-size per-process ring (no dicts unless it carries attributes). Export
+is opt-in: with TRACE_DIR set, a daemon thread drains the ring into it as
+JSONL (one span per line) or OTLP/JSON (one ResourceSpans batch per line, the
+OpenTelemetry file-exporter layout). Every service writes its own file there,
+which is what lets /debug/traces stitch the tree for one trace_id back
+together across processes; without it /debug/traces sees the local ring only.
+Nothing prunes the directory, so point each run (loadgen, replay) at its own.
+"""
+import atexit
+import functools
+import glob
+import inspect
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .tracing import CURRENT_SPAN
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") != "0"
+TRACE_RING = int(os.getenv("TRACE_RING", "65536"))
+TRACE_DIR = os.getenv("TRACE_DIR", "")   # unset / "" = no export
+TRACE_FORMAT = os.getenv("TRACE_FORMAT", "jsonl")   # jsonl | otlp
+TRACE_FLUSH_S = float(os.getenv("TRACE_FLUSH_S", "1.0"))
+TRACE_FILE_BYTES = int(os.getenv("TRACE_FILE_BYTES", str(64 << 20)))
+
+# perf_counter_ns() is ~2x cheaper than time_ns(); anchor it to the wall clock once
+_WALL_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+_clock = time.perf_counter_ns
+
+
+def _reseed() -> None:
+    global _ids
+    # span ids are ints (random per-process high half + counter) and only become hex on export
+    _ids = itertools.count((random.getrandbits(32) << 32) | random.getrandbits(24))
+
+
+_reseed()
+os.register_at_fork(after_in_child=_reseed)   # forked workers must not reuse the parent's ids
+
+
+def new_trace_id() -> str:
+    return "%032x" % random.getrandbits(128)   # same shape as uuid4().hex, a fraction of the cost
+
+
+def fmt_id(v: Any) -> Optional[str]:
+    # parents from envelopes are already hex strings
+    return "%016x" % v if isinstance(v, int) else v
+
+
+class Span:
+    """One timed operation, usable as a context manager; finished spans go to RECORDER as a tuple."""
+
+    __slots__ = ("name", "trace_id", "parent", "sid", "service", "attrs", "start_ns", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent: Any, sid: Any = None, attrs: Optional[dict] = None,
+                 service: Optional[str] = None) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.sid = next(_ids) if sid is None else sid
+        self.attrs = attrs or None
+        self.service = service
+
+    @property
+    def span_id(self) -> str:
+        return fmt_id(self.sid)
+
+    @property
+    def parent_span_id(self) -> Optional[str]:
+        return fmt_id(self.parent)
+
+    def set(self, key: str, value: Any) -> None:
+        if self.attrs is None:
+            self.attrs = {}
+        self.attrs[key] = value
+
+    def bind(self, trace: Optional[dict]) -> None:
+        """Adopt an envelope's trace: this span becomes a child of the span that sent it."""
+        if trace and trace.get("trace_id"):
+            self.trace_id = trace["trace_id"]
+            self.parent = trace.get("span_id")
+
+    def __enter__(self) -> "Span":
+        self._token = CURRENT_SPAN.set(self)
+        self.start_ns = _clock()
+        return self
+
+    def __exit__(self, et, ev, tb) -> None:
+        end = _clock()
+        CURRENT_SPAN.reset(self._token)
+        RECORDER.record(self, end, et)
+
+
+class _NoopSpan:
+    """Returned when tracing is off, so call sites need no branches."""
+
+    __slots__ = ()
+    trace_id = span_id = parent_span_id = None
+
+    def set(self, key, value): pass
+    def bind(self, trace): pass
+    def __enter__(self): return self
+    def __exit__(self, et, ev, tb): pass
+
+
+NOOP = _NoopSpan()
+
+
+def span(name: str, trace: Optional[dict] = None, service: Optional[str] = None, **attrs) -> Span:
+    """Child of `trace` (an envelope trace dict) if given, else of the active span, else a new root."""
+    if not TRACE_ENABLED:
+        return NOOP
+    if trace and trace.get("trace_id"):
+        return Span(name, trace["trace_id"], trace.get("span_id"), attrs=attrs, service=service)
+    cur = CURRENT_SPAN.get()
+    if cur is not None and cur.trace_id is not None:
+        return Span(name, cur.trace_id, cur.sid, attrs=attrs, service=service or cur.service)
+    return Span(name, new_trace_id(), None, attrs=attrs, service=service)
+
+
+def hop_span(name: str, trace: Optional[dict], **attrs) -> Span:
+    """
+    The span *is* the message `trace` was stamped for (same span_id), so the
+    receiver's bind() parents its request span under this one.
+    """
+    if not TRACE_ENABLED:
+        return NOOP
+    if not trace or not trace.get("span_id"):
+        return span(name, **attrs)
+    cur = CURRENT_SPAN.get()
+    return Span(name, trace["trace_id"], trace.get("parent_span_id"), sid=trace["span_id"], attrs=attrs,
+                service=cur.service if cur is not None else None)
+
+
+def bind(trace: Optional[dict]) -> None:
+    cur = CURRENT_SPAN.get()
+    if cur is not None:
+        cur.bind(trace)
+
+
+def current() -> Optional[Span]:
+    return CURRENT_SPAN.get()
+
+
+def traced(name: Optional[str] = None, **attrs) -> Callable:
+    def deco(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrap(*a, **kw):
+                with span(label, **attrs):
+                    return await fn(*a, **kw)
+            return awrap
+
+        @functools.wraps(fn)
+        def wrap(*a, **kw):
+            with span(label, **attrs):
+                return fn(*a, **kw)
+        return wrap
+    return deco
+
+
+# ring rows: (seq, trace_id, span id, parent id, name, service, start_ns, end_ns, attrs, error)
+Row = Tuple[int, str, Any, Any, str, Optional[str], int, int, Optional[dict], Optional[str]]
+
+
+class SpanRecorder:
+    """Power-of-two ring of finished spans; writers never block and old rows are overwritten."""
+
+    def __init__(self, capacity: int = TRACE_RING, service: str = "") -> None:
+        size = 1 << max(capacity - 1, 1).bit_length()
+        self.mask = size - 1
+        self.buf: List[Optional[Row]] = [None] * size
+        self._seq = itertools.count()   # next() is atomic under the GIL, so threads need no lock
+        self.head = 0
+        self.service = service or os.getenv("SERVICE_NAME", "")
+
+    def record(self, s: Span, end_ns: int, et: Optional[type] = None) -> None:
+        i = next(self._seq)
+        self.buf[i & self.mask] = (i, s.trace_id, s.sid, s.parent, s.name, s.service, s.start_ns, end_ns, s.attrs,
+                                   et.__name__ if et is not None else None)
+        self.head = i + 1
+
+    def since(self, start: int) -> Tuple[List[Row], int, int]:
+        """Rows recorded from sequence `start`: (rows, next start, overwritten before being read)."""
+        head = self.head
+        lost = 0
+        if head - start > len(self.buf):
+            lost = head - len(self.buf) - start
+            start = head - len(self.buf)
+        out = []
+        i = start
+        while i < head:
+            r = self.buf[i & self.mask]
+            if r is None or r[0] < i:
+                break   # a slower writer still owns this slot; pick it up next time
+            if r[0] > i:
+                lost += 1   # lapped while we were reading
+            else:
+                out.append(r)
+            i += 1
+        return out, i, lost
+
+    def snapshot(self) -> List[Row]:
+        return [r for r in self.buf if r is not None]
+
+    def find(self, trace_id: str) -> List[Row]:
+        return [r for r in self.buf if r is not None and r[1] == trace_id]
+
+    def to_dict(self, r: Row) -> dict:
+        out = {
+            "trace_id": r[1],
+            "span_id": fmt_id(r[2]),
+            "parent_span_id": fmt_id(r[3]),
+            "name": r[4],
+            "service": r[5] or self.service,
+            "start_ns": r[6] + _WALL_OFFSET_NS,
+            "end_ns": r[7] + _WALL_OFFSET_NS,
+        }
+        if r[8]:
+            out["attrs"] = r[8]
+        if r[9]:
+            out["error"] = r[9]
+        return out
+
+
+RECORDER = SpanRecorder()
+
+
+def _otlp_value(v: Any) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _from_otlp_value(v: dict) -> Any:
+    return int(v["intValue"]) if "intValue" in v else next(iter(v.values()))
+
+
+def to_otlp(spans: Iterable[dict], service: str) -> dict:
+    out = []
+    for s in spans:
+        o = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in (s.get("attrs") or {}).items()],
+            "status": {"code": 2, "message": s["error"]} if s.get("error") else {"code": 1},
+        }
+        if s.get("parent_span_id"):
+            o["parentSpanId"] = s["parent_span_id"]
+        out.append(o)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+        "scopeSpans": [{"scope": {"name": "cockpit.spans"}, "spans": out}],
+    }]}
+
+
+def from_otlp(batch: dict) -> List[dict]:
+    out = []
+    for rs in batch.get("resourceSpans", []):
+        service = next((a["value"].get("stringValue") for a in rs.get("resource", {}).get("attributes", [])
+                        if a["key"] == "service.name"), "")
+        for ss in rs.get("scopeSpans", []):
+            for o in ss.get("spans", []):
+                s = {
+                    "trace_id": o["traceId"],
+                    "span_id": o["spanId"],
+                    "parent_span_id": o.get("parentSpanId"),
+                    "name": o["name"],
+                    "service": service,
+                    "start_ns": int(o["startTimeUnixNano"]),
+                    "end_ns": int(o["endTimeUnixNano"]),
+                }
+                attrs = {a["key"]: _from_otlp_value(a["value"]) for a in o.get("attributes", [])}
+                if attrs:
+                    s["attrs"] = attrs
+                if o.get("status", {}).get("code") == 2:
+                    s["error"] = o["status"].get("message", "error")
+                out.append(s)
+    return out
+
+
+class SpanExporter:
+    """Daemon thread draining RECORDER into <TRACE_DIR>/<service>-<pid>.jsonl every TRACE_FLUSH_S."""
+
+    def __init__(self, recorder: SpanRecorder = RECORDER, directory: str = TRACE_DIR, fmt: str = TRACE_FORMAT,
+                 interval_s: float = TRACE_FLUSH_S, max_bytes: int = TRACE_FILE_BYTES) -> None:
+        self.recorder = recorder
+        self.directory = directory
+        self.fmt = fmt
+        self.interval_s = interval_s
+        self.max_bytes = max_bytes
+        self.next_seq = 0
+        self.exported = 0
+        self.lost = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.recorder.service or 'proc'}-{os.getpid()}.jsonl")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if not self.directory or not TRACE_ENABLED:
+            return
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.flush()
+            except OSError:
+                pass   # disk full / dir removed: keep recording, try again next round
+
+    def flush(self) -> int:
+        with self._lock:
+            spans, self.next_seq, lost = self.recorder.since(self.next_seq)
+            self.lost += lost
+            if not spans:
+                return 0
+            rows = [self.recorder.to_dict(r) for r in spans]
+            if self.fmt == "otlp":
+                lines = [json.dumps(to_otlp(rows, self.recorder.service), ensure_ascii=False)]
+            else:
+                lines = [json.dumps(r, ensure_ascii=False, separators=(",", ":")) for r in rows]
+            path = self.path
+            if os.path.exists(path) and os.path.getsize(path) > self.max_bytes:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.exported += len(rows)
+            return len(rows)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+
+EXPORTER = SpanExporter()
+
+
+def load_trace(trace_id: str, directory: Optional[str] = None) -> List[dict]:
+    """All spans of one trace: this process's ring plus every service's exported files, deduplicated."""
+    if directory is None:
+        directory = EXPORTER.directory
+    found: Dict[str, dict] = {d["span_id"]: d for d in map(RECORDER.to_dict, RECORDER.find(trace_id))}
+    if directory and os.path.isdir(directory):
+        for path in glob.glob(os.path.join(directory, "*.jsonl*")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if trace_id not in line:
+                            continue
+                        try:
+                            row = json.loads(line)
+                        except ValueError:
+                            continue   # a torn line (writer died mid-flush); the rest of the file is fine
+                        for s in from_otlp(row) if "resourceSpans" in row else [row]:
+                            if s["trace_id"] == trace_id:
+                                found.setdefault(s["span_id"], s)
+            except OSError:
+                continue   # rotated away mid-read
+    return sorted(found.values(), key=lambda s: s["start_ns"])
+
+
+def build_tree(spans: List[dict]) -> List[dict]:
+    """Nest spans under their parents; spans whose parent was never recorded become roots."""
+    nodes = {s["span_id"]: dict(s, duration_ms=round((s["end_ns"] - s["start_ns"]) / 1e6, 3), children=[])
+             for s in spans}
+    roots = []
+    for n in nodes.values():
+        parent = nodes.get(n.get("parent_span_id"))
+        (parent["children"] if parent is not None and parent is not n else roots).append(n)
+    return roots
+
+
+class SpanMiddleware:
+    """ASGI middleware: one span per HTTP request / WebSocket connection, current for the handler."""
+
+    SKIP = ("/debug/", "/metrics")
+
+    def __init__(self, app, service: str = "") -> None:
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if not TRACE_ENABLED or scope["type"] not in ("http", "websocket") or scope["path"].startswith(self.SKIP):
+            return await self.app(scope, receive, send)
+        trace_id, parent = _traceparent(scope)
+        name = f"{scope.get('method', 'WS')} {scope['path']}"
+        s = Span(name, trace_id or new_trace_id(), parent, service=self.service or None)
+
+        async def send_wrapper(msg):
+            if msg["type"] == "http.response.start":
+                s.set("http.status", msg["status"])
+            await send(msg)
+
+        with s:
+            await self.app(scope, receive, send_wrapper)
+
+
+def _traceparent(scope) -> Tuple[Optional[str], Optional[str]]:
+    # W3C "00-<trace_id>-<parent span>-<flags>", for callers that trace outside the envelope
+    for k, v in scope.get("headers") or ():
+        if k == b"traceparent":
+            parts = v.decode("latin-1").split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                return parts[1], parts[2]
+    return None, None
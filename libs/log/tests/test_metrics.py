@@ -0,0 +1,60 @@
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from libs.log.debug import metrics
+from libs.log.metrics import MetricsMiddleware
+
+SERVICE = "metrics_test"
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, service=SERVICE)
+    app.get("/metrics")(metrics)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    @app.websocket("/ws/echo")
+    async def echo(ws: WebSocket):
+        await ws.accept()
+        try:
+            while True:
+                await ws.send_text(await ws.receive_text())
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def samples(text: str) -> dict:
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and f'service="{SERVICE}"' in line:
+            key, value = line.rsplit(" ", 1)
+            out[key] = float(value)
+    return out
+
+
+def test_routes_404_and_websocket_on_metrics():
+    with TestClient(make_app()) as client:
+        for i in range(3):
+            assert client.get(f"/items/{i}").status_code == 200
+        assert client.get("/nope").status_code == 404
+        with client.websocket_connect("/ws/echo") as ws:
+            ws.send_text("hi")
+            assert ws.receive_text() == "hi"
+            during = samples(client.get("/metrics").text)
+        after = samples(client.get("/metrics").text)
+
+    route = f'service="{SERVICE}",method="GET",route="/items/{{item_id}}",code="200"'
+    assert after[f"cockpit_http_request_duration_seconds_count{{{route}}}"] == 3   # one series, not one per id
+    assert after[f'cockpit_http_request_duration_seconds_bucket{{{route},le="+Inf"}}'] == 3
+    assert not any("/items/1" in k for k in after)
+    missing = f'service="{SERVICE}",method="GET",route="unmatched",code="404"'
+    assert after[f"cockpit_http_request_duration_seconds_count{{{missing}}}"] == 1
+    assert not any('route="/metrics"' in k for k in after)                        # scrapes aren't timed
+
+    ws = f'cockpit_ws_connections{{service="{SERVICE}",route="/ws/echo"}}'
+    assert during[ws] == 1 and after[ws] == 0
+    assert after[f'cockpit_http_requests_in_flight{{service="{SERVICE}"}}'] == 0
@@ -0,0 +1,86 @@
+import json
+import os
+from libs.log.spans import (Span, SpanExporter, SpanRecorder, bind, build_tree, from_otlp, hop_span, load_trace,
+                            new_trace_id, span, to_otlp)
+from libs.log.tracing import mk_trace
+
+
+def finished(rec: SpanRecorder, name: str, trace_id: str, parent=None, start: int = 0, **attrs) -> Span:
+    s = Span(name, trace_id, parent, attrs=attrs)
+    s.start_ns = start
+    rec.record(s, start + 1000)
+    return s
+
+
+def names(tree):
+    return [(n["name"], names(n["children"])) for n in tree]
+
+
+def test_envelope_hop_parents_the_receiver_under_the_sender():
+    with span("agent.turn", service="agent") as root:
+        trace = mk_trace(None)                       # stamped while agent.turn is open
+        assert trace["parent_span_id"] == root.span_id
+        with hop_span("vehicle POST /command", trace) as hop:
+            assert hop.span_id == trace["span_id"]
+            # the receiving side: its request span starts unparented, bind() adopts the envelope's trace
+            with Span("POST /command", new_trace_id(), None, service="vehicle"):
+                bind(trace)
+                with span("vehicle.apply", ok=True):
+                    pass
+    spans = load_trace(root.trace_id, directory="")
+    assert names(build_tree(spans)) == [
+        ("agent.turn", [("vehicle POST /command", [("POST /command", [("vehicle.apply", [])])])])]
+    by_name = {s["name"]: s for s in spans}
+    assert by_name["vehicle.apply"]["service"] == "vehicle" and by_name["vehicle.apply"]["attrs"] == {"ok": True}
+    assert by_name["vehicle POST /command"]["service"] == "agent"
+
+
+def test_error_is_recorded():
+    try:
+        with span("boom") as s:
+            raise KeyError("x")
+    except KeyError:
+        pass
+    assert load_trace(s.trace_id, directory="")[0]["error"] == "KeyError"
+
+
+def test_ring_overwrites_oldest_and_reports_lost():
+    rec = SpanRecorder(capacity=4, service="t")
+    tid = new_trace_id()
+    for i in range(10):
+        finished(rec, f"s{i}", tid, start=i)
+    rows, nxt, lost = rec.since(0)
+    assert [r[4] for r in rows] == ["s6", "s7", "s8", "s9"] and nxt == 10 and lost == 6
+    assert len(rec.snapshot()) == 4 and rec.since(nxt) == ([], 10, 0)
+
+
+def test_otlp_round_trip():
+    rec = SpanRecorder(service="nav")
+    tid = new_trace_id()
+    root = finished(rec, "route", tid, n=3, exact=2.5, mode="ch", cached=False)
+    child = finished(rec, "search", tid, parent=root.sid)
+    rows = [rec.to_dict(r) for r in rec.find(tid)]
+    rows[1]["error"] = "TimeoutError"
+    back = from_otlp(json.loads(json.dumps(to_otlp(rows, "nav"))))
+    assert back == rows
+    assert back[1]["parent_span_id"] == root.span_id and back[1]["span_id"] == child.span_id
+
+
+def test_exported_files_stitch_one_trace(tmp_path):
+    tid, other = new_trace_id(), new_trace_id()
+    agent, vehicle = SpanRecorder(service="agent"), SpanRecorder(service="vehicle")
+    turn = finished(agent, "agent.turn", tid, start=0)
+    finished(agent, "unrelated", other, start=5)
+    finished(vehicle, "POST /command", tid, parent=turn.sid, start=10)
+    out = SpanExporter(agent, directory=str(tmp_path), fmt="jsonl")
+    assert out.flush() == 2 and out.flush() == 0
+    assert sorted(os.listdir(tmp_path)) == [f"agent-{os.getpid()}.jsonl"]
+    with open(tmp_path / f"agent-{os.getpid()}.jsonl", "a") as f:
+        f.write('{"trace_id": "' + tid + '", "torn\n')   # a writer died mid-line
+    finished(agent, "agent.reply", tid, parent=turn.sid, start=20)
+    assert out.flush() == 1
+    assert SpanExporter(vehicle, directory=str(tmp_path), fmt="otlp").flush() == 1
+    spans = load_trace(tid, directory=str(tmp_path))
+    assert [(s["service"], s["name"]) for s in spans] == [
+        ("agent", "agent.turn"), ("vehicle", "POST /command"), ("agent", "agent.reply")]
+    assert names(build_tree(spans)) == [("agent.turn", [("POST /command", []), ("agent.reply", [])])]
@@ -1,7 +1,12 @@
 import time
 import uuid
+from contextvars import ContextVar
 from typing import Dict, Optional, Any
 
+# innermost open span (a libs.log.spans.Span) of the current task/thread; messages
+# stamped while it is open become its children
+CURRENT_SPAN: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
 def now_ms() -> int:
     return int(time.time() * 1000)
 
@@ -10,8 +15,11 @@ def new_id(prefix: str = "") -> str:
 
 def mk_trace(parent_trace: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     parent_trace = parent_trace or {}
-    trace_id = parent_trace.get("trace_id") or uuid.uuid4().hex
+    current = CURRENT_SPAN.get()
+    trace_id = parent_trace.get("trace_id") or (current.trace_id if current is not None else uuid.uuid4().hex)
     parent_span = parent_trace.get("span_id")
+    if current is not None and current.trace_id == trace_id:
+        parent_span = current.span_id
     span_id = uuid.uuid4().hex[:16]
     trace: Dict[str, Any] = {"trace_id": trace_id, "span_id": span_id, "tags": {}}
     if parent_span:
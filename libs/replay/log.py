@@ -0,0 +1,320 @@
+"""
+Append-only, segmented envelope log: what libs/replay/recorder.py writes
+and scripts/replay.py streams back.
+
+    w = SegmentWriter("/data/rec", "agent-4242", compress=True)
+    w.append(Record(t_ns, conn, HTTP_IN, 0, 0, "agent", "POST /chat", body))
+    w.close()
+
+    for rec in LogReader("/data/rec").records(session_id="s1", since_ms=t0, until_ms=t1):
+        ...
+
+A log is a directory of segments named <stream>-<seq>.seg, one stream per
+writing process, so writers never share a file. A segment starts with
+MAGIC and then holds records:
+
+    u32 length | u32 crc32 | i64 t_ns, u64 conn, u8 kind, u8 flags, u16 status,
+    u16 x4 string lengths | service, channel, session_id, type (utf-8, each cut to 64 KiB) | body
+
+t_ns is the capture time (wall-clock ns, monotonic within a stream); conn
+ties an HTTP request to its response and the messages of one WebSocket
+together. The body is the message exactly as it crossed the wire (JSON
+text or a binary envelope frame), zlib-compressed per record when that
+pays off, so any record can be decoded on its own.
+
+A sealed segment gets a <segment>.idx sidecar (JSON): a sparse index of
+capture time (ms) -> offset and the offsets of every record per
+session_id. Segments still being written, or left without an index by a
+crash, are scanned instead; a torn last record ends the scan.
+
+Reading goes through mmap, one segment at a time, and yields one record
+at a time, so a multi-GB log is never loaded into memory.
+"""
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"CKRLOG1\n"
+SEGMENT_BYTES = 64 << 20
+INDEX_EVERY = 256          # one sparse time-index entry per this many records
+MIN_COMPRESS = 256         # bodies smaller than this are stored as is
+MAX_STRING = 0xFFFF        # service/channel/session_id/type longer than this are truncated
+
+# record kinds
+HTTP_IN, HTTP_OUT, WS_OPEN, WS_IN, WS_OUT, WS_CLOSE = range(6)
+KIND_NAMES = ("http_in", "http_out", "ws_open", "ws_in", "ws_out", "ws_close")
+
+# flags
+BINARY = 1        # body is a binary envelope frame (libs/schema_utils/binary_frame.py)
+COMPRESSED = 2    # body is zlib-compressed on disk
+INTERNAL = 4      # a service-to-service hop, not a client input
+
+_PREFIX = struct.Struct("<II")
+_HEAD = struct.Struct("<qQBBHHHHH")
+_SEGMENT_RE = re.compile(r"^(?P<stream>.+)-(?P<seq>\d{6})\.seg$")
+
+
+class Record:
+    __slots__ = ("t_ns", "conn", "kind", "flags", "status", "service", "channel", "session_id", "type", "body")
+
+    def __init__(self, t_ns: int, conn: int, kind: int, flags: int, status: int, service: str, channel: str,
+                 body: bytes, session_id: str = "", type: str = "") -> None:
+        self.t_ns = t_ns
+        self.conn = conn
+        self.kind = kind
+        self.flags = flags
+        self.status = status
+        self.service = service
+        self.channel = channel        # "POST /chat?x=1" for HTTP, "/ws/audio?x=1" for WebSocket
+        self.session_id = session_id
+        self.type = type              # meta.type of the envelope, "" if the body isn't one
+        self.body = body
+
+    @property
+    def ts_ms(self) -> int:
+        return self.t_ns // 1_000_000
+
+    @property
+    def internal(self) -> bool:
+        return bool(self.flags & INTERNAL)
+
+    def envelope(self) -> Optional[dict]:
+        """The body as an envelope dict (meta + payload; binary blobs are left out), or None."""
+        return parse_envelope(self.body, bool(self.flags & BINARY))
+
+    def __repr__(self) -> str:
+        return f"Record({KIND_NAMES[self.kind]} {self.service} {self.channel} {self.type or '-'} {len(self.body)}B)"
+
+
+def parse_envelope(body: bytes, binary: bool) -> Optional[dict]:
+    if not body:
+        return None
+    try:
+        if binary:
+            from libs.schema_utils.binary_frame import decode_frame
+            env, _blob = decode_frame(body)
+        else:
+            env = json.loads(body)
+    except Exception:
+        return None
+    return env if isinstance(env, dict) and isinstance(env.get("meta"), dict) else None
+
+
+def _clip(s: str) -> bytes:
+    """utf-8 bytes of s, cut to what a u16 length holds (on a character boundary)."""
+    b = s.encode("utf-8")
+    if len(b) > MAX_STRING:
+        b = b[:MAX_STRING].decode("utf-8", "ignore").encode("utf-8")
+    return b
+
+
+def encode(rec: Record, compress: bool = False) -> bytes:
+    body, flags = rec.body, rec.flags & ~COMPRESSED
+    if compress and len(body) >= MIN_COMPRESS:
+        packed = zlib.compress(body, 1)
+        if len(packed) < len(body):
+            body, flags = packed, flags | COMPRESSED
+    strings = [_clip(s) for s in (rec.service, rec.channel, rec.session_id, rec.type)]
+    head = _HEAD.pack(rec.t_ns, rec.conn, rec.kind, flags, rec.status, *map(len, strings))
+    rest = b"".join([head, *strings, body])
+    return _PREFIX.pack(len(rest), zlib.crc32(rest)) + rest
+
+
+def decode(buf, offset: int, verify: bool = True) -> Tuple[Optional[Record], int]:
+    """(record at offset, next offset); (None, offset) at the end or at a torn/corrupt record."""
+    end = len(buf)
+    if offset + _PREFIX.size > end:
+        return None, offset
+    length, crc = _PREFIX.unpack_from(buf, offset)
+    start = offset + _PREFIX.size
+    if start + length > end or length < _HEAD.size:
+        return None, offset
+    if verify and zlib.crc32(buf[start:start + length]) != crc:
+        return None, offset
+    t_ns, conn, kind, flags, status, n_svc, n_chan, n_sid, n_typ = _HEAD.unpack_from(buf, start)
+    p = start + _HEAD.size
+    strings = []
+    for n in (n_svc, n_chan, n_sid, n_typ):
+        strings.append(buf[p:p + n].decode("utf-8"))
+        p += n
+    body = buf[p:start + length]          # bytes: mmap slicing copies, no view pins the map
+    if flags & COMPRESSED:
+        body = zlib.decompress(body)
+        flags &= ~COMPRESSED
+    service, channel, session_id, typ = strings
+    return Record(t_ns, conn, kind, flags, status, service, channel, body, session_id, typ), start + length
+
+
+class SegmentWriter:
+    """
+    Appends records to <directory>/<stream>-<seq>.seg and rolls to a new
+    segment past max_bytes. Not thread-safe: one writer thread per stream.
+    """
+
+    def __init__(self, directory: str, stream: str, max_bytes: int = SEGMENT_BYTES, compress: bool = False) -> None:
+        self.directory = directory
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.seq = -1
+        self.records = 0
+        self.bytes = 0
+        self._f = None
+        self._path = ""
+        self._size = 0
+        self._index: dict = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def append(self, rec: Record) -> None:
+        if self._f is None or self._size >= self.max_bytes:
+            self._roll()
+        data = encode(rec, self.compress)
+        offset = self._size
+        self._f.write(data)
+        self._size += len(data)
+        self.bytes += len(data)
+        self.records += 1
+        idx = self._index
+        if idx["count"] % INDEX_EVERY == 0:
+            idx["ts"].append([rec.ts_ms, offset])
+        idx["count"] += 1
+        if idx["first_ms"] is None:
+            idx["first_ms"] = rec.ts_ms
+        idx["last_ms"] = rec.ts_ms
+        if rec.session_id:
+            # keyed by what decode() will hand back
+            sid = rec.session_id if len(rec.session_id) * 3 <= MAX_STRING else _clip(rec.session_id).decode("utf-8")
+            idx["sessions"].setdefault(sid, []).append(offset)
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        self._seal()
+
+    def _roll(self) -> None:
+        self._seal()
+        # continue after whatever a previous process with the same stream name left behind
+        self.seq = max(self.seq, _last_seq(self.directory, self.stream)) + 1
+        self._path = os.path.join(self.directory, f"{self.stream}-{self.seq:06d}.seg")
+        self._f = open(self._path, "ab")
+        self._f.write(MAGIC)
+        self._size = len(MAGIC)
+        self._index = {"count": 0, "first_ms": None, "last_ms": None, "ts": [], "sessions": {}}
+
+    def _seal(self) -> None:
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+        tmp = self._path + ".idx.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self._path + ".idx")
+
+
+def _last_seq(directory: str, stream: str) -> int:
+    last = -1
+    for name in os.listdir(directory):
+        m = _SEGMENT_RE.match(name)
+        if m and m["stream"] == stream:
+            last = max(last, int(m["seq"]))
+    return last
+
+
+class Segment:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._index: Optional[dict] = None
+
+    @property
+    def index(self) -> Optional[dict]:
+        if self._index is None and os.path.exists(self.path + ".idx"):
+            try:
+                with open(self.path + ".idx", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return self._index
+
+    def records(self, session_id: Optional[str] = None, since_ms: Optional[int] = None,
+                until_ms: Optional[int] = None, verify: bool = True) -> Iterator[Record]:
+        idx = self.index
+        if idx is not None and idx["count"] and (
+                (since_ms is not None and idx["last_ms"] < since_ms) or
+                (until_ms is not None and idx["first_ms"] > until_ms)):
+            return
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= len(MAGIC):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(MAGIC)] != MAGIC:
+                    return
+                if idx is not None and session_id is not None:
+                    # straight to this session's records
+                    for off in idx["sessions"].get(session_id, ()):
+                        rec, _next = decode(mm, off, verify)
+                        if rec is None:
+                            return
+                        if until_ms is not None and rec.ts_ms > until_ms:
+                            return
+                        if since_ms is None or rec.ts_ms >= since_ms:
+                            yield rec
+                    return
+                off = len(MAGIC)
+                if idx is not None and since_ms is not None:
+                    for ts, o in idx["ts"]:
+                        if ts > since_ms:
+                            break
+                        off = o
+                while True:
+                    rec, off = decode(mm, off, verify)
+                    if rec is None:
+                        return
+                    if until_ms is not None and rec.ts_ms > until_ms:
+                        return
+                    if since_ms is not None and rec.ts_ms < since_ms:
+                        continue
+                    if session_id is not None and rec.session_id != session_id:
+                        continue
+                    yield rec
+
+
+class LogReader:
+    """All streams of a log directory, merged into one capture-time ordered record stream."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def streams(self) -> Dict[str, List[Segment]]:
+        out: Dict[str, List[Tuple[int, str]]] = {}
+        for name in os.listdir(self.directory):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                out.setdefault(m["stream"], []).append((int(m["seq"]), os.path.join(self.directory, name)))
+        return {s: [Segment(p) for _seq, p in sorted(v)] for s, v in sorted(out.items())}
+
+    def records(self, session_id: Optional[str] = None, since_ms: Optional[int] = None,
+                until_ms: Optional[int] = None, verify: bool = True) -> Iterator[Record]:
+        def chain(segments: List[Segment]) -> Iterator[Record]:
+            for seg in segments:
+                yield from seg.records(session_id, since_ms, until_ms, verify)
+        # every stream is already in capture order; merge holds one record per stream
+        return heapq.merge(*(chain(segs) for segs in self.streams().values()), key=lambda r: r.t_ns)
+
+    def stats(self) -> dict:
+        streams = self.streams()
+        segs = [s for v in streams.values() for s in v]
+        return {"streams": len(streams), "segments": len(segs),
+                "bytes": sum(os.path.getsize(s.path) for s in segs),
+                "indexed": sum(1 for s in segs if s.index is not None)}
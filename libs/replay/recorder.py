@@ -0,0 +1,283 @@
+"""
+Envelope recorder: every inbound and outbound HTTP body and WebSocket
+message of a service, appended to the segmented log in RECORD_DIR
+(libs/replay/log.py) for scripts/replay.py.
+
+    RECORD_DIR=/data/rec python scripts/run_all.py     # install() adds the middleware when set
+
+On the event loop, capture() only appends a tuple to a deque. A daemon
+thread (the same pattern as the span exporter) pulls session_id and type
+out of the envelopes, encodes the records and writes them every
+RECORD_FLUSH_S; one stream per process, so multi-worker services and the
+monolith need no coordination. Each stream is in timestamp order, which
+the reader's merge relies on: an HTTP request whose body is only complete
+later (or never read, as for a GET) reserves its place on arrival and the
+writer waits for it to be filled. When the writer falls behind by
+RECORD_QUEUE messages, new ones are dropped and counted rather than
+growing memory.
+
+Calls one service makes to another carry HOP_HEADER; they are recorded
+with the INTERNAL flag so a replay doesn't send them twice.
+"""
+import atexit
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+from .log import (BINARY, HTTP_IN, HTTP_OUT, INTERNAL, SEGMENT_BYTES, WS_CLOSE, WS_IN, WS_OPEN, WS_OUT, Record,
+                  SegmentWriter, parse_envelope)
+
+RECORD_DIR = os.getenv("RECORD_DIR", "")     # "" = recording off
+RECORD_COMPRESS = os.getenv("RECORD_COMPRESS", "1") != "0"
+RECORD_FLUSH_S = float(os.getenv("RECORD_FLUSH_S", "0.5"))
+RECORD_SEGMENT_BYTES = int(os.getenv("RECORD_SEGMENT_MB", str(SEGMENT_BYTES >> 20))) << 20
+RECORD_QUEUE = int(os.getenv("RECORD_QUEUE", "65536"))
+
+HOP_HEADER = "x-cockpit-hop"
+_HOP_KEY = HOP_HEADER.encode("latin-1")
+BINARY_CONTENT_TYPE = b"application/x-cockpit-envelope"
+
+_WALL_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def now_ns() -> int:
+    return _WALL_OFFSET_NS + time.perf_counter_ns()
+
+
+class EnvelopeRecorder:
+    def __init__(self, directory: str = RECORD_DIR, compress: bool = RECORD_COMPRESS,
+                 interval_s: float = RECORD_FLUSH_S, max_pending: int = RECORD_QUEUE,
+                 segment_bytes: int = RECORD_SEGMENT_BYTES) -> None:
+        self.directory = directory
+        self.compress = compress
+        self.interval_s = interval_s
+        self.max_pending = max_pending
+        self.segment_bytes = segment_bytes
+        self.service = ""
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self._pending: deque = deque()
+        self._conns = itertools.count(1)
+        self._writer: Optional[SegmentWriter] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self._users = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def new_conn(self) -> int:
+        # unique across the processes writing one log, so replays can key on it
+        return (os.getpid() << 32) | next(self._conns)
+
+    def capture(self, t_ns: int, kind: int, conn: int, flags: int, status: int, service: str, channel: str,
+                body: bytes) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((t_ns, kind, conn, flags, status, service, channel, body))
+        self.captured += 1
+
+    def reserve(self, t_ns: int, kind: int, conn: int, flags: int, service: str, channel: str) -> Optional[list]:
+        """Queue a record now whose body comes later (fill()); None if dropped."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return None
+        slot = [t_ns, kind, conn, flags, 0, service, channel, None]
+        self._pending.append(slot)
+        return slot
+
+    def fill(self, slot: Optional[list], body: bytes) -> None:
+        if slot is not None:
+            slot[7] = body
+            self.captured += 1
+
+    def start(self, service: str = "") -> None:
+        if not self.directory:
+            return
+        self.service = self.service or service
+        self._users += 1
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._writer = None       # a forked child must not append to the parent's segment
+        self._pending.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="envelope-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.flush()
+            except OSError:
+                pass   # disk full / dir removed: keep going, the queue bound protects memory
+
+    def flush(self, final: bool = False) -> int:
+        with self._lock:
+            pending = self._pending
+            if not pending or (pending[0][7] is None and not final):
+                return 0
+            if self._writer is None:
+                self._writer = SegmentWriter(self.directory, f"{self.service or 'proc'}-{os.getpid()}",
+                                             self.segment_bytes, self.compress)
+            n = 0
+            while pending:
+                if pending[0][7] is None and not final:
+                    break   # a reserved request still being read; what follows it waits
+                t_ns, kind, conn, flags, status, service, channel, body = pending.popleft()
+                body = body or b""
+                env = parse_envelope(body, bool(flags & BINARY)) if kind not in (WS_OPEN, WS_CLOSE) else None
+                meta = env["meta"] if env else {}
+                self._writer.append(Record(t_ns, conn, kind, flags, status, service, channel, body,
+                                           str(meta.get("session_id") or ""), str(meta.get("type") or "")))
+                n += 1
+            self._writer.flush()
+            self.written += n
+            return n
+
+    def release(self) -> None:
+        """An app that started the recorder shut down; the last one closes it."""
+        self._users -= 1
+        if self._users <= 0:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        try:
+            self.flush(final=True)
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return {"dir": self.directory, "captured": self.captured, "written": self.written, "dropped": self.dropped,
+                "pending": len(self._pending)}
+
+
+RECORDING = EnvelopeRecorder()
+
+
+def _header(scope, key: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers") or ():
+        if k == key:
+            return v
+    return None
+
+
+class RecorderMiddleware:
+    """ASGI middleware: taps receive/send and hands every body and WS message to RECORDING."""
+
+    SKIP = ("/metrics", "/health", "/debug/")
+
+    def __init__(self, app, service: str = "", recorder: EnvelopeRecorder = RECORDING) -> None:
+        self.app = app
+        self.service = service
+        self.rec = recorder
+
+    async def __call__(self, scope, receive, send):
+        typ = scope["type"]
+        if typ not in ("http", "websocket") or not self.rec.enabled:
+            return await self.app(scope, receive, send)
+        path = scope["path"][len(scope.get("root_path", "")):]
+        if path.startswith(self.SKIP):
+            return await self.app(scope, receive, send)
+        query = scope.get("query_string") or b""
+        target = path + ("?" + query.decode("latin-1") if query else "")
+        flags = INTERNAL if _header(scope, _HOP_KEY) is not None else 0
+        if typ == "websocket":
+            return await self._ws(scope, receive, send, target, flags)
+        await self._http(scope, receive, send, f"{scope['method']} {target}", flags)
+
+    async def _http(self, scope, receive, send, channel: str, flags: int) -> None:
+        rec, service, conn = self.rec, self.service, self.rec.new_conn()
+        t_in = now_ns()
+        if (_header(scope, b"content-type") or b"").startswith(BINARY_CONTENT_TYPE):
+            flags |= BINARY
+        body, out = [], []
+        state = {"in": False}
+        # queued at arrival so the stream stays in time order; the body is filled in once read
+        slot = rec.reserve(t_in, HTTP_IN, conn, flags, service, channel)
+
+        def request_done() -> None:
+            # a GET handler never reads the body; the request is complete when its response starts at the latest
+            if not state["in"]:
+                state["in"] = True
+                rec.fill(slot, b"".join(body))
+
+        async def receive_tap():
+            msg = await receive()
+            if msg["type"] == "http.request":
+                body.append(msg.get("body", b""))
+                if not msg.get("more_body"):
+                    request_done()
+            return msg
+
+        async def send_tap(msg):
+            t = msg["type"]
+            if t == "http.response.start":
+                request_done()
+                state["status"] = msg["status"]
+                ctype = next((v for k, v in msg.get("headers") or () if k.lower() == b"content-type"), b"")
+                state["flags"] = (flags & INTERNAL) | (BINARY if ctype.startswith(BINARY_CONTENT_TYPE) else 0)
+            elif t == "http.response.body":
+                out.append(msg.get("body", b""))
+                if not msg.get("more_body"):
+                    rec.capture(now_ns(), HTTP_OUT, conn, state.get("flags", 0), state.get("status", 0), service,
+                                channel, b"".join(out))
+            await send(msg)
+
+        try:
+            await self.app(scope, receive_tap, send_tap)
+        finally:
+            request_done()   # the app raised before responding: release the slot
+
+    async def _ws(self, scope, receive, send, channel: str, flags: int) -> None:
+        rec, service, conn = self.rec, self.service, self.rec.new_conn()
+        rec.capture(now_ns(), WS_OPEN, conn, flags, 0, service, channel, b"")
+        closed = [False]
+
+        def close(code: int) -> None:
+            if not closed[0]:
+                closed[0] = True
+                rec.capture(now_ns(), WS_CLOSE, conn, flags, code, service, channel, b"")
+
+        async def receive_tap():
+            msg = await receive()
+            t = msg["type"]
+            if t == "websocket.receive":
+                if msg.get("bytes") is not None:
+                    rec.capture(now_ns(), WS_IN, conn, flags | BINARY, 0, service, channel, msg["bytes"])
+                else:
+                    rec.capture(now_ns(), WS_IN, conn, flags, 0, service, channel, msg["text"].encode("utf-8"))
+            elif t == "websocket.disconnect":
+                close(msg.get("code", 1000))
+            return msg
+
+        async def send_tap(msg):
+            t = msg["type"]
+            if t == "websocket.send":
+                if msg.get("bytes") is not None:
+                    rec.capture(now_ns(), WS_OUT, conn, flags | BINARY, 0, service, channel, msg["bytes"])
+                else:
+                    rec.capture(now_ns(), WS_OUT, conn, flags, 0, service, channel, msg["text"].encode("utf-8"))
+            elif t == "websocket.close":
+                close(msg.get("code", 1000))
+            await send(msg)
+
+        try:
+            await self.app(scope, receive_tap, send_tap)
+        finally:
+            close(1006)
@@ -0,0 +1,105 @@
+import json
+import os
+from libs.replay import log
+from libs.replay.log import BINARY, HTTP_IN, HTTP_OUT, WS_IN, LogReader, Record, SegmentWriter, decode, encode
+
+T0 = 1_700_000_000_000 * 1_000_000      # ns
+
+
+def body(session_id: str, typ: str = "agent.user_utterance", pad: int = 0) -> bytes:
+    return json.dumps({"meta": {"session_id": session_id, "type": typ}, "payload": {"text": "x" * pad}}).encode()
+
+
+def rec(i: int, session_id: str, **kw) -> Record:
+    return Record(T0 + i * 1_000_000, i, HTTP_IN, 0, 0, "agent", "POST /chat", body(session_id, **kw),
+                  session_id, "agent.user_utterance")
+
+
+def write(tmp_path, n: int = 1000, **kw) -> str:
+    w = SegmentWriter(str(tmp_path), "agent-1", **kw)
+    for i in range(n):
+        w.append(rec(i, f"s{i % 7}", pad=i % 500))
+    w.close()
+    return str(tmp_path)
+
+
+def key(r: Record):
+    return (r.t_ns, r.conn, r.kind, r.flags, r.status, r.service, r.channel, r.session_id, r.type, r.body)
+
+
+def test_encode_decode_round_trip():
+    r = Record(T0, 42, WS_IN, BINARY, 101, "audio", "/ws/audio?x=1", b"\x00\x01" * 400, "会话", "audio.chunk")
+    for compress in (False, True):
+        data = encode(r, compress)
+        back, end = decode(data, 0)
+        assert key(back) == key(r) and end == len(data)
+    assert len(encode(r, True)) < len(encode(r, False))
+
+
+def test_index_and_scan_agree(tmp_path):
+    d = write(tmp_path, compress=True, max_bytes=64 << 10)
+    reader = LogReader(d)
+    assert reader.stats()["segments"] > 1 and reader.stats()["indexed"] == reader.stats()["segments"]
+    indexed = {
+        "all": [key(r) for r in reader.records()],
+        "session": [key(r) for r in reader.records(session_id="s3")],
+        "window": [key(r) for r in reader.records(since_ms=T0 // 1_000_000 + 300, until_ms=T0 // 1_000_000 + 600)],
+        "both": [key(r) for r in reader.records(session_id="s3", since_ms=T0 // 1_000_000 + 300)],
+    }
+    for name in os.listdir(d):
+        if name.endswith(".idx"):
+            os.remove(os.path.join(d, name))
+    assert reader.stats()["indexed"] == 0
+    scanned = {
+        "all": [key(r) for r in reader.records()],
+        "session": [key(r) for r in reader.records(session_id="s3")],
+        "window": [key(r) for r in reader.records(since_ms=T0 // 1_000_000 + 300, until_ms=T0 // 1_000_000 + 600)],
+        "both": [key(r) for r in reader.records(session_id="s3", since_ms=T0 // 1_000_000 + 300)],
+    }
+    assert indexed == scanned
+    assert len(scanned["all"]) == 1000
+    assert len(scanned["window"]) == 301
+    assert {k[7] for k in scanned["session"]} == {"s3"} and len(scanned["session"]) == 143
+
+
+def test_filters_across_streams_merge_in_time_order(tmp_path):
+    a, b = SegmentWriter(str(tmp_path), "agent-1"), SegmentWriter(str(tmp_path), "nav-2")
+    for i in range(0, 20, 2):
+        a.append(rec(i, "s1"))
+        b.append(rec(i + 1, "s2" if i % 4 else "s1"))
+    a.close()
+    b.flush()        # nav-2 is still being written: no index yet, it gets scanned
+    out = list(LogReader(str(tmp_path)).records(session_id="s1", since_ms=T0 // 1_000_000 + 4, until_ms=T0 // 1_000_000 + 13))
+    assert [r.conn for r in out] == [4, 5, 6, 8, 9, 10, 12, 13]
+    b.close()
+
+
+def test_torn_last_record_ends_the_scan(tmp_path):
+    w = SegmentWriter(str(tmp_path), "agent-1")
+    for i in range(5):
+        w.append(rec(i, "s1"))
+    w.close()
+    os.remove(w.path + ".idx")          # as after a crash
+    with open(w.path, "r+b") as f:
+        f.truncate(os.path.getsize(w.path) - 3)
+    assert [r.conn for r in LogReader(str(tmp_path)).records()] == [0, 1, 2, 3]
+
+    with open(w.path, "r+b") as f:     # a corrupt (not just short) record ends it too
+        f.seek(len(log.MAGIC) + 8 + 2)
+        f.write(b"\xff")
+    assert list(LogReader(str(tmp_path)).records()) == []
+    assert len(list(LogReader(str(tmp_path)).records(verify=False))) == 4
+
+
+def test_oversized_strings_are_truncated(tmp_path):
+    long_channel = "GET /nav?q=" + "路" * 40000          # 120 KB of utf-8
+    long_sid = "s" * 70000
+    w = SegmentWriter(str(tmp_path), "agent-1")
+    w.append(Record(T0, 1, HTTP_OUT, 0, 200, "nav", long_channel, b"{}", long_sid, ""))
+    w.append(rec(1, "s1"))
+    w.close()
+    first, second = LogReader(str(tmp_path)).records()
+    assert len(first.channel.encode()) <= log.MAX_STRING and long_channel.startswith(first.channel)
+    assert first.session_id == long_sid[:log.MAX_STRING]
+    assert [r.conn for r in LogReader(str(tmp_path)).records(session_id=first.session_id)] == [1]
+    assert second.session_id == "s1"
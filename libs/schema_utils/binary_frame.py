@@ -0,0 +1,50 @@
+"""
+Binary envelope framing for bulk payloads (PCM chunks, camera frames).
+
+    b"CE" | u8 version | u8 flags | u32 header_len | header (UTF-8 JSON) | blob
+
+The header is the usual envelope ({"meta": ..., "payload": ...}) minus the
+base64 field; the blob carries the raw bytes that would otherwise be
+base64'd into `chunk_b64` / `image_b64`. Decoding slices a memoryview, so
+the blob is never copied.
+"""
+import json
+import struct
+from typing import Tuple, Union
+
+MAGIC = b"CE"
+VERSION = 1
+CONTENT_TYPE = "application/x-cockpit-envelope"
+
+_HEAD = struct.Struct("!2sBBI")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class FrameError(ValueError):
+    pass
+
+
+def encode_frame(envelope: dict, blob: Buffer) -> bytes:
+    header = json.dumps(envelope, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"".join((_HEAD.pack(MAGIC, VERSION, 0, len(header)), header, blob))
+
+
+def decode_frame(data: Buffer) -> Tuple[dict, memoryview]:
+    """Returns (envelope header, blob view). The view borrows from `data`."""
+    mv = memoryview(data)
+    if len(mv) < _HEAD.size:
+        raise FrameError("short frame")
+    magic, version, _flags, hlen = _HEAD.unpack_from(mv)
+    if magic != MAGIC or version != VERSION:
+        raise FrameError(f"bad frame magic/version: {bytes(magic)!r}/{version}")
+    end = _HEAD.size + hlen
+    if end > len(mv):
+        raise FrameError("truncated header")
+    try:
+        env = json.loads(mv[_HEAD.size:end].tobytes())
+    except ValueError as e:
+        raise FrameError(f"bad header: {e}") from None
+    if not isinstance(env, dict):
+        raise FrameError("header is not an object")
+    return env, mv[end:]
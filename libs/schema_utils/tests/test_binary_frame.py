@@ -0,0 +1,42 @@
+import struct
+import pytest
+from libs.schema_utils.binary_frame import FrameError, MAGIC, VERSION, decode_frame, encode_frame
+
+ENV = {"meta": {"type": "audio.ingest", "session_id": "会话"}, "payload": {"seq": 3, "is_last": False}}
+
+
+def raw(header: bytes, blob: bytes = b"", hlen=None, magic: bytes = MAGIC, version: int = VERSION) -> bytes:
+    return struct.pack("!2sBBI", magic, version, 0, len(header) if hlen is None else hlen) + header + blob
+
+
+def test_round_trip_borrows_the_blob():
+    blob = bytes(range(256)) * 4
+    data = bytearray(encode_frame(ENV, blob))
+    env, view = decode_frame(data)
+    assert env == ENV and view == blob and isinstance(view, memoryview)
+    data[-1] ^= 0xFF                       # a view into the frame, not a copy
+    assert view[-1] == blob[-1] ^ 0xFF
+    assert decode_frame(encode_frame(ENV, b""))[1] == b""
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"CE\x01", "short frame"),
+    (raw(b"{}", magic=b"XX"), "bad frame magic/version"),
+    (raw(b"{}", version=VERSION + 1), "bad frame magic/version"),
+    (raw(b'{"meta":', hlen=100), "truncated header"),           # header runs past the end
+    (raw(b"{}", hlen=0xFFFFFFFF), "truncated header"),           # oversized length
+    (raw(b"not json", b"blob"), "bad header"),
+    (raw(b"\xff\xfe{}"), "bad header"),                          # not UTF-8
+    (raw(b"[1, 2]"), "header is not an object"),
+])
+def test_bad_frames(data, message):
+    with pytest.raises(FrameError, match=message):
+        decode_frame(data)
+
+
+def test_short_header_length_leaves_the_rest_in_the_blob():
+    header = b'{"meta":{}}'
+    env, blob = decode_frame(raw(header + b"xyz", hlen=len(header)))
+    assert env == {"meta": {}} and blob == b"xyz"
+    with pytest.raises(FrameError, match="bad header"):
+        decode_frame(raw(header, hlen=len(header) - 1))          # cut inside the JSON
@@ -0,0 +1,114 @@
+import json
+import pytest
+from libs.schema_utils.validate import SchemaRegistry, SchemaValidationError, _schema_id
+
+POINT = {
+    "$id": "schemas/t/point.schema.json",
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["lat", "lon"],
+    "properties": {
+        "lat": {"type": "number", "minimum": -90, "maximum": 90},
+        "lon": {"type": "number", "minimum": -180, "maximum": 180},
+    },
+}
+STOP = {
+    "$id": "schemas/t/stop.schema.json",
+    "type": "object",
+    "required": ["kind", "at"],
+    "properties": {
+        "at": {"$ref": "schemas/t/point.schema.json"},
+        "kind": {"type": "string", "enum": ["poi", "charger"]},
+        "name": {"type": "string", "minLength": 1, "maxLength": 8},
+        "rank": {"type": "integer"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "kw": {"type": "number"},
+    },
+    "additionalProperties": {"type": "string"},
+    "allOf": [
+        {"if": {"properties": {"kind": {"const": "charger"}}},
+         "then": {"required": ["kw"], "properties": {"kw": {"type": "number", "minimum": 1}}}},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def reg(tmp_path_factory):
+    root = tmp_path_factory.mktemp("schemas")
+    (root / "t").mkdir()
+    for schema in (POINT, STOP):
+        name = schema["$id"].rsplit("/", 1)[1]
+        (root / "t" / name).write_text(json.dumps(schema))
+    return SchemaRegistry(str(root))
+
+
+def error(reg, obj) -> SchemaValidationError:
+    with pytest.raises(SchemaValidationError) as e:
+        reg.validate(STOP["$id"], obj)
+    return e.value
+
+
+def stop(**kw) -> dict:
+    return {"kind": "poi", "at": {"lat": 31.2, "lon": 121.5}, **kw}
+
+
+def test_valid(reg):
+    assert reg.schema_ids == [POINT["$id"], STOP["$id"]]
+    reg.validate(STOP["$id"], stop(name="cafe", rank=2, tags=["a"], note="free text"))
+    reg.validate(STOP["$id"], stop(kind="charger", kw=60, rank=3.0))   # 3.0 is an integer
+
+
+def test_ref_reports_the_nested_path(reg):
+    e = error(reg, stop(at={"lat": 91, "lon": 0}))
+    assert (e.schema_id, e.path, e.message) == (STOP["$id"], "/at/lat", "91 > maximum 90")
+    assert error(reg, stop(at={"lat": 0})).message == "missing required property 'lon'"
+    assert error(reg, stop(at={"lat": 0, "lon": 0, "alt": 3})).path == "/at"   # closed object
+
+
+def test_if_then(reg):
+    e = error(reg, stop(kind="charger"))
+    assert e.message == "missing required property 'kw'"
+    assert error(reg, stop(kind="charger", kw=0)).message == "0 < minimum 1"
+    reg.validate(STOP["$id"], stop(kw=0))      # the condition doesn't hold: then is skipped
+
+
+def test_additional_properties_schema(reg):
+    e = error(reg, stop(note=3))
+    assert (e.path, e.message) == ("/note", "expected string, got int")
+
+
+def test_enum_and_types(reg):
+    assert error(reg, stop(kind="bank")).message == "'bank' not in ['poi', 'charger']"
+    assert error(reg, stop(kind={"x": 1})).path == "/kind"
+    assert error(reg, stop(rank=2.5)).message == "expected integer, got float"
+    assert error(reg, stop(rank=True)).message == "expected integer, got bool"
+    assert error(reg, stop(at={"lat": True, "lon": 0})).message == "expected number, got bool"
+    assert error(reg, stop(tags=["a", 1])).path == "/tags/1"
+
+
+def test_string_length(reg):
+    assert error(reg, stop(name="")).message == "shorter than 1"
+    assert error(reg, stop(name="x" * 9)).message == "longer than 8"
+    reg.validate(STOP["$id"], stop(name="x" * 8))
+
+
+def test_error_shape(reg):
+    e = error(reg, stop(at={"lat": -91, "lon": 0}))
+    assert e.to_error() == {"code": "schema_invalid", "message": "-91 < minimum -90",
+                            "detail": {"schema": STOP["$id"], "path": "/at/lat"}, "retryable": False}
+    assert str(e) == f"{STOP['$id']}: /at/lat: -91 < minimum -90"
+
+
+def test_message_payload_path():
+    from libs.schema_utils.validate import get_registry
+    msg = {"meta": {"message_id": "m_12345678", "timestamp_ms": 1, "source": "test", "type": "nav.poi.request",
+                    "session_id": "s", "trace": {"trace_id": "t" * 16, "span_id": "s" * 8}},
+           "payload": {"center": {"lat": 31.2, "lon": 121.5}, "query": 7}}
+    with pytest.raises(SchemaValidationError) as e:
+        get_registry().validate_message(msg)
+    assert e.value.path == "/payload/query"
+
+
+def test_schema_id_keeps_leading_dots_of_names():
+    assert _schema_id("./schemas/common/envelope.schema.json") == "schemas/common/envelope.schema.json"
+    assert _schema_id(".hidden/x.schema.json") == ".hidden/x.schema.json"
@@ -1,3 +1,362 @@
-def validate_or_raise(_schema_path: str, _obj: dict) -> None:
-    # TODO: integrate jsonschema validation
-    return
\ No newline at end of file
+import json
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCHEMA_DIR = os.path.join(ROOT, "schemas")
+ENVELOPE_SCHEMA = "schemas/common/envelope.schema.json"
+
+# 开关：生产默认开启，压测对比时可 SCHEMA_VALIDATION=0 关闭
+ENABLED = os.getenv("SCHEMA_VALIDATION", "1") != "0"
+
+# envelope meta.type -> payload schema
+TYPE_SCHEMAS: Dict[str, str] = {
+    "agent.user_utterance": "schemas/agent/agent_user_utterance.schema.json",
+    "agent.out": "schemas/agent/agent_assistant_message.schema.json",
+    "agent.tool_call": "schemas/agent/agent_tool_call.schema.json",
+    "agent.tool_result": "schemas/agent/agent_tool_result.schema.json",
+    "agent.session_state": "schemas/agent/agent_session_state.schema.json",
+    "agent.turn.cancelled": "schemas/agent/agent_turn_cancelled.schema.json",
+    "audio.ingest": "schemas/audio/audio_ingest.schema.json",
+    "audio.transcript.partial": "schemas/audio/audio_transcript.schema.json",
+    "audio.transcript.final": "schemas/audio/audio_transcript.schema.json",
+    "audio.tts.request": "schemas/audio/tts_request.schema.json",
+    "audio.tts.audio": "schemas/audio/tts_audio.schema.json",
+    "audio.wakeword": "schemas/audio/wakeword_event.schema.json",
+    "vehicle.command": "schemas/vehicle/vehicle_command.schema.json",
+    "vehicle.command_batch": "schemas/vehicle/vehicle_command_batch.schema.json",
+    "vehicle.event": "schemas/vehicle/vehicle_event.schema.json",
+    "vehicle.state": "schemas/vehicle/vehicle_state.schema.json",
+    "dms.frame": "schemas/dms/dms_frame_ingest.schema.json",
+    "dms.event": "schemas/dms/dms_event.schema.json",
+    "dms.state": "schemas/dms/dms_state.schema.json",
+    "nav.poi.request": "schemas/nav/nav_poi_request.schema.json",
+    "nav.poi.result": "schemas/nav/nav_poi_result.schema.json",
+    "nav.route.request": "schemas/nav/nav_route_request.schema.json",
+    "nav.route.result": "schemas/nav/nav_route_result.schema.json",
+}
+
+
+class SchemaValidationError(ValueError):
+    def __init__(self, schema_id: str, path: List[str], message: str) -> None:
+        self.schema_id = schema_id
+        self.path = "/" + "/".join(path)
+        self.message = message
+        super().__init__(f"{schema_id}: {self.path}: {message}")
+
+    def to_error(self) -> dict:
+        # shape of schemas/common/error.schema.json
+        return {
+            "code": "schema_invalid",
+            "message": self.message,
+            "detail": {"schema": self.schema_id, "path": self.path},
+            "retryable": False,
+        }
+
+
+class _Invalid(Exception):
+    # path is collected in reverse while unwinding, so the success path never builds strings
+    __slots__ = ("path", "message")
+
+    def __init__(self, message: str) -> None:
+        self.path: List[str] = []
+        self.message = message
+
+
+Check = Callable[[Any], None]
+
+_TYPE_TESTS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+}
+
+
+def _chain(checks: List[Check]) -> Check:
+    if not checks:
+        return lambda v: None
+    if len(checks) == 1:
+        return checks[0]
+    checks_t = tuple(checks)
+
+    def run(v: Any) -> None:
+        for c in checks_t:
+            c(v)
+    return run
+
+
+class SchemaRegistry:
+    """Loads every *.schema.json once and compiles each into a reusable check function."""
+
+    def __init__(self, schema_dir: str = SCHEMA_DIR) -> None:
+        self._raw: Dict[str, dict] = {}
+        self._compiled: Dict[str, Check] = {}
+        self._compiling: set = set()
+        for dirpath, _dirs, files in os.walk(schema_dir):
+            for fn in sorted(files):
+                if not fn.endswith(".schema.json"):
+                    continue
+                with open(os.path.join(dirpath, fn), encoding="utf-8") as f:
+                    schema = json.load(f)
+                rel = os.path.relpath(os.path.join(dirpath, fn), os.path.dirname(schema_dir))
+                self._raw[schema.get("$id") or rel.replace(os.sep, "/")] = schema
+        for schema_id in self._raw:
+            self.check_fn(schema_id)
+        self._envelope = self._compiled.get(ENVELOPE_SCHEMA)
+
+    @property
+    def schema_ids(self) -> List[str]:
+        return sorted(self._raw)
+
+    def check_fn(self, schema_id: str) -> Check:
+        fn = self._compiled.get(schema_id)
+        if fn is not None:
+            return fn
+        if schema_id not in self._raw:
+            raise KeyError(f"unknown schema: {schema_id}")
+        if schema_id in self._compiling:
+            # recursive $ref: bind late
+            return lambda v: self._compiled[schema_id](v)
+        self._compiling.add(schema_id)
+        try:
+            fn = self._compile(self._raw[schema_id])
+        finally:
+            self._compiling.discard(schema_id)
+        self._compiled[schema_id] = fn
+        return fn
+
+    def raw(self, schema_id: str) -> dict:
+        return self._raw[schema_id]
+
+    def compile(self, schema: dict, label: str = "<inline>") -> Callable[[Any], None]:
+        """Compile a (sub)schema into a validator raising SchemaValidationError."""
+        check = self._compile(schema)
+
+        def validate(obj: Any) -> None:
+            try:
+                check(obj)
+            except _Invalid as e:
+                raise SchemaValidationError(label, e.path[::-1], e.message) from None
+        return validate
+
+    def validate(self, schema_id: str, obj: Any) -> None:
+        try:
+            self.check_fn(schema_id)(obj)
+        except _Invalid as e:
+            raise SchemaValidationError(schema_id, e.path[::-1], e.message) from None
+
+    def validate_envelope(self, msg: Any) -> None:
+        # fast path: envelope + trace only, payload is just checked to be an object
+        if self._envelope is None:
+            raise KeyError(f"unknown schema: {ENVELOPE_SCHEMA}")
+        try:
+            self._envelope(msg)
+        except _Invalid as e:
+            raise SchemaValidationError(ENVELOPE_SCHEMA, e.path[::-1], e.message) from None
+
+    def validate_message(self, msg: Any, payload_schema: Optional[str] = None) -> None:
+        self.validate_envelope(msg)
+        schema_id = payload_schema or TYPE_SCHEMAS.get(msg["meta"]["type"])
+        if schema_id is None:
+            return
+        try:
+            self.check_fn(schema_id)(msg["payload"])
+        except _Invalid as e:
+            raise SchemaValidationError(schema_id, ["payload"] + e.path[::-1], e.message) from None
+
+    def validate_batch(self, msgs: Iterable[Any]) -> List[Optional[SchemaValidationError]]:
+        """Validate many envelopes; returns one entry per message (None == valid)."""
+        out: List[Optional[SchemaValidationError]] = []
+        append = out.append
+        validate = self.validate_message
+        for msg in msgs:
+            try:
+                validate(msg)
+                append(None)
+            except SchemaValidationError as e:
+                append(e)
+        return out
+
+    # -- compiler --------------------------------------------------------
+
+    def _compile(self, s: dict) -> Check:
+        checks: List[Check] = []
+
+        ref = s.get("$ref")
+        if ref is not None:
+            checks.append(self.check_fn(ref))
+
+        typ = s.get("type")
+        if typ is not None:
+            names = typ if isinstance(typ, list) else [typ]
+            tests = tuple(_TYPE_TESTS[n] for n in names)
+            expected = "|".join(names)
+            if len(tests) == 1:
+                test = tests[0]
+
+                def check_type(v: Any) -> None:
+                    if not test(v):
+                        raise _Invalid(f"expected {expected}, got {type(v).__name__}")
+            else:
+                def check_type(v: Any) -> None:
+                    for t in tests:
+                        if t(v):
+                            return
+                    raise _Invalid(f"expected {expected}, got {type(v).__name__}")
+            checks.append(check_type)
+
+        if "const" in s:
+            const = s["const"]
+
+            def check_const(v: Any) -> None:
+                if v != const:
+                    raise _Invalid(f"expected const {const!r}")
+            checks.append(check_const)
+
+        if "enum" in s:
+            enum = s["enum"]
+            allowed = frozenset(enum)
+
+            def check_enum(v: Any) -> None:
+                try:
+                    ok = v in allowed
+                except TypeError:  # unhashable (dict/list) can never match a scalar enum
+                    ok = False
+                if not ok:
+                    raise _Invalid(f"{v!r} not in {enum}")
+            checks.append(check_enum)
+
+        if "minLength" in s:
+            min_len = s["minLength"]
+
+            def check_min_len(v: Any) -> None:
+                if isinstance(v, str) and len(v) < min_len:
+                    raise _Invalid(f"shorter than {min_len}")
+            checks.append(check_min_len)
+
+        if "maxLength" in s:
+            max_len = s["maxLength"]
+
+            def check_max_len(v: Any) -> None:
+                if isinstance(v, str) and len(v) > max_len:
+                    raise _Invalid(f"longer than {max_len}")
+            checks.append(check_max_len)
+
+        lo, hi = s.get("minimum"), s.get("maximum")
+        if lo is not None or hi is not None:
+            def check_range(v: Any) -> None:
+                if isinstance(v, bool) or not isinstance(v, (int, float)):
+                    return
+                if lo is not None and v < lo:
+                    raise _Invalid(f"{v} < minimum {lo}")
+                if hi is not None and v > hi:
+                    raise _Invalid(f"{v} > maximum {hi}")
+            checks.append(check_range)
+
+        if "required" in s or "properties" in s or "additionalProperties" in s:
+            checks.append(self._compile_object(s))
+
+        if "items" in s:
+            item = self._compile(s["items"])
+
+            def check_items(v: Any) -> None:
+                if not isinstance(v, list):
+                    return
+                for i, x in enumerate(v):
+                    try:
+                        item(x)
+                    except _Invalid as e:
+                        e.path.append(str(i))
+                        raise
+            checks.append(check_items)
+
+        for sub in s.get("allOf", ()):
+            checks.append(self._compile(sub))
+
+        if "if" in s:
+            cond = self._compile(s["if"])
+            then = self._compile(s["then"]) if "then" in s else None
+            other = self._compile(s["else"]) if "else" in s else None
+
+            def check_if(v: Any) -> None:
+                try:
+                    cond(v)
+                except _Invalid:
+                    if other is not None:
+                        other(v)
+                    return
+                if then is not None:
+                    then(v)
+            checks.append(check_if)
+
+        return _chain(checks)
+
+    def _compile_object(self, s: dict) -> Check:
+        required = tuple(s.get("required", ()))
+        props = {k: self._compile(sub) for k, sub in (s.get("properties") or {}).items()}
+        extra = s.get("additionalProperties", True)
+        extra_check: Optional[Check] = self._compile(extra) if isinstance(extra, dict) else None
+        closed = extra is False
+
+        def check_object(v: Any) -> None:
+            if not isinstance(v, dict):
+                return
+            for k in required:
+                if k not in v:
+                    raise _Invalid(f"missing required property {k!r}")
+            for k, x in v.items():
+                sub = props.get(k)
+                if sub is None:
+                    if closed:
+                        raise _Invalid(f"unexpected property {k!r}")
+                    if extra_check is None:
+                        continue
+                    sub = extra_check
+                try:
+                    sub(x)
+                except _Invalid as e:
+                    e.path.append(str(k))
+                    raise
+        return check_object
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> SchemaRegistry:
+    return SchemaRegistry()
+
+
+def _schema_id(schema_path: str) -> str:
+    if os.path.isabs(schema_path):
+        schema_path = os.path.relpath(schema_path, ROOT)
+    return schema_path.replace(os.sep, "/").removeprefix("./")
+
+
+def validate_or_raise(schema_path: str, obj: dict) -> None:
+    if not ENABLED:
+        return
+    get_registry().validate(_schema_id(schema_path), obj)
+
+
+def validate_envelope(msg: dict) -> None:
+    if not ENABLED:
+        return
+    get_registry().validate_envelope(msg)
+
+
+def validate_message(msg: dict, payload_schema: Optional[str] = None) -> None:
+    """Envelope + payload check; payload schema is looked up by meta.type unless given."""
+    if not ENABLED:
+        return
+    get_registry().validate_message(msg, _schema_id(payload_schema) if payload_schema else None)
+
+
+def validate_batch(msgs: Iterable[dict]) -> List[Optional[SchemaValidationError]]:
+    if not ENABLED:
+        return [None for _ in msgs]
+    return get_registry().validate_batch(msgs)
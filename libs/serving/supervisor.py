@@ -0,0 +1,129 @@
+"""
+Keeps N worker processes (libs/serving/worker.py) per service alive.
+
+Each worker gets its own control port (WORKER_CONTROL_PORT_BASE upwards).
+poll() restarts workers that exited, with backoff when they die young, and
+kills and replaces a worker whose /health fails HEALTH_FAILURES times in a
+row once it is past its startup grace. Killing a worker drops its listening
+socket, so the kernel stops routing new connections to it at once.
+"""
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+CONTROL_PORT_BASE = int(os.getenv("WORKER_CONTROL_PORT_BASE", "9100"))
+HEALTH_FAILURES = int(os.getenv("WORKER_HEALTH_FAILURES", "3"))
+HEALTH_TIMEOUT_S = 1.0
+STARTUP_GRACE_S = float(os.getenv("WORKER_STARTUP_GRACE_S", "30"))
+BACKOFF_MIN_S = 0.5
+BACKOFF_MAX_S = 10.0
+
+
+class Worker:
+    __slots__ = ("service", "app", "port", "control_port", "proc", "started_at", "failures", "restarts",
+                 "backoff_s", "restart_at", "ready")
+
+    def __init__(self, service: str, app: str, port: int, control_port: int) -> None:
+        self.service = service
+        self.app = app
+        self.port = port
+        self.control_port = control_port
+        self.proc: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.backoff_s = BACKOFF_MIN_S
+        self.restart_at: Optional[float] = None
+        self.ready = False
+
+
+class Supervisor:
+    def __init__(self, cwd: str, env: dict) -> None:
+        self.cwd = cwd
+        self.env = env
+        self.workers: List[Worker] = []
+        self._next_control = CONTROL_PORT_BASE
+
+    def add(self, service: str, app: str, port: int, workers: int) -> None:
+        for _ in range(workers):
+            self.workers.append(Worker(service, app, port, self._next_control))
+            self._next_control += 1
+
+    def start(self) -> None:
+        for w in self.workers:
+            self._spawn(w)
+
+    def _spawn(self, w: Worker) -> None:
+        w.proc = subprocess.Popen(
+            [sys.executable, "-m", "libs.serving.worker", w.app, "--port", str(w.port),
+             "--control-port", str(w.control_port)],
+            cwd=self.cwd, env=self.env,
+        )
+        w.started_at = time.monotonic()
+        w.failures = 0
+        w.restart_at = None
+        w.ready = False
+
+    def _healthy(self, w: Worker) -> bool:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{w.control_port}/health", timeout=HEALTH_TIMEOUT_S) as r:
+                return r.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        for w in self.workers:
+            if w.restart_at is not None:
+                if now >= w.restart_at:
+                    w.restarts += 1
+                    print(f"[supervisor] restarting {w.service} worker :{w.control_port} (#{w.restarts})")
+                    self._spawn(w)
+                continue
+            code = w.proc.poll()
+            if code is None:
+                if self._healthy(w):
+                    w.ready = True
+                    w.failures = 0
+                    continue
+                if not w.ready and now - w.started_at < STARTUP_GRACE_S:
+                    continue   # still starting up
+                w.failures += 1
+                if w.failures < HEALTH_FAILURES:
+                    continue
+                print(f"[supervisor] {w.service} worker :{w.control_port} failed {w.failures} health checks, killing")
+                self._kill(w)
+            else:
+                print(f"[supervisor] {w.service} worker :{w.control_port} exited with {code}")
+            # died young -> back off harder before the next try
+            w.backoff_s = min(w.backoff_s * 2, BACKOFF_MAX_S) if now - w.started_at < BACKOFF_MAX_S else BACKOFF_MIN_S
+            w.restart_at = now + w.backoff_s
+
+    @staticmethod
+    def _kill(w: Worker) -> None:
+        w.proc.terminate()
+        try:
+            w.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            w.proc.kill()
+            w.proc.wait()
+
+    def stop(self) -> None:
+        for w in self.workers:
+            if w.proc is not None and w.proc.poll() is None:
+                w.proc.terminate()
+        for w in self.workers:
+            if w.proc is not None:
+                try:
+                    w.proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    w.proc.kill()
+
+    def status(self) -> List[dict]:
+        return [{"service": w.service, "control_port": w.control_port, "pid": w.proc.pid if w.proc else None,
+                 "alive": w.proc is not None and w.proc.poll() is None, "ready": w.ready, "restarts": w.restarts}
+                for w in self.workers]
@@ -0,0 +1,117 @@
+import subprocess
+import pytest
+from libs.serving import supervisor
+from libs.serving.supervisor import Supervisor
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeProc:
+    """A worker process that lives until told to exit (or is terminated)."""
+
+    pids = 100
+
+    def __init__(self, argv, cwd=None, env=None) -> None:
+        self.argv = argv
+        FakeProc.pids += 1
+        self.pid = FakeProc.pids
+        self.code = None
+        self.terminated = False
+
+    def poll(self):
+        return self.code
+
+    def terminate(self) -> None:
+        self.terminated = True
+        self.code = -15
+
+    def kill(self) -> None:
+        self.code = -9
+
+    def wait(self, timeout=None):
+        return self.code
+
+
+class FakeSupervisor(Supervisor):
+    def __init__(self) -> None:
+        super().__init__(cwd=".", env={})
+        self.health = {}     # control port -> answers /health
+
+    def _healthy(self, w) -> bool:
+        return self.health.get(w.control_port, False)
+
+
+@pytest.fixture
+def sup(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(supervisor, "time", clock)
+    monkeypatch.setattr(subprocess, "Popen", FakeProc)
+    monkeypatch.setattr(supervisor, "STARTUP_GRACE_S", 5.0)
+    monkeypatch.setattr(supervisor, "HEALTH_FAILURES", 3)
+    s = FakeSupervisor()
+    s.clock = clock
+    s.add("nav", "services.nav_service.app:app", 8005, workers=2)
+    s.start()
+    return s
+
+
+def test_workers_get_their_own_control_ports(sup):
+    a, b = sup.workers
+    assert (a.control_port, b.control_port) == (supervisor.CONTROL_PORT_BASE, supervisor.CONTROL_PORT_BASE + 1)
+    assert a.proc.argv[-3:] == ["8005", "--control-port", str(a.control_port)]
+    assert [s["alive"] for s in sup.status()] == [True, True]
+
+
+def test_exited_worker_is_restarted_with_backoff(sup):
+    w = sup.workers[0]
+    first = w.proc
+    first.code = 1
+    sup.poll()
+    assert w.restart_at == sup.clock.now + 1.0 and w.proc is first    # died young: backoff doubled
+    sup.clock.now += 0.5
+    sup.poll()
+    assert w.proc is first                                             # still backing off
+    sup.clock.now += 0.5
+    sup.poll()
+    assert w.proc is not first and w.restarts == 1 and w.restart_at is None
+
+    w.proc.code = 1                                                    # and again, right away
+    sup.poll()
+    assert w.restart_at == sup.clock.now + 2.0
+    assert sup.workers[1].restarts == 0
+
+
+def test_unhealthy_worker_is_killed_after_grace(sup):
+    w = sup.workers[0]
+    first = w.proc
+    for _ in range(5):
+        sup.poll()                          # starting up: failed probes don't count yet
+    assert w.failures == 0 and not first.terminated
+
+    sup.clock.now += 6
+    sup.poll()
+    sup.poll()
+    assert w.failures == 2 and not first.terminated
+    sup.health[w.control_port] = True
+    sup.poll()
+    assert w.failures == 0 and w.ready                  # one good probe resets the count
+
+    sup.health[w.control_port] = False
+    for _ in range(3):
+        sup.poll()
+    assert first.terminated and w.restart_at is not None
+    sup.clock.now += supervisor.BACKOFF_MAX_S
+    sup.poll()
+    assert w.proc is not first and w.restarts == 1 and not w.ready
+
+
+def test_stop_terminates_everything(sup):
+    sup.stop()
+    assert all(w.proc.terminated for w in sup.workers)
+    assert [s["alive"] for s in sup.status()] == [False, False]
@@ -0,0 +1,96 @@
+"""
+One worker process of a multi-worker service.
+
+    python -m libs.serving.worker services.nav_service.app:app --port 8005 --control-port 9105
+
+Every worker binds the service port with SO_REUSEPORT and the kernel spreads
+incoming connections across them. A worker joins that group only after its
+lifespan has started and its own /health answers 200 on a private control
+port; until then it receives no traffic. The supervisor probes the same
+control port, so it can tell workers apart.
+"""
+import argparse
+import asyncio
+import socket
+from typing import Optional
+import uvicorn
+
+HEALTH_PATH = "/health"
+HEALTH_TRIES = 50
+HEALTH_RETRY_S = 0.1
+
+
+def reuseport_socket(host: str, port: int) -> socket.socket:
+    # bound but not yet listening: the kernel only balances onto listening sockets
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+async def probe(host: str, port: int, path: str = HEALTH_PATH, timeout_s: float = 1.0) -> Optional[int]:
+    """HTTP status of GET path, or None if nothing answered."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout_s)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        line = await asyncio.wait_for(reader.readline(), timeout_s)
+        parts = line.split()
+        return int(parts[1]) if len(parts) >= 2 else None
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return None
+    finally:
+        writer.close()
+
+
+class GatedServer(uvicorn.Server):
+    def __init__(self, config: uvicorn.Config, shared: socket.socket, control: socket.socket) -> None:
+        super().__init__(config)
+        self.shared = shared
+        self.control = control
+
+    async def startup(self, sockets=None) -> None:
+        # lifespan + the control listener first
+        await super().startup(sockets=[self.control])
+        if self.should_exit:
+            return
+        host, port = self.control.getsockname()[:2]
+        for _ in range(HEALTH_TRIES):
+            if await probe(host, port) == 200:
+                break
+            await asyncio.sleep(HEALTH_RETRY_S)
+        else:
+            self.should_exit = True
+            return
+        config = self.config
+
+        def create_protocol(_loop=None):
+            # built the same way uvicorn builds it for its own listeners
+            return config.http_protocol_class(config=config, server_state=self.server_state,
+                                              app_state=self.lifespan.state, _loop=_loop)
+
+        loop = asyncio.get_running_loop()
+        self.servers.append(await loop.create_server(create_protocol, sock=self.shared, backlog=config.backlog))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("app", help="import path, e.g. services.nav_service.app:app")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, required=True)
+    ap.add_argument("--control-port", type=int, required=True)
+    ap.add_argument("--log-level", default="warning")
+    args = ap.parse_args()
+    shared = reuseport_socket(args.host, args.port)
+    control = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    control.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    control.bind(("127.0.0.1", args.control_port))
+    config = uvicorn.Config(args.app, host=args.host, port=args.port, log_level=args.log_level, lifespan="on")
+    GatedServer(config, shared, control).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Agent session store at scale: memory per session (tracemalloc vs the store's
+own estimate), get()/turn() lookups per second over N live sessions, LRU
+eviction under a memory cap, and snapshot save/load for a warm restart.
+
+  python scripts/bench_agent_sessions.py [--sessions 100000] [--lookups 500000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.agent_service.core.sessions import SessionStore  # noqa: E402
+
+STATE = {"speed_kph": 0.0, "gear": "P", "windows": {"FL": 0, "FR": 30, "RL": 0, "RR": 0},
+         "ac": {"ac_on": True, "temp_c": 22.0, "fan_level": 2, "mode": "auto", "recirc_on": False}}
+NAV = {"tool_name": "nav.poi", "result": {"items": [
+    {"name": "Starbucks 星巴克 新天地店", "lat": 31.22411, "lon": 121.461906, "distance_m": 1010.6,
+     "address": "上海市新天地附近"}]}}
+NAV_JSON = json.dumps(NAV, ensure_ascii=False)
+
+
+def ids(n: int) -> list:
+    return [f"sess_{i:08x}" for i in range(n)]
+
+
+def fill(store: SessionStore, keys: list, nav_every: int = 0) -> None:
+    for i, k in enumerate(keys):
+        s = store.get(k)
+        s.turn_id = 1
+        s.last_vehicle_state = STATE      # shared snapshot, as in the service
+        if nav_every and i % nav_every == 0:
+            s.last_nav = json.loads(NAV_JSON)   # each turn gets its own result
+            store.account(s)
+
+
+def memory(n: int, nav_every: int) -> dict:
+    keys = ids(n)     # the ids belong to the caller either way
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = SessionStore(ttl_s=3600, max_bytes=1 << 40)
+    fill(store, keys, nav_every)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return {"sessions": n, "with_last_nav": f"1/{nav_every}" if nav_every else "none",
+            "bytes_per_session": round(used / n, 1), "estimate_per_session": round(store.nbytes / n, 1)}
+
+
+def lookups(n: int, count: int) -> dict:
+    keys = ids(n)
+    store = SessionStore(ttl_s=3600, max_bytes=1 << 40)
+    fill(store, keys)
+    rnd = random.Random(1)
+    picks = [keys[rnd.randrange(n)] for _ in range(count)]
+    get = store.get
+    t0 = time.perf_counter()
+    for k in picks:
+        get(k)
+    get_s = time.perf_counter() - t0
+
+    async def turns():
+        t = time.perf_counter()
+        for k in picks:
+            async with store.turn(k) as s:
+                s.turn_id += 1
+        return time.perf_counter() - t
+    turn_s = asyncio.run(turns())
+    return {"sessions": n, "get_per_s": round(count / get_s), "turn_per_s": round(count / turn_s),
+            "turn_us": round(turn_s / count * 1e6, 2)}
+
+
+def concurrency() -> dict:
+    # 2 sessions x 20 concurrent turns, each holding the session for 10 ms
+    store = SessionStore()
+
+    async def one(sid, log):
+        async with store.turn(sid) as s:
+            s.turn_id += 1
+            log.append((sid, "in"))
+            await asyncio.sleep(0.01)
+            log.append((sid, "out"))
+
+    async def run():
+        log = []
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(f"s{i % 2}", log) for i in range(40)))
+        elapsed = time.perf_counter() - t0
+        inside = {}
+        overlap = False
+        for sid, ev in log:
+            inside[sid] = inside.get(sid, 0) + (1 if ev == "in" else -1)
+            overlap |= inside[sid] > 1
+        return elapsed, overlap
+    elapsed, overlap = asyncio.run(run())
+    return {"turns": 40, "sessions": 2, "elapsed_ms": round(elapsed * 1000, 1),
+            "serial_would_be_ms": 400, "same_session_overlap": overlap,
+            "turn_ids": sorted(s.turn_id for s in store._sessions.values())}
+
+
+def eviction(n: int) -> dict:
+    store = SessionStore(ttl_s=3600, max_bytes=8 * 1024 * 1024)
+    keys = ids(n)
+    t0 = time.perf_counter()
+    fill(store, keys)
+    elapsed = time.perf_counter() - t0
+    oldest_kept = next(iter(store._sessions))
+    return dict(store.stats(), inserts_per_s=round(n / elapsed), oldest_kept=oldest_kept)
+
+
+def snapshot(n: int) -> dict:
+    store = SessionStore(ttl_s=3600, max_bytes=1 << 40)
+    fill(store, ids(n), nav_every=10)
+    path = os.path.join(tempfile.gettempdir(), f"bench_sessions_{os.getpid()}.jsonl")
+    try:
+        t0 = time.perf_counter()
+        store.save(path)
+        save_s = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        fresh = SessionStore(ttl_s=3600, max_bytes=1 << 40)
+        t0 = time.perf_counter()
+        loaded = fresh.load(path)
+        load_s = time.perf_counter() - t0
+        shared = len({id(s.last_vehicle_state) for s in fresh._sessions.values()})
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    return {"sessions": n, "save_s": round(save_s, 3), "file_mb": round(size / 1e6, 1),
+            "load_s": round(load_s, 3), "loaded": loaded, "distinct_vehicle_states_after_load": shared}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=100_000)
+    ap.add_argument("--lookups", type=int, default=500_000)
+    args = ap.parse_args()
+    n = args.sessions
+    print({"memory": memory(n, 0)})
+    print({"memory": memory(n, 10)})
+    print({"lookups": lookups(n, args.lookups)})
+    print({"per_session_lock": concurrency()})
+    print({"eviction_8mb_cap": eviction(n)})
+    print({"snapshot": snapshot(n)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Concurrent 16 kHz audio streams one core can sustain through the ingest
+stage (jitter buffer -> PCM ring -> VAD -> transcript events).
+
+  python scripts/bench_audio_ingest.py [--streams 50] [--seconds 10] [--chunk-ms 20]
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.audio_service.pipeline.ingest import IngestSession  # noqa: E402
+
+SR = 16000
+
+
+def synth_utterance(seconds: float, rng: np.random.Generator) -> bytes:
+    """Speech-like bursts (modulated harmonics) separated by low noise."""
+    t = np.arange(int(SR * seconds)) / SR
+    sig = 0.002 * rng.standard_normal(len(t))
+    on = (np.sin(2 * np.pi * 0.25 * t) > -0.2)
+    voiced = 0.25 * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    sig[on] += voiced[on]
+    return (np.clip(sig, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def chunks(pcm: bytes, chunk_ms: int):
+    step = SR * chunk_ms // 1000 * 2
+    out = [pcm[i:i + step] for i in range(0, len(pcm), step)]
+    # mild reordering: swap every 9th pair
+    order = list(range(len(out)))
+    for i in range(0, len(order) - 1, 9):
+        order[i], order[i + 1] = order[i + 1], order[i]
+    return [(k, out[k], k == len(out) - 1) for k in order]
+
+
+def run(streams: int, seconds: float, chunk_ms: int, b64: bool) -> dict:
+    rng = np.random.default_rng(0)
+    pcm = synth_utterance(seconds, rng)
+    seq = chunks(pcm, chunk_ms)
+    if b64:
+        seq = [{"seq": k, "chunk_b64": base64.b64encode(c).decode(), "is_last": last} for k, c, last in seq]
+    sessions = [IngestSession() for _ in range(streams)]
+    events = 0
+    t0 = time.process_time()
+    # interleave streams chunk by chunk like a busy server would
+    for item in seq:
+        for s in sessions:
+            if b64:
+                events += len(s.push_b64(item))
+            else:
+                events += len(s.push_pcm(*item))
+    cpu = time.process_time() - t0
+    audio_s = streams * seconds
+    return {
+        "mode": "json+b64" if b64 else "pcm",
+        "streams": streams,
+        "chunk_ms": chunk_ms,
+        "cpu_s": round(cpu, 3),
+        "realtime_factor": round(cpu / audio_s, 5),
+        "streams_per_core": int(audio_s / cpu),
+        "events": events,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--streams", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--chunk-ms", type=int, default=20)
+    args = ap.parse_args()
+    for b64 in (False, True):
+        print(run(args.streams, args.seconds, args.chunk_ms, b64))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Bytes on the wire and decode CPU per frame: JSON+base64 vs binary envelope
+framing, for a 20 ms PCM chunk and a camera JPEG.
+
+  python scripts/bench_binary_frames.py [--n 20000] [--jpeg-kb 60]
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import now_ms, mk_trace, new_id  # noqa: E402
+from libs.schema_utils.binary_frame import decode_frame, encode_frame  # noqa: E402
+
+
+def meta(typ: str) -> dict:
+    return {
+        "message_id": new_id("m_"),
+        "timestamp_ms": now_ms(),
+        "source": "test",
+        "type": typ,
+        "session_id": "bench",
+        "trace": mk_trace(None),
+    }
+
+
+def per_frame_us(fn, n: int) -> float:
+    t0 = time.process_time()
+    for _ in range(n):
+        fn()
+    return (time.process_time() - t0) / n * 1e6
+
+
+def compare(name: str, typ: str, field: str, payload: dict, blob: bytes, n: int) -> None:
+    env = {"meta": meta(typ), "payload": payload}
+    text = json.dumps({"meta": env["meta"], "payload": {**payload, field: base64.b64encode(blob).decode()}}, ensure_ascii=False)
+    binary = encode_frame(env, blob)
+
+    def decode_json():
+        msg = json.loads(text)
+        return base64.b64decode(msg["payload"][field])
+
+    def decode_bin():
+        _env, view = decode_frame(binary)
+        return view
+
+    assert bytes(decode_json()) == bytes(decode_bin())
+    json_us = per_frame_us(decode_json, n)
+    bin_us = per_frame_us(decode_bin, n)
+    json_bytes = len(text.encode("utf-8"))
+    print(f"{name:<14} raw={len(blob):>7}B  json+b64={json_bytes:>7}B ({json_bytes / len(blob):.2f}x)"
+          f"  binary={len(binary):>7}B ({len(binary) / len(blob):.2f}x)"
+          f"  | decode json={json_us:7.2f}us binary={bin_us:6.2f}us")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--jpeg-kb", type=int, default=60)
+    args = ap.parse_args()
+
+    pcm = os.urandom(640)  # 20 ms @ 16 kHz s16le mono
+    compare("audio 20ms", "audio.ingest", "chunk_b64",
+            {"format": "pcm_s16le", "sample_rate_hz": 16000, "channels": 1, "seq": 1, "is_last": False}, pcm, args.n)
+    jpeg = os.urandom(args.jpeg_kb * 1024)
+    compare(f"dms jpeg {args.jpeg_kb}k", "dms.frame", "image_b64",
+            {"format": "jpg", "timestamp_ms": now_ms()}, jpeg, max(100, args.n // 20))
+
+
+if __name__ == "__main__":
+    main()
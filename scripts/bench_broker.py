@@ -0,0 +1,122 @@
+"""
+Cross-process latency through the event bus broker (publisher process ->
+broker process -> N subscriber processes), p50/p99 vs subscriber count.
+
+  python scripts/bench_broker.py [--subs 1,4,16] [--msgs 2000] [--rate 1000]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.event_bus.broker import Broker  # noqa: E402
+from libs.event_bus.client import BrokerBus  # noqa: E402
+
+TOPIC = "vehicle.event"
+
+
+def run_broker(path: str) -> None:
+    asyncio.run(Broker(path).serve_forever())
+
+
+class _Sink:
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.lat_us = []
+        self.done = asyncio.Event()
+
+    async def send_text(self, data: str) -> None:
+        sent_ns = json.loads(data)["t"]
+        self.lat_us.append((time.monotonic_ns() - sent_ns) / 1000)
+        if len(self.lat_us) >= self.n:
+            self.done.set()
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def run_subscriber(path: str, n: int, ready, out) -> None:
+    async def main():
+        bus = BrokerBus(path)
+        sink = _Sink(n)
+        await bus.subscribe(TOPIC, sink)
+        ready.set()
+        try:
+            await asyncio.wait_for(sink.done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        out.put(sink.lat_us)
+        await bus.close()
+    asyncio.run(main())
+
+
+def run_publisher(path: str, n: int, rate: float) -> None:
+    async def main():
+        bus = BrokerBus(path)
+        await bus.connect()
+        gap = 1.0 / rate
+        payload = {"event": "state_changed", "state": {"windows": {"FL": 0, "FR": 30, "RL": 0, "RR": 0}}}
+        for _ in range(n):
+            await bus.publish(TOPIC, {"t": time.monotonic_ns(), "payload": payload})
+            await asyncio.sleep(gap)
+        await bus.close()
+    asyncio.run(main())
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else float("nan")
+
+
+def bench(n_subs: int, n_msgs: int, rate: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    broker = mp.Process(target=run_broker, args=(path,), daemon=True)
+    broker.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+    out = mp.Queue()
+    subs = []
+    for _ in range(n_subs):
+        ready = mp.Event()
+        p = mp.Process(target=run_subscriber, args=(path, n_msgs, ready, out), daemon=True)
+        p.start()
+        ready.wait()
+        subs.append(p)
+    time.sleep(0.2)  # let SUB frames reach the broker
+
+    run_publisher(path, n_msgs, rate)
+    lat = []
+    for _ in subs:
+        lat.extend(out.get(timeout=120))
+    for p in subs:
+        p.join(timeout=5)
+    broker.terminate()
+    return {
+        "subscribers": n_subs,
+        "delivered": len(lat),
+        "expected": n_subs * n_msgs,
+        "p50_us": round(pct(lat, 0.50), 1),
+        "p99_us": round(pct(lat, 0.99), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--subs", default="1,4,16")
+    ap.add_argument("--msgs", type=int, default=2000)
+    ap.add_argument("--rate", type=float, default=1000.0, help="messages per second")
+    args = ap.parse_args()
+    for n in (int(x) for x in args.subs.split(",")):
+        print(json.dumps(bench(n, args.msgs, args.rate)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+CPU per dms.event as /ws/dms viewers are added: the old per-connection loop
+(envelope + trace + json.dumps per viewer) vs one serialization fanned out
+through the bus.
+
+  python scripts/bench_dms_broadcast.py [--events 500] [--viewers 1,10,100,500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.event_bus import client  # noqa: E402
+from libs.event_bus.bus import TopicBus  # noqa: E402
+from libs.log.tracing import now_ms, mk_trace, new_id  # noqa: E402
+from services.dms_service.pipeline.broadcast import ALL_TOPIC, DMSBroadcaster  # noqa: E402
+
+EVENT = {"event_type": "DISTRACTION_GAZE_OFF_ROAD", "severity": 3, "duration_ms": 1200, "metrics": {"phase": "start"}}
+
+
+class FakeWS:
+    def __init__(self) -> None:
+        self.received = 0
+
+    async def send_text(self, data: str) -> None:
+        self.received += 1
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def per_connection(viewers: int, events: int) -> float:
+    socks = [FakeWS() for _ in range(viewers)]
+    t0 = time.process_time()
+    for _ in range(events):
+        for ws in socks:
+            out = {"meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "dms",
+                            "type": "dms.event", "session_id": "demo", "trace": mk_trace(None)},
+                   "payload": EVENT}
+            await ws.send_text(json.dumps(out, ensure_ascii=False))
+    return time.process_time() - t0
+
+
+async def shared(viewers: int, events: int) -> float:
+    bus = client._BUS = TopicBus(maxsize=events + 1)
+    socks = [FakeWS() for _ in range(viewers)]
+    for ws in socks:
+        await bus.subscribe(ALL_TOPIC, ws)
+    b = DMSBroadcaster()
+    t0 = time.process_time()
+    for _ in range(events):
+        await b.publish("demo", None, [EVENT])
+    while sum(ws.received for ws in socks) < viewers * events:
+        await asyncio.sleep(0)
+    dt = time.process_time() - t0
+    for ws in socks:
+        await bus.unsubscribe(ALL_TOPIC, ws)
+    return dt
+
+
+async def main_async(events: int, viewers) -> None:
+    for v in viewers:
+        old = await per_connection(v, events)
+        new = await shared(v, events)
+        print(f"viewers={v:<5} per-connection={old / events * 1e6:9.1f}us/event  "
+              f"shared={new / events * 1e6:8.1f}us/event  ({new / events / v * 1e6:.2f}us per viewer)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=500)
+    ap.add_argument("--viewers", default="1,10,100,500")
+    args = ap.parse_args()
+    asyncio.run(main_async(args.events, [int(x) for x in args.viewers.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+DMS pipeline: frames/sec per worker by batch size (decode + stand-in model),
+then an overload run with more camera fps than the pool can absorb, to show
+latency stays flat while frames are dropped instead of queued.
+
+  python scripts/bench_dms_pipeline.py [--workers 1] [--cameras 8] [--fps 15] [--seconds 6]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.dms_service.pipeline import stage  # noqa: E402
+from services.dms_service.pipeline.decode import encode_png  # noqa: E402
+
+
+def synth_face(rng: np.random.Generator, eyes_open: bool, h: int = 240, w: int = 320) -> bytes:
+    yy, xx = np.mgrid[0:h, 0:w]
+    img = 40 + 10 * rng.standard_normal((h, w))
+    face = ((yy - h * 0.5) / (h * 0.42)) ** 2 + ((xx - w * 0.5) / (w * 0.28)) ** 2 < 1
+    img[face] = 190
+    if eyes_open:
+        for cx in (0.40, 0.60):
+            eye = ((yy - h * 0.37) / (h * 0.03)) ** 2 + ((xx - w * cx) / (w * 0.04)) ** 2 < 1
+            img[eye] = 20
+    mouth = (abs(yy - h * 0.70) < h * 0.015) & (abs(xx - w * 0.5) < w * 0.08)
+    img[mouth] = 60
+    return encode_png(np.clip(img, 0, 255).astype(np.uint8))
+
+
+def per_worker(frames, batches=(1, 4, 8, 16), rounds: int = 20) -> None:
+    stage._init_worker(stage.DEFAULT_MODEL)
+    for b in batches:
+        items = [(frames[i % len(frames)], "png") for i in range(b)]
+        stage.infer_batch(items)
+        t0 = time.process_time()
+        for _ in range(rounds):
+            stage.infer_batch(items)
+        dt = time.process_time() - t0
+        print(f"batch={b:<3} {b * rounds / dt:8.1f} frames/s per worker  ({dt / rounds / b * 1000:.2f} ms/frame)")
+
+
+async def overload(frames, workers: int, cameras: int, fps: float, seconds: float) -> None:
+    events = []
+
+    async def emit(sid, _trace, evs):
+        events.extend(evs)
+
+    p = stage.DMSPipeline(emit, workers=workers)
+    await p.start()
+    await asyncio.gather(*[p.submit("warm", frames[0], "png", 0) for _ in range(workers)])
+    p.latency_ms.clear()
+    windows = []
+
+    async def camera(k: int):
+        ts = 0
+        period = 1 / fps
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            p.submit(f"cam{k}", frames[(ts // 100) % len(frames)], "png", ts)
+            ts += int(period * 1000)
+            await asyncio.sleep(period)
+
+    async def sample():
+        for _ in range(int(seconds)):
+            await asyncio.sleep(1)
+            lat = sorted(p.latency_ms)
+            windows.append(round(lat[int(len(lat) * 0.99) - 1], 1) if lat else None)
+            p.latency_ms.clear()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(sample(), *[camera(k) for k in range(cameras)])
+    dt = time.perf_counter() - t0
+    s = p.stats()
+    await p.close()
+    print({"workers": workers, "offered_fps": cameras * fps, "processed_fps": round(s["processed"] / dt, 1),
+           "dropped": s["dropped"], "stale": s["stale"], "avg_batch": s["avg_batch"],
+           "events": len(events), "p99_ms_per_second": windows})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--cameras", type=int, default=8)
+    ap.add_argument("--fps", type=float, default=15)
+    ap.add_argument("--seconds", type=float, default=6)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+    # 2 s eyes open, 1 s closed, repeating (frames indexed by ts // 100)
+    frames = [synth_face(rng, eyes_open=(i % 30) < 20) for i in range(30)]
+    per_worker(frames)
+    asyncio.run(overload(frames, args.workers, args.cameras, args.fps, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
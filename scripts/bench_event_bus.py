@@ -0,0 +1,80 @@
+"""
+TopicBus fan-out latency with and without one slow subscriber.
+
+  python scripts/bench_event_bus.py [--subs 200] [--msgs 200] [--slow-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.event_bus.bus import TopicBus  # noqa: E402
+
+
+class FakeWS:
+    def __init__(self, delay_s: float = 0.0) -> None:
+        self.delay_s = delay_s
+        self.latencies = []
+
+    async def send_text(self, data: str) -> None:
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        else:
+            await asyncio.sleep(0)
+        sent_at = float(data[data.index(":") + 1:data.index(",")])
+        self.latencies.append(time.perf_counter() - sent_at)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+
+async def run(n_subs: int, n_msgs: int, slow_ms: float) -> None:
+    bus = TopicBus(maxsize=64)
+    fast = [FakeWS() for _ in range(n_subs)]
+    subs = list(fast)
+    if slow_ms:
+        subs.append(FakeWS(slow_ms / 1000))
+    for ws in subs:
+        await bus.subscribe("vehicle.event", ws)
+
+    publish_cost = []
+    for _ in range(n_msgs):
+        t0 = time.perf_counter()
+        # body carries the send timestamp so receivers can compute latency
+        await bus.publish("vehicle.event", '{"t":%r,"payload":{}}' % t0)
+        publish_cost.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.05)
+
+    lat = [x for ws in fast for x in ws.latencies]
+    st = bus.stats()["vehicle.event"]
+    print(f"subs={n_subs:<5} slow={'yes' if slow_ms else 'no ':<4}"
+          f" publish p50={pct(publish_cost, .5) * 1e6:7.1f}us p99={pct(publish_cost, .99) * 1e6:7.1f}us"
+          f" | deliver p50={pct(lat, .5) * 1e3:6.2f}ms p99={pct(lat, .99) * 1e3:6.2f}ms"
+          f" | dropped={st['dropped']} depth_max={st['queue_depth_max']}")
+    for ws in subs:
+        await bus.unsubscribe("vehicle.event", ws)
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--subs", type=int, default=200)
+    ap.add_argument("--msgs", type=int, default=200)
+    ap.add_argument("--slow-ms", type=float, default=50.0)
+    args = ap.parse_args()
+    for n in (10, args.subs):
+        await run(n, args.msgs, 0)
+        await run(n, args.msgs, args.slow_ms)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
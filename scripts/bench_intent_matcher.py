@@ -0,0 +1,97 @@
+"""
+Plans/sec of the compiled intent matcher vs the old sequential regex scan,
+as the intent table grows (synthetic POI intents are appended).
+
+  python scripts/bench_intent_matcher.py [--sizes 6,50,200,500] [--n 20000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.agent_service.core import orchestrator  # noqa: E402
+from services.agent_service.core.intents import INTENTS, IntentMatcher, poi_intent  # noqa: E402
+
+CORPUS = [
+    "把副驾窗开到30%",
+    "温度调到24",
+    "帮我找一下最近的星巴克",
+    "空调二十四度，风量3档，打开内循环",
+    "主驾窗开一半然后副驾窗开到百分之二十",
+    "我想听点音乐",
+    "附近有没有充电站",
+    "吹脚模式",
+    # long ASR transcript with no intent: worst case for leading .* patterns
+    "嗯那个就是我想说一下今天的天气好像还不错我们等会儿去哪里吃饭呢你觉得怎么样" * 4,
+]
+
+_CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+
+
+def synthetic_intents(n: int, rng: random.Random):
+    out = []
+    for i in range(n):
+        words = {"".join(rng.choice(_CJK) for _ in range(3)): f"poi_{i}_{j}" for j in range(3)}
+        out.append(poi_intent(f"poi_{i}", words))
+    return out
+
+
+def legacy_patterns(intents):
+    # shape of the old simple_plan: one leading-.* regex per trigger, tried in order
+    pats = []
+    for it in intents:
+        for w in it.triggers:
+            pats.append(re.compile(r"(%s).*(\d{1,3})\s*%%?" % re.escape(w)))
+    return pats
+
+
+def rate(fn, texts, n):
+    t0 = time.perf_counter()
+    i = 0
+    while i < n:
+        for t in texts:
+            fn(t)
+        i += len(texts)
+    return i / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="6,50,200,500")
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'intents':>8}{'AC states':>11}{'matcher/s':>12}{'cached plan/s':>15}{'legacy regex/s':>16}")
+    for size in (int(x) for x in args.sizes.split(",")):
+        intents = INTENTS + synthetic_intents(max(0, size - len(INTENTS)), rng)
+        matcher = IntentMatcher(intents)
+        norm = [orchestrator.normalize(t) for t in CORPUS]
+        ac_rate = rate(matcher.match, norm, args.n)
+
+        pats = legacy_patterns(intents)
+
+        def legacy(t):
+            for p in pats:
+                if p.search(t):
+                    return p
+            return None
+        legacy_rate = rate(legacy, CORPUS, max(len(CORPUS), args.n // 10))
+
+        orchestrator.MATCHER = matcher
+        orchestrator._match.cache_clear()
+        cached_rate = rate(orchestrator.simple_plan, CORPUS, args.n)
+        print(f"{len(intents):>8}{len(matcher._ac):>11}{ac_rate:>12,.0f}{cached_rate:>15,.0f}{legacy_rate:>16,.0f}")
+
+    t0 = time.perf_counter()
+    plans = orchestrator.plan_batch(CORPUS * 100)
+    print(f"\nplan_batch({len(plans)}): {len(plans) / (time.perf_counter() - t0):,.0f} plans/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Nav MCP server over stdio: pipelined vs one-at-a-time tools/call throughput,
+plus a cancellation check. Spawns `python -m services.nav_service.mcp.server`.
+
+  python scripts/bench_mcp_stdio.py [--requests 500] [--window 64]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CENTER = (31.23, 121.47)
+QUERIES = ["starbucks", "coffee", "charging station", "parking", "gas"]
+
+
+class Client:
+    def __init__(self, proc) -> None:
+        self.proc = proc
+        self.next_id = 0
+        self.pending = {}
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                break
+            msg = json.loads(line)
+            fut = self.pending.pop(msg.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+
+    def send(self, msg: dict) -> None:
+        self.proc.stdin.write(json.dumps(msg).encode() + b"\n")
+
+    def request(self, method: str, params: dict) -> "tuple[int, asyncio.Future]":
+        self.next_id += 1
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = fut
+        self.send({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params})
+        return self.next_id, fut
+
+    async def call(self, method: str, params: dict) -> dict:
+        _, fut = self.request(method, params)
+        await self.proc.stdin.drain()
+        return await fut
+
+
+def plan(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        jitter = lambda: (CENTER[0] + rng.uniform(-0.015, 0.015), CENTER[1] + rng.uniform(-0.015, 0.015))  # noqa: E731
+        if rng.random() < 0.5:
+            (a, b), (c, d) = jitter(), jitter()
+            out.append({"name": "nav.route", "arguments": {"origin": {"lat": a, "lon": b}, "destination": {"lat": c, "lon": d}}})
+        else:
+            a, b = jitter()
+            out.append({"name": "nav.poi", "arguments": {"center": {"lat": a, "lon": b}, "query": rng.choice(QUERIES),
+                                                         "radius_m": 3000}})
+    return out
+
+
+async def sequential(cli: Client, calls) -> float:
+    t0 = time.perf_counter()
+    for c in calls:
+        r = await cli.call("tools/call", c)
+        assert "result" in r, r
+    return time.perf_counter() - t0
+
+
+async def pipelined(cli: Client, calls, window: int) -> float:
+    sem = asyncio.Semaphore(window)
+
+    async def one(c):
+        async with sem:
+            r = await cli.call("tools/call", c)
+            assert "result" in r, r
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(c) for c in calls))
+    return time.perf_counter() - t0
+
+
+async def cancellation(cli: Client, n: int = 50) -> dict:
+    """Fire n requests and cancel every other one straight away; cancelled ids must get no reply."""
+    sent = [cli.request("tools/call", c) for c in plan(n, seed=7)]
+    for rid, _ in sent[::2]:
+        cli.send({"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": rid, "reason": "bench"}})
+    await cli.proc.stdin.drain()
+    await asyncio.gather(*(f for _, f in sent[1::2]))
+    await cli.call("ping", {})   # anything cancelled too late has answered by now
+    answered = sum(f.done() for _, f in sent[::2])
+    for rid, _ in sent[::2]:
+        cli.pending.pop(rid, None)
+    return {"sent": n, "cancelled": n // 2, "cancelled_but_answered": answered}
+
+
+async def amain(args) -> None:
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "services.nav_service.mcp.server", cwd=ROOT,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=16 * 1024 * 1024)
+    cli = Client(proc)
+    t0 = time.perf_counter()
+    init = await cli.call("initialize", {"protocolVersion": "2025-06-18", "capabilities": {},
+                                         "clientInfo": {"name": "bench", "version": "0"}})
+    startup_s = time.perf_counter() - t0
+    cli.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+    tools = (await cli.call("tools/list", {}))["result"]["tools"]
+    print({"server": init["result"]["serverInfo"], "tools": [t["name"] for t in tools], "startup_s": round(startup_s, 2)})
+
+    calls = plan(args.requests)
+    await pipelined(cli, calls[:50], args.window)   # page in the graph and index
+    calls = plan(args.requests, seed=1)
+    seq = await sequential(cli, calls)
+    calls = plan(args.requests, seed=2)
+    pipe = await pipelined(cli, calls, args.window)
+    print({"requests": args.requests, "sequential_rps": int(args.requests / seq),
+           "pipelined_rps": int(args.requests / pipe), "window": args.window, "speedup": round(seq / pipe, 2)})
+    print(await cancellation(cli))
+
+    bad = await cli.call("tools/call", {"name": "nav.poi", "arguments": {"center": {"lat": 1}}})
+    print({"invalid_args_error": bad["error"]["code"]})
+
+    proc.stdin.close()
+    await proc.wait()
+    cli.reader.cancel()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--window", type=int, default=64, help="max requests in flight when pipelining")
+    asyncio.run(amain(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Metrics recording overhead in ns/observation: histogram observe on a cached
+child, with the labels() lookup, counters, the in-flight gauge pair, the
+whole MetricsMiddleware around a trivial ASGI app, and what a /metrics
+scrape costs. Also checks that threads hammering one histogram lose no
+counts (per-thread shards, no lock).
+
+  python scripts/bench_metrics.py [--n 200000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log import metrics  # noqa: E402
+
+H = metrics.histogram("bench_seconds", "bench", ("service", "method", "route", "code"))
+C = metrics.counter("bench_total", "bench", ("topic",))
+G = metrics.gauge("bench_in_flight", "bench", ("service",))
+
+
+def per_op_ns(fn, n: int) -> float:
+    fn(n // 10)   # warm up
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter_ns()
+        fn(n)
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return round(best, 1)
+
+
+def empty(n):
+    for _ in range(n):
+        pass
+
+
+def observe_cached(n):
+    h = H.labels("agent", "POST", "/chat", "200")
+    for i in range(n):
+        h.observe_ns(i & 0xFFFFFF)
+
+
+def observe_labels(n):
+    for i in range(n):
+        H.labels("agent", "POST", "/chat", "200").observe_ns(i & 0xFFFFFF)
+
+
+def observe_timed(n):
+    h = H.labels("agent", "POST", "/chat", "200")
+    clock = time.perf_counter_ns
+    for _ in range(n):
+        t0 = clock()
+        h.observe_ns(clock() - t0)
+
+
+def observe_ws(n):
+    clock = time.perf_counter_ns
+    for _ in range(n):
+        metrics.observe_ws("agent", "agent.user_utterance", clock())
+
+
+def counter_inc(n):
+    c = C.labels("vehicle.delta")
+    for _ in range(n):
+        c.inc()
+
+
+def gauge_pair(n):
+    g = G.labels("agent")
+    for _ in range(n):
+        g.inc()
+        g.dec()
+
+
+async def _asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def asgi_ns(app, n: int) -> float:
+    scope = {"type": "http", "method": "POST", "path": "/chat", "root_path": "", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_msg):
+        pass
+
+    async def run(k):
+        for _ in range(k):
+            await app(dict(scope), receive, send)
+
+    async def best():
+        await run(n // 10)
+        out = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter_ns()
+            await run(n)
+            out = min(out, (time.perf_counter_ns() - t0) / n)
+        return out
+
+    return asyncio.run(best())
+
+
+def threaded(threads: int, n: int) -> dict:
+    h = metrics.Histogram()
+
+    def work():
+        for i in range(n):
+            h.observe_ns(i)
+
+    ts = [threading.Thread(target=work) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    wall = time.perf_counter() - t0
+    _cum, count, _sum = h.snapshot()
+    return {"threads": threads, "expected": threads * n, "counted": count,
+            "ns_per_obs": round(wall * 1e9 / (threads * n), 1)}
+
+
+def scrape_ms(series: int) -> float:
+    reg = metrics.Registry()
+    h = reg.add(metrics.Metric("histogram", "scrape_seconds", "x", ("route",), metrics.Histogram))
+    for i in range(series):
+        h.labels(f"/r{i}").observe_ns(i * 1000)
+    t0 = time.perf_counter()
+    for _ in range(10):
+        reg.render()
+    return round((time.perf_counter() - t0) * 100, 3)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    args = ap.parse_args()
+    n = args.n
+    base = asgi_ns(_asgi_app, n // 4)
+    wrapped = asgi_ns(metrics.MetricsMiddleware(_asgi_app, service="agent"), n // 4)
+    out = {
+        "loop_ns": per_op_ns(empty, n),
+        "histogram_observe_ns": per_op_ns(observe_cached, n),
+        "histogram_labels_observe_ns": per_op_ns(observe_labels, n),
+        "histogram_timed_ns": per_op_ns(observe_timed, n),
+        "observe_ws_ns": per_op_ns(observe_ws, n),
+        "counter_inc_ns": per_op_ns(counter_inc, n),
+        "gauge_inc_dec_ns": per_op_ns(gauge_pair, n),
+        "asgi_request_ns": round(base, 1),
+        "asgi_request_with_metrics_ns": round(wrapped, 1),
+        "middleware_overhead_ns": round(wrapped - base, 1),
+        "threads": threaded(4, n // 4),
+        "scrape_ms": {s: scrape_ms(s) for s in (10, 100, 1000)},
+    }
+    for k, v in out.items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+run_all.py multi-process vs --monolith: startup time until every /health
+answers, total RSS of the process tree, and /chat latency for a vehicle
+command and a nav query (agent -> vehicle / nav hop).
+
+  python scripts/bench_monolith.py [--requests 200]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import mk_trace, new_id, now_ms  # noqa: E402
+
+SERVICES = {"audio": 8001, "agent": 8002, "vehicle": 8003, "dms": 8004, "nav": 8005}
+MONOLITH_PORT = 8000
+UTTERANCES = ["把副驾窗开到30%", "温度调到24", "带我去最近的星巴克"]
+
+
+def urls(monolith: bool) -> dict:
+    if monolith:
+        return {s: f"http://127.0.0.1:{MONOLITH_PORT}/{s}" for s in SERVICES}
+    return {s: f"http://127.0.0.1:{port}" for s, port in SERVICES.items()}
+
+
+def group_rss_mb(pgid: int) -> float:
+    total = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            if os.getpgid(int(pid)) != pgid:
+                continue
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except (OSError, ProcessLookupError):
+            continue
+    return round(total / 1024, 1)
+
+
+def utterance(text: str) -> dict:
+    return {
+        "meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "ui",
+                 "type": "agent.user_utterance", "session_id": "bench", "trace": mk_trace()},
+        "payload": {"input_modality": "api", "text": text},
+    }
+
+
+def run(monolith: bool, requests: int) -> dict:
+    cmd = [sys.executable, os.path.join(ROOT, "scripts", "run_all.py")] + (["--monolith"] if monolith else [])
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = urls(monolith)
+    try:
+        with httpx.Client(timeout=10) as c:
+            pending = set(base)
+            while pending:
+                if time.perf_counter() - t0 > 60:
+                    raise RuntimeError(f"services not healthy: {sorted(pending)}")
+                for s in list(pending):
+                    try:
+                        if c.get(base[s] + "/health").status_code == 200:
+                            pending.discard(s)
+                    except httpx.HTTPError:
+                        pass
+                time.sleep(0.05)
+            startup_s = time.perf_counter() - t0
+            rss = group_rss_mb(proc.pid)
+            for text in UTTERANCES * 3:   # warm: first nav call loads the graph/index
+                r = c.post(base["agent"] + "/chat", json=utterance(text))
+                r.raise_for_status()
+                assert "异常" not in r.json()["payload"]["text"], r.text   # tool call failed
+            lat = {t: [] for t in UTTERANCES}
+            for i in range(requests):
+                text = UTTERANCES[i % len(UTTERANCES)]
+                body = utterance(text)
+                t1 = time.perf_counter()
+                c.post(base["agent"] + "/chat", json=body).raise_for_status()
+                lat[text].append((time.perf_counter() - t1) * 1000)
+            rss_after = group_rss_mb(proc.pid)
+    finally:
+        os.killpg(proc.pid, signal.SIGINT)
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+    out = {"mode": "monolith" if monolith else "multi-process", "startup_s": round(startup_s, 2),
+           "rss_mb": rss, "rss_after_load_mb": rss_after}
+    for text, xs in lat.items():
+        xs.sort()
+        out[f"chat_ms_p50_p95[{text}]"] = (round(xs[len(xs) // 2], 2), round(xs[int(len(xs) * 0.95)], 2))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    args = ap.parse_args()
+    for monolith in (False, True):
+        print(run(monolith, args.requests))
+        time.sleep(1)   # let the ports free up
+
+
+if __name__ == "__main__":
+    main()
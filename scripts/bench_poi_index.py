@@ -0,0 +1,85 @@
+"""
+POI index build / open / query figures at 1M and 10M synthetic POIs
+clustered around 20 city centres.
+
+  python scripts/bench_poi_index.py [--sizes 1000000,10000000] [--queries 2000] [--dir /tmp/poi_bench]
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.nav_service.providers.poi_index import PoiIndex, build_index, synthetic_pois  # noqa: E402
+
+CITIES = [(31.23, 121.47), (39.90, 116.40), (23.13, 113.26), (22.54, 114.06), (30.57, 104.07),
+          (30.27, 120.15), (34.34, 108.94), (29.56, 106.55), (32.06, 118.80), (30.59, 114.31),
+          (36.07, 120.38), (38.04, 114.51), (28.23, 112.94), (41.80, 123.43), (45.80, 126.53),
+          (26.07, 119.30), (25.04, 102.71), (36.65, 117.12), (34.75, 113.62), (43.82, 125.32)]
+QUERIES = ["starbucks", "coffee", "charging station", "parking", "gas", "星巴克", ""]
+RADII = [1000, 3000, 5000, 10000]
+
+
+def dir_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+
+
+def run(n: int, queries: int, base: str) -> None:
+    path = os.path.join(base, f"n{n}")
+    shutil.rmtree(path, ignore_errors=True)
+    t0 = time.perf_counter()
+    data = synthetic_pois(n, seed=1, centers=CITIES, spread_deg=0.3)
+    gen_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    build_index(path, *data)
+    build_s = time.perf_counter() - t0
+    del data
+    t0 = time.perf_counter()
+    ix = PoiIndex(path)
+    open_ms = (time.perf_counter() - t0) * 1000
+
+    rng = np.random.default_rng(2)
+    plan = []
+    for _ in range(queries):
+        c = CITIES[rng.integers(len(CITIES))]
+        plan.append((c[0] + rng.normal(0, 0.2), c[1] + rng.normal(0, 0.2),
+                     QUERIES[rng.integers(len(QUERIES))], RADII[rng.integers(len(RADII))]))
+    for q in plan[:100]:
+        ix.search(*q)   # fault pages in
+    lat = []
+    hits = 0
+    t_all = time.perf_counter()
+    for la, lo, q, r in plan:
+        t0 = time.perf_counter()
+        hits += len(ix.search(la, lo, q, r, 5))
+        lat.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - t_all
+    lat.sort()
+    print({"pois": n, "gen_s": round(gen_s, 1), "build_s": round(build_s, 1), "index_mb": round(dir_mb(path), 1),
+           "open_ms": round(open_ms, 2), "qps": int(queries / total),
+           "p50_ms": round(lat[len(lat) // 2], 3), "p99_ms": round(lat[int(len(lat) * 0.99)], 3),
+           "avg_hits": round(hits / queries, 2)})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000000,10000000")
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--dir", default="/tmp/poi_bench")
+    ap.add_argument("--keep", action="store_true", help="leave the built indexes on disk")
+    args = ap.parse_args()
+    try:
+        for n in (int(x) for x in args.sizes.split(",")):
+            run(n, args.queries, args.dir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(args.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
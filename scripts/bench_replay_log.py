@@ -0,0 +1,104 @@
+"""
+Envelope log throughput: append rate through SegmentWriter (with and
+without per-record compression), the on-disk ratio, a full merged read,
+one session's records through the segment index vs a scan, a time-window
+read, and the reader's peak RSS growth over the whole log (bounded by one
+mapped segment, not by the log size).
+
+  python scripts/bench_replay_log.py [--records 200000] [--sessions 2000] [--dir /tmp/bench-replay-log]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.replay.log import HTTP_IN, HTTP_OUT, LogReader, Record, Segment, SegmentWriter  # noqa: E402
+
+
+def body(i: int, session: str, typ: str) -> bytes:
+    env = {"meta": {"message_id": f"m{i}", "timestamp_ms": 1760000000000 + i, "source": "ui", "type": typ,
+                    "session_id": session, "trace": {"trace_id": f"{i:032x}", "span_id": f"{i:016x}"}},
+           "payload": {"text": "open the driver window halfway and set the cabin to 22 degrees",
+                       "context": {"speed_kph": 42, "gear": "D", "windows": [0, 0, 0, 0]}}}
+    return json.dumps(env, ensure_ascii=False).encode("utf-8")
+
+
+def write(directory: str, n: int, sessions: int, compress: bool, segment_mb: int) -> dict:
+    shutil.rmtree(directory, ignore_errors=True)
+    w = SegmentWriter(directory, "bench-1", segment_mb << 20, compress)
+    t_ns = 1760000000000 * 1_000_000
+    raw = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        sid = f"s{i % sessions}"
+        kind = HTTP_IN if i % 2 == 0 else HTTP_OUT
+        b = body(i, sid, "agent.user_utterance" if kind == HTTP_IN else "agent.reply")
+        raw += len(b)
+        w.append(Record(t_ns + i * 1_000_000, i // 2, kind, 0, 200 if kind else 0, "agent", "POST /chat", b, sid,
+                        "agent.user_utterance" if kind == HTTP_IN else "agent.reply"))
+    w.close()
+    wall = time.perf_counter() - t0
+    return {"compress": compress, "records_per_s": round(n / wall), "mb_per_s": round(raw / wall / 1e6, 1),
+            "disk_ratio": round(w.bytes / raw, 3), "segments": len(LogReader(directory).streams()["bench-1"])}
+
+
+class Unindexed(Segment):
+    index = None
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read(directory: str, n: int, sessions: int) -> dict:
+    reader = LogReader(directory)
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    count = sum(1 for _ in reader.records())
+    scan = time.perf_counter() - t0
+    rss1 = rss_mb()
+    assert count == n, (count, n)
+
+    t0 = time.perf_counter()
+    hit = sum(1 for _ in reader.records(session_id="s7"))
+    indexed_ms = (time.perf_counter() - t0) * 1000
+
+    # the same lookup without the sidecar index, as for a segment a crash left unsealed
+    t0 = time.perf_counter()
+    miss = sum(1 for segs in reader.streams().values() for seg in segs
+               for _ in Unindexed(seg.path).records(session_id="s7"))
+    scan_lookup_ms = (time.perf_counter() - t0) * 1000
+
+    base = 1760000000000
+    t0 = time.perf_counter()
+    window = sum(1 for _ in reader.records(since_ms=base + n // 2, until_ms=base + n // 2 + 999))
+    window_ms = (time.perf_counter() - t0) * 1000
+    return {"full_read_records_per_s": round(n / scan), "full_read_rss_growth_mb": round(rss1 - rss0, 1),
+            "session_records": hit, "session_indexed_ms": round(indexed_ms, 2),
+            "session_scan_records": miss, "session_scan_ms": round(scan_lookup_ms, 1),
+            "window_1s_records": window, "window_1s_ms": round(window_ms, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=200_000)
+    ap.add_argument("--sessions", type=int, default=2000)
+    ap.add_argument("--segment-mb", type=int, default=16)
+    ap.add_argument("--dir", default="/tmp/bench-replay-log")
+    args = ap.parse_args()
+    out = {"write_plain": write(args.dir, args.records, args.sessions, False, args.segment_mb)}
+    out["write_compressed"] = write(args.dir, args.records, args.sessions, True, args.segment_mb)
+    out["read"] = read(args.dir, args.records, args.sessions)
+    shutil.rmtree(args.dir, ignore_errors=True)
+    for k, v in out.items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Route query latency on synthetic city grids: bidirectional A* vs contraction
+hierarchies vs a route-cache hit, plus CH preprocessing cost.
+
+  python scripts/bench_routing.py [--grids 100,200] [--queries 200] [--dir /tmp/route_bench]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.nav_service.providers.road_graph import RoadGraph, build_graph, synthetic_grid  # noqa: E402
+from services.nav_service.providers.routing import CH, RouteEngine, astar_bidir, build_ch  # noqa: E402
+
+
+def pcts(xs):
+    xs = sorted(xs)
+    return round(xs[len(xs) // 2], 2), round(xs[int(len(xs) * 0.99)], 2)
+
+
+def run(side: int, queries: int, base: str) -> None:
+    path = os.path.join(base, f"grid{side}")
+    shutil.rmtree(path, ignore_errors=True)
+    build_graph(path, *synthetic_grid(side, side))
+    g = RoadGraph(path)
+    t0 = time.perf_counter()
+    build_ch(g)
+    ch_s = time.perf_counter() - t0
+    ch = CH(os.path.join(path, "ch"))
+    rng = random.Random(0)
+    pairs = [(rng.randrange(g.n), rng.randrange(g.n)) for _ in range(queries)]
+
+    def timed(fn):
+        out = []
+        for s, t in pairs:
+            t0 = time.perf_counter()
+            fn(s, t)
+            out.append((time.perf_counter() - t0) * 1000)
+        return out
+
+    astar = timed(lambda s, t: astar_bidir(g, s, t))
+    chq = timed(ch.query)
+    eng = RouteEngine(g, ch)
+    ends = [((float(g.lat[s]), float(g.lon[s])), (float(g.lat[t]), float(g.lon[t]))) for s, t in pairs]
+    full = []
+    for o, d in ends:
+        t0 = time.perf_counter()
+        eng.route(o, d)
+        full.append((time.perf_counter() - t0) * 1000)
+    hit = []
+    for o, d in ends:
+        t0 = time.perf_counter()
+        eng.route(o, d)
+        hit.append((time.perf_counter() - t0) * 1000)
+    print({"nodes": g.n, "edges": g.m, "ch_build_s": round(ch_s, 1),
+           "astar_ms_p50_p99": pcts(astar), "ch_ms_p50_p99": pcts(chq),
+           "route_ms_p50_p99": pcts(full), "cache_hit_ms_p50_p99": pcts(hit)})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--grids", default="100,200", help="grid side lengths (nodes = side^2, 200 m spacing)")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--dir", default="/tmp/route_bench")
+    args = ap.parse_args()
+    try:
+        for side in (int(x) for x in args.grids.split(",")):
+            run(side, args.queries, args.dir)
+    finally:
+        shutil.rmtree(args.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
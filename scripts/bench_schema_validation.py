@@ -0,0 +1,97 @@
+"""
+Validations/sec per schema for libs/schema_utils.
+
+  python scripts/bench_schema_validation.py [--n 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import now_ms, mk_trace, new_id  # noqa: E402
+from libs.schema_utils.validate import SchemaRegistry, SCHEMA_DIR  # noqa: E402
+
+SAMPLES = {
+    "agent.user_utterance": {"text": "把副驾窗开到30%", "input_modality": "voice", "language": "zh-CN"},
+    "agent.out": {"text": "好的", "output_modality": "voice", "should_tts": True},
+    "agent.tool_call": {"tool_name": "vehicle.control", "call_id": "call_0123456789", "arguments": {}},
+    "vehicle.command": {"command": "set_window", "args": {"position": "FR", "percent": 30}},
+    "vehicle.event": {
+        "event": "state_changed",
+        "state": {
+            "speed_kph": 0.0, "gear": "P",
+            "windows": {"FL": 0, "FR": 30, "RL": 0, "RR": 0},
+            "ac": {"ac_on": True, "temp_c": 24.0, "fan_level": 2, "mode": "auto", "recirc_on": False},
+        },
+    },
+    "dms.frame": {"image_b64": "AAAA", "format": "jpg", "timestamp_ms": 0},
+    "dms.event": {"event_type": "NO_FACE", "severity": 2, "duration_ms": 0, "metrics": {}},
+    "nav.poi.request": {"center": {"lat": 31.23, "lon": 121.47}, "query": "Starbucks", "radius_m": 5000, "limit": 3},
+    "nav.route.request": {"origin": {"lat": 31.23, "lon": 121.47}, "destination": {"lat": 31.2, "lon": 121.5}},
+    "nav.poi.result": {"items": [{"name": "Starbucks", "lat": 31.23, "lon": 121.47, "distance_m": 850}] * 5},
+}
+
+
+def mk_msg(typ: str, payload: dict) -> dict:
+    return {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "test",
+            "type": typ,
+            "session_id": "bench",
+            "trace": mk_trace({"tags": {"bench": "1"}}),
+        },
+        "payload": payload,
+    }
+
+
+def rate(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+
+def naive_validate(schema_path: str, obj: dict) -> None:
+    # what a per-call load would cost: re-read + re-resolve every $ref on every message
+    SchemaRegistry(SCHEMA_DIR).validate(schema_path, obj)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    reg = SchemaRegistry()
+    print(f"registry load+compile: {(time.perf_counter() - t0) * 1000:.1f} ms ({len(reg.schema_ids)} schemas)\n")
+
+    print(f"{'type':<24}{'envelope only/s':>18}{'envelope+payload/s':>22}")
+    for typ, payload in SAMPLES.items():
+        msg = mk_msg(typ, payload)
+        reg.validate_message(msg)  # sanity: samples must be valid
+        env_rate = rate(lambda: reg.validate_envelope(msg), args.n)
+        full_rate = rate(lambda: reg.validate_message(msg), args.n)
+        print(f"{typ:<24}{env_rate:>18,.0f}{full_rate:>22,.0f}")
+
+    batch = [mk_msg(t, p) for t, p in SAMPLES.items()] * 100
+    t0 = time.perf_counter()
+    rounds = max(1, args.n // len(batch))
+    for _ in range(rounds):
+        reg.validate_batch(batch)
+    batch_rate = rounds * len(batch) / (time.perf_counter() - t0)
+    print(f"\nbatch ({len(batch)} mixed msgs): {batch_rate:,.0f} msgs/s")
+
+    msg = SAMPLES["vehicle.event"]
+    naive_n = max(1, args.n // 100)
+    naive = rate(lambda: naive_validate("schemas/vehicle/vehicle_event.schema.json", msg), naive_n)
+    cached = rate(lambda: reg.validate("schemas/vehicle/vehicle_event.schema.json", msg), args.n)
+    print(f"vehicle.event payload: per-call load {naive:,.0f}/s vs cached {cached:,.0f}/s ({cached / naive:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Span recording overhead in ns/span: root vs child spans, attributes, the
+decorator, and with the exporter thread draining into a JSONL file.
+
+  python scripts/bench_spans.py [--n 200000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log import spans  # noqa: E402
+from libs.log.tracing import mk_trace  # noqa: E402
+
+
+def per_op_ns(fn, n: int) -> float:
+    fn(n // 10)   # warm up
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter_ns()
+        fn(n)
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return round(best, 1)
+
+
+def empty(n):
+    for _ in range(n):
+        pass
+
+
+def roots(n):
+    for _ in range(n):
+        with spans.span("root"):
+            pass
+
+
+def children(n):
+    with spans.span("parent"):
+        for _ in range(n):
+            with spans.span("child"):
+                pass
+
+
+def children_attrs(n):
+    with spans.span("parent"):
+        for i in range(n):
+            with spans.span("child", tool="vehicle.control") as s:
+                s.set("ok", True)
+
+
+@spans.traced("decorated")
+def decorated():
+    pass
+
+
+def decorator(n):
+    with spans.span("parent"):
+        for _ in range(n):
+            decorated()
+
+
+def stamps(n):
+    t = mk_trace()
+    for _ in range(n):
+        mk_trace(t)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    args = ap.parse_args()
+    n = args.n
+    out = {
+        "loop_ns": per_op_ns(empty, n),
+        "mk_trace_ns": per_op_ns(stamps, n),
+        "root_span_ns": per_op_ns(roots, n),
+        "child_span_ns": per_op_ns(children, n),
+        "child_span_attrs_ns": per_op_ns(children_attrs, n),
+        "decorator_ns": per_op_ns(decorator, n),
+    }
+    d = tempfile.mkdtemp(prefix="span_bench_")
+    try:
+        exp = spans.SpanExporter(directory=d, interval_s=0.05)
+        exp.next_seq = spans.RECORDER.head
+        exp._stop.clear()
+        exp._thread = None
+        exp.start()
+        out["child_span_exporting_ns"] = per_op_ns(children, n)
+        exp.close()
+        out["exported"] = exp.exported
+        out["lost_to_ring_wrap"] = exp.lost
+        out["ring"] = spans.RECORDER.mask + 1
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
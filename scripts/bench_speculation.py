@@ -0,0 +1,106 @@
+"""
+End-of-speech -> tool-execution latency on /ws/agent turns with and without
+speculative planning on partial transcripts.
+
+Replays a recorded corpus of ASR partial/final sequences (400 ms partial
+cadence, as audio_service emits them) into a TurnPipeline running inside
+the monolith (lifespans entered, so the vehicle state feed is live). Tools
+get an artificial delay (--tool-ms) standing in for remote tool latency.
+Latency runs from the final transcript to the turn's agent.out; the run
+also checks that no partial ever moved the car.
+
+  python scripts/bench_speculation.py [--tool-ms 150] [--rounds 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TRACE_ENABLED", "0")
+
+from libs.log.tracing import new_id  # noqa: E402
+from services.agent_service.core.turns import TurnPipeline  # noqa: E402
+from services.agent_service.tools import dispatch  # noqa: E402
+from services.monolith import app  # noqa: E402
+from services.vehicle_service.simulator.state import STORE  # noqa: E402
+
+PARTIAL_S = 0.4
+# (name, partial transcripts in arrival order, final transcript)
+CORPUS = [
+    ("poi_starbucks", ["带我", "带我去最近", "带我去最近的星巴克"], "带我去最近的星巴克"),
+    ("poi_charging", ["附近", "附近有没有充", "附近有没有充电站"], "附近有没有充电站"),
+    ("poi_late_slot", ["帮我找", "帮我找一个", "帮我找一个附近的"], "帮我找一个附近的停车场"),
+    ("poi_revised", ["找个加", "找个加油站"], "找个停车场"),
+    ("window", ["把副驾", "把副驾窗开到3", "把副驾窗开到30%"], "把副驾窗开到30%"),
+    ("state", ["现在", "现在几度"], "现在几度"),
+    ("mixed", ["温度调到24", "温度调到24，带我去最近的咖"], "温度调到24，带我去最近的咖啡"),
+]
+
+
+def slow_tools(delay_s: float) -> None:
+    for name, handler in list(dispatch.TOOLS.items()):
+        async def slow(args, session_id, trace, _h=handler):
+            await asyncio.sleep(delay_s)
+            return await _h(args, session_id, trace)
+        dispatch.TOOLS[name] = slow
+
+
+def msg(text: str, session_id: str, final: bool, call_id: str) -> dict:
+    return {"meta": {"session_id": session_id, "type": "audio.transcript.final" if final else "audio.transcript.partial"},
+            "payload": {"text": text, "is_final": final, "language": "zh-CN", "call_id": call_id}}
+
+
+async def replay(speculate: bool, rounds: int) -> dict:
+    frames = {}
+
+    async def send(data: str) -> None:
+        m = json.loads(data)
+        if m["meta"]["type"] in ("agent.out", "agent.turn.cancelled"):
+            frames[m["payload"]["call_id"]] = (time.perf_counter(), m["meta"]["type"])
+
+    pipe = TurnPipeline(send, speculate=speculate)
+    lat = {name: [] for name, _p, _f in CORPUS}
+    moved_by_partial = False
+    for r in range(rounds):
+        for name, partials, final in CORPUS:
+            sid = f"{name}-{r}-{int(speculate)}"
+            before = STORE.version
+            for text in partials:
+                await pipe.handle(msg(text, sid, False, new_id("call_")))
+                await asyncio.sleep(PARTIAL_S)
+            moved_by_partial |= STORE.version != before
+            call_id = new_id("call_")
+            t0 = time.perf_counter()
+            await pipe.handle(msg(final, sid, True, call_id))
+            while call_id not in frames:
+                await asyncio.sleep(0.0005)
+            lat[name].append((frames[call_id][0] - t0) * 1000)
+    stats = pipe.stats()
+    await pipe.close()
+    return {"speculation": speculate, "moved_by_partial": moved_by_partial,
+            "latency_ms": {k: round(statistics.median(v), 1) for k, v in lat.items()},
+            "mean_ms": round(statistics.mean(x for v in lat.values() for x in v), 1),
+            "spec": stats.get("speculation")}
+
+
+async def main_async(args) -> None:
+    slow_tools(args.tool_ms / 1000)
+    async with app.router.lifespan_context(app):
+        for speculate in (False, True):
+            print(await replay(speculate, args.rounds))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tool-ms", type=float, default=150)
+    ap.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+TTS cache: time-to-first-audio-byte for miss / disk hit / memory hit, and
+hit rate for a Zipf-distributed prompt mix under a byte budget.
+
+  python scripts/bench_tts_cache.py [--requests 2000] [--phrases 300] [--mem-mb 8] [--delay-ms 20]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.audio_service.pipeline.tts import CachedTTS, StubSynth  # noqa: E402
+
+PHRASES = ["好的，已为你打开副驾车窗", "空调已调到二十二度", "为你找到附近的充电站", "前方五百米右转", "已切换到外循环"]
+
+
+def ttfb_ms(tts: CachedTTS, text: str) -> float:
+    t0 = time.perf_counter()
+    _src, it = tts.open(text)
+    next(it)
+    dt = (time.perf_counter() - t0) * 1000
+    for _ in it:
+        pass
+    return dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--phrases", type=int, default=300)
+    ap.add_argument("--mem-mb", type=float, default=8)
+    ap.add_argument("--delay-ms", type=float, default=20, help="stand-in synthesis time per character")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="tts_bench_")
+    try:
+        engine = StubSynth(delay_s=args.delay_ms / 1000)
+        tts = CachedTTS(engine, mem_bytes=int(args.mem_mb * 1024 * 1024), disk_dir=tmp, disk_bytes=1 << 30)
+        text = PHRASES[0]
+        miss = ttfb_ms(tts, text)
+        mem = min(ttfb_ms(tts, text) for _ in range(20))
+        cold = CachedTTS(engine, mem_bytes=0, disk_dir=tmp, disk_bytes=1 << 30)
+        disk = min(ttfb_ms(cold, text) for _ in range(20))
+        print(f"ttfb  miss={miss:.2f}ms  disk_hit={disk:.3f}ms  mem_hit={mem:.3f}ms")
+
+        engine.delay_s = 0.0
+        rng = np.random.default_rng(0)
+        prompts = [f"{PHRASES[i % len(PHRASES)]}（{i}）" for i in range(args.phrases)]
+        picks = np.minimum(rng.zipf(1.2, args.requests) - 1, args.phrases - 1)
+        tts = CachedTTS(engine, mem_bytes=int(args.mem_mb * 1024 * 1024), disk_dir=None)
+        t0 = time.perf_counter()
+        for i in picks:
+            tts.synthesize(prompts[i])
+        dt = time.perf_counter() - t0
+        s = tts.stats.snapshot()
+        print({"requests": args.requests, "mem_mb": args.mem_mb, "cached_entries": len(tts.mem),
+               "cached_mb": round(tts.mem.bytes / 1e6, 2), "hit_rate": s["hit_rate"],
+               "req_per_s": int(args.requests / dt)})
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Commands/sec for vehicle_service: one /command per command vs one /commands
+batch per "make it comfortable" scene.
+
+  python scripts/bench_vehicle_commands.py [--scenes 500] [--url http://127.0.0.1:8003]
+
+Without --url the app is driven in-process through httpx's ASGI transport.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import now_ms, mk_trace, new_id  # noqa: E402
+
+SCENE = [
+    {"command": "set_ac", "args": {"temp_c": 22.0, "ac_on": True}},
+    {"command": "set_fan_speed", "args": {"level": 3}},
+    {"command": "set_ac_mode", "args": {"mode": "face"}},
+    {"command": "set_recirc", "args": {"recirc_on": True}},
+    {"command": "set_window", "args": {"position": "FL", "percent": 0}},
+    {"command": "set_window", "args": {"position": "FR", "percent": 0}},
+]
+
+
+def envelope(typ: str, payload: dict) -> dict:
+    return {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "test",
+            "type": typ,
+            "session_id": "bench",
+            "trace": mk_trace(None),
+        },
+        "payload": payload,
+    }
+
+
+async def run(client: httpx.AsyncClient, scenes: int) -> None:
+    t0 = time.perf_counter()
+    for _ in range(scenes):
+        for cmd in SCENE:
+            r = await client.post("/command", json=envelope("vehicle.command", cmd))
+            r.raise_for_status()
+    single = scenes * len(SCENE) / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for _ in range(scenes):
+        r = await client.post("/commands", json=envelope("vehicle.command_batch", {"commands": SCENE}))
+        r.raise_for_status()
+    batched = scenes * len(SCENE) / (time.perf_counter() - t0)
+
+    print(f"single /command : {single:10,.0f} commands/s  ({single / len(SCENE):,.0f} scenes/s)")
+    print(f"batched /commands: {batched:10,.0f} commands/s  ({batched / len(SCENE):,.0f} scenes/s)  x{batched / single:.1f}")
+
+
+def bench_dispatch(n: int) -> None:
+    from services.vehicle_service.simulator.commands import resolve
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for cmd in SCENE:
+            resolve(cmd)
+    print(f"registry resolve(): {n * len(SCENE) / (time.perf_counter() - t0):,.0f} commands/s")
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenes", type=int, default=500)
+    ap.add_argument("--url", default=None)
+    args = ap.parse_args()
+
+    bench_dispatch(args.scenes * 10)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url) as client:
+            await run(client, args.scenes)
+    else:
+        from services.vehicle_service.app import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://vehicle") as client:
+            await run(client, args.scenes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
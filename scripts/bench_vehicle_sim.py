@@ -0,0 +1,115 @@
+"""
+Simulated vehicles per second through the vectorized fleet tick
+(services/vehicle_service/simulator/physics.py), with the random driver
+moving the fleet: the tick alone, the tick plus building vehicle.event
+deltas for the vehicles that changed, and plus the envelope + JSON each
+delta costs to publish. "fleet_at_10hz" is how many vehicles one core
+keeps at 10 ticks/s. A per-vehicle Python loop doing the same physics is
+the baseline.
+
+  python scripts/bench_vehicle_sim.py [--sizes 1000,10000,100000] [--ticks 100]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.vehicle_service.routers.http import envelope  # noqa: E402
+from services.vehicle_service.simulator import physics  # noqa: E402
+from services.vehicle_service.simulator.physics import Fleet  # noqa: E402
+
+DT = 0.1
+
+
+def run(n: int, ticks: int) -> dict:
+    fleet = Fleet(n, drive=True, seed=1)
+    for _ in range(50):    # get the fleet moving first
+        fleet.events(fleet.tick(DT))
+    t_tick = t_events = t_publish = 0.0
+    events = 0
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        idx = fleet.tick(DT)
+        t1 = time.perf_counter()
+        out = fleet.events(idx)
+        t2 = time.perf_counter()
+        for i, payload in out:
+            json.dumps(envelope("vehicle", "vehicle.event", fleet.ids[i], None, payload), ensure_ascii=False)
+        t3 = time.perf_counter()
+        t_tick += t1 - t0
+        t_events += t2 - t1
+        t_publish += t3 - t2
+        events += len(out)
+    total = t_tick + t_events + t_publish
+    return {
+        "vehicles": n,
+        "changed_per_tick": round(events / ticks, 1),
+        "tick_ms": round(t_tick / ticks * 1000, 3),
+        "events_ms": round(t_events / ticks * 1000, 3),
+        "publish_ms": round(t_publish / ticks * 1000, 3),
+        "vehicles_per_s_tick": round(n * ticks / t_tick),
+        "vehicles_per_s_with_events": round(n * ticks / (t_tick + t_events)),
+        "vehicles_per_s_with_publish": round(n * ticks / total),
+        "fleet_at_10hz": round(n * ticks / total / 10),
+    }
+
+
+class ScalarVehicle:
+    """The same physics, one object per vehicle (the baseline)."""
+
+    __slots__ = ("window", "window_target", "v", "v_target", "gear", "cabin", "setpoint", "fan", "ac_on", "ambient",
+                 "pub")
+
+    def __init__(self) -> None:
+        self.window = [0.0] * 4
+        self.window_target = [0.0, 0.0, 30.0, 0.0]
+        self.v, self.v_target, self.gear = 0.0, 50.0, "P"
+        self.cabin, self.setpoint, self.fan, self.ac_on, self.ambient = 28.0, 22.0, 2, True, 28.0
+        self.pub = None
+
+    def tick(self, dt: float) -> bool:
+        step = physics.WINDOW_PCT_PER_S * dt
+        for k in range(4):
+            self.window[k] += max(-step, min(step, self.window_target[k] - self.window[k]))
+        target = 0.0 if self.v * self.v_target < 0 else self.v_target
+        lim = (physics.ACCEL_KPH_S if abs(target) > abs(self.v) else physics.BRAKE_KPH_S) * dt
+        self.v += max(-lim, min(lim, target - self.v))
+        self.gear = "D" if self.v > physics.MOVING_KPH else "R" if self.v < -physics.MOVING_KPH else \
+            "D" if target > 0 else "R" if target < 0 else "P"
+        if self.ac_on:
+            rate, goal = self.fan / (7 * physics.AC_TAU_S), self.setpoint
+        else:
+            rate, goal = 1 / physics.AMBIENT_TAU_S, self.ambient
+        self.cabin += (goal - self.cabin) * -math.expm1(-rate * dt)
+        q = (*(round(w) for w in self.window), round(abs(self.v) * 10), self.gear, round(self.cabin * 10))
+        changed, self.pub = q != self.pub, q
+        return changed
+
+
+def scalar(n: int, ticks: int) -> dict:
+    fleet = [ScalarVehicle() for _ in range(n)]
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        for v in fleet:
+            v.tick(DT)
+    wall = time.perf_counter() - t0
+    return {"vehicles": n, "tick_ms": round(wall / ticks * 1000, 3), "vehicles_per_s_tick": round(n * ticks / wall)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--ticks", type=int, default=100)
+    args = ap.parse_args()
+    for n in map(int, args.sizes.split(",")):
+        print(f"vectorized: {run(n, args.ticks)}")
+    print(f"python loop: {scalar(10000, max(args.ticks // 10, 5))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+/chat and /poi throughput with 1..N SO_REUSEPORT workers for agent and nav
+(run_all.py --workers), then a crash check: SIGKILL one agent worker under
+load and watch the supervisor bring it back.
+
+Load comes from separate client processes so the generator isn't the
+bottleneck; on a box with fewer cores than workers + clients the curve
+flattens accordingly (the report includes os.cpu_count()).
+
+  python scripts/bench_workers.py [--workers 1,2,4] [--seconds 10] [--clients 4] [--conns 16]
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import mk_trace, new_id, now_ms  # noqa: E402
+
+AGENT = "http://127.0.0.1:8002"
+NAV = "http://127.0.0.1:8005"
+CONTROL_BASE = 9100
+
+
+def chat_body() -> dict:
+    return {
+        "meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "ui",
+                 "type": "agent.user_utterance", "session_id": "bench", "trace": mk_trace()},
+        "payload": {"input_modality": "api", "text": "温度调到24"},
+    }
+
+
+def poi_body() -> dict:
+    return {
+        "meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "agent",
+                 "type": "nav.poi.request", "session_id": "bench", "trace": mk_trace()},
+        "payload": {"center": {"lat": 31.23, "lon": 121.47}, "query": "coffee", "radius_m": 3000, "limit": 5},
+    }
+
+
+async def _drive(target: str, seconds: float, conns: int) -> tuple:
+    url, make = (AGENT + "/chat", chat_body) if target == "chat" else (NAV + "/poi", poi_body)
+    ok = err = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=conns, max_keepalive_connections=conns)
+    async with httpx.AsyncClient(timeout=5, limits=limits) as c:
+        async def loop():
+            nonlocal ok, err
+            while time.perf_counter() < deadline:
+                try:
+                    r = await c.post(url, json=make())
+                    ok += r.status_code == 200
+                    err += r.status_code != 200
+                except httpx.HTTPError:
+                    err += 1
+        await asyncio.gather(*(loop() for _ in range(conns)))
+    return ok, err
+
+
+def _client(target: str, seconds: float, conns: int, out) -> None:
+    out.put(asyncio.run(_drive(target, seconds, conns)))
+
+
+def load(target: str, seconds: float, clients: int, conns: int) -> dict:
+    q = mp.get_context("spawn").Queue()
+    procs = [mp.get_context("spawn").Process(target=_client, args=(target, seconds, conns, q)) for _ in range(clients)]
+    for p in procs:
+        p.start()
+    res = [q.get() for _ in procs]
+    for p in procs:
+        p.join()
+    ok = sum(r[0] for r in res)
+    return {"rps": round(ok / seconds, 1), "errors": sum(r[1] for r in res)}
+
+
+def wait_ready(control_ports, timeout_s: float = 90) -> None:
+    t0 = time.time()
+    pending = set(control_ports)
+    with httpx.Client(timeout=1) as c:
+        while pending:
+            if time.time() - t0 > timeout_s:
+                raise RuntimeError(f"workers not ready on control ports {sorted(pending)}")
+            for port in list(pending):
+                try:
+                    if c.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        pending.discard(port)
+                except httpx.HTTPError:
+                    pass
+            time.sleep(0.1)
+
+
+def start(n: int) -> subprocess.Popen:
+    cmd = [sys.executable, os.path.join(ROOT, "scripts", "run_all.py"), "--workers", f"agent={n},nav={n}"]
+    env = dict(os.environ, WORKER_CONTROL_PORT_BASE=str(CONTROL_BASE), TRACE_ENABLED="0")
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ports = list(range(CONTROL_BASE, CONTROL_BASE + 2 * n)) if n > 1 else []
+    wait_ready(ports)
+    with httpx.Client(timeout=1) as c:
+        for _ in range(600):
+            try:
+                if all(c.get(u + "/health").status_code == 200 for u in (AGENT, NAV, "http://127.0.0.1:8003")):
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+    return proc
+
+
+def stop(proc: subprocess.Popen) -> None:
+    os.killpg(proc.pid, signal.SIGINT)
+    try:
+        proc.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+    time.sleep(1)
+
+
+def worker_pid(control_port: int) -> int:
+    out = subprocess.run(["ps", "-eo", "pid,args"], capture_output=True, text=True).stdout
+    for line in out.splitlines():
+        if f"--control-port {control_port}" in line:
+            return int(line.split()[0])
+    raise RuntimeError(f"no worker on control port {control_port}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--clients", type=int, default=4, help="load generator processes")
+    ap.add_argument("--conns", type=int, default=16, help="concurrent requests per generator")
+    args = ap.parse_args()
+    print({"cpu_count": os.cpu_count()})
+    base = {}
+    counts = [int(x) for x in args.workers.split(",")]
+    for n in counts:
+        proc = start(n)
+        try:
+            row = {"workers": n}
+            for target in ("chat", "poi"):
+                r = load(target, args.seconds, args.clients, args.conns)
+                base.setdefault(target, r["rps"])
+                row[target] = dict(r, speedup=round(r["rps"] / base[target], 2) if base[target] else None)
+            print(row)
+        finally:
+            stop(proc)
+
+    n = max(counts)
+    if n > 1:
+        proc = start(n)
+        try:
+            victim = worker_pid(CONTROL_BASE)
+            t0 = time.time()
+            pool = ThreadPoolExecutor(1)
+            pending = pool.submit(load, "chat", 6, args.clients, args.conns)
+            time.sleep(2)
+            os.kill(victim, signal.SIGKILL)
+            wait_ready([CONTROL_BASE], timeout_s=60)
+            back_s = time.time() - t0 - 2
+            r = pending.result()
+            pool.shutdown()
+            print({"crash_test": {"killed_pid": victim, "replacement_pid": worker_pid(CONTROL_BASE),
+                                  "back_in_s": round(back_s, 2), "chat_during": r}})
+        finally:
+            stop(proc)
+
+
+if __name__ == "__main__":
+    main()
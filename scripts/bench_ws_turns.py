@@ -0,0 +1,175 @@
+"""
+Perceived latency on /ws/agent for rapid follow-up utterances, measured
+from the moment each one was "said" to its agent.out (or
+agent.turn.cancelled) frame. Tools get an artificial delay (--tool-ms)
+standing in for real tool/LLM latency.
+
+  burst       N independent commands said --gap-ms apart, pipelined, vs the
+              same commands handled one at a time (what the old
+              receive->plan->send loop did)
+  correction  "温度调到24" then "温度调到26": the first turn is superseded
+              and its tool call cancelled; the car must end at 26
+  barge_in    a nav query, then a partial transcript "算了"
+
+The monolith app runs in-process under uvicorn.
+
+  python scripts/bench_ws_turns.py [--tool-ms 200] [--gap-ms 50] [--rounds 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import uvicorn
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TRACE_ENABLED", "0")
+
+from libs.log.tracing import mk_trace, new_id, now_ms  # noqa: E402
+from services.agent_service.tools import dispatch  # noqa: E402
+from services.monolith import app  # noqa: E402
+
+PORT = 8011
+WS_URL = f"ws://127.0.0.1:{PORT}/agent/ws/agent"
+BURST = ["温度调到24", "副驾窗开到30%", "带我去最近的星巴克", "风量调到3档"]
+
+
+def slow_tools(delay_s: float) -> None:
+    for name, handler in list(dispatch.TOOLS.items()):
+        async def slow(args, session_id, trace, _h=handler):
+            await asyncio.sleep(delay_s)
+            return await _h(args, session_id, trace)
+        dispatch.TOOLS[name] = slow
+
+
+def utterance(text: str, session_id: str, typ: str = "agent.user_utterance", final: bool = True) -> str:
+    payload = {"input_modality": "voice", "text": text, "call_id": new_id("call_")}
+    if typ.startswith("audio."):
+        payload = {"text": text, "is_final": final, "language": "zh-CN", "call_id": payload["call_id"]}
+    return json.dumps({
+        "meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "audio", "type": typ,
+                 "session_id": session_id, "trace": mk_trace()},
+        "payload": payload,
+    }, ensure_ascii=False)
+
+
+class Client:
+    def __init__(self, ws) -> None:
+        self.ws = ws
+        self.frames = []    # (t, type, call_id of the turn)
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for raw in self.ws:
+            msg = json.loads(raw)
+            call = msg["payload"].get("call_id", "").split(".")[0]
+            self.frames.append((time.perf_counter(), msg["meta"]["type"], call))
+
+    async def send(self, data: str) -> str:
+        await self.ws.send(data)
+        return json.loads(data)["payload"]["call_id"]
+
+    async def until(self, call_id: str, types=("agent.out", "agent.turn.cancelled"), timeout_s: float = 10):
+        deadline = time.perf_counter() + timeout_s
+        while time.perf_counter() < deadline:
+            for t, typ, call in self.frames:
+                if call == call_id and typ in types:
+                    return t, typ
+            await asyncio.sleep(0.001)
+        raise TimeoutError(call_id)
+
+    def order(self, calls: list) -> list:
+        seen = []
+        for _t, typ, call in self.frames:
+            if typ == "agent.out" and call in calls:
+                seen.append(calls.index(call))
+        return seen
+
+
+async def burst(c: Client, gap_s: float, pipelined: bool, sid: str) -> list:
+    # utterance i is said at t0 + i * gap; latency counts from then
+    t0 = time.perf_counter()
+    said = [t0 + i * gap_s for i in range(len(BURST))]
+    calls = []
+    for i, text in enumerate(BURST):
+        if calls and not pipelined:
+            # the old loop only read the next message once the previous turn was answered
+            await c.until(calls[-1])
+        await asyncio.sleep(max(0.0, said[i] - time.perf_counter()))
+        calls.append(await c.send(utterance(text, sid)))
+    done = [await c.until(call) for call in calls]
+    assert c.order(calls) == list(range(len(calls))), c.order(calls)
+    return [(t - s) * 1000 for (t, _typ), s in zip(done, said)]
+
+
+async def correction(c: Client, gap_s: float, sid: str) -> dict:
+    t0 = time.perf_counter()
+    first = await c.send(utterance("温度调到24", sid))
+    await asyncio.sleep(gap_s)
+    t1 = time.perf_counter()
+    second = await c.send(utterance("温度调到26", sid))
+    t_first, typ_first = await c.until(first)
+    t_second, _ = await c.until(second)
+    async with httpx.AsyncClient() as h:
+        temp = (await h.get(f"http://127.0.0.1:{PORT}/vehicle/state")).json()["payload"]["ac"]["temp_c"]
+    return {"first": typ_first, "first_ms": (t_first - t0) * 1000, "second_ms": (t_second - t1) * 1000, "temp_c": temp}
+
+
+async def barge_in(c: Client, gap_s: float, sid: str) -> dict:
+    call = await c.send(utterance("带我去最近的星巴克", sid))
+    await asyncio.sleep(gap_s)
+    t1 = time.perf_counter()
+    await c.send(utterance("算了", sid, typ="audio.transcript.partial", final=False))
+    t, typ = await c.until(call)
+    return {"outcome": typ, "cancel_ms": (t - t1) * 1000}
+
+
+def summary(xs: list) -> dict:
+    return {"mean_ms": round(statistics.mean(xs), 1), "max_ms": round(max(xs), 1)}
+
+
+async def main_async(args) -> None:
+    slow_tools(args.tool_ms / 1000)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning", lifespan="on"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        async with websockets.connect(WS_URL) as ws:
+            c = Client(ws)
+            for name, pipelined in (("serial", False), ("pipelined", True)):
+                per_pos = [[] for _ in BURST]
+                for r in range(args.rounds):
+                    for i, ms in enumerate(await burst(c, args.gap_ms / 1000, pipelined, f"{name}{r}")):
+                        per_pos[i].append(ms)
+                print({"burst": name, "tool_ms": args.tool_ms, "gap_ms": args.gap_ms,
+                       "latency_by_position": [summary(x) for x in per_pos]})
+            rows = [await correction(c, args.gap_ms / 1000, f"fix{r}") for r in range(args.rounds)]
+            print({"correction": {"first": sorted({r["first"] for r in rows}),
+                                  "second": summary([r["second_ms"] for r in rows]),
+                                  "final_temp_c": sorted({r["temp_c"] for r in rows})}})
+            rows = [await barge_in(c, args.gap_ms / 1000, f"barge{r}") for r in range(args.rounds)]
+            print({"barge_in": {"outcome": sorted({r["outcome"] for r in rows}),
+                                "cancel": summary([r["cancel_ms"] for r in rows])}})
+            c.reader.cancel()
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tool-ms", type=float, default=200)
+    ap.add_argument("--gap-ms", type=float, default=50)
+    ap.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
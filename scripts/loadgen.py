@@ -0,0 +1,560 @@
+"""
+End-to-end load generator for the whole cockpit pipeline.
+
+    python scripts/loadgen.py scripts/scenarios/smoke.json [--target monolith] [--out run.json]
+    python scripts/loadgen.py scripts/scenarios/mixed.json --compare base.json   # exit 1 on regression
+
+A scenario file (JSON) says what to start and which workloads to drive:
+
+    {"name": "mixed", "target": "run_all", "duration_s": 30, "warmup_s": 3,
+     "workloads": {
+       "chat":    {"sessions": 2000, "interval_s": 20, "texts": ["温度调到24", ...]},
+       "vehicle": {"sessions": 100, "interval_s": 1, "commands": [{"command": "set_window", ...}]},
+       "nav":     {"sessions": 200, "interval_s": 5, "route_ratio": 0.3, "queries": ["coffee", ...]},
+       "dms":     {"sessions": 4, "fps": 10},
+       "audio":   {"sessions": 20, "chunk_ms": 20, "utterance_s": 1.5, "pause_s": 2}}}
+
+Targets: run_all (scripts/run_all.py, one process per service; "run_all_args"
+are passed through, e.g. ["--workers", "agent=2"]), monolith (run_all.py
+--monolith), inproc (the monolith app under uvicorn in this process) and
+external (already running; "urls" maps service -> base URL).
+
+Every session is a task that sleeps an exponential think time between
+requests. Every request carries a fresh trace. Afterwards the services'
+exported spans (TRACE_DIR, one JSONL file per process) are joined to the
+client-side records by trace id. That gives p50/p95/p99 per hop, e.g.
+agent:POST /chat -> agent:vehicle POST /command -> vehicle:POST /command,
+next to the client's end-to-end numbers. Audio is a WebSocket stream with
+no per-message spans, so its hops are measured client-side (start of
+stream -> speech_start, end of speech -> final transcript). The result is one JSON document; --compare flags ops and
+hops whose p95 grew by more than --threshold.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.log.tracing import mk_trace, new_id, now_ms  # noqa: E402
+from libs.schema_utils.binary_frame import CONTENT_TYPE, encode_frame  # noqa: E402
+
+SERVICE_PORTS = {"audio": 8001, "agent": 8002, "vehicle": 8003, "dms": 8004, "nav": 8005}
+MONOLITH_PORT = 8000
+INPROC_PORT = 8090
+SR = 16000
+
+DEFAULT_TEXTS = ["温度调到24", "把副驾窗开到30%", "带我去最近的星巴克", "风量调到3档", "现在几度", "你好"]
+DEFAULT_COMMANDS = [
+    {"command": "set_window", "args": {"position": "FL", "percent": 40}},
+    {"command": "set_ac", "args": {"temp_c": 23.0, "ac_on": True}},
+    {"command": "set_fan_speed", "args": {"level": 3}},
+    {"command": "get_state", "args": {}},
+]
+DEFAULT_QUERIES = ["coffee", "Starbucks", "charging station", "parking", "restaurant"]
+CENTER = (31.23, 121.47)
+
+
+def percentiles(xs: List[float]) -> dict:
+    if not xs:
+        return {"count": 0}
+    a = np.asarray(xs)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {"count": len(xs), "p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "max": round(float(a.max()), 3), "mean": round(float(a.mean()), 3)}
+
+
+def envelope(typ: str, session_id: str, payload: dict, source: str = "ui") -> Tuple[dict, dict]:
+    trace = mk_trace()
+    return {"meta": {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": source, "type": typ,
+                     "session_id": session_id, "trace": trace}, "payload": payload}, trace
+
+
+def traceparent(trace: dict) -> dict:
+    return {"traceparent": f"00-{trace['trace_id']}-{trace['span_id']}-01"}
+
+
+class Recorder:
+    """Client-side results: one row per request, (op, trace_id, latency_ms, error code or None)."""
+
+    def __init__(self) -> None:
+        self.rows: List[Tuple[str, Optional[str], float, Optional[str]]] = []
+        self.measuring = False
+
+    def add(self, op: str, trace_id: Optional[str], latency_ms: float, error: Optional[str] = None) -> None:
+        if self.measuring:
+            self.rows.append((op, trace_id, latency_ms, error))
+
+
+# -- targets -------------------------------------------------------------------
+
+class Target:
+    def __init__(self, kind: str, scenario: dict, trace_dir: str) -> None:
+        self.kind = kind
+        self.scenario = scenario
+        self.trace_dir = trace_dir
+        self.proc: Optional[subprocess.Popen] = None
+        self.server = None
+        self.serving: Optional[asyncio.Task] = None
+
+    def url(self, service: str) -> str:
+        if self.kind == "external":
+            return self.scenario["urls"][service].rstrip("/")
+        if self.kind == "monolith":
+            return f"http://127.0.0.1:{MONOLITH_PORT}/{service}"
+        if self.kind == "inproc":
+            return f"http://127.0.0.1:{INPROC_PORT}/{service}"
+        return f"http://127.0.0.1:{SERVICE_PORTS[service]}"
+
+    def ws_url(self, service: str, path: str) -> str:
+        return self.url(service).replace("http://", "ws://", 1) + path
+
+    async def start(self) -> None:
+        if self.kind in ("run_all", "monolith"):
+            cmd = [sys.executable, os.path.join(ROOT, "scripts", "run_all.py")]
+            cmd += ["--monolith"] if self.kind == "monolith" else list(self.scenario.get("run_all_args") or [])
+            env = dict(os.environ, TRACE_ENABLED="1", TRACE_DIR=self.trace_dir, TRACE_RING=str(1 << 18))
+            self.proc = subprocess.Popen(cmd, cwd=ROOT, env=env, start_new_session=True,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elif self.kind == "inproc":
+            import uvicorn
+            from libs.log.spans import EXPORTER
+            EXPORTER.directory = self.trace_dir   # in case spans was imported before run() set TRACE_DIR
+            from services.monolith import app
+            self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=INPROC_PORT,
+                                                        log_level="warning", lifespan="on"))
+            self.serving = asyncio.create_task(self.server.serve())
+        await self.wait_healthy()
+
+    async def wait_healthy(self, timeout_s: float = 120) -> None:
+        deadline = time.monotonic() + timeout_s
+        services = [s for s in SERVICE_PORTS if self.kind != "external" or s in self.scenario.get("urls", {})]
+        async with httpx.AsyncClient(timeout=1) as c:
+            while True:
+                try:
+                    codes = [(await c.get(self.url(s) + "/health")).status_code for s in services]
+                    if all(code == 200 for code in codes):
+                        return
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{self.kind} target not healthy after {timeout_s}s")
+                await asyncio.sleep(0.2)
+
+    async def stop(self) -> None:
+        if self.proc is not None:
+            # run_all forwards the stop; services flush their spans on the way out
+            os.killpg(self.proc.pid, signal.SIGINT)
+            try:
+                await asyncio.to_thread(self.proc.wait, 30)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+        if self.server is not None:
+            from libs.log.spans import EXPORTER
+            self.server.should_exit = True
+            await self.serving
+            EXPORTER.flush()
+
+
+# -- workloads -------------------------------------------------------------------
+
+class Workloads:
+    def __init__(self, target: Target, scenario: dict, rec: Recorder, client: httpx.AsyncClient) -> None:
+        self.target = target
+        self.scenario = scenario
+        self.rec = rec
+        self.client = client
+        self.rng = random.Random(scenario.get("seed", 1))
+        self.stop_at = 0.0
+
+    def tasks(self) -> List:
+        out = []
+        for kind, cfg in (self.scenario.get("workloads") or {}).items():
+            runner = getattr(self, f"_{kind}")
+            for i in range(int(cfg.get("sessions", 1))):
+                out.append(runner(cfg, f"lg-{kind}-{i}"))
+        return out
+
+    async def _think(self, cfg: dict, first: bool) -> bool:
+        interval = float(cfg.get("interval_s", 1.0))
+        # spread session starts over one interval, then exponential think times
+        delay = self.rng.uniform(0, interval) if first else self.rng.expovariate(1 / interval)
+        if time.monotonic() + delay >= self.stop_at:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+    async def _post(self, op: str, url: str, body: dict, trace: dict, blob: Optional[bytes] = None) -> Optional[httpx.Response]:
+        headers = traceparent(trace)
+        t0 = time.perf_counter()
+        try:
+            if blob is None:
+                r = await self.client.post(url, json=body, headers=headers)
+            else:
+                headers["content-type"] = CONTENT_TYPE
+                r = await self.client.post(url, content=encode_frame(body, blob), headers=headers)
+        except httpx.TimeoutException:
+            self.rec.add(op, trace["trace_id"], (time.perf_counter() - t0) * 1000, "timeout")
+            return None
+        except httpx.HTTPError as e:
+            self.rec.add(op, trace["trace_id"], (time.perf_counter() - t0) * 1000, type(e).__name__)
+            return None
+        except asyncio.CancelledError:
+            # still waiting when the run gave up on it
+            self.rec.add(op, trace["trace_id"], (time.perf_counter() - t0) * 1000, "unfinished")
+            raise
+        err = None if r.status_code == 200 else f"http_{r.status_code}"
+        self.rec.add(op, trace["trace_id"], (time.perf_counter() - t0) * 1000, err)
+        return r
+
+    async def _chat(self, cfg: dict, sid: str) -> None:
+        texts = cfg.get("texts") or DEFAULT_TEXTS
+        url = self.target.url("agent") + "/chat"
+        first = True
+        while await self._think(cfg, first):
+            first = False
+            body, trace = envelope("agent.user_utterance", sid, {"input_modality": "api", "text": self.rng.choice(texts)})
+            await self._post("chat", url, body, trace)
+
+    async def _vehicle(self, cfg: dict, sid: str) -> None:
+        commands = cfg.get("commands") or DEFAULT_COMMANDS
+        url = self.target.url("vehicle") + "/command"
+        first = True
+        while await self._think(cfg, first):
+            first = False
+            body, trace = envelope("vehicle.command", sid, self.rng.choice(commands))
+            await self._post("vehicle.command", url, body, trace)
+
+    async def _nav(self, cfg: dict, sid: str) -> None:
+        queries = cfg.get("queries") or DEFAULT_QUERIES
+        route_ratio = float(cfg.get("route_ratio", 0.3))
+        base = self.target.url("nav")
+        first = True
+        while await self._think(cfg, first):
+            first = False
+            lat, lon = CENTER[0] + self.rng.uniform(-0.03, 0.03), CENTER[1] + self.rng.uniform(-0.03, 0.03)
+            if self.rng.random() < route_ratio:
+                dest = {"lat": lat + self.rng.uniform(-0.05, 0.05), "lon": lon + self.rng.uniform(-0.05, 0.05)}
+                body, trace = envelope("nav.route.request", sid, {"origin": {"lat": lat, "lon": lon}, "destination": dest},
+                                       source="agent")
+                await self._post("nav.route", base + "/route", body, trace)
+            else:
+                body, trace = envelope("nav.poi.request", sid, {"center": {"lat": lat, "lon": lon},
+                                                                "query": self.rng.choice(queries),
+                                                                "radius_m": 3000, "limit": 5}, source="agent")
+                await self._post("nav.poi", base + "/poi", body, trace)
+
+    async def _dms(self, cfg: dict, sid: str) -> None:
+        frames = dms_frames(int(cfg.get("distinct_frames", 4)))
+        url = self.target.url("dms") + "/frame"
+        period = 1 / float(cfg.get("fps", 10))
+        await asyncio.sleep(self.rng.uniform(0, period))
+        k = 0
+        pending: set = set()
+        next_at = time.monotonic()
+        while time.monotonic() < self.stop_at:
+            body, trace = envelope("dms.frame", sid, {"format": "png", "timestamp_ms": now_ms()}, source="dms")
+            # camera clock: frames leave on schedule whether or not the last answer is back
+            pending.add(asyncio.create_task(self._post("dms.frame", url, body, trace, frames[k % len(frames)])))
+            pending = {p for p in pending if not p.done()}
+            k += 1
+            next_at += period
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        try:
+            if pending:
+                await asyncio.wait(pending)
+        finally:
+            for p in pending:
+                p.cancel()
+
+    async def _audio(self, cfg: dict, sid: str) -> None:
+        import websockets
+        chunk_ms = int(cfg.get("chunk_ms", 20))
+        voiced_s = float(cfg.get("utterance_s", 1.5))
+        pcm = speech_pcm(voiced_s)
+        step = SR * chunk_ms // 1000 * 2
+        chunks = [pcm[i:i + step] for i in range(0, len(pcm), step)]
+        voiced = int(voiced_s * 1000) // chunk_ms
+        pause = float(cfg.get("pause_s", 2.0))
+        await asyncio.sleep(self.rng.uniform(0, pause))
+        while time.monotonic() < self.stop_at:
+            try:
+                async with websockets.connect(self.target.ws_url("audio", "/ws/audio"), max_size=None) as ws:
+                    while time.monotonic() < self.stop_at:
+                        await self._utterance(ws, sid, chunks, chunk_ms, voiced)
+                        await asyncio.sleep(self.rng.expovariate(1 / pause))
+            except (OSError, websockets.WebSocketException) as e:
+                # reconnect, like a head unit would
+                self.rec.add("audio.connect", None, 0.0, type(e).__name__)
+                await asyncio.sleep(pause)
+
+    async def _utterance(self, ws, sid: str, chunks: List[bytes], chunk_ms: int, voiced: int) -> None:
+        """One utterance, chunks paced in real time; records start -> final and the hops in between."""
+        trace = mk_trace()
+        t_start = t_eos = time.perf_counter()
+        got: Dict[str, float] = {}
+
+        async def reader():
+            async for raw in ws:
+                typ = json.loads(raw)["meta"]["type"]
+                got.setdefault(typ, time.perf_counter())
+                if typ in ("audio.transcript.final", "audio.error"):
+                    return
+
+        read = asyncio.create_task(reader())
+        code = None
+        try:
+            next_at = time.monotonic()
+            for seq, chunk in enumerate(chunks):
+                meta = {"message_id": new_id("m_"), "timestamp_ms": now_ms(), "source": "audio",
+                        "type": "audio.ingest", "session_id": sid, "trace": trace}
+                payload = {"format": "pcm_s16le", "sample_rate_hz": SR, "channels": 1, "seq": seq,
+                           "is_last": seq == len(chunks) - 1}
+                await ws.send(encode_frame({"meta": meta, "payload": payload}, chunk))
+                if seq == voiced - 1:
+                    t_eos = time.perf_counter()
+                next_at += chunk_ms / 1000
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            await asyncio.wait_for(asyncio.shield(read), 10)
+        except asyncio.TimeoutError:
+            code = "timeout"
+        except asyncio.CancelledError:
+            code = "unfinished"
+            raise
+        except Exception as e:    # the socket died under us, in send() or in the reader
+            code = type(e).__name__
+            raise
+        finally:
+            read.cancel()
+            if read.done() and not read.cancelled():
+                read.exception()    # retrieved; send() already reported it
+            if code is None and "audio.error" in got:
+                code = "audio_error"
+            self.rec.add("audio.utterance", trace["trace_id"], (time.perf_counter() - t_start) * 1000, code)
+        if "audio.transcript.final" in got:
+            # end of speech (last voiced chunk out) -> final transcript: VAD hangover + ASR
+            self.rec.add("audio.eos_to_final", trace["trace_id"], (got["audio.transcript.final"] - t_eos) * 1000)
+        if "audio.vad.speech_start" in got:
+            self.rec.add("audio.speech_start", trace["trace_id"], (got["audio.vad.speech_start"] - t_start) * 1000)
+
+
+async def loop_lag(until: float, period_s: float = 0.05) -> List[float]:
+    out = []
+    while time.monotonic() < until:
+        t = time.perf_counter()
+        await asyncio.sleep(period_s)
+        out.append((time.perf_counter() - t - period_s) * 1000)
+    return out
+
+
+def dms_frames(n: int) -> List[bytes]:
+    from services.dms_service.pipeline.decode import encode_png
+    rng = np.random.default_rng(0)
+    h, w = 240, 320
+    yy, xx = np.mgrid[0:h, 0:w]
+    out = []
+    for k in range(n):
+        img = 40 + 10 * rng.standard_normal((h, w))
+        img[((yy - h * 0.5) / (h * 0.42)) ** 2 + ((xx - w * 0.5) / (w * 0.28)) ** 2 < 1] = 190
+        if k % 4:
+            for cx in (0.40, 0.60):
+                img[((yy - h * 0.37) / (h * 0.03)) ** 2 + ((xx - w * cx) / (w * 0.04)) ** 2 < 1] = 20
+        out.append(encode_png(np.clip(img, 0, 255).astype(np.uint8)))
+    return out
+
+
+def speech_pcm(seconds: float) -> bytes:
+    # voiced burst then trailing silence, so the VAD closes the utterance by itself
+    t = np.arange(int(SR * (seconds + 0.6))) / SR
+    sig = 0.002 * np.random.default_rng(0).standard_normal(len(t))
+    on = t < seconds
+    sig[on] += 0.25 * (np.sin(2 * np.pi * 180 * t[on]) + 0.5 * np.sin(2 * np.pi * 360 * t[on]))
+    return (np.clip(sig, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+# -- stitching -------------------------------------------------------------------
+
+def load_spans(trace_dir: str, wanted: set) -> Dict[str, List[dict]]:
+    from libs.log.spans import from_otlp   # not at the top: inproc sets TRACE_* before spans is first imported
+    by_trace: Dict[str, List[dict]] = defaultdict(list)
+    for path in glob.glob(os.path.join(trace_dir, "*.jsonl*")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue   # torn last line
+                for s in from_otlp(row) if "resourceSpans" in row else [row]:
+                    if s["trace_id"] in wanted:
+                        by_trace[s["trace_id"]].append(s)
+    return by_trace
+
+
+def hop_name(s: dict) -> str:
+    service, name = s.get("service") or "?", s["name"]
+    # the monolith mounts each app under /<service>; report hops the same way in every mode
+    method, _, path = name.partition(" ")
+    if path.startswith(f"/{service}/"):
+        name = f"{method} {path[len(service) + 1:]}"
+    return f"{service}:{name}"
+
+
+def report(rec: Recorder, spans: Dict[str, List[dict]], seconds: float) -> dict:
+    ops: Dict[str, dict] = {}
+    by_op: Dict[str, list] = defaultdict(list)
+    for row in rec.rows:
+        by_op[row[0]].append(row)
+    for op, rows in sorted(by_op.items()):
+        ok = [r[2] for r in rows if r[3] is None]
+        errors: Dict[str, int] = defaultdict(int)
+        for r in rows:
+            if r[3] is not None:
+                errors[r[3]] += 1
+        hops: Dict[str, List[float]] = defaultdict(list)
+        stitched = 0
+        for _op, trace_id, _ms, err in rows:
+            found = spans.get(trace_id) if trace_id else None
+            if not found or err is not None:
+                continue
+            stitched += 1
+            per_hop: Dict[str, float] = defaultdict(float)
+            for s in found:
+                per_hop[hop_name(s)] += (s["end_ns"] - s["start_ns"]) / 1e6
+            for name, ms in per_hop.items():
+                hops[name].append(ms)
+        ops[op] = {
+            "requests": len(rows),
+            "errors": sum(errors.values()),
+            "error_codes": dict(errors),
+            "rps": round(len(ok) / seconds, 2),
+            "latency_ms": percentiles(ok),
+            "stitched": round(stitched / len(ok), 3) if ok else 0.0,
+            "hops": {name: percentiles(v) for name, v in sorted(hops.items())},
+        }
+    return ops
+
+
+def compare(current: dict, base: dict, threshold: float) -> List[str]:
+    out = []
+    for op, cur in current["ops"].items():
+        old = base.get("ops", {}).get(op)
+        if not old:
+            continue
+        pairs = [("e2e", cur["latency_ms"], old["latency_ms"])]
+        pairs += [(h, v, old["hops"][h]) for h, v in cur["hops"].items() if h in old.get("hops", {})]
+        for name, a, b in pairs:
+            if a.get("count", 0) < 20 or b.get("count", 0) < 20:
+                continue
+            if a["p95"] > b["p95"] * (1 + threshold) and a["p95"] - b["p95"] > 1.0:
+                out.append(f"{op} {name}: p95 {b['p95']} -> {a['p95']} ms")
+        if cur["errors"] / max(cur["requests"], 1) > old["errors"] / max(old["requests"], 1) + 0.01:
+            out.append(f"{op}: errors {old['errors']}/{old['requests']} -> {cur['errors']}/{cur['requests']}")
+    return out
+
+
+def git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(scenario: dict, target_kind: str) -> dict:
+    trace_dir = scenario.get("trace_dir") or tempfile.mkdtemp(prefix=f"loadgen-{scenario.get('name', 'run')}-")
+    if target_kind == "inproc":
+        # before the services are imported: they read these at import time
+        os.environ.update(TRACE_ENABLED="1", TRACE_DIR=trace_dir, TRACE_RING=str(1 << 18))
+    target = Target(target_kind, scenario, trace_dir)
+    await target.start()
+    rec = Recorder()
+    http = scenario.get("http") or {}
+    limits = httpx.Limits(max_connections=int(http.get("max_connections", 256)),
+                          max_keepalive_connections=int(http.get("max_connections", 256)))
+    duration = float(scenario.get("duration_s", 30))
+    warmup = float(scenario.get("warmup_s", 3))
+    grace_s = float(http.get("timeout_s", 10)) + 5
+    try:
+        async with httpx.AsyncClient(timeout=float(http.get("timeout_s", 10)), limits=limits) as client:
+            w = Workloads(target, scenario, rec, client)
+            w.stop_at = time.monotonic() + warmup + duration
+            tasks = [asyncio.create_task(t) for t in w.tasks()]
+            await asyncio.sleep(warmup)
+            rec.measuring = True
+            t0 = time.monotonic()
+            lag = asyncio.create_task(loop_lag(w.stop_at))
+            # nothing new starts after stop_at; give stragglers one request timeout, then give up on them
+            _done, stuck = await asyncio.wait(tasks, timeout=w.stop_at - time.monotonic() + grace_s)
+            for t in stuck:
+                t.cancel()
+            await asyncio.gather(*stuck, return_exceptions=True)
+            rec.measuring = False
+            measured = min(duration, time.monotonic() - t0)
+            lag_ms = percentiles(await lag)
+            await asyncio.sleep(0.5)
+    finally:
+        await target.stop()
+    wanted = {r[1] for r in rec.rows if r[1]}
+    spans = load_spans(trace_dir, wanted)
+    return {
+        "scenario": scenario.get("name"),
+        "target": target_kind,
+        "git": git_rev(),
+        "cpu_count": os.cpu_count(),
+        "started_at": int(time.time()),
+        "duration_s": round(measured, 2),
+        "sessions": {k: int(v.get("sessions", 1)) for k, v in (scenario.get("workloads") or {}).items()},
+        "trace_dir": trace_dir,
+        "unfinished_sessions": len(stuck),
+        # high client-side loop lag means the generator itself was the bottleneck
+        "loadgen_lag_ms": lag_ms,
+        "ops": report(rec, spans, measured),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("scenario", help="scenario JSON file")
+    ap.add_argument("--target", choices=["run_all", "monolith", "inproc", "external"], default=None,
+                    help="overrides the scenario's target")
+    ap.add_argument("--duration", type=float, default=None, help="overrides duration_s")
+    ap.add_argument("--out", default="", help="write the result JSON here (default: stdout)")
+    ap.add_argument("--compare", default="", help="baseline result JSON; exit 1 on regressions")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed relative p95 growth (default 0.2)")
+    args = ap.parse_args()
+    with open(args.scenario, encoding="utf-8") as f:
+        scenario = json.load(f)
+    if args.duration is not None:
+        scenario["duration_s"] = args.duration
+    result = asyncio.run(run(scenario, args.target or scenario.get("target", "monolith")))
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        result["regressions"] = regressions
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for line in regressions:
+        print("REGRESSION", line, file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Replay a recorded envelope log (libs/replay) against a build and compare
+latency per message type with the recording.
+
+    RECORD_DIR=/tmp/rec python scripts/loadgen.py scripts/scenarios/smoke.json   # or a real session
+    python scripts/replay.py /tmp/rec --target monolith --speed 1      # original timing
+    python scripts/replay.py /tmp/rec --speed 4                         # 4x faster
+    python scripts/replay.py /tmp/rec --speed max --fail-p95-pct 20     # back to back; exit 1 on regressions
+    python scripts/replay.py /tmp/rec --session s1 --since-ms 1760000000000 --out diff.json
+
+Inputs are the client-facing records: HTTP requests and WebSocket
+messages that didn't come from another service (INTERNAL). Each is sent
+byte for byte as recorded, at its original offset from the first input
+divided by --speed. At max speed a session's HTTP requests still go one
+after another, and each WebSocket connection sends its messages in order.
+
+Latency pairs are computed the same way for the recording and the replay:
+  HTTP       request -> response, keyed "<request type> (METHOD /service/path)"
+  WebSocket  inbound message -> every outbound frame with its trace_id,
+             keyed "<in type> -> <out type>"; a frame belongs to the latest
+             inbound message of that trace on the connection
+Recorded latencies were taken by the recorder middleware, so a target
+this script starts records the replay as well (--replay-log) and "replay"
+is paired from that log the same way; what the replayer itself saw is
+"replay_client". An external target only has the client side. Per key the
+report gives both sides' percentiles, the p50/p95 diff, HTTP status
+mismatches and responses whose payload differs from the recorded one. The log is streamed twice (once to pair the recording, once to drive
+the replay) and never loaded whole.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+import httpx
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadgen import Target, git_rev, percentiles  # noqa: E402  (scripts/ is on sys.path)
+from libs.replay.log import (BINARY, HTTP_IN, HTTP_OUT, WS_CLOSE, WS_IN, WS_OPEN, WS_OUT, LogReader,  # noqa: E402
+                             Record, parse_envelope)
+from libs.schema_utils.binary_frame import CONTENT_TYPE  # noqa: E402
+
+
+def http_key(rec: Record) -> str:
+    method, _, target = rec.channel.partition(" ")
+    return f"{rec.type or '-'} ({method} /{rec.service}{target.split('?')[0]})"
+
+
+def payload_hash(body: bytes, binary: bool) -> Optional[int]:
+    env = parse_envelope(body, binary)
+    if env is None:
+        try:
+            return hash(json.dumps(json.loads(body), sort_keys=True))
+        except ValueError:
+            return hash(bytes(body)) if body else None
+    return hash(json.dumps(env.get("payload"), sort_keys=True, ensure_ascii=False))
+
+
+def trace_of(env: Optional[dict]) -> Optional[str]:
+    trace = (env or {}).get("meta", {}).get("trace") or {}
+    return trace.get("trace_id")
+
+
+class Pairs:
+    """Latency samples per key, plus per-key counters."""
+
+    def __init__(self) -> None:
+        self.ms: Dict[str, array] = defaultdict(lambda: array("d"))
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, key: str, ms: float) -> None:
+        self.ms[key].append(ms)
+
+    def count(self, key: str, what: str) -> None:
+        self.counts[key][what] += 1
+
+
+class WsPairing:
+    """inbound -> outbound pairing on one connection, by trace_id."""
+
+    def __init__(self, pairs: Pairs) -> None:
+        self.pairs = pairs
+        self.last_in: Dict[str, Tuple[float, str]] = {}
+
+    def inbound(self, t_ms: float, body: bytes, binary: bool, typ: str = "") -> None:
+        env = parse_envelope(body, binary)
+        trace_id = trace_of(env)
+        if trace_id:
+            self.last_in[trace_id] = (t_ms, typ or env["meta"].get("type", "-"))
+
+    def outbound(self, t_ms: float, body: bytes, binary: bool) -> None:
+        env = parse_envelope(body, binary)
+        hit = self.last_in.get(trace_of(env) or "")
+        if hit is not None:
+            self.pairs.add(f"{hit[1]} -> {env['meta'].get('type', '-')}", t_ms - hit[0])
+
+
+def is_input(rec: Record) -> bool:
+    return rec.kind in (HTTP_IN, WS_OPEN, WS_IN, WS_CLOSE) and not rec.internal
+
+
+def pair_recording(reader: LogReader, filters: dict) -> Tuple[Pairs, Dict[int, Tuple[int, Optional[int]]], dict]:
+    """Pass 1: recorded latencies, and each recorded HTTP response's (status, payload hash) by conn."""
+    pairs = Pairs()
+    http_in: Dict[int, Tuple[int, str]] = {}
+    responses: Dict[int, Tuple[int, Optional[int]]] = {}
+    ws: Dict[int, WsPairing] = {}
+    first = last = None
+    inputs = 0
+    for rec in reader.records(**filters):
+        if rec.internal:
+            continue
+        if is_input(rec):
+            inputs += 1
+            first = rec.t_ns if first is None else first
+            last = rec.t_ns
+        if rec.kind == HTTP_IN:
+            http_in[rec.conn] = (rec.t_ns, http_key(rec))
+        elif rec.kind == HTTP_OUT:
+            hit = http_in.pop(rec.conn, None)
+            if hit is not None:
+                pairs.add(hit[1], (rec.t_ns - hit[0]) / 1e6)
+                responses[rec.conn] = (rec.status, payload_hash(rec.body, bool(rec.flags & BINARY)))
+        elif rec.kind == WS_IN:
+            ws.setdefault(rec.conn, WsPairing(pairs)).inbound(rec.t_ns / 1e6, rec.body, bool(rec.flags & BINARY),
+                                                              rec.type)
+        elif rec.kind == WS_OUT:
+            p = ws.get(rec.conn)
+            if p is not None:
+                p.outbound(rec.t_ns / 1e6, rec.body, bool(rec.flags & BINARY))
+        elif rec.kind == WS_CLOSE:
+            ws.pop(rec.conn, None)
+    span_s = (last - first) / 1e9 if first is not None else 0.0
+    return pairs, responses, {"inputs": inputs, "span_s": round(span_s, 3)}
+
+
+class ReplayConn:
+    """One replayed WebSocket: sends its queued inputs in order, timestamps what comes back."""
+
+    def __init__(self, url: str, pairs: Pairs, drain_s: float) -> None:
+        self.url = url
+        self.pairing = WsPairing(pairs)
+        self.drain_s = drain_s
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_frame = time.perf_counter()
+        self.errors = 0
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                reader = asyncio.create_task(self._read(ws))
+                while True:
+                    rec = await self.queue.get()
+                    if rec is None:
+                        break
+                    binary = bool(rec.flags & BINARY)
+                    self.pairing.inbound(time.perf_counter() * 1000, rec.body, binary, rec.type)
+                    await ws.send(rec.body if binary else rec.body.decode("utf-8"))
+                # let the answers to the last messages arrive
+                deadline = time.perf_counter() + 10 * self.drain_s
+                while time.perf_counter() - self.last_frame < self.drain_s and time.perf_counter() < deadline:
+                    await asyncio.sleep(self.drain_s / 10)
+                reader.cancel()
+        except (OSError, websockets.WebSocketException):
+            self.errors += 1
+
+    async def _read(self, ws) -> None:
+        try:
+            async for raw in ws:
+                self.last_frame = t = time.perf_counter()
+                binary = isinstance(raw, bytes)
+                self.pairing.outbound(t * 1000, raw if binary else raw.encode("utf-8"), binary)
+        except websockets.ConnectionClosed:
+            pass
+
+
+class Replayer:
+    def __init__(self, target: Target, speed: Optional[float], responses: Dict[int, Tuple[int, Optional[int]]],
+                 concurrency: int, drain_s: float) -> None:
+        self.target = target
+        self.speed = speed          # None = as fast as possible
+        self.responses = responses
+        self.pairs = Pairs()
+        self.sem = asyncio.Semaphore(concurrency)
+        self.drain_s = drain_s
+        self.conns: Dict[int, ReplayConn] = {}
+        self.chains: Dict[str, asyncio.Task] = {}
+        self.tasks = set()
+        self.behind_ms = 0.0
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def run(self, records) -> float:
+        limits = httpx.Limits(max_connections=self.sem._value, max_keepalive_connections=self.sem._value)
+        async with httpx.AsyncClient(timeout=30, limits=limits) as self.client:
+            t0 = time.perf_counter()
+            first = None
+            for rec in records:
+                if not is_input(rec):
+                    continue
+                if first is None:
+                    first = rec.t_ns
+                if self.speed is not None:
+                    due = t0 + (rec.t_ns - first) / 1e9 / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.behind_ms = max(self.behind_ms, -delay * 1000)
+                self._dispatch(rec)
+            for c in self.conns.values():
+                c.queue.put_nowait(None)
+            await asyncio.gather(*self.tasks, *(c.task for c in self.conns.values()), return_exceptions=True)
+            return time.perf_counter() - t0
+
+    def _dispatch(self, rec: Record) -> None:
+        if rec.kind == HTTP_IN:
+            prev = self.chains.get(rec.session_id) if self.speed is None and rec.session_id else None
+            task = asyncio.create_task(self._http(rec, prev))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            if self.speed is None and rec.session_id:
+                self.chains[rec.session_id] = task
+            return
+        conn = self.conns.get(rec.conn)
+        if rec.kind == WS_CLOSE:
+            if conn is not None:
+                conn.queue.put_nowait(None)
+            return
+        if conn is None:
+            # WS_OPEN, or the first message of a connection opened before the recording window
+            conn = self.conns[rec.conn] = ReplayConn(self.target.ws_url(rec.service, rec.channel), self.pairs,
+                                                     self.drain_s)
+        if rec.kind == WS_IN:
+            conn.queue.put_nowait(rec)
+
+    async def _http(self, rec: Record, prev: Optional[asyncio.Task]) -> None:
+        if prev is not None:
+            await asyncio.wait([prev])
+        method, _, path = rec.channel.partition(" ")
+        headers = {}
+        if rec.body:
+            headers["content-type"] = CONTENT_TYPE if rec.flags & BINARY else "application/json"
+        key = http_key(rec)
+        async with self.sem:
+            t0 = time.perf_counter()
+            try:
+                r = await self.client.request(method, self.target.url(rec.service) + path, content=rec.body or None,
+                                              headers=headers)
+            except httpx.HTTPError as e:
+                self.pairs.count(key, type(e).__name__)
+                return
+            ms = (time.perf_counter() - t0) * 1000
+        self.pairs.add(key, ms)
+        want = self.responses.get(rec.conn)
+        if want is None:
+            return
+        if r.status_code != want[0]:
+            self.pairs.count(key, "status_mismatch")
+        elif want[1] is not None:
+            ctype = r.headers.get("content-type", "")
+            if payload_hash(r.content, ctype.startswith(CONTENT_TYPE)) != want[1]:
+                self.pairs.count(key, "payload_mismatch")
+
+
+def report(recorded: Pairs, replayed: Pairs, client: Pairs) -> dict:
+    out = {}
+    for key in sorted(set(recorded.ms) | set(replayed.ms) | set(client.ms) | set(client.counts)):
+        a = percentiles(list(recorded.ms.get(key, ())))
+        b = percentiles(list(replayed.ms.get(key, ())))
+        row = {"recorded": a, "replay": b, **dict(client.counts.get(key, {}))}
+        if replayed is not client:
+            row["replay_client"] = percentiles(list(client.ms.get(key, ())))
+        if a.get("count") and b.get("count"):
+            row["diff_p50_ms"] = round(b["p50"] - a["p50"], 3)
+            row["diff_p95_ms"] = round(b["p95"] - a["p95"], 3)
+            row["diff_p95_pct"] = round(100 * (b["p95"] - a["p95"]) / a["p95"], 1) if a["p95"] else None
+        out[key] = row
+    return out
+
+
+async def main_async(args) -> dict:
+    reader = LogReader(args.log)
+    filters = {"session_id": args.session, "since_ms": args.since_ms, "until_ms": args.until_ms}
+    recorded, responses, info = pair_recording(reader, filters)
+    if not info["inputs"]:
+        raise SystemExit(f"no replayable inputs in {args.log} for {filters}")
+    scenario = {"urls": dict(kv.split("=", 1) for kv in args.urls.split(",")) if args.urls else {}}
+    if args.workers:
+        scenario["run_all_args"] = ["--workers", args.workers]
+    # a target we start records the replay too, so both sides are timed at the same point (its
+    # middleware); it must not append to the log being replayed
+    replay_log = ""
+    if args.target != "external":
+        replay_log = args.replay_log or tempfile.mkdtemp(prefix="replay-log-")
+        os.environ["RECORD_DIR"] = replay_log
+    else:
+        os.environ.pop("RECORD_DIR", None)
+    target = Target(args.target, scenario, tempfile.mkdtemp(prefix="replay-traces-"))
+    await target.start()
+    speed = None if args.speed == "max" else float(args.speed)
+    rp = Replayer(target, speed, responses, args.concurrency, args.drain_s)
+    try:
+        wall = await rp.run(reader.records(**filters))
+    finally:
+        await target.stop()
+    errors = sum(c.errors for c in rp.conns.values())
+    replayed = pair_recording(LogReader(replay_log), {})[0] if replay_log else rp.pairs
+    return {
+        "log": os.path.abspath(args.log),
+        "log_stats": reader.stats(),
+        "filters": {k: v for k, v in filters.items() if v is not None},
+        "target": args.target,
+        "speed": args.speed,
+        "git": git_rev(),
+        "cpu_count": os.cpu_count(),
+        "inputs": info["inputs"],
+        "recorded_span_s": info["span_s"],
+        "replay_wall_s": round(wall, 3),
+        "max_behind_ms": round(rp.behind_ms, 1),
+        "ws_connections": len(rp.conns),
+        "ws_errors": errors,
+        "replay_log": replay_log or None,
+        "measured": "server" if replay_log else "client",
+        "types": report(recorded, replayed, rp.pairs),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("log", help="RECORD_DIR of the recording")
+    ap.add_argument("--target", choices=["run_all", "monolith", "inproc", "external"], default="monolith")
+    ap.add_argument("--workers", default="", help="run_all --workers spec, e.g. agent=2,nav=2")
+    ap.add_argument("--urls", default="", help="external target: agent=http://host:8002,vehicle=...")
+    ap.add_argument("--speed", default="1", help="1 = original timing, N = N times faster, max = back to back")
+    ap.add_argument("--session", default=None, help="only this session_id")
+    ap.add_argument("--since-ms", type=int, default=None)
+    ap.add_argument("--until-ms", type=int, default=None)
+    ap.add_argument("--replay-log", default="", help="keep the replay's own recording here (default: a temp dir)")
+    ap.add_argument("--concurrency", type=int, default=64, help="max HTTP requests in flight")
+    ap.add_argument("--drain-s", type=float, default=1.0, help="quiet time before closing a replayed socket")
+    ap.add_argument("--out", default="", help="write the report JSON here (default: stdout)")
+    ap.add_argument("--fail-p95-pct", type=float, default=None, help="exit 1 if any p95 grew by more than this")
+    args = ap.parse_args()
+    result = asyncio.run(main_async(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.fail_p95_pct is not None:
+        worse = [k for k, v in result["types"].items()
+                 if v.get("diff_p95_pct") is not None and v["replay"]["count"] >= 20
+                 and v["diff_p95_pct"] > args.fail_p95_pct]
+        for k in worse:
+            print(f"REGRESSION {k}: p95 {result['types'][k]['recorded']['p95']} -> "
+                  f"{result['types'][k]['replay']['p95']} ms", file=sys.stderr)
+        sys.exit(1 if worse else 0)
+
+
+if __name__ == "__main__":
+    main()
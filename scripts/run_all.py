@@ -1,9 +1,13 @@
+import argparse
 import os
 import subprocess
 import sys
 import time
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libs.serving.supervisor import Supervisor  # noqa: E402
 
 SERVICES = [
     ("audio_service",   "services.audio_service.app:app",   int(os.getenv("AUDIO_SERVICE_PORT", "8001"))),
@@ -13,13 +17,57 @@ SERVICES = [
     ("nav_service",     "services.nav_service.app:app",     int(os.getenv("NAV_SERVICE_PORT", "8005"))),
 ]
 
-def main():
-    procs = []
-    env = os.environ.copy()
-    # 关键：让 ROOT 在 sys.path 上，这样 services/ libs/ 可导入
-    env["PYTHONPATH"] = ROOT + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+# 只有 agent / nav 可以多 worker：它们的进程内状态只是缓存，需要共享的放 broker KV（libs/event_bus/kv.py）。
+# vehicle / dms / audio 各自是自己状态的唯一写者，固定 1 个进程
+MULTI_WORKER = {"agent_service", "nav_service"}
+
+MONOLITH_PORT = int(os.getenv("MONOLITH_PORT", "8000"))
+
+def worker_counts(spec: str) -> dict:
+    # "agent=4,nav=2"；环境变量 AGENT_WORKERS / NAV_WORKERS 作为默认
+    counts = {name: int(os.getenv(name.split("_")[0].upper() + "_WORKERS", "1")) for name, _app, _port in SERVICES}
+    for part in filter(None, (spec or "").split(",")):
+        key, _, n = part.partition("=")
+        counts[key.strip() + "_service"] = int(n)
+    for name, n in counts.items():
+        if n > 1 and name not in MULTI_WORKER:
+            print(f"{name} keeps its state in-process; running 1 worker instead of {n}")
+            counts[name] = 1
+    return counts
+
+def run_monolith(env: dict) -> subprocess.Popen:
+    # 单进程：五个服务挂在同一个 ASGI app 下（/audio /agent /vehicle /dms /nav），
+    # 进程内 TopicBus，agent -> vehicle/nav 直接进程内调用，不需要 broker
+    env.pop("EVENT_BUS_SOCKET", None)
+    print(f"Starting monolith on :{MONOLITH_PORT} (/audio /agent /vehicle /dms /nav) ...")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "services.monolith:app", "--host", "127.0.0.1", "--port", str(MONOLITH_PORT)],
+        cwd=ROOT, env=env,
+    )
+
+def start_services(env: dict, procs: list, workers: dict, supervisor: Supervisor) -> None:
+    # 跨进程事件总线：先起 broker，各服务通过 EVENT_BUS_SOCKET 连接
+    env.setdefault("EVENT_BUS_SOCKET", "/tmp/cockpit_bus.sock")
+
+    print(f"Starting event bus broker on {env['EVENT_BUS_SOCKET']} ...")
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "libs.event_bus.broker", "--path", env["EVENT_BUS_SOCKET"]],
+        cwd=ROOT, env=env,
+    ))
+    for _ in range(50):
+        if os.path.exists(env["EVENT_BUS_SOCKET"]):
+            break
+        time.sleep(0.1)
 
     for name, app, port in SERVICES:
+        if workers.get(name, 1) > 1:
+            # SO_REUSEPORT 多 worker，supervisor 负责拉起 / 健康检查 / 重启
+            if name == "agent_service":
+                # 会话要跨 worker 可见：写穿到 broker KV
+                env.setdefault("AGENT_SESSION_SHARED", "1")
+            print(f"Starting {name} on :{port} with {workers[name]} workers ...")
+            supervisor.add(name, app, port, workers[name])
+            continue
         cmd = [
             sys.executable, "-m", "uvicorn", app,
             "--host", "127.0.0.1",
@@ -29,13 +77,17 @@ def main():
         cmd = [x for x in cmd if x]
         print(f"Starting {name} on :{port} ...")
         procs.append(subprocess.Popen(cmd, cwd=ROOT, env=env))
+    supervisor.start()
 
+def wait(procs: list, supervisor: Supervisor) -> None:
     print("\nAll services started. Press Ctrl+C to stop.\n")
     try:
         while True:
             time.sleep(1)
+            supervisor.poll()
     except KeyboardInterrupt:
         print("\nStopping...")
+        supervisor.stop()
         for p in procs:
             p.terminate()
         for p in procs:
@@ -44,5 +96,23 @@ def main():
             except Exception:
                 pass
 
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--monolith", action="store_true", default=os.getenv("RUN_MODE") == "monolith",
+                    help="all services in one process under path prefixes (RUN_MODE=monolith)")
+    ap.add_argument("--workers", default="", help="per-service worker counts, e.g. agent=4,nav=4 "
+                                                  "(defaults: AGENT_WORKERS / NAV_WORKERS)")
+    args = ap.parse_args()
+    procs = []
+    env = os.environ.copy()
+    # 关键：让 ROOT 在 sys.path 上，这样 services/ libs/ 可导入
+    env["PYTHONPATH"] = ROOT + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    supervisor = Supervisor(ROOT, env)
+    if args.monolith:
+        procs.append(run_monolith(env))
+    else:
+        start_services(env, procs, worker_counts(args.workers), supervisor)
+    wait(procs, supervisor)
+
 if __name__ == "__main__":
     main()
@@ -1,7 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from libs.log.debug import install
+from libs.log.metrics import register_collector
+from .core.sessions import SNAPSHOT_PATH, get_sessions, snapshot_loop
+from .core.vehicle_state import VEHICLE_STATE
 from .routers.http import router as http_router
 from .routers.ws import router as ws_router
+from .tools.http_client import close_clients
 
-app = FastAPI(title="agent_service")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    sessions = get_sessions()
+    snapshots = None
+    if SNAPSHOT_PATH:
+        # warm restart: sessions that haven't expired while we were down
+        await asyncio.to_thread(sessions.load, SNAPSHOT_PATH)
+        snapshots = asyncio.create_task(snapshot_loop(sessions, SNAPSHOT_PATH))
+    await VEHICLE_STATE.start()
+    yield
+    await VEHICLE_STATE.stop()
+    if snapshots is not None:
+        snapshots.cancel()
+        await sessions.save_async(SNAPSHOT_PATH)
+    await close_clients()
+
+app = FastAPI(title="agent_service", lifespan=lifespan)
+install(app, "agent")
+register_collector(get_sessions().metrics)
 app.include_router(http_router)
-app.include_router(ws_router)
\ No newline at end of file
+app.include_router(ws_router)
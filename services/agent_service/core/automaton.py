@@ -0,0 +1,69 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """
+    Multi-keyword automaton. One left-to-right pass over the text reports every
+    keyword occurrence, so the cost is O(len(text) + hits) no matter how many
+    keywords are registered.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, T]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[int, T]]] = [[]]  # (keyword length, value)
+        for word, value in keywords:
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append((len(word), value))
+
+        fail = [0] * len(goto)
+        q = deque(goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, nxt in goto[node].items():
+                q.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                cand = goto[f].get(ch, 0)
+                fail[nxt] = cand if cand != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> List[Tuple[int, int, T]]:
+        """Returns (start, end, value) for every keyword hit, ordered by end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: List[Tuple[int, int, T]] = []
+        node = 0
+        for i, ch in enumerate(text):
+            while True:
+                nxt = goto[node].get(ch)
+                if nxt is not None:
+                    node = nxt
+                    break
+                if node == 0:
+                    break
+                node = fail[node]
+            if out[node]:
+                end = i + 1
+                for length, value in out[node]:
+                    hits.append((end - length, end, value))
+        return hits
@@ -0,0 +1,281 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .automaton import AhoCorasick
+
+# Clause separators: every intent is matched and slot-filled inside one clause
+SEPARATORS = ("，", ",", "。", "；", ";", "！", "!", "？", "?", "、", "然后", "并且", "同时", "再把")
+
+# "24.5" / "二十四点五" are one number; the fraction is read digit by digit
+_NUM_RE = re.compile(r"[0-9]+(?:[.点][0-9]+)*|[零〇一二两三四五六七八九十百]+(?:点[零〇一二两三四五六七八九十百]+)*")
+# "一点" / "一下" / "一些" / "一半" are amounts, not the number 1
+_AMOUNT_AFTER_ONE = "点下些半"
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+
+
+def cn_to_int(s: str) -> int:
+    if s.isdigit():
+        return int(s)
+    total, cur = 0, 0
+    for ch in s:
+        if ch == "十":
+            total += (cur or 1) * 10
+            cur = 0
+        elif ch == "百":
+            total += (cur or 1) * 100
+            cur = 0
+        else:
+            cur = _CN_DIGITS.get(ch, 0)
+    return total + cur
+
+
+def parse_number(s: str) -> Optional[float]:
+    """"24" -> 24, "24.5" / "二十四点五" -> 24.5; None when s doesn't read as one number."""
+    whole, dot, frac = s.replace("点", ".").partition(".")
+    if not dot:
+        return cn_to_int(whole)
+    if not frac or "." in frac or not all(ch.isdigit() or ch in _CN_DIGITS for ch in frac):
+        return None
+    digits = "".join(ch if ch.isdigit() else str(_CN_DIGITS[ch]) for ch in frac)
+    return float(f"{cn_to_int(whole)}.{digits}")
+
+
+class Clause:
+    __slots__ = ("text", "start", "end", "words", "numbers", "garbled")
+
+    def __init__(self, text: str, start: int) -> None:
+        self.text = text
+        self.start = start
+        self.end = len(text)
+        self.words: List[Tuple[int, int, str]] = []      # (start, end, word)
+        self.numbers: List[Tuple[int, int, float]] = []  # (start, end, value)
+        self.garbled = False   # holds a number we couldn't read ("24.5.3", "24.度")
+
+    def has(self, *words: str) -> bool:
+        return any(w in words for _s, _e, w in self.words)
+
+    def found(self, table: Dict[str, object]) -> List[object]:
+        return [table[w] for _s, _e, w in self.words if w in table]
+
+    def number_with_unit(self, units: Sequence[str]) -> Optional[float]:
+        for s, e, v in self.numbers:
+            for u in units:
+                if self.text.startswith(u, e):
+                    return v
+        return None
+
+    def number_right_after(self, word: str) -> Optional[float]:
+        ends = {e for _s, e, w in self.words if w == word}
+        for s, _e, v in self.numbers:
+            if s in ends:
+                return v
+        return None
+
+    def number_after(self, pos: int) -> Optional[float]:
+        for s, _e, v in self.numbers:
+            if s >= pos:
+                return v
+        return None
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    tool_name: str
+    triggers: Tuple[str, ...]
+    # (clause, trigger_end) -> tool arguments; empty list when slots are missing
+    build: Callable[[Clause, int], List[dict]]
+    words: Tuple[str, ...] = ()
+
+
+class IntentMatcher:
+    """
+    Compiles an intent table into one Aho-Corasick automaton over triggers,
+    slot words and clause separators. match() is a single pass over the text
+    plus per-clause slot extraction for the intents that fired.
+    """
+
+    def __init__(self, intents: Sequence[Intent]) -> None:
+        self.intents = list(intents)
+        keywords: List[Tuple[str, Tuple[str, object]]] = []
+        for i, it in enumerate(self.intents):
+            keywords += [(w, ("t", i)) for w in it.triggers]
+            keywords += [(w, ("w", None)) for w in it.words]
+        keywords += [(w, ("sep", None)) for w in SEPARATORS]
+        self._ac = AhoCorasick(keywords)
+
+    def match(self, text: str) -> Tuple[Tuple[str, dict], ...]:
+        """text must already be normalized; returns ((tool_name, arguments), ...) in utterance order."""
+        clauses = [Clause(text, 0)]
+        fired: List[Dict[int, int]] = [{}]   # per clause: intent index -> first trigger end
+        for s, e, (kind, ref) in self._ac.scan(text):
+            if kind == "sep":
+                clauses[-1].end = s
+                clauses.append(Clause(text, e))
+                fired.append({})
+                continue
+            clauses[-1].words.append((s, e, text[s:e]))
+            if kind == "t" and ref not in fired[-1]:
+                fired[-1][ref] = e
+
+        if not any(fired):
+            return ()
+
+        ci = 0
+        for m in _NUM_RE.finditer(text):
+            nxt = text[m.end():m.end() + 1]
+            if m.group() == "一" and nxt and nxt in _AMOUNT_AFTER_ONE:
+                continue
+            while ci < len(clauses) - 1 and m.start() >= clauses[ci].end:
+                ci += 1
+            value = parse_number(m.group()) if nxt not in (".", "点") else None
+            if value is None:
+                clauses[ci].garbled = True
+                continue
+            clauses[ci].numbers.append((m.start(), m.end(), value))
+
+        out: List[Tuple[int, str, dict]] = []
+        for clause, hits in zip(clauses, fired):
+            for idx, trig_end in hits.items():
+                it = self.intents[idx]
+                for args in it.build(clause, trig_end):
+                    out.append((trig_end, it.tool_name, args))
+        out.sort(key=lambda x: x[0])
+        return tuple((name, args) for _pos, name, args in out)
+
+
+# -- intent table -----------------------------------------------------------
+
+WINDOW_POSITIONS = {
+    "主驾": "FL", "左前": "FL",
+    "副驾": "FR", "副驾驶": "FR", "右前": "FR",
+    "左后": "RL", "右后": "RR",
+}
+# group words name several windows; a bare "车窗" names none
+WINDOW_GROUPS = {
+    "全部": ("FL", "FR", "RL", "RR"), "所有": ("FL", "FR", "RL", "RR"), "四个": ("FL", "FR", "RL", "RR"),
+    "前排": ("FL", "FR"), "后排": ("RL", "RR"),
+}
+CLOSE_WORDS = ("关闭", "关上", "关掉", "关", "取消")
+OPEN_WORDS = ("打开", "开")
+QUESTION_WORDS = ("开了多少", "多少")
+# relative changes need the current setpoint, which a text-only plan doesn't have
+VAGUE_AMOUNTS = ("一点", "一些")
+RELATIVE_WORDS = ("调高", "调低", "升高", "降低", "高一点", "低一点", "高一些", "低一些", "高点", "低点")
+
+AC_MODES = {"吹脸": "face", "吹面": "face", "吹脚": "feet", "除雾": "defrost", "除霜": "defrost", "自动模式": "auto"}
+
+# nav.poi keyword -> query sent to nav_service
+POI_QUERIES = {
+    "星巴克": "Starbucks",
+    "咖啡": "coffee",
+    "充电站": "charging station",
+    "充电桩": "charging station",
+    "加油站": "gas station",
+    "停车场": "parking",
+    "洗手间": "restroom",
+    "厕所": "restroom",
+    "餐厅": "restaurant",
+    "医院": "hospital",
+}
+DEFAULT_CENTER = {"lat": 31.23, "lon": 121.47}
+
+
+def _set_window(c: Clause, _pos: int) -> List[dict]:
+    if c.has(*QUESTION_WORDS):
+        return []   # "副驾窗开了多少" asks, it doesn't set
+    if c.has(*VAGUE_AMOUNTS) or c.garbled:
+        return []   # "开一点" names no position we could set
+    positions = c.found(WINDOW_POSITIONS)
+    for group in c.found(WINDOW_GROUPS):
+        positions += group
+    if not positions:
+        return []
+    pct = c.number_with_unit(("%",))
+    if pct is None:
+        pct = c.number_right_after("百分之")
+    if pct is None:
+        # "开到30": a bare number is the percent ("四个车窗" counts windows, it isn't one)
+        bare = [v for _s, e, v in c.numbers if not c.text.startswith("个", e)]
+        if bare:
+            pct = bare[-1]
+    if pct is not None and (pct > 100 or pct != int(pct)):
+        return []   # "开到300" / "开到30.5" aren't percents we can set
+    if pct is None:
+        if c.has("一半"):
+            pct = 50
+        elif c.has(*CLOSE_WORDS):
+            pct = 0
+        elif c.has(*OPEN_WORDS):
+            pct = 100
+        else:
+            return []
+    pct = max(0, min(100, int(pct)))
+    seen = []
+    for p in positions:
+        if p not in seen:
+            seen.append(p)
+    return [{"command": "set_window", "args": {"position": p, "percent": pct}} for p in seen]
+
+
+def _set_ac_temp(c: Clause, pos: int) -> List[dict]:
+    if c.has(*RELATIVE_WORDS) or c.garbled:
+        return []
+    temp = c.number_with_unit(("度",))
+    if temp is None and c.text.startswith("温度", pos - 2):
+        # "温度24": only right after 温度; "空调风量3档" has no temperature in it
+        temp = c.number_after(pos)
+    if temp is None:
+        return []
+    temp = max(16.0, min(30.0, float(temp)))
+    return [{"command": "set_ac", "args": {"temp_c": temp, "ac_on": True}}]
+
+
+def _set_fan(c: Clause, pos: int) -> List[dict]:
+    if c.garbled:
+        return []
+    level = c.number_with_unit(("档", "级"))
+    if level is None:
+        level = c.number_after(pos)
+    if level is None or level != int(level):
+        return []
+    return [{"command": "set_fan_speed", "args": {"level": max(1, min(7, int(level)))}}]
+
+
+def _set_mode(c: Clause, _pos: int) -> List[dict]:
+    modes = c.found(AC_MODES)
+    return [{"command": "set_ac_mode", "args": {"mode": modes[0]}}] if modes else []
+
+
+def _set_recirc(c: Clause, _pos: int) -> List[dict]:
+    on = c.has("内循环")
+    if c.has(*CLOSE_WORDS):
+        on = not on
+    return [{"command": "set_recirc", "args": {"recirc_on": on}}]
+
+
+def _get_state(_c: Clause, _pos: int) -> List[dict]:
+    return [{}]
+
+
+def poi_intent(name: str, keywords: Dict[str, str]) -> Intent:
+    def build(c: Clause, _pos: int) -> List[dict]:
+        queries = c.found(keywords)
+        if not queries:
+            return []
+        return [{"center": dict(DEFAULT_CENTER), "query": queries[0], "radius_m": 5000, "limit": 3}]
+    return Intent(name, "nav.poi", tuple(keywords), build)
+
+
+INTENTS: List[Intent] = [
+    Intent("window", "vehicle.control", ("窗",), _set_window,
+           words=tuple(WINDOW_POSITIONS) + tuple(WINDOW_GROUPS) + CLOSE_WORDS + OPEN_WORDS + QUESTION_WORDS + VAGUE_AMOUNTS + ("一半", "百分之")),
+    # a bare "度" also ends 亮度 / 角度; a temperature needs 温度 or 空调 in the clause
+    Intent("ac_temp", "vehicle.control", ("温度", "空调"), _set_ac_temp, words=RELATIVE_WORDS),
+    Intent("fan", "vehicle.control", ("风量", "风速", "风扇"), _set_fan),
+    Intent("ac_mode", "vehicle.control", tuple(AC_MODES), _set_mode),
+    Intent("recirc", "vehicle.control", ("内循环", "外循环"), _set_recirc, words=CLOSE_WORDS),
+    poi_intent("nav_poi", POI_QUERIES),
+    # questions about the car
+    Intent("vehicle_state", "vehicle.get_state", ("状态", "几度", "多少度", "车速") + QUESTION_WORDS, _get_state),
+]
@@ -1,57 +1,95 @@
-import re
+from functools import lru_cache
+from typing import Any, FrozenSet, List, Tuple
 from libs.log.tracing import new_id
+from .intents import INTENTS, IntentMatcher
+
+MATCHER = IntentMatcher(INTENTS)
+
+# whole-utterance barge-in: stop whatever this session still has in flight
+CANCEL_WORDS = frozenset({"取消", "算了", "停", "停止", "不要了", "不用了", "别说了"})
+
+FALLBACK_TEXT = "我在。你可以说：把副驾窗开到30%、温度调到24、带我去最近的星巴克。"
+
+# 全角 -> 半角，ASR 常见输出
+_NORM = {0xFF05: "%", 0x3000: " "}
+_NORM.update({0xFF10 + i: str(i) for i in range(10)})
+_NORM.update({0xFF21 + i: chr(0x61 + i) for i in range(26)})
+_NORM.update({0xFF41 + i: chr(0x61 + i) for i in range(26)})
+_NORM_TABLE = str.maketrans(_NORM)
+
+
+def normalize(text: str) -> str:
+    return "".join(text.translate(_NORM_TABLE).lower().split())
+
+
+@lru_cache(maxsize=4096)
+def _match(norm: str) -> Tuple[Tuple[str, dict], ...]:
+    return MATCHER.match(norm)
+
+
+def _clone(obj: Any) -> Any:
+    # cached arguments are shared; hand out fresh containers
+    if isinstance(obj, dict):
+        return {k: _clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone(v) for v in obj]
+    return obj
+
 
 def simple_plan(text: str) -> dict:
     """
     Return either:
       {"type": "tool_call", "tool_call": {...}}
+      {"type": "tool_calls", "tool_calls": [{...}, ...]}   (multi-intent utterance)
       {"type": "message", "message": {...}}
     """
-    t = text.strip()
-
-    # window: "副驾窗开到30%"
-    m = re.search(r"(副驾|副驾驶|右前).*(窗).*(\d{1,3})\s*%", t)
-    if m:
-        pct = int(m.group(3))
-        pct = max(0, min(100, pct))
-        return {
-            "type": "tool_call",
-            "tool_call": {
-                "tool_name": "vehicle.control",
-                "call_id": new_id("call_"),
-                "arguments": {"command": "set_window", "args": {"position": "FR", "percent": pct}},
-                "requires_confirmation": False
-            }
-        }
-
-    # ac temp: "温度调到24"
-    m = re.search(r"(温度).*(\d{2})", t)
-    if m:
-        temp = float(m.group(2))
-        temp = max(16.0, min(30.0, temp))
-        return {
-            "type": "tool_call",
-            "tool_call": {
-                "tool_name": "vehicle.control",
-                "call_id": new_id("call_"),
-                "arguments": {"command": "set_ac", "args": {"temp_c": temp, "ac_on": True}},
-                "requires_confirmation": False
-            }
-        }
-
-    # nav: "最近的星巴克"
-    if "星巴克" in t or "充电站" in t:
-        return {
-            "type": "tool_call",
-            "tool_call": {
-                "tool_name": "nav.poi",
-                "call_id": new_id("call_"),
-                "arguments": {"center": {"lat": 31.23, "lon": 121.47}, "query": "Starbucks", "radius_m": 5000, "limit": 3},
-                "requires_confirmation": False
-            }
+    calls = [
+        {
+            "tool_name": tool_name,
+            "call_id": new_id("call_"),
+            "arguments": _clone(args),
+            "requires_confirmation": False
         }
+        for tool_name, args in _match(normalize(text))
+    ]
+    if len(calls) == 1:
+        return {"type": "tool_call", "tool_call": calls[0]}
+    if calls:
+        return {"type": "tool_calls", "tool_calls": calls}
 
     return {
         "type": "message",
-        "message": {"text": "我在。你可以说：把副驾窗开到30%、温度调到24、带我去最近的星巴克。", "output_modality": "voice", "should_tts": True}
-    }
\ No newline at end of file
+        "message": {"text": FALLBACK_TEXT, "output_modality": "voice", "should_tts": True}
+    }
+
+
+def is_cancel(text: str) -> bool:
+    return normalize(text).strip("，,。.！!？?") in CANCEL_WORDS
+
+
+def targets(tool_calls: List[dict]) -> FrozenSet[Tuple[str, ...]]:
+    """
+    What a plan acts on, e.g. ("vehicle", "set_window", "FR") or ("nav",).
+    A later plan with an overlapping target supersedes an earlier one.
+    """
+    out = set()
+    for tc in tool_calls:
+        name = tc["tool_name"]
+        if name == "vehicle.control":
+            args = tc.get("arguments") or {}
+            out.add(("vehicle", args.get("command", ""), (args.get("args") or {}).get("position", "")))
+        elif name.startswith("nav."):
+            out.add(("nav",))
+        else:
+            out.add((name,))
+    return frozenset(out)
+
+
+def plan_calls(plan: dict) -> List[dict]:
+    if plan["type"] == "message":
+        return []
+    return plan.get("tool_calls") or [plan["tool_call"]]
+
+
+def plan_batch(texts: List[str]) -> List[dict]:
+    return [simple_plan(t) for t in texts]
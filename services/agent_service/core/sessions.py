@@ -0,0 +1,327 @@
+"""
+In-memory agent session store.
+
+    async with get_sessions().turn(session_id) as sess:
+        sess.turn_id += 1
+        ...
+
+Sessions are slotted records in an OrderedDict kept in LRU order. Every
+touch moves a session to the end, so the front is both the least recently
+used and the longest idle: TTL expiry and eviction under the memory cap
+are just pops from the front. turn() holds a per-session asyncio.Lock, so
+turns of one session run one at a time while different sessions run
+concurrently; the lock only exists while someone holds or waits for it.
+
+last_vehicle_state points at the (read-only) snapshot from the vehicle
+state cache, so sessions share it instead of each holding a copy.
+
+Optional extras, both off by default:
+  AGENT_SESSION_SNAPSHOT=<path>  periodic JSON-lines snapshot, loaded at
+                                 startup for a warm restart
+  AGENT_SESSION_SHARED=1         write-through to the broker KV so several
+                                 agent workers see the same sessions; the
+                                 per-session lock stays per process
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from libs.event_bus.kv import get_kv
+from .vehicle_state import VEHICLE_STATE
+
+SESSION_TTL_S = float(os.getenv("AGENT_SESSION_TTL_S", "1800"))
+SESSION_MEM_BYTES = int(float(os.getenv("AGENT_SESSION_MEM_MB", "64")) * 1024 * 1024)
+SNAPSHOT_PATH = os.getenv("AGENT_SESSION_SNAPSHOT", "")
+SNAPSHOT_EVERY_S = float(os.getenv("AGENT_SESSION_SNAPSHOT_S", "30"))
+SHARED = os.getenv("AGENT_SESSION_SHARED", "0") == "1"
+KV_PREFIX = "agent:session:"
+# broker gone (its socket is unlinked when it stops), slow or mid-reconnect: fall back to the local copy
+_KV_ERRORS = (OSError, asyncio.TimeoutError, RuntimeError)
+
+
+class Session:
+    __slots__ = ("session_id", "turn_id", "last_vehicle_state", "last_nav",
+                 "touched", "nbytes", "lock", "users")
+
+    def __init__(self, session_id: str, touched: float) -> None:
+        self.session_id = session_id
+        self.turn_id = 0
+        self.last_vehicle_state: Optional[dict] = None   # shared snapshot, read-only
+        self.last_nav: Optional[dict] = None
+        self.touched = touched
+        self.nbytes = 0
+        self.lock: Optional[asyncio.Lock] = None
+        self.users = 0                                   # holders + waiters of lock
+
+    def to_dict(self) -> dict:
+        """agent_session_state.schema.json shape (last_vehicle_state left out while unknown)."""
+        # no tool asks for confirmation yet, so there is never one pending
+        out: Dict[str, Any] = {"turn_id": self.turn_id, "pending_confirmation": {}}
+        if self.last_vehicle_state is not None:
+            out["last_vehicle_state"] = self.last_vehicle_state
+        if self.last_nav is not None:
+            out["last_nav"] = self.last_nav
+        return out
+
+    def load(self, d: dict) -> None:
+        self.turn_id = d.get("turn_id", 0)
+        self.last_vehicle_state = d.get("last_vehicle_state")
+        self.last_nav = d.get("last_nav")
+
+
+def remember(sess: Session, results: List[dict]) -> None:
+    """Keep what later turns of this session may refer back to."""
+    for r in results:
+        if r["tool_name"].startswith("nav.") and r["ok"]:
+            sess.last_nav = {"tool_name": r["tool_name"], "result": r["result"]}
+    if VEHICLE_STATE.state is not None:
+        sess.last_vehicle_state = VEHICLE_STATE.state
+
+
+def _deep_size(obj: Any) -> int:
+    n = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        n += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, list):
+        n += sum(_deep_size(v) for v in obj)
+    return n
+
+
+# slotted record + OrderedDict entry (hash slot and the linked-list node)
+_ENTRY_BYTES = sys.getsizeof(Session("", 0.0)) + 100
+
+
+class SessionStore:
+    def __init__(self, ttl_s: float = SESSION_TTL_S, max_bytes: int = SESSION_MEM_BYTES, shared: bool = SHARED) -> None:
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def peek(self, session_id: str) -> Optional[Session]:
+        s = self._sessions.get(session_id)
+        if s is not None and s.users == 0 and time.monotonic() - s.touched > self.ttl_s:
+            return None
+        return s
+
+    def get(self, session_id: str) -> Session:
+        """The live session for session_id (a fresh one if unknown or expired), marked as just used."""
+        now = time.monotonic()
+        sessions = self._sessions
+        s = sessions.get(session_id)
+        if s is not None:
+            sessions.move_to_end(session_id)
+            if now - s.touched > self.ttl_s and s.users == 0:
+                self._drop(s)
+                self.expired += 1
+                s = None
+        if s is None:
+            s = Session(session_id, now)
+            self._add(s)
+        s.touched = now
+        self._expire(now)
+        return s
+
+    def account(self, s: Session) -> None:
+        """Re-size s after its last_nav changed and evict if over the cap."""
+        n = _ENTRY_BYTES + sys.getsizeof(s.session_id)
+        if s.last_nav:
+            n += _deep_size(s.last_nav)
+        if self._sessions.get(s.session_id) is s:
+            self._bytes += n - s.nbytes
+        s.nbytes = n
+        self._evict()
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[Session]:
+        s = self.get(session_id)
+        if s.lock is None:
+            s.lock = asyncio.Lock()
+        lock = s.lock
+        s.users += 1
+        try:
+            async with lock:
+                if self.shared:
+                    await self._pull(s)
+                yield s
+                s.touched = time.monotonic()
+                self.account(s)
+                if self.shared:
+                    await self._push(s)
+        finally:
+            s.users -= 1
+            if s.users == 0:
+                s.lock = None
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "created": self.created, "expired": self.expired, "evicted": self.evicted}
+
+    def metrics(self) -> list:
+        """Collector for libs.log.metrics: the counters above as metric families."""
+        return [
+            ("cockpit_agent_sessions", "gauge", "Live agent sessions.", [({}, len(self._sessions))]),
+            ("cockpit_agent_session_bytes", "gauge", "Approximate memory held by sessions.", [({}, self._bytes)]),
+            ("cockpit_agent_sessions_removed_total", "counter", "Sessions removed, by reason.",
+             [({"reason": "expired"}, self.expired), ({"reason": "evicted"}, self.evicted)]),
+        ]
+
+    def _add(self, s: Session) -> None:
+        self._sessions[s.session_id] = s
+        s.nbytes = _ENTRY_BYTES + sys.getsizeof(s.session_id)
+        self._bytes += s.nbytes
+        self.created += 1
+        self._evict()
+
+    def _drop(self, s: Session) -> None:
+        del self._sessions[s.session_id]
+        self._bytes -= s.nbytes
+
+    def _expire(self, now: float) -> None:
+        sessions = self._sessions
+        # at most a few pops per call; the front is the longest idle
+        for _ in range(8):
+            if not sessions:
+                return
+            s = next(iter(sessions.values()))
+            if now - s.touched <= self.ttl_s:
+                return
+            if s.users:
+                sessions.move_to_end(s.session_id)
+                continue
+            self._drop(s)
+            self.expired += 1
+
+    def _evict(self) -> None:
+        sessions = self._sessions
+        skipped = 0
+        while self._bytes > self.max_bytes and len(sessions) > skipped + 1:
+            s = next(iter(sessions.values()))
+            if s.users:
+                # mid-turn: keep it, try the next one
+                sessions.move_to_end(s.session_id)
+                skipped += 1
+                continue
+            self._drop(s)
+            self.evicted += 1
+
+    # -- shared (broker KV) mode -------------------------------------------
+
+    async def _pull(self, s: Session) -> None:
+        # another worker may have run later turns of this session
+        try:
+            blob = await get_kv().get(KV_PREFIX + s.session_id)
+        except _KV_ERRORS:
+            return
+        if blob is not None:
+            d = json.loads(blob)
+            if d.get("turn_id", 0) > s.turn_id:
+                s.load(d)
+
+    async def _push(self, s: Session) -> None:
+        try:
+            await get_kv().set(KV_PREFIX + s.session_id, json.dumps(s.to_dict(), ensure_ascii=False).encode("utf-8"),
+                               ttl_s=self.ttl_s)
+        except _KV_ERRORS:
+            pass
+
+    # -- snapshots ---------------------------------------------------------
+
+    def _rows(self) -> Tuple[List[dict], List[dict]]:
+        # taken on the event loop; serializing happens off it
+        now = time.monotonic()
+        states: List[dict] = []
+        state_idx: Dict[int, int] = {}
+        rows = []
+        for s in self._sessions.values():
+            row: Dict[str, Any] = {"id": s.session_id, "idle_s": round(now - s.touched, 3), "turn_id": s.turn_id}
+            if s.last_nav:
+                row["last_nav"] = s.last_nav
+            vs = s.last_vehicle_state
+            if vs is not None:
+                i = state_idx.get(id(vs))
+                if i is None:
+                    i = state_idx[id(vs)] = len(states)
+                    states.append(vs)
+                row["vs"] = i
+            rows.append(row)
+        return states, rows
+
+    def save(self, path: str) -> int:
+        """Write every live session to path (atomically); returns how many."""
+        states, rows = self._rows()
+        _write_snapshot(path, states, rows)
+        return len(rows)
+
+    async def save_async(self, path: str) -> int:
+        states, rows = self._rows()
+        await asyncio.to_thread(_write_snapshot, path, states, rows)
+        return len(rows)
+
+    def load(self, path: str) -> int:
+        """Restore sessions from a snapshot, skipping ones that expired meanwhile; returns how many."""
+        try:
+            f = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+        now = time.monotonic()
+        n = 0
+        with f:
+            header = json.loads(f.readline() or "{}")
+            states = header.get("states") or []
+            down_s = max(0.0, time.time() - header.get("saved_at", time.time()))
+            # rows were written least recently used first, so appending restores the LRU order
+            for line in f:
+                row = json.loads(line)
+                idle = row.get("idle_s", 0) + down_s
+                if idle > self.ttl_s or row["id"] in self._sessions:
+                    continue
+                s = Session(row["id"], now - idle)
+                s.turn_id = row.get("turn_id", 0)
+                s.last_nav = row.get("last_nav")
+                if "vs" in row:
+                    s.last_vehicle_state = states[row["vs"]]
+                self._add(s)
+                self.account(s)
+                n += 1
+        return n
+
+
+def _write_snapshot(path: str, states: List[dict], rows: List[dict]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"saved_at": time.time(), "states": states}, ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+async def snapshot_loop(store: SessionStore, path: str, every_s: float = SNAPSHOT_EVERY_S) -> None:
+    while True:
+        await asyncio.sleep(every_s)
+        await store.save_async(path)
+
+
+_STORE: Optional[SessionStore] = None
+
+
+def get_sessions() -> SessionStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = SessionStore()
+    return _STORE
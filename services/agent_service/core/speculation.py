@@ -0,0 +1,134 @@
+"""
+Speculative planning on partial transcripts.
+
+Every partial transcript is planned as if it were final. Read-only tool
+calls of that plan (nav.poi, nav.route, vehicle.get_state) start at once in
+the background and land in a short-lived cache keyed by session, tool and
+normalized arguments. When the final transcript plans the same call, the
+turn takes the prefetched result (or joins the still-running call) instead
+of issuing its own; anything the final plan doesn't use is dropped.
+
+Vehicle-mutating calls never run here. A partial that plans one only warms
+the vehicle state cache when it isn't live.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from libs.log.spans import span
+from ..tools.dispatch import run_tool_call, run_tool_calls
+from .orchestrator import plan_calls
+from .vehicle_state import VEHICLE_STATE
+
+ENABLED = os.getenv("AGENT_SPECULATION", "1") != "0"
+TTL_S = float(os.getenv("AGENT_SPEC_TTL_S", "5"))
+MAX_ENTRIES = int(os.getenv("AGENT_SPEC_MAX", "32"))
+READ_ONLY_TOOLS = frozenset({"nav.poi", "nav.route", "vehicle.get_state"})
+
+Key = Tuple[str, str, str]
+
+
+def call_key(session_id: str, tool_call: dict) -> Key:
+    # the slots as the planner filled them; call_id and flags don't matter
+    return session_id, tool_call["tool_name"], json.dumps(tool_call.get("arguments") or {}, sort_keys=True,
+                                                          ensure_ascii=False)
+
+
+class Speculator:
+    """Per-connection prefetch cache; all methods run on the event loop."""
+
+    def __init__(self, ttl_s: float = TTL_S, max_entries: int = MAX_ENTRIES) -> None:
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, Tuple[float, asyncio.Task]]" = OrderedDict()
+        self.started = 0
+        self.committed = 0
+        self.discarded = 0
+
+    def speculate(self, session_id: str, plan: dict, trace: Optional[dict]) -> int:
+        """Start prefetches for the read-only calls of a partial's plan; returns how many started."""
+        self._expire()
+        n = 0
+        calls = plan_calls(plan)
+        for tc in calls:
+            if tc["tool_name"] not in READ_ONLY_TOOLS:
+                continue
+            if tc["tool_name"] == "vehicle.get_state" and VEHICLE_STATE.live and VEHICLE_STATE.state is not None:
+                continue     # answered from the cache anyway
+            key = call_key(session_id, tc)
+            if key in self._entries:
+                continue
+            self._entries[key] = (time.monotonic(), asyncio.create_task(self._prefetch(tc, session_id, trace)))
+            n += 1
+        if any(tc["tool_name"] == "vehicle.control" for tc in calls) and VEHICLE_STATE.current()[1] is None:
+            key = (session_id, "vehicle.get_state", "{}")
+            if key not in self._entries:
+                warm = {"tool_name": "vehicle.get_state", "call_id": "spec_state", "arguments": {}}
+                self._entries[key] = (time.monotonic(), asyncio.create_task(self._prefetch(warm, session_id, trace)))
+                n += 1
+        while len(self._entries) > self.max_entries:
+            _key, (_t, task) = self._entries.popitem(last=False)
+            task.cancel()
+            self.discarded += 1
+        self.started += n
+        return n
+
+    async def run(self, calls: List[dict], session_id: str, trace: Optional[dict]) -> List[dict]:
+        """run_tool_calls() for a committed plan, using prefetched results where the calls match."""
+        self._expire()
+        taken: Dict[int, asyncio.Task] = {}
+        for i, tc in enumerate(calls):
+            if tc["tool_name"] in READ_ONLY_TOOLS:
+                hit = self._entries.pop(call_key(session_id, tc), None)
+                if hit is not None:
+                    taken[i] = hit[1]
+        self.discard(session_id)
+        if not taken:
+            return await run_tool_calls(calls, session_id, trace)
+        rest = [i for i in range(len(calls)) if i not in taken]
+        fresh = await run_tool_calls([calls[i] for i in rest], session_id, trace) if rest else []
+        results: List[dict] = [{}] * len(calls)
+        for i, r in zip(rest, fresh):
+            results[i] = r
+        for i, task in taken.items():
+            r = await task
+            if not r["ok"]:
+                # a failed guess is not worth keeping; do it for real
+                results[i] = await run_tool_call(calls[i], session_id, trace)
+                continue
+            self.committed += 1
+            results[i] = dict(r, call_id=calls[i]["call_id"])
+        return results
+
+    def discard(self, session_id: str) -> None:
+        """Drop what this session speculated on (the final plan didn't need it)."""
+        for key in [k for k in self._entries if k[0] == session_id]:
+            _t, task = self._entries.pop(key)
+            task.cancel()
+            self.discarded += 1
+
+    def close(self) -> None:
+        for _t, task in self._entries.values():
+            task.cancel()
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "started": self.started, "committed": self.committed,
+                "discarded": self.discarded}
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, (t, task) = next(iter(self._entries.items()))
+            if now - t <= self.ttl_s:
+                return
+            del self._entries[key]
+            task.cancel()
+            self.discarded += 1
+
+    @staticmethod
+    async def _prefetch(tc: dict, session_id: str, trace: Optional[dict]) -> dict:
+        with span("agent.speculate", trace, tool=tc["tool_name"]):
+            return await run_tool_call(tc, session_id, trace)
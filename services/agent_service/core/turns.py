@@ -0,0 +1,261 @@
+"""
+Pipelined, cancellable agent turns for one /ws/agent connection.
+
+Every utterance runs as its own task, so a slow turn no longer holds up the
+messages behind it. All frames of a turn carry its call_id (its tool calls
+get <call_id>.<n>) and go out in utterance order per session: a turn's
+tool-call announcements are buffered, and everything after waits, until
+the session's previous turn is done.
+
+A newer plan supersedes the session's in-flight turns that act on the same
+target (orchestrator.targets): "温度调到24" followed by "温度调到26" cancels
+the first turn along with its pending tool HTTP call. The new turn then
+waits for the old one to unwind before running its own tools, so the two
+writes can't land out of order. A cancel word ("取消", "算了") stops
+everything the session has in flight. Turns start on final text; partial
+transcripts cancel and feed speculative prefetching (core/speculation.py).
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from libs.log.metrics import observe_ws
+from libs.log.spans import span
+from libs.log.tracing import now_ms, mk_trace, new_id
+from ..tools.dispatch import describe, describe_state, run_tool_calls
+from .orchestrator import is_cancel, plan_calls, simple_plan, targets
+from .sessions import get_sessions, remember
+from .speculation import ENABLED as SPECULATION, Speculator
+from .vehicle_state import VEHICLE_STATE
+
+MAX_INFLIGHT = int(os.getenv("AGENT_WS_MAX_INFLIGHT", "8"))
+CANCELLED_TEXT = "好的，已取消。"
+WS_TYPES = frozenset({"agent.user_utterance", "audio.transcript.partial", "audio.transcript.final"})
+
+
+class Turn:
+    __slots__ = ("call_id", "session_id", "trace", "targets", "task", "started", "done", "prev", "buffer",
+                 "flushed", "reason", "superseded_by", "kind", "received_ns")
+
+    def __init__(self, call_id: str, session_id: str, trace: Optional[dict], prev: Optional["Turn"]) -> None:
+        self.call_id = call_id
+        self.session_id = session_id
+        self.trace = trace
+        self.targets = frozenset()
+        self.task: Optional[asyncio.Task] = None
+        self.started = False
+        self.done = asyncio.Event()
+        self.prev = prev                      # previous turn of the session, until we've caught up with it
+        self.buffer: List[str] = []
+        self.flushed = prev is None
+        self.reason: Optional[str] = None     # why it was cancelled
+        self.superseded_by: Optional[str] = None
+        self.kind = "agent.user_utterance"    # message type that started it, for the ws latency metric
+        self.received_ns = 0
+
+
+class TurnPipeline:
+    def __init__(self, send: Callable[[str], Awaitable[None]], max_inflight: int = MAX_INFLIGHT,
+                 speculate: bool = SPECULATION) -> None:
+        self.send = send
+        self.max_inflight = max_inflight
+        self.sessions = get_sessions()
+        self.spec = Speculator() if speculate else None
+        self._inflight: Dict[str, List[Turn]] = {}
+        self._last: Dict[str, Turn] = {}      # newest turn per session, for ordering
+        self._count = 0
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+        self.cancelled = 0
+
+    async def handle(self, msg: dict) -> None:
+        """Start (or cancel) turns for one inbound message; returns without waiting for the turn."""
+        received_ns = time.perf_counter_ns()
+        meta = msg.get("meta") or {}
+        typ = meta.get("type", "agent.user_utterance")
+        session_id = meta.get("session_id", "demo")
+        trace = meta.get("trace")
+        payload = msg.get("payload") or {}
+        text = payload.get("text", "")
+        final = typ != "audio.transcript.partial" and payload.get("is_final", True)
+        call_id = payload.get("call_id") or new_id("call_")
+        kind = typ if typ in WS_TYPES else "other"
+
+        if is_cancel(text):
+            superseded = self._supersede(session_id, None, call_id, "barge_in")
+            if not (final and await self._start(call_id, session_id, trace, None, superseded, kind, received_ns)):
+                observe_ws("agent", kind, received_ns)
+            return
+        plan = simple_plan(text) if text else None
+        calls = plan_calls(plan) if plan else []
+        superseded = []
+        if calls:
+            superseded = self._supersede(session_id, targets(calls), call_id, "superseded" if final else "barge_in")
+            if not final and self.spec is not None:
+                self.spec.speculate(session_id, plan, trace)
+        if not (final and plan is not None
+                and await self._start(call_id, session_id, trace, plan, superseded, kind, received_ns)):
+            # nothing left running for it; a started turn is observed when it finishes
+            observe_ws("agent", kind, received_ns)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self.spec is not None:
+            self.spec.close()
+        tasks = []
+        for turns in self._inflight.values():
+            for t in turns:
+                self._cancel(t, "barge_in", None)
+                tasks.append(t.task)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        out = {"inflight": self._count, "cancelled": self.cancelled}
+        if self.spec is not None:
+            out["speculation"] = self.spec.stats()
+        return out
+
+    # -- internals ---------------------------------------------------------
+
+    def _supersede(self, session_id: str, hit: Optional[frozenset], by: str, reason: str) -> List[asyncio.Task]:
+        out = []
+        for t in self._inflight.get(session_id, ()):
+            if t.reason is None and (hit is None or t.targets & hit):
+                self._cancel(t, reason, by)
+                out.append(t.task)
+        return out
+
+    @staticmethod
+    def _cancel(t: Turn, reason: str, by: Optional[str]) -> None:
+        if t.reason is not None:
+            return
+        t.reason = reason
+        t.superseded_by = by
+        # a task cancelled before its first step never runs its except/finally;
+        # one that hasn't started sees t.reason and stops by itself
+        if t.started:
+            t.task.cancel()
+
+    async def _start(self, call_id: str, session_id: str, trace: Optional[dict], plan: Optional[dict],
+                     superseded: List[asyncio.Task], kind: str, received_ns: int) -> bool:
+        if self._count >= self.max_inflight:
+            await self._send_now(self._frame("agent.turn.cancelled", session_id, trace,
+                                             {"call_id": call_id, "reason": "too_many_turns"}))
+            return False
+        t = Turn(call_id, session_id, trace, self._last.get(session_id))
+        t.kind = kind
+        t.received_ns = received_ns
+        if plan is not None:
+            t.targets = targets(plan_calls(plan))
+        self._last[session_id] = t
+        self._inflight.setdefault(session_id, []).append(t)
+        self._count += 1
+        t.task = asyncio.create_task(self._run(t, plan, superseded))
+        return True
+
+    async def _run(self, t: Turn, plan: Optional[dict], superseded: List[asyncio.Task]) -> None:
+        t.started = True
+        try:
+            if t.reason is not None:
+                raise asyncio.CancelledError()
+            if superseded:
+                await asyncio.wait(superseded)
+            async with self.sessions.turn(t.session_id) as sess:
+                sess.turn_id += 1
+                turn_id = sess.turn_id
+            with span("agent.ws.turn", t.trace, turn_id=turn_id, call_id=t.call_id):
+                await self._respond(t, plan)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            out = {"call_id": t.call_id, "reason": t.reason or "barge_in"}
+            if t.superseded_by:
+                out["superseded_by"] = t.superseded_by
+            await self._emit(t, "agent.turn.cancelled", out)
+        finally:
+            t.done.set()
+            observe_ws("agent", t.kind, t.received_ns)
+            turns = self._inflight.get(t.session_id)
+            if turns is not None:
+                turns.remove(t)
+                if not turns:
+                    del self._inflight[t.session_id]
+            if self._last.get(t.session_id) is t:
+                del self._last[t.session_id]
+            self._count -= 1
+
+    async def _respond(self, t: Turn, plan: Optional[dict]) -> None:
+        if plan is None:
+            await self._emit(t, "agent.out", {"text": CANCELLED_TEXT, "output_modality": "voice",
+                                              "should_tts": True, "call_id": t.call_id})
+            return
+        calls = plan_calls(plan)
+        if not calls:
+            if self.spec is not None:
+                self.spec.discard(t.session_id)
+            await self._emit(t, "agent.out", dict(plan["message"], call_id=t.call_id))
+            return
+        for i, tc in enumerate(calls):
+            tc["call_id"] = f"{t.call_id}.{i}"
+        if all(tc["tool_name"] == "vehicle.get_state" for tc in calls):
+            # state questions straight from the cache when it's fresh
+            _version, state = VEHICLE_STATE.current()
+            if state is not None:
+                async with self.sessions.turn(t.session_id) as sess:
+                    sess.last_vehicle_state = state
+                await self._emit(t, "agent.out", {"text": describe_state(state), "output_modality": "voice",
+                                                  "should_tts": True, "call_id": t.call_id})
+                return
+        for tc in calls:
+            await self._emit(t, "agent.tool_call", tc, wait=False)
+        if self.spec is not None:
+            results = await self.spec.run(calls, t.session_id, t.trace)
+        else:
+            results = await run_tool_calls(calls, t.session_id, t.trace)
+        async with self.sessions.turn(t.session_id) as sess:
+            remember(sess, results)
+        for r in results:
+            await self._emit(t, "agent.tool_result", r)
+        await self._emit(t, "agent.out", {"text": "；".join(describe(r) for r in results), "output_modality": "voice",
+                                          "should_tts": True, "call_id": t.call_id})
+
+    def _frame(self, typ: str, session_id: str, trace: Optional[dict], payload: dict) -> str:
+        out = {
+            "meta": {
+                "message_id": new_id("m_"),
+                "timestamp_ms": now_ms(),
+                "source": "agent",
+                "type": typ,
+                "session_id": session_id,
+                "trace": mk_trace(trace),
+            },
+            "payload": payload
+        }
+        return json.dumps(out, ensure_ascii=False)
+
+    async def _emit(self, t: Turn, typ: str, payload: dict, wait: bool = True) -> None:
+        frame = self._frame(typ, t.session_id, t.trace, payload)
+        if not t.flushed:
+            if not t.prev.done.is_set():
+                if not wait:
+                    t.buffer.append(frame)
+                    return
+                await t.prev.done.wait()
+            t.prev = None
+            t.flushed = True
+            frames, t.buffer = t.buffer + [frame], []
+        else:
+            frames = [frame]
+        for f in frames:
+            await self._send_now(f)
+
+    async def _send_now(self, frame: str) -> None:
+        if self._closed:
+            return
+        async with self._send_lock:
+            try:
+                await self.send(frame)
+            except Exception:
+                # the socket is gone; the receive loop will notice and close us
+                self._closed = True
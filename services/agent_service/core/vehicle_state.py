@@ -0,0 +1,109 @@
+"""
+Agent-side cache of the vehicle state.
+
+Fed from two places: the state that comes back with every vehicle.* tool
+result, and the vehicle.delta frames vehicle_service publishes on the bus
+(coalesced per tick, so writes by anyone else arrive within ~100 ms). Both
+carry the state version, so a late frame never rolls the cache back.
+
+While the bus feed is live the cache can answer "what's the state" on its
+own. It is live through a connected broker, or when vehicle_service runs in
+this process (the monolith sets local_feed); a plain in-process bus in a
+standalone agent carries no deltas. Otherwise a state is trusted for
+MAX_AGE_S after it was last seen.
+"""
+import json
+import os
+import time
+from typing import Optional, Tuple
+from libs.event_bus.client import get_bus
+
+DELTA_TOPIC = "vehicle.delta"
+MAX_AGE_S = float(os.getenv("AGENT_VEHICLE_STATE_MAX_AGE_S", "2"))
+
+
+class VehicleStateCache:
+    def __init__(self, max_age_s: float = MAX_AGE_S) -> None:
+        self.max_age_s = max_age_s
+        self.version = -1
+        self.state: Optional[dict] = None    # never mutated once published; sessions hold references
+        self.seen_at = 0.0
+        self.subscribed = False
+        self.local_feed = False   # vehicle_service publishes on this process's bus
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def live(self) -> bool:
+        # a BrokerBus cut off from the broker only delivers this process's own publishes
+        return self.subscribed and (self.local_feed or getattr(get_bus(), "connected", False))
+
+    def offer(self, version: Optional[int], state: Optional[dict]) -> None:
+        """A full state seen somewhere (tool result, snapshot frame); ignored if older than what we have."""
+        if not state:
+            return
+        if version is None:
+            # unversioned: only good for the max-age window
+            if self.state is None:
+                self.state, self.seen_at = state, time.monotonic()
+            return
+        if version >= self.version:
+            self.version, self.state, self.seen_at = version, state, time.monotonic()
+
+    def apply_delta(self, from_version: int, version: int, ops: list) -> None:
+        if version <= self.version:
+            return
+        if self.state is None or from_version > self.version:
+            # missed frames in between: wait for the next full state
+            self.state, self.version = None, -1
+            return
+        new = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self.state.items()}
+        for op in ops:
+            keys = op["path"].strip("/").split("/")
+            node = new
+            for k in keys[:-1]:
+                node = node.setdefault(k, {})
+            node[keys[-1]] = op.get("value")
+        self.version, self.state, self.seen_at = version, new, time.monotonic()
+
+    def current(self) -> Tuple[Optional[int], Optional[dict]]:
+        """(version, state) if the cache can be trusted right now, else (None, None)."""
+        if self.state is not None and (self.live or time.monotonic() - self.seen_at <= self.max_age_s):
+            self.hits += 1
+            return self.version, self.state
+        self.misses += 1
+        return None, None
+
+    # -- bus feed --------------------------------------------------------------
+
+    async def send_text(self, data: str) -> None:
+        # TopicBus subscriber interface (the cache stands in for a WebSocket)
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            return
+        meta = msg.get("meta") or {}
+        payload = msg.get("payload") or {}
+        if meta.get("type") == "vehicle.state.snapshot":
+            self.offer(payload.get("version"), payload.get("state"))
+        elif meta.get("type") == "vehicle.state.delta":
+            self.apply_delta(payload.get("from_version", 0), payload.get("version", 0), payload.get("ops") or [])
+
+    async def close(self, code: int = 1000) -> None:
+        # dropped by the bus for falling behind
+        self.subscribed = False
+
+    async def start(self) -> None:
+        bus = get_bus()
+        await bus.subscribe(DELTA_TOPIC, self)
+        self.subscribed = True
+
+    async def stop(self) -> None:
+        self.subscribed = False
+        await get_bus().unsubscribe(DELTA_TOPIC, self)
+
+    def stats(self) -> dict:
+        return {"version": self.version, "live": self.live, "hits": self.hits, "misses": self.misses}
+
+
+VEHICLE_STATE = VehicleStateCache()
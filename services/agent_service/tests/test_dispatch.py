@@ -0,0 +1,33 @@
+import asyncio
+from services.agent_service.tools import dispatch
+
+
+def call(i: int) -> dict:
+    return {"tool_name": "vehicle.control", "call_id": f"c{i}",
+            "arguments": {"command": "set_window", "args": {"position": "FL", "percent": i}}}
+
+
+def reply(results: list):
+    async def post(path: str, body: dict) -> dict:
+        assert path == "/commands"
+        return {"payload": {"event": "state_changed", "version": 7, "state": {"windows": {"FL": 1}}, "results": results}}
+    return post
+
+
+def test_short_batch_reply_is_an_error_per_missing_call(monkeypatch):
+    monkeypatch.setattr(dispatch.VEHICLE, "post", reply([{"index": 0, "command": "set_window", "ok": True}]))
+    out = asyncio.run(dispatch.run_tool_calls([call(1), call(2), call(3)], "s1", None))
+    assert [r["call_id"] for r in out] == ["c1", "c2", "c3"]
+    assert out[0]["ok"] and out[0]["result"]["event"] == "state_changed"
+    assert [r["error"]["code"] for r in out[1:]] == ["missing_result", "missing_result"]
+    for r in out:
+        assert dispatch.describe(r)    # every result can be spoken
+
+
+def test_batch_results_are_matched_by_index(monkeypatch):
+    monkeypatch.setattr(dispatch.VEHICLE, "post", reply([
+        {"index": 1, "command": "set_window", "ok": False, "error": {"code": "bad_args", "message": "no"}},
+        {"index": 0, "command": "set_window", "ok": True},
+    ]))
+    out = asyncio.run(dispatch.run_tool_calls([call(1), call(2)], "s1", None))
+    assert out[0]["ok"] and not out[1]["ok"] and out[1]["error"]["code"] == "bad_args"
@@ -0,0 +1,75 @@
+import asyncio
+import httpx
+import pytest
+from services.agent_service.tools.http_client import CircuitBreaker, ServiceClient, ToolCallError
+
+
+def client_with(handler, breaker: CircuitBreaker) -> ServiceClient:
+    c = ServiceClient("svc", "http://svc.test", breaker=breaker)
+    c._ensure()
+    c._client = httpx.AsyncClient(base_url=c.base_url, transport=httpx.MockTransport(handler))
+    return c
+
+
+def test_opens_after_failures_and_half_opens_for_one_trial():
+    b = CircuitBreaker(failures=2, reset_s=0.0)
+    b.record_failure()
+    assert b.state == "closed"
+    b.record_failure()
+    assert b.state == "half_open"      # reset_s = 0: due for a trial straight away
+    assert b.allow()
+    assert not b.allow()               # only one trial at a time
+    b.record_failure()
+    assert b.allow()
+    b.record_success()
+    assert b.state == "closed" and b.allow() and b.allow()
+
+
+def test_open_breaker_rejects_without_calling():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    b = CircuitBreaker(failures=1, reset_s=60.0)
+    c = client_with(handler, b)
+
+    async def go():
+        with pytest.raises(ToolCallError) as e:
+            await c.post("/x", {})
+        assert e.value.code == "http_status"
+        with pytest.raises(ToolCallError) as e:
+            await c.post("/x", {})
+        assert e.value.code == "circuit_open"
+        await c.aclose()
+
+    asyncio.run(go())
+    assert len(calls) == 1
+
+
+def test_cancelled_trial_frees_the_breaker():
+    gate = {"hang": True}
+
+    async def handler(request):
+        if gate["hang"]:
+            await asyncio.sleep(3600)
+        return httpx.Response(200, json={"ok": True})
+
+    b = CircuitBreaker(failures=1, reset_s=0.0)
+    b.record_failure()
+    c = client_with(handler, b)
+
+    async def go():
+        trial = asyncio.create_task(c.post("/x", {}))
+        await asyncio.sleep(0.05)
+        assert not b.allow()           # the trial holds the slot while in flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        gate["hang"] = False
+        assert await c.post("/x", {}) == {"ok": True}
+        assert b.state == "closed"
+        await c.aclose()
+
+    asyncio.run(go())
@@ -0,0 +1,67 @@
+import pytest
+from services.agent_service.core.orchestrator import normalize
+from services.agent_service.core.intents import INTENTS, IntentMatcher
+
+MATCHER = IntentMatcher(INTENTS)
+
+
+def plan(text: str):
+    return MATCHER.match(normalize(text))
+
+
+def window(position: str, percent: int):
+    return ("vehicle.control", {"command": "set_window", "args": {"position": position, "percent": percent}})
+
+
+def ac(temp: float):
+    return ("vehicle.control", {"command": "set_ac", "args": {"temp_c": temp, "ac_on": True}})
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("温度调到24度", (ac(24.0),)),
+    ("空调调到二十二度", (ac(22.0),)),
+    ("温度24", (ac(24.0),)),
+    ("温度调到10度", (ac(16.0),)),
+    ("温度调到24.5度", (ac(24.5),)),
+    ("温度调到二十四点五度", (ac(24.5),)),
+    ("温度二十二点零五", (ac(22.05),)),
+    ("副驾窗开到50%", (window("FR", 50),)),
+    ("副驾窗开到30", (window("FR", 30),)),
+    ("把副驾窗开到3", (window("FR", 3),)),
+    ("主驾窗开一半", (window("FL", 50),)),
+    ("打开副驾窗", (window("FR", 100),)),
+    ("四个车窗开到30", tuple(window(p, 30) for p in ("FL", "FR", "RL", "RR"))),
+    ("关闭所有车窗", tuple(window(p, 0) for p in ("FL", "FR", "RL", "RR"))),
+    ("后排车窗开到30", (window("RL", 30), window("RR", 30))),
+    ("关上前排车窗", (window("FL", 0), window("FR", 0))),
+    ("风量一档", (("vehicle.control", {"command": "set_fan_speed", "args": {"level": 1}}),)),
+    ("空调风量3档", (("vehicle.control", {"command": "set_fan_speed", "args": {"level": 3}}),)),
+    ("打开副驾窗，温度调到22度", (window("FR", 100), ac(22.0))),
+])
+def test_plans(text, expected):
+    assert plan(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "屏幕亮度调到50",      # 亮度 / 角度 are not temperatures
+    "座椅角度调到10",
+    "温度调高一点",        # relative: needs the current setpoint
+    "温度调低2度",
+    "风量调高一点",        # 一点 is not the number 1
+    "车窗开一点",
+    "副驾窗开到300",       # not a percent: decline instead of clamping to fully open
+    "副驾窗开到30.5",
+    "车窗开到30",          # names no window
+    "打开车窗",
+    "温度调到24.5.3度",    # unreadable numbers decline instead of guessing
+    "温度调到24.度",
+    "风量2.5档",
+    "把空调打开",
+])
+def test_declines(text):
+    assert plan(text) == ()
+
+
+def test_question_is_not_a_command():
+    assert plan("副驾窗开了多少") == (("vehicle.get_state", {}),)
+    assert plan("现在几度") == (("vehicle.get_state", {}),)
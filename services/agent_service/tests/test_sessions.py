@@ -0,0 +1,45 @@
+import asyncio
+from libs.event_bus import kv
+from services.agent_service.core.sessions import SessionStore
+
+
+def test_shared_store_falls_back_when_broker_is_gone(monkeypatch, tmp_path):
+    # the broker unlinks its socket when it stops
+    monkeypatch.setattr(kv, "_KV", kv.BrokerKV(str(tmp_path / "missing.sock")))
+    store = SessionStore(shared=True)
+
+    async def run():
+        for _ in range(2):
+            async with store.turn("s1") as sess:
+                sess.turn_id += 1
+        return store.peek("s1").turn_id
+
+    assert asyncio.run(run()) == 2
+
+
+def test_ttl_expiry_and_memory_cap():
+    store = SessionStore(ttl_s=0.0, max_bytes=10**9)
+    store.get("a")
+    assert store.peek("a") is None
+
+    small = SessionStore(ttl_s=60, max_bytes=1)
+    for sid in ("a", "b", "c"):
+        small.get(sid)
+    assert len(small) == 1 and small.peek("c") is not None and small.evicted == 2
+
+
+def test_turns_of_one_session_run_one_at_a_time():
+    store = SessionStore(ttl_s=60)
+    order = []
+
+    async def turn(tag):
+        async with store.turn("s1"):
+            order.append(("in", tag))
+            await asyncio.sleep(0.01)
+            order.append(("out", tag))
+
+    async def run():
+        await asyncio.gather(turn(1), turn(2))
+
+    asyncio.run(run())
+    assert order == [("in", 1), ("out", 1), ("in", 2), ("out", 2)]
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+from services.agent_service.core import turns
+from services.agent_service.core.orchestrator import plan_calls, simple_plan
+from services.agent_service.core.speculation import Speculator
+from services.agent_service.core.vehicle_state import VEHICLE_STATE
+from services.agent_service.tools import dispatch
+
+
+class Downstream:
+    """Fake tool handlers behind dispatch: records every call that reaches them."""
+
+    def __init__(self) -> None:
+        self.calls, self.cancelled = [], []
+        self.release = asyncio.Event()
+
+    def handler(self, tool_name: str):
+        async def handle(args, session_id, trace):
+            self.calls.append((tool_name, args))
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled.append((tool_name, args))
+                raise
+            if tool_name == "nav.poi":
+                return {"items": [{"name": args["query"], "distance_m": 100}]}
+            return {"event": "state_changed", "state": {}, "version": 1}
+        return handle
+
+    def tools(self):
+        return [name for name, _args in self.calls]
+
+
+@pytest.fixture
+def downstream(monkeypatch):
+    d = Downstream()
+    for name in dispatch.TOOLS:
+        monkeypatch.setitem(dispatch.TOOLS, name, d.handler(name))
+    monkeypatch.setattr(VEHICLE_STATE, "state", None)     # nothing cached: partials may warm it
+    monkeypatch.setattr(VEHICLE_STATE, "subscribed", False)
+    return d
+
+
+def partial(text: str) -> dict:
+    return {"meta": {"type": "audio.transcript.partial", "session_id": "s1"}, "payload": {"text": text}}
+
+
+def test_partials_never_reach_a_setter(downstream):
+    async def go():
+        frames = []
+
+        async def send(data: str) -> None:
+            frames.append(json.loads(data))
+
+        p = turns.TurnPipeline(send, speculate=True)
+        for text in ("把副驾窗开到", "把副驾窗开到30", "把副驾窗开到30%，温度调到24度", "关闭所有车窗"):
+            await p.handle(partial(text))
+        await asyncio.sleep(0.01)
+        await p.close()
+        return frames
+
+    frames = asyncio.run(go())
+    assert "vehicle.control" not in downstream.tools()
+    assert downstream.tools() == ["vehicle.get_state"]        # only a read, to warm the state cache
+    assert frames == []                                        # and no turn was answered
+
+
+def test_final_that_matches_takes_the_prefetch(downstream):
+    async def go():
+        spec = Speculator()
+        assert spec.speculate("s1", simple_plan("最近的星巴克"), None) == 1
+        await asyncio.sleep(0)
+        assert downstream.tools() == ["nav.poi"]
+        downstream.release.set()
+        calls = plan_calls(simple_plan("带我去最近的星巴克"))
+        results = await spec.run(calls, "s1", None)
+        return spec, calls, results
+
+    spec, calls, results = asyncio.run(go())
+    assert downstream.tools() == ["nav.poi"]                  # not issued a second time
+    assert results[0]["ok"] and results[0]["call_id"] == calls[0]["call_id"]
+    assert spec.stats() == {"entries": 0, "started": 1, "committed": 1, "discarded": 0}
+
+
+def test_divergent_final_discards_the_guess(downstream):
+    async def go():
+        spec = Speculator()
+        spec.speculate("s1", simple_plan("附近的充电站"), None)
+        spec.speculate("s2", simple_plan("附近的医院"), None)   # another session's guess is left alone
+        await asyncio.sleep(0)
+        calls = plan_calls(simple_plan("附近的星巴克"))
+        run = asyncio.create_task(spec.run(calls, "s1", None))
+        await asyncio.sleep(0)
+        downstream.release.set()
+        results = await run
+        await asyncio.sleep(0)
+        return spec, results
+
+    spec, results = asyncio.run(go())
+    queries = [args["query"] for _name, args in downstream.calls]
+    assert queries == ["charging station", "hospital", "Starbucks"]
+    assert [args["query"] for _name, args in downstream.cancelled] == ["charging station"]
+    assert results[0]["result"]["items"][0]["name"] == "Starbucks"
+    assert spec.stats()["committed"] == 0 and spec.stats()["discarded"] == 1 and spec.stats()["entries"] == 1
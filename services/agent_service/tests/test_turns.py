@@ -0,0 +1,102 @@
+import asyncio
+import json
+from services.agent_service.core import turns
+from services.agent_service.core.turns import CANCELLED_TEXT, TurnPipeline
+
+
+def utterance(text: str, call_id: str, session_id: str = "t1") -> dict:
+    return {"meta": {"type": "agent.user_utterance", "session_id": session_id},
+            "payload": {"text": text, "call_id": call_id}}
+
+
+class Tools:
+    """Stands in for the downstream HTTP calls: each one waits until released."""
+
+    def __init__(self) -> None:
+        self.started, self.cancelled = [], []
+        self.release = asyncio.Event()
+
+    async def __call__(self, calls, session_id, trace):
+        ids = [tc["call_id"] for tc in calls]
+        self.started.append(ids)
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(ids)
+            raise
+        return [{"tool_name": tc["tool_name"], "call_id": tc["call_id"], "ok": True,
+                 "result": {"event": "state_changed", "state": {}}} for tc in calls]
+
+
+def run(monkeypatch, scenario, max_inflight: int = 8):
+    async def go():
+        tools = Tools()
+        monkeypatch.setattr(turns, "run_tool_calls", tools)
+        frames = []
+
+        async def send(data: str) -> None:
+            m = json.loads(data)
+            frames.append((m["meta"]["type"], m["payload"]))
+
+        p = TurnPipeline(send, max_inflight=max_inflight, speculate=False)
+        await scenario(p, tools)
+        tools.release.set()
+        while p.stats()["inflight"]:
+            await asyncio.sleep(0.01)
+        await p.close()
+        return frames, tools, p
+
+    return asyncio.run(go())
+
+
+def test_newer_plan_on_the_same_target_cancels_the_older_turn(monkeypatch):
+    async def scenario(p, tools):
+        await p.handle(utterance("温度调到24度", "a"))
+        await asyncio.sleep(0.01)
+        await p.handle(utterance("温度调到26度", "b"))
+        await asyncio.sleep(0.01)
+
+    frames, tools, p = run(monkeypatch, scenario)
+    assert tools.started == [["a.0"], ["b.0"]] and tools.cancelled == [["a.0"]]   # the pending call itself is cancelled
+    assert ("agent.turn.cancelled", {"call_id": "a", "reason": "superseded", "superseded_by": "b"}) in frames
+    assert [f[1].get("call_id") for f in frames if f[0] == "agent.out"] == ["b"]
+    assert p.stats()["cancelled"] == 1
+
+
+def test_cancel_word_stops_everything_in_flight(monkeypatch):
+    async def scenario(p, tools):
+        await p.handle(utterance("温度调到24度", "a"))
+        await p.handle(utterance("打开副驾窗", "b"))
+        await asyncio.sleep(0.01)
+        await p.handle(utterance("取消", "c"))
+        await asyncio.sleep(0.01)
+
+    frames, tools, _ = run(monkeypatch, scenario)
+    assert sorted(map(tuple, tools.cancelled)) == [("a.0",), ("b.0",)]
+    cancelled = {f[1]["call_id"]: f[1] for f in frames if f[0] == "agent.turn.cancelled"}
+    assert cancelled["a"]["reason"] == cancelled["b"]["reason"] == "barge_in"
+    assert frames[-1] == ("agent.out", {"text": CANCELLED_TEXT, "output_modality": "voice", "should_tts": True,
+                                        "call_id": "c"})
+
+
+def test_independent_turns_both_finish_in_utterance_order(monkeypatch):
+    async def scenario(p, tools):
+        await p.handle(utterance("温度调到24度", "a"))
+        await p.handle(utterance("打开副驾窗", "b"))
+        await asyncio.sleep(0.01)
+        assert tools.started == [["a.0"], ["b.0"]]   # pipelined: b's tools run while a's are pending
+
+    frames, tools, _ = run(monkeypatch, scenario)
+    assert tools.cancelled == []
+    order = [f[1]["call_id"].split(".")[0] for f in frames]
+    assert order == sorted(order) and [f[0] for f in frames if f[1]["call_id"] == "b"][-1] == "agent.out"
+
+
+def test_too_many_turns_are_refused(monkeypatch):
+    async def scenario(p, tools):
+        await p.handle(utterance("温度调到24度", "a", "s1"))
+        await p.handle(utterance("打开副驾窗", "b", "s2"))
+
+    frames, tools, _ = run(monkeypatch, scenario, max_inflight=1)
+    assert ("agent.turn.cancelled", {"call_id": "b", "reason": "too_many_turns"}) in frames
+    assert tools.started == [["a.0"]]
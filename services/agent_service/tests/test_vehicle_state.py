@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from libs.event_bus.bus import TopicBus
+from libs.event_bus.client import BrokerBus
+from services.agent_service.core import vehicle_state
+from services.agent_service.core.vehicle_state import VehicleStateCache
+
+STATE = {"cabin": {"temp_c": 22.0}}
+
+
+class OpenWriter:
+    def is_closing(self) -> bool:
+        return False
+
+
+@pytest.fixture
+def stale(monkeypatch):
+    def make(bus):
+        monkeypatch.setattr(vehicle_state, "get_bus", lambda: bus)
+        cache = VehicleStateCache(max_age_s=2.0)
+        asyncio.run(cache.start())
+        cache.offer(5, STATE)
+        cache.seen_at -= 10    # well past max_age_s
+        return cache
+    return make
+
+
+def test_plain_topic_bus_is_not_a_feed(stale):
+    # a standalone agent's in-process bus never sees vehicle.delta
+    cache = stale(TopicBus())
+    assert not cache.live
+    assert cache.current() == (None, None)
+    cache.seen_at += 10
+    assert cache.current() == (5, STATE)
+
+
+def test_monolith_feed_is_live(stale):
+    cache = stale(TopicBus())
+    cache.local_feed = True
+    assert cache.live and cache.current() == (5, STATE)
+    asyncio.run(cache.close())       # dropped by the bus for falling behind
+    assert cache.current() == (None, None)
+
+
+def test_broker_bus_is_live_only_while_connected(stale, tmp_path):
+    bus = BrokerBus(str(tmp_path / "none.sock"))
+    cache = stale(bus)
+    assert not bus.connected and cache.current() == (None, None)
+    bus._writer = OpenWriter()      # connected == an open writer to the broker
+    assert cache.live and cache.current() == (5, STATE)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+from libs.log.tracing import now_ms, mk_trace, new_id
+from ..core.vehicle_state import VEHICLE_STATE
+from .http_client import ServiceClient, ToolCallError, register_client
+
+VEHICLE_URL = os.getenv("VEHICLE_URL", "http://127.0.0.1:8003")
+NAV_URL = os.getenv("NAV_URL", "http://127.0.0.1:8005")
+
+VEHICLE = register_client(ServiceClient("vehicle", VEHICLE_URL, max_concurrency=16, timeout_s=3.0))
+NAV = register_client(ServiceClient("nav", NAV_URL, max_concurrency=32, timeout_s=5.0))
+
+
+def envelope(typ: str, session_id: str, trace: Optional[dict], payload: dict) -> dict:
+    return {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "agent",
+            "type": typ,
+            "session_id": session_id,
+            "trace": mk_trace(trace),
+        },
+        "payload": payload
+    }
+
+
+async def _vehicle_control(args: dict, session_id: str, trace: Optional[dict]) -> dict:
+    data = await VEHICLE.post("/command", envelope("vehicle.command", session_id, trace, args))
+    payload = data.get("payload") or {}
+    VEHICLE_STATE.offer(payload.get("version"), payload.get("state"))
+    return payload
+
+
+async def _vehicle_get_state(args: dict, session_id: str, trace: Optional[dict]) -> dict:
+    version, state = VEHICLE_STATE.current()
+    if state is not None:
+        return {"event": "state_changed", "state": state, "version": version}
+    return await _vehicle_control({"command": "get_state", "args": {}}, session_id, trace)
+
+
+async def _nav_poi(args: dict, session_id: str, trace: Optional[dict]) -> dict:
+    data = await NAV.post("/poi", envelope("nav.poi.request", session_id, trace, args))
+    return data.get("payload") or {}
+
+
+async def _nav_route(args: dict, session_id: str, trace: Optional[dict]) -> dict:
+    data = await NAV.post("/route", envelope("nav.route.request", session_id, trace, args))
+    return data.get("payload") or {}
+
+
+ToolHandler = Callable[[dict, str, Optional[dict]], Awaitable[dict]]
+
+TOOLS: Dict[str, ToolHandler] = {
+    "vehicle.control": _vehicle_control,
+    "vehicle.get_state": _vehicle_get_state,
+    "nav.poi": _nav_poi,
+    "nav.route": _nav_route,
+}
+
+
+async def run_tool_call(tool_call: dict, session_id: str, trace: Optional[dict]) -> dict:
+    """Execute one tool call; returns an agent_tool_result.schema.json dict (never raises)."""
+    name = tool_call["tool_name"]
+    out = {"call_id": tool_call["call_id"], "tool_name": name, "ok": False}
+    handler = TOOLS.get(name)
+    if handler is None:
+        out["error"] = {"code": "unsupported_tool", "message": f"unsupported tool: {name}", "retryable": False}
+        return out
+    try:
+        result = await handler(tool_call.get("arguments") or {}, session_id, trace)
+    except ToolCallError as e:
+        out["error"] = e.to_error()
+        return out
+    out["result"] = result
+    if result.get("error") or result.get("event") == "command_rejected":
+        out["error"] = result.get("error") or {"code": "command_rejected", "message": "command rejected"}
+    else:
+        out["ok"] = True
+    return out
+
+
+async def _vehicle_batch(tool_calls: List[dict], session_id: str, trace: Optional[dict]) -> List[dict]:
+    # several vehicle.control calls of one plan -> one /commands round trip
+    body = {"commands": [tc.get("arguments") or {} for tc in tool_calls], "mode": "best_effort"}
+    try:
+        data = await VEHICLE.post("/commands", envelope("vehicle.command_batch", session_id, trace, body))
+    except ToolCallError as e:
+        return [{"call_id": tc["call_id"], "tool_name": tc["tool_name"], "ok": False, "error": e.to_error()}
+                for tc in tool_calls]
+    payload = data.get("payload") or {}
+    VEHICLE_STATE.offer(payload.get("version"), payload.get("state"))
+    by_index = {r.get("index", i): r for i, r in enumerate(payload.get("results") or []) if isinstance(r, dict)}
+    out = []
+    for i, tc in enumerate(tool_calls):
+        r = by_index.get(i)
+        if r is None or "ok" not in r:
+            # a short reply must not leave a call without a result
+            out.append({"call_id": tc["call_id"], "tool_name": tc["tool_name"], "ok": False,
+                        "error": {"code": "missing_result", "message": f"no result for command {i} in the batch reply",
+                                  "retryable": False}})
+            continue
+        res = {
+            "call_id": tc["call_id"],
+            "tool_name": tc["tool_name"],
+            "ok": r["ok"],
+            "result": {"event": "state_changed" if r["ok"] else "command_rejected", "state": payload.get("state") or {}},
+        }
+        if not r["ok"]:
+            res["error"] = r.get("error") or {"code": "command_rejected", "message": "command rejected"}
+        out.append(res)
+    return out
+
+
+async def run_tool_calls(tool_calls: List[dict], session_id: str, trace: Optional[dict]) -> List[dict]:
+    # independent nav.* / vehicle.* calls of one plan run concurrently; order of results is kept
+    if len(tool_calls) == 1:
+        return [await run_tool_call(tool_calls[0], session_id, trace)]
+    batched = [i for i, tc in enumerate(tool_calls) if tc["tool_name"] == "vehicle.control"]
+    if len(batched) < 2:
+        batched = []
+    rest = [i for i in range(len(tool_calls)) if i not in batched]
+
+    jobs = [run_tool_call(tool_calls[i], session_id, trace) for i in rest]
+    if batched:
+        jobs.append(_vehicle_batch([tool_calls[i] for i in batched], session_id, trace))
+    done = await asyncio.gather(*jobs)
+
+    results: List[dict] = [{}] * len(tool_calls)
+    for i, r in zip(rest, done):
+        results[i] = r
+    if batched:
+        for i, r in zip(batched, done[-1]):
+            results[i] = r
+    return results
+
+
+def describe(result: dict) -> str:
+    name = result["tool_name"]
+    r = result.get("result") or {}
+    err = result.get("error")
+    if name == "vehicle.get_state" and result["ok"]:
+        return describe_state(r.get("state") or {})
+    if name.startswith("vehicle."):
+        windows = (r.get("state") or {}).get("windows")
+        if "result" not in result:
+            return f"[debug] 车控请求异常: {err['code']}: {err['message']}"
+        if not result["ok"]:
+            return f"[debug] 车控失败: event={r.get('event')}, error={err}, windows={windows}"
+        return f"[debug] 车控成功: event={r.get('event')}, windows={windows}"
+    if name == "nav.poi":
+        if not result["ok"]:
+            return f"[debug] 导航请求异常: {err['code']}: {err['message']}"
+        items = r.get("items") or []
+        if not items:
+            return "附近没有找到相关地点。"
+        names = "、".join(f"{it['name']}({int(it.get('distance_m', 0))}米)" for it in items)
+        return f"为你找到{len(items)}个地点：{names}"
+    if name == "nav.route":
+        if not result["ok"]:
+            return f"[debug] 导航请求异常: {err['code']}: {err['message']}"
+        return f"{r.get('summary', '')}，全程{r.get('distance_m', 0) / 1000:.1f}公里，约{round(r.get('duration_s', 0) / 60)}分钟"
+    return "[debug] unsupported tool"
+
+
+WINDOW_NAMES = {"FL": "主驾", "FR": "副驾", "RL": "左后", "RR": "右后"}
+
+
+def describe_state(state: dict) -> str:
+    windows = state.get("windows") or {}
+    ac = state.get("ac") or {}
+    opened = [f"{WINDOW_NAMES[p]}{v}%" for p, v in windows.items() if v]
+    parts = [f"车窗{'开着：' + '、'.join(opened) if opened else '都关着'}"]
+    if ac.get("ac_on"):
+        parts.append(f"空调{ac.get('temp_c')}度，风量{ac.get('fan_level')}档")
+    else:
+        parts.append("空调关着")
+    parts.append(f"车速{round(state.get('speed_kph', 0))}公里每小时")
+    return "，".join(parts)
@@ -0,0 +1,236 @@
+import asyncio
+import inspect
+import json
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import httpx
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from libs.log.spans import hop_span, span
+from libs.replay.recorder import HOP_HEADER
+
+# Per-target pool / concurrency / timeout settings
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_TIMEOUT_S = 3.0
+BREAKER_FAILURES = 5
+BREAKER_RESET_S = 10.0
+
+
+class ToolCallError(Exception):
+    def __init__(self, code: str, message: str, retryable: bool = False, detail: Optional[dict] = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.retryable = retryable
+        self.detail = detail or {}
+
+    def to_error(self) -> dict:
+        # shape of schemas/common/error.schema.json
+        return {"code": self.code, "message": self.message, "detail": self.detail, "retryable": self.retryable}
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures; one trial call (half-open) after reset_s."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S) -> None:
+        self.max_failures = failures
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        st = self.state
+        if st == "closed":
+            return True
+        if st == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.max_failures or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """The call ended without a verdict (cancelled): free the half-open trial slot."""
+        self._trial = False
+
+
+def _api_routes(routes) -> Iterator[APIRoute]:
+    for r in routes:
+        if isinstance(r, APIRoute):
+            yield r
+        elif hasattr(r, "original_router"):
+            # newer FastAPI keeps include_router() children unflattened (the services use no prefixes)
+            yield from _api_routes(r.original_router.routes)
+
+
+class LocalDispatcher:
+    """
+    Calls another service's POST endpoints in-process (monolith mode): no
+    socket and no JSON round trip, the envelope dict itself is handed over.
+    Replies are shared with the callee, so treat them as read-only. Errors
+    surface as the same ToolCallErrors the HTTP path raises.
+    """
+
+    def __init__(self, name: str, app: FastAPI) -> None:
+        self.name = name
+        self.routes: Dict[str, Tuple[Callable, List[Tuple[str, Any]], bool]] = {}
+        for r in _api_routes(app.routes):
+            if "POST" in r.methods:
+                self.routes[r.path] = (r.endpoint, self._plan(r.endpoint), inspect.iscoroutinefunction(r.endpoint))
+
+    @staticmethod
+    def _plan(endpoint: Callable) -> List[Tuple[str, Any]]:
+        # how to fill each parameter: the body, a scratch Response, or its declared default
+        plan = []
+        for p in inspect.signature(endpoint).parameters.values():
+            if p.annotation is dict:
+                plan.append((p.name, "body"))
+            elif p.annotation is Response:
+                plan.append((p.name, "response"))
+            else:
+                default = p.default
+                plan.append((p.name, ("default", getattr(default, "default", default))))
+        return plan
+
+    async def post(self, path: str, body: dict) -> dict:
+        route = self.routes.get(path)
+        if route is None:
+            raise ToolCallError("http_status", f"{self.name}{path} HTTP 404", detail={"status": 404, "body": ""})
+        endpoint, plan, is_async = route
+        kwargs = {}
+        for name, how in plan:
+            kwargs[name] = body if how == "body" else Response() if how == "response" else how[1]
+        # the callee's span, as SpanMiddleware would open it; its bind() hangs it under our hop
+        with span(f"POST {path}", service=self.name) as s:
+            try:
+                out = await endpoint(**kwargs) if is_async else await run_in_threadpool(endpoint, **kwargs)
+            except HTTPException as e:
+                s.set("http.status", e.status_code)
+                raise ToolCallError(
+                    "http_status",
+                    f"{self.name}{path} HTTP {e.status_code}",
+                    retryable=e.status_code >= 500,
+                    detail={"status": e.status_code, "body": json.dumps({"detail": e.detail}, ensure_ascii=False)[:200]},
+                )
+            s.set("http.status", 200)
+        if isinstance(out, Response):
+            return json.loads(out.body)
+        return out
+
+
+class ServiceClient:
+    """Keep-alive pooled async client for one downstream service."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.name = name
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.local: Optional[LocalDispatcher] = None
+
+    def _ensure(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_s,
+                headers={HOP_HEADER: "agent"},   # recorders keep these out of replay inputs
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def post(self, path: str, body: dict) -> dict:
+        if self.local is not None:
+            with hop_span(f"{self.name} local {path}", (body.get("meta") or {}).get("trace")):
+                return await self.local.post(path, body)
+        client = self._ensure()
+        if not self.breaker.allow():
+            raise ToolCallError("circuit_open", f"{self.name} circuit open", retryable=True)
+        try:
+            with hop_span(f"{self.name} POST {path}", (body.get("meta") or {}).get("trace")) as s:
+                async with self._sem:
+                    r = await client.post(path, json=body)
+                s.set("http.status", r.status_code)
+        except httpx.TimeoutException as e:
+            self.breaker.record_failure()
+            raise ToolCallError("timeout", f"{self.name}{path} timeout: {type(e).__name__}", retryable=True)
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise ToolCallError("unavailable", f"{self.name}{path} error: {type(e).__name__}: {e}", retryable=True)
+        except BaseException:
+            # cancelled turn (or anything else): no verdict, but the trial slot must not stay taken
+            self.breaker.abandon()
+            raise
+
+        if r.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if r.status_code != 200:
+            raise ToolCallError(
+                "http_status",
+                f"{self.name}{path} HTTP {r.status_code}",
+                retryable=r.status_code >= 500,
+                detail={"status": r.status_code, "body": r.text[:200]},
+            )
+        return r.json()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._sem = None
+
+
+_CLIENTS: Dict[str, ServiceClient] = {}
+
+
+def register_client(client: ServiceClient) -> ServiceClient:
+    _CLIENTS[client.name] = client
+    return client
+
+
+def get_client(name: str) -> ServiceClient:
+    return _CLIENTS[name]
+
+
+def attach_local(name: str, app: FastAPI) -> None:
+    """Route this client's calls straight into `app`, which lives in the same process."""
+    _CLIENTS[name].local = LocalDispatcher(name, app)
+
+
+async def close_clients() -> None:
+    for c in _CLIENTS.values():
+        await c.aclose()
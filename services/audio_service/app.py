@@ -1,7 +1,9 @@
 from fastapi import FastAPI
+from libs.log.debug import install
 from .routers.http import router as http_router
 from .routers.ws import router as ws_router
 
 app = FastAPI(title="audio_service")
+install(app, "audio")
 app.include_router(http_router)
-app.include_router(ws_router)
\ No newline at end of file
+app.include_router(ws_router)
@@ -0,0 +1,194 @@
+import base64
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from .vad import EnergyVAD
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+JITTER_DEPTH = 8          # chunks held back waiting for a missing seq
+MAX_UTTERANCE_S = 30      # ring capacity per session
+PARTIAL_MS = 400          # partial transcript cadence while speech is active
+
+
+class JitterBuffer:
+    """Reorders chunks by `seq`; gives up on a gap once `depth` later chunks are waiting."""
+
+    def __init__(self, depth: int = JITTER_DEPTH) -> None:
+        self.depth = depth
+        self.next_seq: Optional[int] = None
+        self._held: Dict[int, Tuple[Buffer, bool]] = {}
+        self.late = 0
+        self.lost = 0
+
+    def push(self, seq: Optional[int], chunk: Buffer, is_last: bool) -> List[Tuple[Buffer, bool]]:
+        if seq is None:
+            # unsequenced sender: arrival order is the order
+            seq = self.next_seq if self.next_seq is not None else 0
+        if self.next_seq is None:
+            # streams start at seq 0; a first chunk close to 0 may just be reordered
+            self.next_seq = 0 if seq <= self.depth else seq
+        if seq < self.next_seq:
+            self.late += 1
+            return []
+        self._held[seq] = (chunk, is_last)
+        out = self._drain()
+        if len(self._held) > self.depth or (is_last and self._held):
+            # give up on the gap(s) and release what we have in order
+            while self._held:
+                nxt = min(self._held)
+                self.lost += nxt - self.next_seq
+                self.next_seq = nxt
+                out += self._drain()
+        return out
+
+    def _drain(self) -> List[Tuple[Buffer, bool]]:
+        out = []
+        held = self._held
+        while self.next_seq in held:
+            out.append(held.pop(self.next_seq))
+            self.next_seq += 1
+        return out
+
+
+class PcmRing:
+    """Preallocated int16 ring; positions are absolute sample indexes."""
+
+    def __init__(self, capacity: int) -> None:
+        self.buf = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.write_pos = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            self.write_pos += n - self.capacity
+            n = self.capacity
+        i = self.write_pos % self.capacity
+        first = min(n, self.capacity - i)
+        self.buf[i:i + first] = samples[:first]
+        if first < n:
+            self.buf[:n - first] = samples[first:]
+        self.write_pos += n
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Samples [start, end); a view unless the range wraps."""
+        start = max(start, self.write_pos - self.capacity)
+        i, j = start % self.capacity, end % self.capacity
+        if end - start <= 0:
+            return self.buf[:0]
+        if i < j or j == 0:
+            return self.buf[i:j or self.capacity]
+        return np.concatenate((self.buf[i:], self.buf[:j]))
+
+
+class StubRecognizer:
+    """Deterministic ASR stand-in: reveals a canned utterance as speech accumulates."""
+
+    TEXT = "我想把副驾窗开到30%"
+    FULL_MS = 1500
+
+    def partial(self, speech_ms: int) -> str:
+        n = max(1, min(len(self.TEXT), len(self.TEXT) * speech_ms // self.FULL_MS))
+        return "（stub）" + self.TEXT[:n]
+
+    def final(self, _pcm: np.ndarray) -> str:
+        return "（stub）" + self.TEXT
+
+
+class IngestSession:
+    """
+    Per-session streaming stage: seq reordering -> ring buffer -> VAD ->
+    speech start/end, partial and final transcripts.
+
+    push_*() return a list of (event_type, payload) pairs to emit.
+    """
+
+    def __init__(self, fmt: str = "pcm_s16le", sample_rate_hz: int = 16000, channels: int = 1,
+                 recognizer: Optional[StubRecognizer] = None) -> None:
+        if fmt != "pcm_s16le":
+            raise ValueError(f"unsupported audio format: {fmt}")
+        if sample_rate_hz <= 0 or channels not in (1, 2):
+            raise ValueError(f"unsupported audio layout: {sample_rate_hz} Hz x {channels} channels")
+        self.sample_rate_hz = sample_rate_hz
+        self.channels = channels
+        self.jitter = JitterBuffer()
+        self.ring = PcmRing(sample_rate_hz * MAX_UTTERANCE_S)
+        self.vad = EnergyVAD(sample_rate_hz)
+        self.asr = recognizer or StubRecognizer()
+        self._vad_pos = 0                 # next sample the VAD has not seen
+        self._speech_start: Optional[int] = None
+        self._last_partial = 0
+        self._finals = 0
+
+    def _ms(self, samples: int) -> int:
+        return samples * 1000 // self.sample_rate_hz
+
+    def push_b64(self, payload: dict) -> List[Tuple[str, dict]]:
+        return self.push_pcm(payload.get("seq"), base64.b64decode(payload.get("chunk_b64") or ""), bool(payload.get("is_last")))
+
+    def push_pcm(self, seq: Optional[int], pcm: Buffer, is_last: bool) -> List[Tuple[str, dict]]:
+        events: List[Tuple[str, dict]] = []
+        for chunk, last in self.jitter.push(seq, pcm, is_last):
+            # whole samples only; np.frombuffer is a view, the ring write is the only copy
+            usable = len(chunk) - len(chunk) % (2 * self.channels)
+            samples = np.frombuffer(chunk, dtype="<i2", count=usable // 2)
+            if self.channels == 2:
+                samples = ((samples[0::2].astype(np.int32) + samples[1::2]) >> 1).astype(np.int16)
+            self.ring.write(samples)
+            events += self._run_vad()
+            if last:
+                events += self._finish()
+        return events
+
+    def _run_vad(self) -> List[Tuple[str, dict]]:
+        events: List[Tuple[str, dict]] = []
+        fl = self.vad.frame_len
+        n = (self.ring.write_pos - self._vad_pos) // fl
+        if n == 0:
+            return events
+        base = self._vad_pos
+        frames = self.ring.read(base, base + n * fl).reshape(n, fl)
+        self._vad_pos += n * fl
+        for idx, kind in self.vad.process(frames):
+            # idx may be negative: the run started in an earlier batch
+            pos = max(0, base + idx * fl)
+            if kind == "start":
+                self._speech_start = pos
+                self._last_partial = pos
+                events.append(("audio.vad.speech_start", {"offset_ms": self._ms(pos)}))
+            elif self._speech_start is not None:
+                events.append(("audio.vad.speech_end", {"offset_ms": self._ms(pos)}))
+                events.append(self._final(self._speech_start, pos))
+                self._speech_start = None
+        if self._speech_start is not None:
+            end = self._vad_pos
+            if self._ms(end - self._last_partial) >= PARTIAL_MS:
+                self._last_partial = end
+                events.append(("audio.transcript.partial", {
+                    "text": self.asr.partial(self._ms(end - self._speech_start)),
+                    "is_final": False,
+                    "language": "zh-CN",
+                }))
+        return events
+
+    def _final(self, start: int, end: int) -> Tuple[str, dict]:
+        self._finals += 1
+        text = self.asr.final(self.ring.read(start, end))
+        return ("audio.transcript.final", {
+            "text": text,
+            "is_final": True,
+            "language": "zh-CN",
+            "confidence": 0.5,
+            "segments": [{"start_ms": self._ms(start), "end_ms": self._ms(end), "text": text}],
+        })
+
+    def _finish(self) -> List[Tuple[str, dict]]:
+        end = self.ring.write_pos
+        if self._speech_start is not None:
+            start, self._speech_start = self._speech_start, None
+            return [("audio.vad.speech_end", {"offset_ms": self._ms(end)}), self._final(start, end)]
+        if self._finals == 0:
+            # nothing detected as speech in the whole stream: still answer is_last
+            return [self._final(0, end)]
+        return []
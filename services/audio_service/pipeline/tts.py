@@ -0,0 +1,259 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterator, Optional, Tuple
+import numpy as np
+
+CHUNK_MS = 100
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/tmp/cockpit_tts_cache")
+TTS_CACHE_MEM_BYTES = int(os.getenv("TTS_CACHE_MEM_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+
+class TTSEngine:
+    """Synthesizer interface: yields PCM s16le mono chunks as they are produced."""
+
+    def synthesize(self, text: str, voice: str, sample_rate_hz: int, speed: float = 1.0) -> Iterator[bytes]:
+        raise NotImplementedError
+
+
+class StubSynth(TTSEngine):
+    """
+    Deterministic stand-in: one short tone per character, pitch derived from
+    the code point. Same input -> same bytes, so it exercises caching for real.
+    `delay_s` per chunk mimics a slow model.
+    """
+
+    def __init__(self, char_ms: int = 120, delay_s: float = 0.0) -> None:
+        self.char_ms = char_ms
+        self.delay_s = delay_s
+
+    def synthesize(self, text: str, voice: str, sample_rate_hz: int, speed: float = 1.0) -> Iterator[bytes]:
+        n = int(sample_rate_hz * self.char_ms / 1000 / max(speed, 0.1))
+        t = np.arange(n, dtype=np.float32) / sample_rate_hz
+        env = np.hanning(n).astype(np.float32)
+        base = 120.0 + (sum(map(ord, voice)) % 80)
+        for ch in text:
+            if self.delay_s:
+                time.sleep(self.delay_s)
+            if ch.isspace():
+                yield bytes(n * 2)
+                continue
+            f = base + (ord(ch) % 48) * 12.0
+            yield (np.sin(2 * np.pi * f * t) * env * 9000).astype("<i2").tobytes()
+
+
+def cache_key(text: str, voice: str, sample_rate_hz: int, speed: float = 1.0) -> str:
+    return hashlib.sha256(f"{voice}\0{sample_rate_hz}\0{speed:g}\0{text}".encode("utf-8")).hexdigest()
+
+
+def wav_header(sample_rate_hz: int, data_bytes: Optional[int] = None) -> bytes:
+    # data_bytes=None -> streaming header with open-ended sizes
+    size = 0xFFFFFFFF if data_bytes is None else data_bytes
+    riff = 0xFFFFFFFF if data_bytes is None else 36 + data_bytes
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", riff, b"WAVE", b"fmt ", 16, 1, 1,
+                       sample_rate_hz, sample_rate_hz * 2, 2, 16, b"data", size)
+
+
+class ByteLRU:
+    """In-memory LRU bounded by total value bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._d: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        v = self._d.get(key)
+        if v is not None:
+            self._d.move_to_end(key)
+        return v
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        old = self._d.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._d[key] = value
+        self.bytes += len(value)
+        while self.bytes > self.max_bytes:
+            _k, v = self._d.popitem(last=False)
+            self.bytes -= len(v)
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+
+class DiskCache:
+    """Content-addressed <key>.pcm files, LRU by access order, bounded by total bytes."""
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+        entries = []
+        for fn in os.listdir(root):
+            if fn.endswith(".pcm"):
+                st = os.stat(os.path.join(root, fn))
+                entries.append((st.st_mtime, fn[:-4], st.st_size))
+        for _mtime, key, size in sorted(entries):
+            self._index[key] = size
+            self.bytes += size
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".pcm")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if key not in self._index:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self.bytes -= self._index.pop(key)
+            return None
+        if len(data) != self._index[key] or len(data) % 2:
+            # truncated or rewritten behind our back: not s16le we wrote, synthesize again
+            self._drop(key)
+            return None
+        self._index.move_to_end(key)
+        os.utime(self._path(key))
+        return data
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes or key in self._index:
+            return
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(value)
+        os.replace(tmp, self._path(key))
+        self._index[key] = len(value)
+        self.bytes += len(value)
+        self._evict()
+
+    def _drop(self, key: str) -> None:
+        self.bytes -= self._index.pop(key)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes and self._index:
+            self._drop(next(iter(self._index)))
+
+
+class TTSStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.ttfb_ms: Deque[float] = deque(maxlen=1024)
+
+    def snapshot(self) -> dict:
+        ttfb = sorted(self.ttfb_ms)
+
+        def pct(p: float) -> Optional[float]:
+            return round(ttfb[min(len(ttfb) - 1, int(len(ttfb) * p))], 3) if ttfb else None
+        hits = self.mem_hits + self.disk_hits
+        return {
+            "requests": self.requests,
+            "mem_hits": self.mem_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / self.requests, 4) if self.requests else 0.0,
+            "ttfb_ms_p50": pct(0.50),
+            "ttfb_ms_p95": pct(0.95),
+        }
+
+
+class CachedTTS:
+    """
+    TTS behind a memory LRU + disk cache keyed by (text, voice, sample_rate,
+    speed). open() yields PCM chunks; on a miss chunks are forwarded as the
+    engine produces them and the full result is cached only if the stream
+    ran to completion.
+    """
+
+    def __init__(self, engine: TTSEngine, mem_bytes: int = TTS_CACHE_MEM_BYTES,
+                 disk_dir: Optional[str] = TTS_CACHE_DIR, disk_bytes: int = TTS_CACHE_DISK_BYTES) -> None:
+        self.engine = engine
+        self.mem = ByteLRU(mem_bytes)
+        self.disk = DiskCache(disk_dir, disk_bytes) if disk_dir else None
+        self.stats = TTSStats()
+        self._lock = threading.Lock()  # streams run in the threadpool
+
+    def lookup(self, key: str) -> Tuple[str, Optional[bytes]]:
+        """("mem" | "disk" | "miss", pcm)."""
+        with self._lock:
+            self.stats.requests += 1
+            data = self.mem.get(key)
+            if data is not None:
+                self.stats.mem_hits += 1
+                return "mem", data
+            if self.disk is not None:
+                data = self.disk.get(key)
+                if data is not None:
+                    self.stats.disk_hits += 1
+                    self.mem.put(key, data)
+                    return "disk", data
+            self.stats.misses += 1
+            return "miss", None
+
+    def store(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self.mem.put(key, data)
+            if self.disk is not None:
+                self.disk.put(key, data)
+
+    def open(self, text: str, voice: str = "default", sample_rate_hz: int = 16000,
+             speed: float = 1.0, started: Optional[float] = None) -> Tuple[str, Iterator[bytes]]:
+        """Looks the request up now; returns (cache source, PCM chunk iterator)."""
+        started = started if started is not None else time.perf_counter()
+        key = cache_key(text, voice, sample_rate_hz, speed)
+        source, data = self.lookup(key)
+        if data is not None:
+            return source, self._replay(data, sample_rate_hz * CHUNK_MS // 1000 * 2, started)
+        return source, self._synth(key, self.engine.synthesize(text, voice, sample_rate_hz, speed), started)
+
+    def _replay(self, data: bytes, step: int, started: float) -> Iterator[bytes]:
+        mv = memoryview(data)
+        for i in range(0, len(data), step):
+            if i == 0:
+                self._ttfb(started)
+            yield mv[i:i + step]
+
+    def _synth(self, key: str, chunks: Iterator[bytes], started: float) -> Iterator[bytes]:
+        parts = []
+        for chunk in chunks:
+            if not parts:
+                self._ttfb(started)
+            parts.append(chunk)
+            yield chunk
+        self.store(key, b"".join(parts))
+
+    def synthesize(self, text: str, voice: str = "default", sample_rate_hz: int = 16000, speed: float = 1.0) -> bytes:
+        return b"".join(self.open(text, voice, sample_rate_hz, speed)[1])
+
+    def _ttfb(self, started: float) -> None:
+        with self._lock:
+            self.stats.ttfb_ms.append((time.perf_counter() - started) * 1000)
+
+
+_TTS: Optional[CachedTTS] = None
+
+
+def get_tts() -> CachedTTS:
+    global _TTS
+    if _TTS is None:
+        _TTS = CachedTTS(StubSynth())
+    return _TTS
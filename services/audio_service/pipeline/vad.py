@@ -0,0 +1,61 @@
+from typing import List, Tuple
+import numpy as np
+
+FRAME_MS = 20
+
+
+class EnergyVAD:
+    """
+    Energy + zero-crossing VAD. All complete frames of a chunk are scored in
+    one vectorized pass; only the start/end hysteresis walks frame by frame.
+    """
+
+    def __init__(
+        self,
+        sample_rate_hz: int,
+        frame_ms: int = FRAME_MS,
+        energy_db: float = -40.0,
+        max_zcr: float = 0.35,
+        start_ms: int = 60,
+        end_ms: int = 500,
+    ) -> None:
+        self.frame_len = sample_rate_hz * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.energy_db = energy_db
+        self.max_zcr = max_zcr
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_ms // frame_ms)
+        self.in_speech = False
+        self._run = 0  # consecutive frames disagreeing with the current state
+
+    def score(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """frames: (n, frame_len) int16 -> (speech_prob, is_speech) per frame."""
+        x = frames.astype(np.float32) * (1.0 / 32768.0)
+        energy = np.einsum("ij,ij->i", x, x) / x.shape[1]
+        db = 10.0 * np.log10(energy + 1e-10)
+        signs = np.signbit(x)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (x.shape[1] - 1)
+        prob = 1.0 / (1.0 + np.exp(-(db - self.energy_db) / 3.0))
+        # broadband noise has high ZCR and is not counted as speech
+        speech = (db > self.energy_db) & (zcr < self.max_zcr)
+        return prob, speech
+
+    def process(self, frames: np.ndarray) -> List[Tuple[int, str]]:
+        """Returns (frame_index, "start" | "end") transitions within `frames`."""
+        if len(frames) == 0:
+            return []
+        _prob, speech = self.score(frames)
+        out: List[Tuple[int, str]] = []
+        need = self.end_frames if self.in_speech else self.start_frames
+        for i, s in enumerate(speech.tolist()):
+            if s != self.in_speech:
+                self._run += 1
+                if self._run >= need:
+                    self.in_speech = s
+                    self._run = 0
+                    # report where the run began
+                    out.append((i - need + 1, "start" if s else "end"))
+                    need = self.end_frames if s else self.start_frames
+            else:
+                self._run = 0
+        return out
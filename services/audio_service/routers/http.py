@@ -1,29 +1,82 @@
-from fastapi import APIRouter
+import base64
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from libs.log.tracing import now_ms, mk_trace, new_id
+from libs.log.spans import bind
+from libs.schema_utils.validate import SchemaValidationError, validate_message
+from ..pipeline.tts import get_tts, wav_header
 
 router = APIRouter()
 
+def envelope(typ: str, session_id: str, trace: Optional[dict], payload: dict):
+    return {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "audio",
+            "type": typ,
+            "session_id": session_id,
+            "trace": mk_trace(trace),
+        },
+        "payload": payload
+    }
+
 @router.get("/health")
 def health():
     return {"ok": True}
 
+def _tts_request(req: dict) -> dict:
+    try:
+        validate_message(req, "schemas/audio/tts_request.schema.json")
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
+    bind((req.get("meta") or {}).get("trace"))
+    p = req["payload"]
+    return {
+        "text": p["text"],
+        "voice": p.get("voice") or "default",
+        # the schema lets 16000.0 through as an integer; the wav header and cache key need the int
+        "sample_rate_hz": int(p["sample_rate_hz"]),
+        "speed": float(p.get("speed", 1.0)),
+    }
+
 @router.post("/tts")
 def tts(req: dict):
-    # Envelope in -> Envelope out (stub)
+    started = time.perf_counter()
+    args = _tts_request(req)
+    fmt = req["payload"]["format"]
+    _source, chunks = get_tts().open(started=started, **args)
+    pcm = b"".join(chunks)
+    audio = wav_header(args["sample_rate_hz"], len(pcm)) + pcm if fmt == "wav" else pcm
     meta = req.get("meta", {})
-    out = {
-        "meta": {
-            "message_id": new_id("m_"),
-            "timestamp_ms": now_ms(),
-            "source": "audio",
-            "type": "audio.tts.audio",
-            "session_id": meta.get("session_id", "demo"),
-            "trace": mk_trace(meta.get("trace")),
-        },
-        "payload": {
-            "audio_b64": "",  # TODO: generate real audio
-            "format": "wav",
-            "sample_rate_hz": 16000
-        }
-    }
-    return out
\ No newline at end of file
+    return envelope("audio.tts.audio", meta.get("session_id", "demo"), meta.get("trace"), {
+        "audio_b64": base64.b64encode(audio).decode(),
+        "format": fmt,
+        "sample_rate_hz": args["sample_rate_hz"],
+    })
+
+@router.post("/tts/stream")
+def tts_stream(req: dict):
+    """
+    Same request as /tts; the response body is the audio itself, sent as
+    ~100 ms chunks while synthesis is still running. wav gets an open-ended
+    header up front.
+    """
+    started = time.perf_counter()
+    args = _tts_request(req)
+    fmt = req["payload"]["format"]
+    source, chunks = get_tts().open(started=started, **args)
+
+    def body():
+        if fmt == "wav":
+            yield wav_header(args["sample_rate_hz"])
+        yield from chunks
+
+    media = "audio/wav" if fmt == "wav" else f"audio/L16;rate={args['sample_rate_hz']};channels=1"
+    return StreamingResponse(body(), media_type=media, headers={"X-TTS-Cache": source})
+
+@router.get("/tts/stats")
+def tts_stats():
+    return get_tts().stats.snapshot()
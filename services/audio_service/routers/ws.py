@@ -1,37 +1,99 @@
+import binascii
 import json
+import time
+from typing import Dict
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from libs.event_bus.client import get_bus
+from libs.log.metrics import observe_ws
 from libs.log.tracing import now_ms, mk_trace, new_id
+from libs.schema_utils.binary_frame import FrameError, decode_frame
+from libs.schema_utils.validate import TYPE_SCHEMAS
+from ..pipeline.ingest import IngestSession
 
 router = APIRouter()
 
+def envelope(typ: str, session_id: str, trace, payload: dict) -> dict:
+    return {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "audio",
+            "type": typ,
+            "session_id": session_id,
+            "trace": mk_trace(trace),
+        },
+        "payload": payload
+    }
+
+async def _send_error(ws: WebSocket, session_id: str, trace, code: str, message: str) -> None:
+    await ws.send_text(json.dumps(envelope("audio.error", session_id, trace, {
+        "code": code, "message": message, "retryable": False
+    }), ensure_ascii=False))
+
 @router.websocket("/ws/audio")
 async def ws_audio(ws: WebSocket):
     await ws.accept()
+    bus = get_bus()
+    # one ingest stage per session_id multiplexed on this socket
+    sessions: Dict[str, IngestSession] = {}
     try:
         while True:
-            raw = await ws.receive_text()
-            msg = json.loads(raw)
-            meta = msg.get("meta", {})
-            payload = msg.get("payload", {})
-            # Stub: whenever is_last True -> output final transcript
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            t0 = time.perf_counter_ns()
+            blob = None
+            if message.get("bytes") is not None:
+                # binary mode: envelope header + raw PCM, no base64
+                try:
+                    msg, blob = decode_frame(message["bytes"])
+                except FrameError as e:
+                    await _send_error(ws, "demo", None, "bad_frame", str(e))
+                    continue
+            else:
+                try:
+                    msg = json.loads(message.get("text") or "")
+                except ValueError as e:
+                    await _send_error(ws, "demo", None, "bad_message", f"not JSON: {e}")
+                    continue
+            meta = msg.get("meta", {}) if isinstance(msg, dict) else None
+            payload = msg.get("payload", {}) if isinstance(msg, dict) else None
+            if not isinstance(meta, dict) or not isinstance(payload, dict):
+                await _send_error(ws, "demo", None, "bad_message", "expected an envelope object")
+                continue
+            session_id = str(meta.get("session_id", "demo"))
+
+            sess = sessions.get(session_id)
+            if sess is None:
+                try:
+                    sess = sessions[session_id] = IngestSession(
+                        payload.get("format", "pcm_s16le"),
+                        int(payload.get("sample_rate_hz", 16000)),
+                        int(payload.get("channels", 1)),
+                    )
+                except (ValueError, TypeError) as e:
+                    # unknown format, or a sample_rate_hz / channels that isn't usable (null included)
+                    await _send_error(ws, session_id, meta.get("trace"), "unsupported_format", str(e))
+                    continue
+
+            if blob is None:
+                try:
+                    events = sess.push_b64(payload)
+                except (binascii.Error, TypeError) as e:
+                    # a corrupt chunk costs that chunk, not the socket
+                    await _send_error(ws, session_id, meta.get("trace"), "bad_chunk", f"chunk_b64: {e}")
+                    # an empty chunk in its place keeps seq order moving and still honours is_last
+                    events = sess.push_pcm(payload.get("seq"), b"", bool(payload.get("is_last")))
+            else:
+                events = sess.push_pcm(payload.get("seq"), blob, bool(payload.get("is_last")))
+            for typ, out_payload in events:
+                data = json.dumps(envelope(typ, session_id, meta.get("trace"), out_payload), ensure_ascii=False)
+                await ws.send_text(data)
+                if typ.startswith("audio.transcript."):
+                    await bus.publish("audio.transcript", data)
             if payload.get("is_last") is True:
-                out = {
-                    "meta": {
-                        "message_id": new_id("m_"),
-                        "timestamp_ms": now_ms(),
-                        "source": "audio",
-                        "type": "audio.transcript.final",
-                        "session_id": meta.get("session_id", "demo"),
-                        "trace": mk_trace(meta.get("trace")),
-                    },
-                    "payload": {
-                        "text": "（stub）我想把副驾窗开到30%",
-                        "is_final": True,
-                        "language": "zh-CN",
-                        "confidence": 0.5,
-                        "segments": []
-                    }
-                }
-                await ws.send_text(json.dumps(out, ensure_ascii=False))
+                sessions.pop(session_id, None)
+            typ = meta.get("type")
+            observe_ws("audio", typ if typ in TYPE_SCHEMAS else "other", t0)
     except WebSocketDisconnect:
-        return
\ No newline at end of file
+        return
@@ -0,0 +1,106 @@
+import base64
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.audio_service.pipeline import tts
+from services.audio_service.pipeline.tts import ByteLRU, CachedTTS, DiskCache, StubSynth, cache_key
+from services.audio_service.routers.http import envelope, router
+
+
+def test_byte_lru_evicts_least_recently_used():
+    lru = ByteLRU(10)
+    lru.put("a", b"aaaa")
+    lru.put("b", b"bbbb")
+    assert lru.get("a") == b"aaaa"          # a is now the most recent
+    lru.put("c", b"cccc")
+    assert lru.get("b") is None and len(lru) == 2 and lru.bytes == 8
+    lru.put("big", b"x" * 11)               # larger than the whole cache: not stored
+    assert lru.get("big") is None and lru.get("a") == b"aaaa"
+
+
+def test_disk_cache_hit_miss_evict_and_reload(tmp_path):
+    disk = DiskCache(str(tmp_path), 10)
+    assert disk.get("a") is None
+    disk.put("a", b"aaaa")
+    disk.put("b", b"bbbb")
+    assert disk.get("a") == b"aaaa"
+    disk.put("c", b"cccc")
+    assert disk.get("b") is None and not (tmp_path / "b.pcm").exists()
+    assert sorted(os.listdir(tmp_path)) == ["a.pcm", "c.pcm"]
+    again = DiskCache(str(tmp_path), 10)    # a new process picks the files up
+    assert again.get("c") == b"cccc" and again.bytes == 8
+
+
+def test_disk_cache_drops_a_corrupt_file(tmp_path):
+    disk = DiskCache(str(tmp_path), 100)
+    disk.put("a", b"aaaa")
+    (tmp_path / "a.pcm").write_bytes(b"aaa")   # truncated behind the cache's back
+    assert disk.get("a") is None
+    assert not (tmp_path / "a.pcm").exists() and disk.bytes == 0
+    (tmp_path / "b.pcm").write_bytes(b"bbb")   # odd length left over from a crash
+    assert DiskCache(str(tmp_path), 100).get("b") is None
+    disk.put("a", b"aaaa")
+    (tmp_path / "a.pcm").unlink()
+    assert disk.get("a") is None and disk.bytes == 0
+
+
+def test_cached_tts_sources(tmp_path):
+    t = CachedTTS(StubSynth(char_ms=100), mem_bytes=1 << 20, disk_dir=str(tmp_path))
+    first = t.synthesize("你好")
+    assert t.synthesize("你好") == first
+    t.mem = ByteLRU(1 << 20)                  # memory gone (restart): the disk copy serves it
+    assert t.open("你好")[0] == "disk"
+    source, chunks = t.open("你好")
+    sizes = [len(c) for c in chunks]
+    assert source == "mem" and sum(sizes) == len(first)
+    assert sizes == [3200] * 2                 # replayed as 100 ms chunks
+    snap = t.stats.snapshot()
+    assert (snap["misses"], snap["mem_hits"], snap["disk_hits"]) == (1, 2, 1)
+    assert os.path.exists(tmp_path / f"{cache_key('你好', 'default', 16000)}.pcm")
+
+
+def test_abandoned_stream_is_not_cached(tmp_path):
+    t = CachedTTS(StubSynth(), disk_dir=str(tmp_path))
+    _src, chunks = t.open("三个字")
+    next(chunks)
+    chunks.close()                            # client went away mid-stream
+    assert t.open("三个字")[0] == "miss"
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts, "_TTS", CachedTTS(StubSynth(char_ms=250), disk_dir=str(tmp_path)))
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as c:
+        yield c
+
+
+def request(**payload) -> dict:
+    return envelope("audio.tts.request", "s1", None,
+                    {"text": "好的", "voice": "default", "format": "wav", "sample_rate_hz": 16000, **payload})
+
+
+def test_tts_float_sample_rate(client):
+    r = client.post("/tts", json=request(sample_rate_hz=16000.0))
+    assert r.status_code == 200
+    audio = base64.b64decode(r.json()["payload"]["audio_b64"])
+    assert audio[:4] == b"RIFF" and int.from_bytes(audio[24:28], "little") == 16000
+    assert r.json()["payload"]["sample_rate_hz"] == 16000
+    assert client.post("/tts", json=request(sample_rate_hz=16000.5)).status_code == 422
+    assert client.post("/tts", json=request(sample_rate_hz=8000)).status_code == 422
+
+
+def test_tts_stream_chunks(client):
+    with client.stream("POST", "/tts/stream", json=request(format="pcm_s16le")) as r:
+        assert r.headers["X-TTS-Cache"] == "miss"
+        assert r.headers["content-type"] == "audio/L16;rate=16000;channels=1"
+        miss = list(r.iter_bytes())
+    with client.stream("POST", "/tts/stream", json=request()) as r:
+        assert r.headers["X-TTS-Cache"] == "mem"
+        body = r.read()
+    pcm = b"".join(miss)
+    assert len(pcm) == 2 * 16000 * 250 // 1000 * 2      # two characters of 250 ms
+    assert body[:4] == b"RIFF" and body[4:8] == b"\xff\xff\xff\xff"   # open-ended streaming header
+    assert body[44:] == pcm
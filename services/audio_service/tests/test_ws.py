@@ -0,0 +1,53 @@
+import base64
+import json
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.audio_service.routers.ws import router
+
+app = FastAPI()
+app.include_router(router)
+
+
+def chunk(seq: int, pcm: bytes, is_last: bool = False, b64: str = None) -> str:
+    return json.dumps({
+        "meta": {"message_id": f"m{seq}", "timestamp_ms": 0, "source": "ui", "type": "audio.chunk",
+                 "session_id": "s1"},
+        "payload": {"seq": seq, "chunk_b64": b64 if b64 is not None else base64.b64encode(pcm).decode(),
+                    "is_last": is_last, "format": "pcm_s16le", "sample_rate_hz": 16000, "channels": 1},
+    })
+
+
+def test_malformed_chunk_is_an_error_frame_not_a_disconnect():
+    silence = np.zeros(320, "<i2").tobytes()
+    with TestClient(app) as client, client.websocket_connect("/ws/audio") as ws:
+        ws.send_text(chunk(0, silence))
+        ws.send_text(chunk(1, b"", b64="not*base64!"))
+        err = json.loads(ws.receive_text())
+        assert err["meta"]["type"] == "audio.error" and err["payload"]["code"] == "bad_chunk"
+        # the socket is still up and the stream carries on in order
+        ws.send_text(chunk(2, silence, is_last=True))
+        ws.send_text(chunk(0, b"", b64="x", is_last=True))    # a new utterance, its only chunk corrupt
+        types = []
+        while not types or types[-1] != "audio.error":
+            types.append(json.loads(ws.receive_text())["meta"]["type"])
+        assert types[-1] == "audio.error"
+        # is_last still closes the utterance even though its chunk was dropped
+        assert json.loads(ws.receive_text())["meta"]["type"] == "audio.transcript.final"
+
+
+def test_bad_messages_and_layouts_are_error_frames():
+    silence = np.zeros(320, "<i2").tobytes()
+    with TestClient(app) as client, client.websocket_connect("/ws/audio") as ws:
+        for text in ("{not json", "[1, 2]", '{"meta": 3, "payload": {}}'):
+            ws.send_text(text)
+            err = json.loads(ws.receive_text())
+            assert err["meta"]["type"] == "audio.error" and err["payload"]["code"] == "bad_message"
+        for rate in (None, "fast", 0):
+            msg = json.loads(chunk(0, silence))
+            msg["payload"]["sample_rate_hz"] = rate
+            ws.send_text(json.dumps(msg))
+            err = json.loads(ws.receive_text())
+            assert err["payload"]["code"] == "unsupported_format", rate
+        ws.send_text(chunk(0, silence, is_last=True))          # the socket survived all of it
+        assert json.loads(ws.receive_text())["meta"]["type"].startswith("audio.")
@@ -1,7 +1,18 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routers.http import router as http_router
+from libs.log.debug import install
+from libs.log.metrics import register_collector
+from .routers.http import PIPELINE, router as http_router
 from .routers.ws import router as ws_router
 
-app = FastAPI(title="dms_service")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await PIPELINE.start()
+    yield
+    await PIPELINE.close()
+
+app = FastAPI(title="dms_service", lifespan=lifespan)
+install(app, "dms")
+register_collector(PIPELINE.metrics)
 app.include_router(http_router)
-app.include_router(ws_router)
\ No newline at end of file
+app.include_router(ws_router)
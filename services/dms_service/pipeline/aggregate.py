@@ -0,0 +1,104 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+EAR_CLOSED = 0.20
+MAR_YAWN = 0.60
+GAZE_OFF = 0.35
+BLINK_MAX_MS = 400
+
+# condition -> (event_type, min duration before it is an event, base severity)
+CONDITIONS = {
+    "eyes_closed": ("DROWSY_EYES_CLOSED", 800, 3),
+    "yawn": ("YAWN", 1500, 2),
+    "gaze_off": ("DISTRACTION_GAZE_OFF_ROAD", 1000, 3),
+    "no_face": ("NO_FACE", 2000, 2),
+}
+
+
+def _conditions(obs: dict) -> Dict[str, bool]:
+    if not obs.get("has_face"):
+        return {"no_face": True, "eyes_closed": False, "yawn": False, "gaze_off": False}
+    return {
+        "no_face": False,
+        "eyes_closed": obs["ear"] < EAR_CLOSED,
+        "yawn": obs["mar"] > MAR_YAWN,
+        "gaze_off": abs(obs["gaze_x"]) > GAZE_OFF,
+    }
+
+
+class TemporalAggregator:
+    """
+    Per-session debouncer: per-frame observations -> dms.event payloads.
+
+    A condition becomes an event once it has held for its minimum duration
+    (metrics.phase "start"), and again when it clears (phase "end") with the
+    full duration_ms. Timestamps are the camera's, so dropped frames only
+    coarsen the edges instead of shortening durations.
+    """
+
+    def __init__(self) -> None:
+        self._since: Dict[str, Optional[int]] = {k: None for k in CONDITIONS}
+        self._fired: Dict[str, bool] = {k: False for k in CONDITIONS}
+        self._blinks: Deque[int] = deque()
+        self._yawns: Deque[int] = deque()
+        self._gaze_off: Deque[Tuple[int, int]] = deque()   # (ts, ms off-road since previous frame)
+        self._last_ts: Optional[int] = None
+        self.last: Optional[dict] = None
+        self.touched = 0.0   # monotonic time of the last frame; DMSPipeline expires idle sessions on it
+
+    def push(self, ts_ms: int, obs: dict) -> List[dict]:
+        if self._last_ts is not None and ts_ms < self._last_ts:
+            return []   # stale frame; order is per camera timestamp
+        step = ts_ms - self._last_ts if self._last_ts is not None else 0
+        self._last_ts = ts_ms
+        self.last = obs
+        events = []
+        for name, on in _conditions(obs).items():
+            since = self._since[name]
+            if on and since is None:
+                self._since[name] = ts_ms
+            elif on:
+                dur = ts_ms - since
+                if not self._fired[name] and dur >= CONDITIONS[name][1]:
+                    self._fired[name] = True
+                    events.append(self._event(name, dur, obs, "start"))
+            elif since is not None:
+                dur = ts_ms - since
+                if self._fired[name]:
+                    events.append(self._event(name, dur, obs, "end"))
+                elif name == "eyes_closed" and dur <= BLINK_MAX_MS:
+                    self._blinks.append(ts_ms)
+                if name == "yawn" and self._fired[name]:
+                    self._yawns.append(ts_ms)
+                self._since[name] = None
+                self._fired[name] = False
+        if self._since["gaze_off"] is not None and step:
+            self._gaze_off.append((ts_ms, step))
+        self._expire(ts_ms)
+        return events
+
+    def _event(self, name: str, dur: int, obs: dict, phase: str) -> dict:
+        event_type, min_ms, base = CONDITIONS[name]
+        return {
+            "event_type": event_type,
+            "severity": min(5, base + dur // (min_ms * 3)),
+            "duration_ms": int(dur),
+            "metrics": {"phase": phase, "ear": obs.get("ear"), "mar": obs.get("mar"), "gaze_x": obs.get("gaze_x")},
+        }
+
+    def _expire(self, now: int) -> None:
+        while self._blinks and now - self._blinks[0] > 60_000:
+            self._blinks.popleft()
+        while self._yawns and now - self._yawns[0] > 300_000:
+            self._yawns.popleft()
+        while self._gaze_off and now - self._gaze_off[0][0] > 10_000:
+            self._gaze_off.popleft()
+
+    def state(self) -> dict:
+        """dms.state payload."""
+        return {
+            "has_face": bool(self.last and self.last.get("has_face")),
+            "blink_rate_per_min": float(len(self._blinks)),
+            "yawn_count_5min": len(self._yawns),
+            "gaze_off_road_ms_10s": int(sum(ms for _ts, ms in self._gaze_off)),
+        }
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+from libs.event_bus.client import get_bus
+from libs.log.tracing import now_ms, mk_trace, new_id
+
+ALL_TOPIC = "dms.event"
+REPLAY = int(os.getenv("DMS_REPLAY", "256"))   # frames kept per session for resume
+SESSION_TTL_S = float(os.getenv("DMS_SESSION_TTL_S", "600"))   # idle cameras are forgotten after this
+MAX_SESSIONS = int(os.getenv("DMS_MAX_SESSIONS", "4096"))
+
+
+def session_topic(session_id: str) -> str:
+    return f"{ALL_TOPIC}.{session_id}"
+
+
+class _SessionLog:
+    __slots__ = ("session_id", "base", "seq", "frames", "touched")
+
+    def __init__(self, session_id: str, size: int, base: int) -> None:
+        self.session_id = session_id
+        self.base = base   # seq before this log's first frame
+        self.seq = base
+        self.frames: Deque[Tuple[int, str]] = deque(maxlen=size)
+        self.touched = 0.0
+
+
+class DMSBroadcaster:
+    """
+    Builds each dms.event envelope once, stamps a per-session `seq`, keeps
+    the serialized frame in a small replay ring and publishes the same
+    string to "dms.event" and "dms.event.<session_id>". Viewers cost a
+    queue slot each, not a serialization.
+
+    Logs are kept in LRU order; one idle for ttl_s, or the least recently
+    used beyond max_sessions, is dropped. A camera that comes back numbers
+    on from the highest seq issued so far, never reusing one a viewer may
+    already hold, and viewers resuming from its old log get dms.event.gap.
+    """
+
+    def __init__(self, replay: int = REPLAY, ttl_s: float = SESSION_TTL_S, max_sessions: int = MAX_SESSIONS) -> None:
+        self.replay_size = replay
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._logs: "OrderedDict[str, _SessionLog]" = OrderedDict()
+        self._high = 0   # highest seq issued by any log
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._logs)
+
+    async def publish(self, session_id: str, trace: Optional[dict], events: List[dict]) -> None:
+        bus = get_bus()
+        now = time.monotonic()
+        logs = self._logs
+        log = logs.get(session_id)
+        if log is None:
+            log = logs[session_id] = _SessionLog(session_id, self.replay_size, self._high)
+        else:
+            logs.move_to_end(session_id)
+        log.touched = now
+        self._expire(now)
+        for payload in events:
+            log.seq += 1
+            data = json.dumps({
+                "meta": {
+                    "message_id": new_id("m_"),
+                    "timestamp_ms": now_ms(),
+                    "source": "dms",
+                    "type": "dms.event",
+                    "session_id": session_id,
+                    "trace": mk_trace(trace),
+                },
+                "payload": {**payload, "seq": log.seq},
+            }, ensure_ascii=False)
+            log.frames.append((log.seq, data))
+            self._high = max(self._high, log.seq)
+            await bus.publish(ALL_TOPIC, data)
+            await bus.publish(session_topic(session_id), data)
+
+    def last_seq(self, session_id: str) -> int:
+        log = self._logs.get(session_id)
+        return log.seq if log else 0
+
+    def since(self, session_id: str, seq: int) -> Tuple[List[str], bool]:
+        """(frames with seq > `seq`, complete). complete is False when some were already evicted."""
+        log = self._logs.get(session_id)
+        if log is None:
+            return [], seq == 0   # seq > 0: the whole log was dropped (or never existed here)
+        if seq > log.seq:
+            return [], False      # a seq this log never issued: it came from a dropped one
+        if seq == log.seq:
+            return [], True
+        frames = [data for s, data in log.frames if s > seq]
+        if 0 < seq < log.base:
+            return frames, False  # resuming from a dropped log: its tail is unknown
+        oldest = log.frames[0][0] if log.frames else log.seq + 1
+        return frames, oldest <= max(seq, log.base) + 1
+
+    def _expire(self, now: float) -> None:
+        logs = self._logs
+        while len(logs) > self.max_sessions:
+            logs.popitem(last=False)
+            self.expired += 1
+        # at most a few pops per call; the front is the longest idle
+        for _ in range(8):
+            if not logs:
+                return
+            log = next(iter(logs.values()))
+            if now - log.touched <= self.ttl_s:
+                return
+            del logs[log.session_id]
+            self.expired += 1
+
+
+BROADCAST = DMSBroadcaster()
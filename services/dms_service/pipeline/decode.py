@@ -0,0 +1,118 @@
+import struct
+import zlib
+from typing import Union
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # optional: PNG still decodes without it
+    Image = None
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+PNG_SIG = b"\x89PNG\r\n\x1a\n"
+_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}   # PNG colour type -> samples per pixel
+
+
+class DecodeError(ValueError):
+    pass
+
+
+def decode_gray(data: Buffer, fmt: str) -> np.ndarray:
+    """Camera frame -> 2-D uint8 luminance."""
+    if Image is not None:
+        import io
+        try:
+            with Image.open(io.BytesIO(data)) as im:
+                return np.asarray(im.convert("L"))
+        except OSError as e:
+            raise DecodeError(str(e)) from None
+    if fmt == "png" or bytes(data[:8]) == PNG_SIG:
+        return _decode_png(bytes(data))
+    raise DecodeError(f"{fmt} decode needs Pillow")
+
+
+def _decode_png(data: bytes) -> np.ndarray:
+    """8-bit, non-interlaced PNG via zlib; enough for camera frames without Pillow."""
+    if data[:8] != PNG_SIG:
+        raise DecodeError("not a png")
+    pos, idat, hdr = 8, [], None
+    while pos + 8 <= len(data):
+        n, kind = struct.unpack_from("!I4s", data, pos)
+        body = data[pos + 8:pos + 8 + n]
+        pos += 12 + n
+        if kind == b"IHDR":
+            hdr = struct.unpack("!IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+    if hdr is None:
+        raise DecodeError("png without IHDR")
+    w, h, depth, ctype, _comp, _filt, interlace = hdr
+    if depth != 8 or interlace or ctype not in _CHANNELS:
+        raise DecodeError(f"unsupported png: depth={depth} colour={ctype} interlace={interlace}")
+    bpp = _CHANNELS[ctype]
+    stride = w * bpp
+    try:
+        raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8)
+    except zlib.error as e:
+        raise DecodeError(str(e)) from None
+    if len(raw) < h * (stride + 1):
+        raise DecodeError("truncated png data")
+    rows = raw[:h * (stride + 1)].reshape(h, stride + 1)
+    out = np.empty((h, stride), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.uint8)
+    for y in range(h):
+        f, line = rows[y, 0], rows[y, 1:]
+        if f == 0:
+            cur = line
+        elif f == 2:
+            cur = line + prev
+        elif f == 1:
+            cur = np.cumsum(line.reshape(-1, bpp), axis=0, dtype=np.uint32).astype(np.uint8).reshape(-1)
+        else:
+            cur = _unfilter_slow(int(f), line, prev, bpp)
+        out[y] = cur
+        prev = out[y]
+    px = out.reshape(h, w, bpp)
+    if bpp <= 2:
+        return np.ascontiguousarray(px[:, :, 0])
+    return (px[:, :, 0] * 0.299 + px[:, :, 1] * 0.587 + px[:, :, 2] * 0.114).astype(np.uint8)
+
+
+def _unfilter_slow(f: int, line: np.ndarray, prev: np.ndarray, bpp: int) -> np.ndarray:
+    # Average / Paeth depend on the pixel to the left: sequential by nature
+    cur = np.zeros(len(line), dtype=np.int32)
+    up = prev.astype(np.int32)
+    src = line.astype(np.int32)
+    for i in range(len(line)):
+        a = cur[i - bpp] if i >= bpp else 0
+        b = up[i]
+        if f == 3:
+            cur[i] = (src[i] + ((a + b) >> 1)) & 0xFF
+        elif f == 4:
+            c = up[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+            cur[i] = (src[i] + pred) & 0xFF
+        else:
+            raise DecodeError(f"bad png filter {f}")
+    return cur.astype(np.uint8)
+
+
+def encode_png(gray: np.ndarray) -> bytes:
+    """Minimal grayscale PNG writer (Up filter), for test fixtures and benchmarks."""
+    h, w = gray.shape
+    g = np.ascontiguousarray(gray, dtype=np.uint8)
+    up = np.empty_like(g)
+    up[0] = g[0]
+    up[1:] = g[1:] - g[:-1]
+    rows = np.hstack([np.full((h, 1), 2, dtype=np.uint8), up])
+    rows[0, 0] = 0
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack("!I", len(body)) + kind + body + struct.pack("!I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+    return (PNG_SIG + chunk(b"IHDR", struct.pack("!IIBBBBB", w, h, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)) + chunk(b"IEND", b""))
@@ -0,0 +1,71 @@
+import importlib
+from typing import List, Sequence
+import numpy as np
+
+INPUT = 96   # model input side, pixels
+
+
+class DMSModel:
+    """Per-frame driver-state model: a batch of luminance frames -> one observation dict each."""
+
+    def infer(self, frames: Sequence[np.ndarray]) -> List[dict]:
+        raise NotImplementedError
+
+
+def resize(gray: np.ndarray, side: int = INPUT) -> np.ndarray:
+    """Nearest-neighbour resize to side x side float32; cheap and allocation-light."""
+    h, w = gray.shape
+    ys = (np.arange(side) * h // side)
+    xs = (np.arange(side) * w // side)
+    return gray[ys[:, None], xs[None, :]].astype(np.float32)
+
+
+class StubFaceModel(DMSModel):
+    """
+    CPU stand-in with a real model's shape: resize, a few conv layers' worth
+    of arithmetic over the whole batch, then band statistics read as
+    face / eye openness (EAR) / mouth openness (MAR) / horizontal gaze.
+    Deterministic for a given image. `layers` scales the compute cost.
+    """
+
+    def __init__(self, layers: int = 4) -> None:
+        self.layers = layers
+
+    def infer(self, frames: Sequence[np.ndarray]) -> List[dict]:
+        if not frames:
+            return []
+        x = np.stack([resize(f) for f in frames]) / 255.0          # (B, S, S)
+        feat = x
+        for _ in range(self.layers):
+            # 3x3 box blur + ReLU of the residual: conv-like work, batch-wide
+            p = np.pad(feat, ((0, 0), (1, 1), (1, 1)), mode="edge")
+            blur = sum(p[:, dy:dy + INPUT, dx:dx + INPUT] for dy in range(3) for dx in range(3)) / 9.0
+            feat = np.maximum(feat - blur, 0.0) + blur
+        s = INPUT
+        centre = x[:, s // 4:3 * s // 4, s // 4:3 * s // 4]
+        eyes = x[:, int(s * 0.30):int(s * 0.45), int(s * 0.30):int(s * 0.70)]
+        mouth = x[:, int(s * 0.62):int(s * 0.80), s // 3:2 * s // 3]
+        face_score = centre.std(axis=(1, 2))
+        # open eyes show up as dark blobs (pupil/lashes) inside the eye band
+        ear = 0.10 + 0.25 * np.clip((eyes < 0.3).mean(axis=(1, 2)) / 0.04, 0.0, 1.0)
+        mar = np.clip((mouth < 0.2).mean(axis=(1, 2)) * 2.0, 0.0, 1.0)
+        cols = (1.0 - eyes).sum(axis=1)                             # darkness per column
+        centroid = (cols * np.arange(cols.shape[1])).sum(axis=1) / np.maximum(cols.sum(axis=1), 1e-6)
+        gaze_x = centroid / max(cols.shape[1] - 1, 1) * 2.0 - 1.0
+        energy = feat.mean(axis=(1, 2))
+        out = []
+        for i in range(len(frames)):
+            out.append({
+                "has_face": bool(face_score[i] > 0.05),
+                "ear": round(float(ear[i]), 3),
+                "mar": round(float(mar[i]), 3),
+                "gaze_x": round(float(gaze_x[i]), 3),
+                "energy": round(float(energy[i]), 4),
+            })
+        return out
+
+
+def load_model(spec: str) -> DMSModel:
+    """'package.module:Class' -> instance. Pool workers build their model from this string."""
+    mod, _, name = spec.partition(":")
+    return getattr(importlib.import_module(mod), name)()
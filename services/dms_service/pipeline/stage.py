@@ -0,0 +1,280 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from .aggregate import TemporalAggregator
+from .decode import DecodeError, decode_gray
+from .model import DMSModel, load_model
+
+DEFAULT_MODEL = os.getenv("DMS_MODEL", "services.dms_service.pipeline.model:StubFaceModel")
+DMS_WORKERS = int(os.getenv("DMS_WORKERS", "1"))        # 0 = run inference in a thread, no pool
+DMS_BATCH = int(os.getenv("DMS_BATCH", "8"))
+DMS_BATCH_WAIT_MS = float(os.getenv("DMS_BATCH_WAIT_MS", "5"))
+DMS_QUEUE_DEPTH = int(os.getenv("DMS_QUEUE_DEPTH", "1"))  # frames held per camera; newest wins
+DMS_MAX_AGE_MS = float(os.getenv("DMS_MAX_AGE_MS", "500"))
+DMS_SESSION_TTL_S = float(os.getenv("DMS_SESSION_TTL_S", "600"))   # idle cameras' aggregators are dropped
+DMS_MAX_SESSIONS = int(os.getenv("DMS_MAX_SESSIONS", "4096"))
+
+# (session_id, trace, dms.event payloads) -> publish
+Emit = Callable[[str, Optional[dict], List[dict]], Awaitable[None]]
+
+_MODEL: Optional[DMSModel] = None
+
+
+def _init_worker(spec: str) -> None:
+    global _MODEL
+    _MODEL = load_model(spec)
+
+
+def infer_batch(items: List[Tuple[bytes, str]]) -> List[Optional[dict]]:
+    """Runs in a pool worker: decode + one batched model call. None marks an undecodable frame."""
+    frames, idx = [], []
+    for i, (data, fmt) in enumerate(items):
+        try:
+            frames.append(decode_gray(data, fmt))
+            idx.append(i)
+        except DecodeError:
+            pass
+    out: List[Optional[dict]] = [None] * len(items)
+    for i, obs in zip(idx, _MODEL.infer(frames)):
+        out[i] = obs
+    return out
+
+
+class Frame:
+    __slots__ = ("session_id", "image", "fmt", "ts_ms", "trace", "arrived", "future")
+
+    def __init__(self, session_id: str, image: bytes, fmt: str, ts_ms: int, trace: Optional[dict],
+                 future: "asyncio.Future[str]") -> None:
+        self.session_id = session_id
+        self.image = image
+        self.fmt = fmt
+        self.ts_ms = ts_ms
+        self.trace = trace
+        self.arrived = time.perf_counter()
+        self.future = future
+
+
+class LatestFrameQueue:
+    """
+    One bounded deque per camera (session). A full camera queue drops its
+    oldest frame, so a slow consumer sees the newest picture instead of a
+    backlog. A camera with a frame in flight is not handed out again until
+    done(), which keeps each session's results in order.
+    """
+
+    def __init__(self, depth: int = DMS_QUEUE_DEPTH) -> None:
+        self.depth = depth
+        self._frames: Dict[str, Deque[Frame]] = {}
+        self._ready: Deque[str] = deque()
+        self._busy: Set[str] = set()
+        self.wake = asyncio.Event()
+
+    def put(self, frame: Frame) -> Optional[Frame]:
+        """Enqueues; returns the frame it displaced, if any."""
+        q = self._frames.get(frame.session_id)
+        if q is None:
+            q = self._frames[frame.session_id] = deque()
+        was_empty = not q
+        dropped = q.popleft() if len(q) >= self.depth else None
+        q.append(frame)
+        if was_empty and frame.session_id not in self._busy:
+            self._ready.append(frame.session_id)
+            self.wake.set()
+        return dropped
+
+    def take(self, n: int) -> List[Frame]:
+        """Up to n frames, at most one per camera, round-robin across cameras."""
+        out = []
+        while self._ready and len(out) < n:
+            sid = self._ready.popleft()
+            q = self._frames[sid]
+            out.append(q.popleft())
+            self._busy.add(sid)
+            if not q:
+                del self._frames[sid]
+        if not self._ready:
+            self.wake.clear()
+        return out
+
+    def done(self, session_id: str) -> None:
+        self._busy.discard(session_id)
+        if session_id in self._frames:
+            self._ready.append(session_id)
+            self.wake.set()
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._frames.values())
+
+
+class DMSPipeline:
+    """
+    Camera frames -> latest-frame-wins queue -> micro-batches across
+    sessions -> decode + inference in a process pool -> per-session
+    temporal aggregation -> emit(dms.event payloads).
+
+    One dispatcher task per worker keeps exactly one batch in flight per
+    worker. Frames that already waited longer than max_age_ms are dropped
+    at dispatch, which bounds event latency under overload instead of
+    letting lag grow.
+
+    submit() returns a future resolving to "processed", "dropped" (a newer
+    frame from the same camera replaced it), "stale" or "error".
+
+    Per-session aggregators are kept in LRU order; one idle for ttl_s, or
+    the least recently used beyond max_sessions, is dropped and a camera
+    that comes back starts from a clean state.
+    """
+
+    def __init__(self, emit: Emit, workers: int = DMS_WORKERS, batch_size: int = DMS_BATCH,
+                 batch_wait_ms: float = DMS_BATCH_WAIT_MS, depth: int = DMS_QUEUE_DEPTH,
+                 max_age_ms: float = DMS_MAX_AGE_MS, model: str = DEFAULT_MODEL,
+                 ttl_s: float = DMS_SESSION_TTL_S, max_sessions: int = DMS_MAX_SESSIONS) -> None:
+        self.emit = emit
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait_s = batch_wait_ms / 1000
+        self.depth = depth
+        self.max_age_s = max_age_ms / 1000
+        self.model = model
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, TemporalAggregator]" = OrderedDict()
+        self.counts = {"submitted": 0, "processed": 0, "dropped": 0, "stale": 0, "error": 0, "batches": 0, "events": 0,
+                       "expired": 0}
+        self.latency_ms: Deque[float] = deque(maxlen=1024)
+        self._queue: Optional[LatestFrameQueue] = None
+        self._pool: Optional[Executor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _new_pool(self) -> Executor:
+        if self.workers > 0:
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(self.model,))
+        _init_worker(self.model)
+        return ThreadPoolExecutor(1)
+
+    async def start(self) -> None:
+        self._queue = LatestFrameQueue(self.depth)
+        self._pool = self._new_pool()
+        self._tasks = [asyncio.create_task(self._dispatch()) for _ in range(max(1, self.workers))]
+
+    async def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, session_id: str, image: bytes, fmt: str, ts_ms: int,
+               trace: Optional[dict] = None) -> "asyncio.Future[str]":
+        fut = asyncio.get_running_loop().create_future()
+        self.counts["submitted"] += 1
+        dropped = self._queue.put(Frame(session_id, image, fmt, ts_ms, trace, fut))
+        if dropped is not None:
+            self._resolve(dropped, "dropped")
+        return fut
+
+    def state(self, session_id: str) -> dict:
+        agg = self.sessions.get(session_id)
+        return agg.state() if agg else TemporalAggregator().state()
+
+    def stats(self) -> dict:
+        lat = sorted(self.latency_ms)
+
+        def pct(p: float) -> Optional[float]:
+            return round(lat[min(len(lat) - 1, int(len(lat) * p))], 2) if lat else None
+        b = self.counts["batches"]
+        return {**self.counts, "queued": len(self._queue) if self._queue else 0, "sessions": len(self.sessions),
+                "avg_batch": round(self.counts["processed"] / b, 2) if b else 0.0,
+                "latency_ms_p50": pct(0.50), "latency_ms_p99": pct(0.99)}
+
+    def metrics(self) -> list:
+        """Collector for libs.log.metrics: frame outcomes and queue depth."""
+        return [
+            ("cockpit_dms_frames_total", "counter", "Camera frames by outcome.",
+             [({"status": k}, self.counts[k]) for k in ("submitted", "processed", "dropped", "stale", "error")]),
+            ("cockpit_dms_batches_total", "counter", "Inference batches run.", [({}, self.counts["batches"])]),
+            ("cockpit_dms_queue_depth", "gauge", "Frames waiting for inference.",
+             [({}, len(self._queue) if self._queue else 0)]),
+            ("cockpit_dms_sessions", "gauge", "Cameras with live aggregation state.", [({}, len(self.sessions))]),
+        ]
+
+    def _session(self, session_id: str) -> TemporalAggregator:
+        now = time.monotonic()
+        sessions = self.sessions
+        agg = sessions.get(session_id)
+        if agg is None:
+            agg = sessions[session_id] = TemporalAggregator()
+        else:
+            sessions.move_to_end(session_id)
+        agg.touched = now
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+            self.counts["expired"] += 1
+        # at most a few pops per frame; the front is the longest idle
+        for _ in range(8):
+            sid, oldest = next(iter(sessions.items()))
+            if now - oldest.touched <= self.ttl_s:
+                break
+            del sessions[sid]
+            self.counts["expired"] += 1
+        return agg
+
+    def _resolve(self, frame: Frame, status: str) -> None:
+        self.counts[status] += 1
+        if not frame.future.done():
+            frame.future.set_result(status)
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        q = self._queue
+        while True:
+            await q.wake.wait()
+            batch = q.take(self.batch_size)
+            if len(batch) < self.batch_size and self.batch_wait_s:
+                # micro-batch: give other cameras a moment to contribute
+                await asyncio.sleep(self.batch_wait_s)
+                batch += q.take(self.batch_size - len(batch))
+            if not batch:
+                continue
+            now = time.perf_counter()
+            live = []
+            for f in batch:
+                if now - f.arrived > self.max_age_s:
+                    self._resolve(f, "stale")
+                    q.done(f.session_id)
+                else:
+                    live.append(f)
+            if not live:
+                continue
+            try:
+                results = await loop.run_in_executor(self._pool, infer_batch, [(f.image, f.fmt) for f in live])
+            except asyncio.CancelledError:
+                raise
+            except BrokenExecutor:
+                # a worker died (OOM, segfault in a native decoder): replace the pool once
+                pool, self._pool = self._pool, self._new_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+                results = [None] * len(live)
+            except Exception:
+                results = [None] * len(live)
+            self.counts["batches"] += 1
+            for f, obs in zip(live, results):
+                try:
+                    if obs is None:
+                        self._resolve(f, "error")
+                        continue
+                    events = self._session(f.session_id).push(f.ts_ms, obs)
+                    if events:
+                        self.counts["events"] += len(events)
+                        await self.emit(f.session_id, f.trace, events)
+                    self.latency_ms.append((time.perf_counter() - f.arrived) * 1000)
+                    self._resolve(f, "processed")
+                finally:
+                    q.done(f.session_id)
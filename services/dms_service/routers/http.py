@@ -1,6 +1,13 @@
+import base64
+import json
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
 from libs.log.tracing import now_ms, mk_trace, new_id
+from libs.log.spans import bind
+from libs.schema_utils.binary_frame import CONTENT_TYPE, FrameError, decode_frame
+from libs.schema_utils.validate import SchemaValidationError, validate_envelope, validate_message
+from ..pipeline.broadcast import BROADCAST
+from ..pipeline.stage import DMSPipeline
 
 router = APIRouter()
 
@@ -21,15 +28,51 @@ def envelope(typ: str, session_id: str, trace: Optional[dict], payload: dict):
 def health():
     return {"ok": True}
 
+async def _read_frame(request: Request):
+    """(envelope, image bytes) from either JSON+base64 or the binary envelope framing."""
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(CONTENT_TYPE):
+        try:
+            req, image = decode_frame(body)
+            validate_envelope(req)
+        except FrameError as e:
+            raise HTTPException(status_code=400, detail={"code": "bad_frame", "message": str(e), "retryable": False})
+        except SchemaValidationError as e:
+            raise HTTPException(status_code=422, detail=e.to_error())
+        fmt = (req.get("payload") or {}).get("format")
+        if fmt not in ("jpg", "png"):
+            raise HTTPException(status_code=422, detail={"code": "schema_invalid", "message": f"bad format: {fmt!r}", "retryable": False})
+        return req, image
+    try:
+        req = json.loads(body)
+        validate_message(req, "schemas/dms/dms_frame_ingest.schema.json")
+        image = base64.b64decode(req["payload"]["image_b64"])
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail={"code": "bad_request", "message": str(e), "retryable": False})
+    return req, image
+
+PIPELINE = DMSPipeline(BROADCAST.publish)
+
 @router.post("/frame")
-def frame(req: dict):
+async def frame(request: Request, response: Response):
+    """
+    Queues the frame into the DMS pipeline and answers with the session's
+    dms.state once it is processed or superseded (X-DMS-Frame says which).
+    dms.event messages are broadcast as the aggregator produces them.
+    """
+    req, image = await _read_frame(request)
     meta = req.get("meta", {})
+    payload = req.get("payload") or {}
     session_id = meta.get("session_id", "demo")
     trace = meta.get("trace")
-    # stub: always no-face
-    return envelope("dms.event", session_id, trace, {
-        "event_type": "NO_FACE",
-        "severity": 2,
-        "duration_ms": 0,
-        "metrics": {}
-    })
\ No newline at end of file
+    bind(trace)
+    ts = payload.get("timestamp_ms") or meta.get("timestamp_ms") or now_ms()
+    status = await PIPELINE.submit(session_id, bytes(image), payload["format"], ts, trace)
+    response.headers["X-DMS-Frame"] = status
+    return envelope("dms.state", session_id, trace, PIPELINE.state(session_id))
+
+@router.get("/pipeline/stats")
+def pipeline_stats():
+    return PIPELINE.stats()
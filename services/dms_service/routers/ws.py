@@ -1,30 +1,63 @@
-import asyncio
 import json
-from fastapi import APIRouter, WebSocket
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from libs.event_bus.client import get_bus
 from libs.log.tracing import now_ms, mk_trace, new_id
+from ..pipeline.broadcast import ALL_TOPIC, BROADCAST, session_topic
 
 router = APIRouter()
 
+def _gap_frame(session_id: str, since: int) -> str:
+    return json.dumps({
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "dms",
+            "type": "dms.event.gap",
+            "session_id": session_id,
+            "trace": mk_trace(None),
+        },
+        "payload": {"since": since, "last_seq": BROADCAST.last_seq(session_id)}
+    }, ensure_ascii=False)
+
+async def _replay(ws: WebSocket, topic: str, session_id: Optional[str], since: Optional[int]) -> None:
+    if session_id is None or since is None:
+        return
+    frames, complete = BROADCAST.since(session_id, since)
+    if not complete:
+        frames.insert(0, _gap_frame(session_id, since))
+    # through the subscription's queue: the bus's sender task is the only writer on the socket
+    await get_bus().send(topic, ws, frames)
+
+def _since(raw: Optional[str]) -> Optional[int]:
+    return int(raw) if raw is not None and raw.isdigit() else None
+
 @router.websocket("/ws/dms")
 async def ws_dms(ws: WebSocket):
+    """
+    dms.event frames as the pipeline produces them, shared by every viewer.
+    ?session_id= narrows to one session; with ?since=<seq> (or a later
+    {"since": N}) the frames after seq are replayed from a short buffer
+    first, preceded by dms.event.gap if some were already evicted. A frame
+    may arrive both live and replayed; drop seq numbers already seen.
+    """
     await ws.accept()
-    # demo: periodic event
-    while True:
-        out = {
-            "meta": {
-                "message_id": new_id("m_"),
-                "timestamp_ms": now_ms(),
-                "source": "dms",
-                "type": "dms.event",
-                "session_id": "demo",
-                "trace": mk_trace(None),
-            },
-            "payload": {
-                "event_type": "DISTRACTION_GAZE_OFF_ROAD",
-                "severity": 3,
-                "duration_ms": 1200,
-                "metrics": {}
-            }
-        }
-        await ws.send_text(json.dumps(out, ensure_ascii=False))
-        await asyncio.sleep(5)
\ No newline at end of file
+    session_id = ws.query_params.get("session_id")
+    topic = session_topic(session_id) if session_id else ALL_TOPIC
+    bus = get_bus()
+    # subscribe before replaying so nothing published in between is lost
+    await bus.subscribe(topic, ws)
+    try:
+        await _replay(ws, topic, session_id, _since(ws.query_params.get("since")))
+        while True:
+            raw = await ws.receive_text()
+            try:
+                since = json.loads(raw).get("since")
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(since, int):
+                await _replay(ws, topic, session_id, since)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await bus.unsubscribe(topic, ws)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from services.dms_service.pipeline.broadcast import DMSBroadcaster
+
+EVENT = {"event_type": "YAWN", "severity": 2}
+
+
+def publish(b: DMSBroadcaster, session_id: str, n: int = 1) -> None:
+    asyncio.run(b.publish(session_id, None, [EVENT] * n))
+
+
+def test_replay_since_and_gap():
+    b = DMSBroadcaster(replay=4)
+    publish(b, "cam", 6)
+    frames, complete = b.since("cam", 3)
+    assert [json.loads(f)["payload"]["seq"] for f in frames] == [4, 5, 6]
+    assert complete
+    frames, complete = b.since("cam", 1)
+    assert len(frames) == 4 and not complete      # seq 2 already left the ring
+    assert b.since("cam", 6) == ([], True)
+
+
+def test_sessions_are_capped_lru():
+    b = DMSBroadcaster(max_sessions=3)
+    for sid in ("a", "b", "c"):
+        publish(b, sid)
+    publish(b, "a")                                 # a is now the most recent
+    publish(b, "d")
+    assert len(b) == 3 and b.expired == 1
+    assert b.last_seq("b") == 0 and b.last_seq("a") == 2
+
+
+def test_idle_sessions_expire():
+    b = DMSBroadcaster(ttl_s=0.0)
+    publish(b, "a", 3)
+    publish(b, "b")
+    assert len(b) == 1 and b.last_seq("a") == 0
+    assert b.since("a", 3) == ([], False)           # a resuming viewer is told about the gap
+    assert b.since("a", 0) == ([], True)
+
+
+def test_resume_after_eviction_reports_the_gap():
+    b = DMSBroadcaster(max_sessions=1)
+    publish(b, "a", 5)
+    publish(b, "b")                                 # evicts a
+    publish(b, "a", 3)                              # a comes back with a new log
+    assert b.last_seq("a") == 9                     # numbered past every seq handed out
+    frames, complete = b.since("a", 5)              # the old log's tail is unknown
+    assert [json.loads(f)["payload"]["seq"] for f in frames] == [7, 8, 9] and not complete
+    assert b.since("a", 50) == ([], False)          # a seq this log never issued
+    frames, complete = b.since("a", 7)
+    assert [json.loads(f)["payload"]["seq"] for f in frames] == [8, 9] and complete
+    frames, complete = b.since("a", 0)
+    assert len(frames) == 3 and complete
+
+
+def test_ws_replays_through_the_subscription():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from services.dms_service.pipeline import broadcast
+    from services.dms_service.routers.ws import router
+
+    app = FastAPI()
+    app.include_router(router)
+    publish(broadcast.BROADCAST, "ws-cam", 3)
+    with TestClient(app) as client, client.websocket_connect("/ws/dms?session_id=ws-cam&since=1") as ws:
+        assert [json.loads(ws.receive_text())["payload"]["seq"] for _ in range(2)] == [2, 3]
+        ws.send_text(json.dumps({"since": 0}))
+        assert [json.loads(ws.receive_text())["payload"]["seq"] for _ in range(3)] == [1, 2, 3]
+    with TestClient(app) as client, client.websocket_connect("/ws/dms?session_id=gone&since=4") as ws:
+        gap = json.loads(ws.receive_text())         # nothing kept for it: gap first
+        assert gap["meta"]["type"] == "dms.event.gap" and gap["payload"]["last_seq"] == 0
@@ -0,0 +1,23 @@
+from services.dms_service.pipeline.stage import DMSPipeline
+
+
+async def emit(session_id, trace, events):
+    pass
+
+
+def test_aggregators_are_capped_lru():
+    p = DMSPipeline(emit, max_sessions=2)
+    a = p._session("a")
+    p._session("b")
+    assert p._session("a") is a
+    p._session("c")
+    assert list(p.sessions) == ["a", "c"] and p.counts["expired"] == 1
+
+
+def test_idle_aggregators_expire():
+    p = DMSPipeline(emit, ttl_s=0.0)
+    a = p._session("a")
+    p._session("b")
+    assert list(p.sessions) == ["b"]
+    assert p._session("a") is not a
+    assert p.state("b") == p.state("never-seen")
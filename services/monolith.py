@@ -0,0 +1,63 @@
+"""
+All five services in one ASGI app (one interpreter), each mounted under its
+own prefix: /audio, /agent, /vehicle, /dms, /nav.
+
+    uvicorn services.monolith:app --port 8000      (or: python scripts/run_all.py --monolith)
+
+agent -> vehicle / nav calls skip the loopback hop and go straight into the
+other app's endpoints (LocalDispatcher), and the services share the
+in-process TopicBus, so no broker is needed either.
+"""
+from contextlib import AsyncExitStack, asynccontextmanager
+from fastapi import FastAPI
+from libs.log.debug import metrics
+from libs.log.spans import RECORDER
+from libs.replay.recorder import RECORDING
+
+RECORDER.service = RECORDER.service or "monolith"   # name of the exported span file
+RECORDING.service = RECORDING.service or "monolith"   # and of the envelope log stream
+
+from .agent_service.app import app as agent_app  # noqa: E402
+from .agent_service.core.vehicle_state import VEHICLE_STATE  # noqa: E402
+from .agent_service.tools.http_client import attach_local  # noqa: E402
+from .audio_service.app import app as audio_app  # noqa: E402
+from .dms_service.app import app as dms_app  # noqa: E402
+from .nav_service.app import app as nav_app  # noqa: E402
+from .vehicle_service.app import app as vehicle_app  # noqa: E402
+
+APPS = {
+    "audio": audio_app,
+    "agent": agent_app,
+    "vehicle": vehicle_app,
+    "dms": dms_app,
+    "nav": nav_app,
+}
+
+attach_local("vehicle", vehicle_app)
+attach_local("nav", nav_app)
+VEHICLE_STATE.local_feed = True   # vehicle.delta is published on the shared bus
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Mount doesn't run sub-app lifespans; enter them here, in the usual order
+    async with AsyncExitStack() as stack:
+        for sub in APPS.values():
+            await stack.enter_async_context(sub.router.lifespan_context(sub))
+        yield
+
+
+app = FastAPI(title="cockpit_monolith", lifespan=lifespan)
+
+
+@app.get("/health")
+def health():
+    return {"ok": True, "services": list(APPS)}
+
+
+# one registry per process: /metrics here and under every mount is the same text
+app.get("/metrics", include_in_schema=False)(metrics)
+
+
+for _name, _sub in APPS.items():
+    app.mount(f"/{_name}", _sub)
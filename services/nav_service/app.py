@@ -1,5 +1,18 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from libs.log.debug import install
+from .providers.poi_index import get_index
+from .providers.routing import get_engine
 from .routers.http import router as http_router
 
-app = FastAPI(title="nav_service")
-app.include_router(http_router)
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # open (or build) the index and road graph before taking traffic, not on the first request
+    await asyncio.to_thread(get_index)
+    await asyncio.to_thread(get_engine)
+    yield
+
+app = FastAPI(title="nav_service", lifespan=lifespan)
+install(app, "nav")
+app.include_router(http_router)
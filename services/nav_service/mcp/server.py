@@ -1,7 +1,232 @@
-# Placeholder MCP server.
-# Next step: implement MCP protocol endpoints/tools: nav.route / nav.poi
+"""
+MCP server for the nav tools over stdio (newline-delimited JSON-RPC 2.0).
+
+    python -m services.nav_service.mcp.server
+
+Requests are dispatched as independent tasks, so a slow route never holds
+up a POI lookup queued behind it; responses go out in completion order and
+clients match them by id. `notifications/cancelled` cancels an in-flight
+request, which then gets no response. The engines are the same in-process
+ones behind the HTTP routers, run on a small thread pool.
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from libs.schema_utils.validate import SchemaValidationError, get_registry, validate_or_raise
+from ..providers.poi_index import get_index
+from ..providers.routing import get_engine
+
+PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+SERVER_INFO = {"name": "cockpit-nav", "version": "0.1.0"}
+MCP_WORKERS = int(os.getenv("NAV_MCP_WORKERS", "4"))
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+TOOLS = {
+    "tools": [
+        {
+            "name": "nav.route",
+            "description": "Driving route between two coordinates: distance, duration, steps and an encoded polyline.",
+            "input_schema": "schemas/nav/nav_route_request.schema.json",
+            "output_schema": "schemas/nav/nav_route_result.schema.json",
+        },
+        {
+            "name": "nav.poi",
+            "description": "Nearest points of interest matching a text query within a radius of a centre point.",
+            "input_schema": "schemas/nav/nav_poi_request.schema.json",
+            "output_schema": "schemas/nav/nav_poi_result.schema.json",
+        },
+    ]
+}
+validate_or_raise("schemas/nav/nav_mcp_tool.schema.json", TOOLS)
+
+
+class ToolError(Exception):
+    """Reported to the client as a tool result with isError, not as a JSON-RPC error."""
+
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _route(args: dict) -> dict:
+    result = get_engine().route((args["origin"]["lat"], args["origin"]["lon"]),
+                                (args["destination"]["lat"], args["destination"]["lon"]), args.get("avoid") or ())
+    if result is None:
+        raise ToolError("no_route", "no route between origin and destination")
+    return result
+
+
+def _poi(args: dict) -> dict:
+    c = args["center"]
+    return {"items": get_index().search(c["lat"], c["lon"], args["query"], args.get("radius_m", 5000), args.get("limit", 5))}
+
+
+HANDLERS: Dict[str, Callable[[dict], dict]] = {"nav.route": _route, "nav.poi": _poi}
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class NavMCPServer:
+    """Transport-agnostic: feed it decoded messages, it calls `send` with replies."""
+
+    def __init__(self, send: Callable[[dict], Any], workers: int = MCP_WORKERS) -> None:
+        self.send = send
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="nav-mcp")
+        self.inflight: Dict[Any, asyncio.Task] = {}
+        self.stats = {"requests": 0, "cancelled": 0, "errors": 0}
+
+    def tools_list(self) -> dict:
+        reg = get_registry()
+        return {"tools": [{
+            "name": t["name"],
+            "description": t["description"],
+            "inputSchema": reg.raw(t["input_schema"]),
+            "outputSchema": reg.raw(t["output_schema"]),
+        } for t in TOOLS["tools"]]}
+
+    async def call_tool(self, params: dict) -> dict:
+        name = params.get("name")
+        spec = next((t for t in TOOLS["tools"] if t["name"] == name), None)
+        if spec is None:
+            raise RpcError(INVALID_PARAMS, f"unknown tool: {name}")
+        args = params.get("arguments") or {}
+        try:
+            get_registry().validate(spec["input_schema"], args)
+        except SchemaValidationError as e:
+            raise RpcError(INVALID_PARAMS, e.message, e.to_error())
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.pool, HANDLERS[name], args)
+        except ToolError as e:
+            return {"content": [{"type": "text", "text": f"{e.code}: {e.message}"}], "isError": True}
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, ensure_ascii=False)}],
+            "structuredContent": result,
+            "isError": False,
+        }
+
+    async def dispatch(self, method: str, params: dict) -> Any:
+        if method == "initialize":
+            asked = params.get("protocolVersion")
+            return {
+                "protocolVersion": asked if asked in PROTOCOL_VERSIONS else PROTOCOL_VERSIONS[0],
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": SERVER_INFO,
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return self.tools_list()
+        if method == "tools/call":
+            return await self.call_tool(params)
+        raise RpcError(METHOD_NOT_FOUND, f"method not found: {method}")
+
+    def handle(self, msg: Any) -> None:
+        """One decoded JSON-RPC message; requests are started as tasks and answered when done."""
+        if isinstance(msg, list):
+            for m in msg:
+                self.handle(m)
+            return
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or "method" not in msg:
+            if isinstance(msg, dict) and ("result" in msg or "error" in msg):
+                return   # a response to something we never send; ignore
+            self._reply_error(msg.get("id") if isinstance(msg, dict) else None, INVALID_REQUEST, "invalid request")
+            return
+        method, params = msg["method"], msg.get("params") or {}
+        if "id" not in msg:
+            if method == "notifications/cancelled":
+                task = self.inflight.get(params.get("requestId"))
+                if task is not None:
+                    self.stats["cancelled"] += 1
+                    task.cancel()
+            return   # notifications/initialized and friends need no reply
+        req_id = msg["id"]
+        self.stats["requests"] += 1
+        self.inflight[req_id] = asyncio.create_task(self._run(req_id, method, params))
+
+    async def _run(self, req_id: Any, method: str, params: dict) -> None:
+        try:
+            result = await self.dispatch(method, params)
+            self.send({"jsonrpc": "2.0", "id": req_id, "result": result})
+        except asyncio.CancelledError:
+            pass   # cancelled by the client: no response
+        except RpcError as e:
+            self._reply_error(req_id, e.code, e.message, e.data)
+        except Exception as e:
+            self._reply_error(req_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        finally:
+            self.inflight.pop(req_id, None)
+
+    def _reply_error(self, req_id: Any, code: int, message: str, data: Any = None) -> None:
+        self.stats["errors"] += 1
+        err = {"code": code, "message": message}
+        if data is not None:
+            err["data"] = data
+        self.send({"jsonrpc": "2.0", "id": req_id, "error": err})
+
+    async def close(self) -> None:
+        for task in list(self.inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self.inflight.values(), return_exceptions=True)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve_stdio() -> None:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    w_transport, w_protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    writer = asyncio.StreamWriter(w_transport, w_protocol, reader, loop)
+
+    def send(msg: dict) -> None:
+        # one line per message; the transport buffers, so send never blocks the loop
+        writer.write(json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    server = NavMCPServer(send)
+    # warm the engines so the first tool call doesn't pay for loading them
+    await loop.run_in_executor(server.pool, get_engine)
+    await loop.run_in_executor(server.pool, get_index)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                server._reply_error(None, PARSE_ERROR, "parse error")
+                continue
+            server.handle(msg)
+            if writer.transport.get_write_buffer_size() > 1 << 20:
+                await writer.drain()
+        # stdin closed: let in-flight requests finish before exiting
+        await asyncio.gather(*server.inflight.values(), return_exceptions=True)
+        await writer.drain()
+    finally:
+        await server.close()
+
+
 def main():
-    print("MCP server stub. TODO: implement nav.route/nav.poi tools.")
+    asyncio.run(serve_stdio())
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,303 @@
+"""
+Array-backed POI index.
+
+POIs are bucketed into a row-major lat/lon grid (cell_deg wide) and stored
+sorted by cell, so every grid row a query box touches is one contiguous
+slice. Everything lives in .npy / .bin files opened with mmap_mode="r":
+opening an index is O(1) and pages are faulted in on demand.
+
+    meta.json              version, n, cell_deg, categories
+    cells.npy  starts.npy  sorted non-empty cell keys, first POI of each (+ end)
+    lat.npy    lon.npy     float32 per POI
+    cat.npy                uint8 category per POI
+    tok.npy                int32 [n, MAX_TOKENS] name token ids, -1 padded
+    names.bin names_off.npy, addr.bin addr_off.npy, vocab.bin vocab_off.npy
+                           UTF-8 blobs + int64 offsets; vocab is sorted, so a
+                           token prefix is a contiguous id range
+
+Build from CSV (name,lat,lon,category,address):
+
+    python -m services.nav_service.providers.poi_index build pois.csv /data/poi_index
+"""
+import bisect
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+VERSION = 1
+CELL_DEG = 0.01            # ~1.1 km of latitude
+MAX_TOKENS = 4
+EARTH_R = 6371008.8
+
+_TOKEN_RE = re.compile("[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def haversine_m(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to arrays of points, in metres."""
+    p1 = np.radians(lat)
+    p2 = np.radians(lats.astype(np.float64))
+    dp = p2 - p1
+    dl = np.radians(lons.astype(np.float64) - lon)
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class _Strings(Sequence[str]):
+    """Read-only view over a UTF-8 blob + offsets; indexable, so bisect works on it."""
+
+    def __init__(self, blob, offsets: np.ndarray) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+def _blob(path: str):
+    # np.memmap refuses empty files
+    return np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else b""
+
+
+def _pack_strings(items: Iterable[str]) -> Tuple[bytes, np.ndarray]:
+    enc = [s.encode("utf-8") for s in items]
+    off = np.zeros(len(enc) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in enc], out=off[1:])
+    return b"".join(enc), off
+
+
+def _cell_keys(lat: np.ndarray, lon: np.ndarray, cell_deg: float) -> np.ndarray:
+    ncols = int(np.ceil(360 / cell_deg))
+    row = np.floor((lat.astype(np.float64) + 90) / cell_deg).astype(np.int64)
+    col = np.floor((lon.astype(np.float64) + 180) / cell_deg).astype(np.int64)
+    return row * ncols + np.clip(col, 0, ncols - 1)
+
+
+def build_index(out_dir: str, names: Sequence[str], lat, lon, categories: Sequence[str],
+                addresses: Optional[Sequence[str]] = None, cell_deg: float = CELL_DEG) -> None:
+    """Writes an index directory. `categories` is one label per POI."""
+    n = len(names)
+    lat = np.asarray(lat, dtype=np.float32)
+    lon = np.asarray(lon, dtype=np.float32)
+    cat_names = sorted(set(categories))
+    if len(cat_names) > 255:
+        raise ValueError("at most 255 categories")
+    cat_id = {c: i for i, c in enumerate(cat_names)}
+    cat = np.fromiter((cat_id[c] for c in categories), dtype=np.uint8, count=n)
+
+    # name token ids, first MAX_TOKENS distinct; category tokens are matched through
+    # cat.npy instead. chains repeat names a lot, so tokenize each distinct name once
+    memo: Dict[str, int] = {}
+    uniq: List[Tuple[str, ...]] = []
+    row = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        u = memo.get(names[i])
+        if u is None:
+            u = memo[names[i]] = len(uniq)
+            uniq.append(tuple(dict.fromkeys(tokenize(names[i])))[:MAX_TOKENS])
+        row[i] = u
+    del memo
+    vocab = sorted({t for toks in uniq for t in toks} | {t for c in cat_names for t in tokenize(c)})
+    tid = {t: i for i, t in enumerate(vocab)}
+    uniq_tok = np.full((len(uniq), MAX_TOKENS), -1, dtype=np.int32)
+    for u, toks in enumerate(uniq):
+        uniq_tok[u, :len(toks)] = [tid[t] for t in toks]
+    tok = uniq_tok[row]
+
+    keys = _cell_keys(lat, lon, cell_deg)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    cells, starts = np.unique(keys, return_index=True)
+    starts = np.append(starts, n).astype(np.int64)
+
+    os.makedirs(out_dir, exist_ok=True)
+    save = lambda name, arr: np.save(os.path.join(out_dir, name), arr)  # noqa: E731
+    save("cells.npy", cells)
+    save("starts.npy", starts)
+    save("lat.npy", lat[order])
+    save("lon.npy", lon[order])
+    save("cat.npy", cat[order])
+    save("tok.npy", tok[order])
+    for stem, items in (("names", [names[i] for i in order]),
+                        ("addr", [addresses[i] for i in order] if addresses else [""] * n),
+                        ("vocab", vocab)):
+        blob, off = _pack_strings(items)
+        with open(os.path.join(out_dir, f"{stem}.bin"), "wb") as f:
+            f.write(blob)
+        save(f"{stem}_off.npy", off)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "n": n, "cell_deg": cell_deg, "categories": cat_names}, f, ensure_ascii=False)
+
+
+def build_from_csv(src: str, out_dir: str, cell_deg: float = CELL_DEG) -> int:
+    names, lats, lons, cats, addrs = [], [], [], [], []
+    with open(src, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0] == "name":
+                continue
+            names.append(row[0])
+            lats.append(float(row[1]))
+            lons.append(float(row[2]))
+            cats.append(row[3] if len(row) > 3 else "")
+            addrs.append(row[4] if len(row) > 4 else "")
+    build_index(out_dir, names, lats, lons, cats, addrs, cell_deg)
+    return len(names)
+
+
+class PoiIndex:
+    """Radius-limited kNN with an AND-of-token-prefixes text filter."""
+
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != VERSION:
+            raise ValueError(f"poi index version {meta.get('version')} != {VERSION}")
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self.n = meta["n"]
+        self.cell_deg = meta["cell_deg"]
+        self.ncols = int(np.ceil(360 / self.cell_deg))
+        self.categories: List[str] = meta["categories"]
+        self.cells = load("cells.npy")
+        self.starts = load("starts.npy")
+        self.lat = load("lat.npy")
+        self.lon = load("lon.npy")
+        self.cat = load("cat.npy")
+        self.tok = load("tok.npy")
+        self.names = _Strings(_blob(os.path.join(path, "names.bin")), load("names_off.npy"))
+        self.addrs = _Strings(_blob(os.path.join(path, "addr.bin")), load("addr_off.npy"))
+        self.vocab = _Strings(_blob(os.path.join(path, "vocab.bin")), load("vocab_off.npy"))
+        self._prefix_cache: Dict[str, Tuple[int, int]] = {}
+        # token ids of each category label; every one is in the vocab by construction
+        self._cat_tokens = [[bisect.bisect_left(self.vocab, t) for t in tokenize(c)] for c in self.categories]
+
+    def _token_range(self, prefix: str) -> Tuple[int, int]:
+        r = self._prefix_cache.get(prefix)
+        if r is None:
+            lo = bisect.bisect_left(self.vocab, prefix)
+            hi = bisect.bisect_left(self.vocab, prefix + "\U0010ffff", lo)
+            r = self._prefix_cache[prefix] = (lo, hi)
+            if len(self._prefix_cache) > 4096:
+                self._prefix_cache.clear()
+        return r
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """POI row indexes in the cells overlapping the query's bounding box."""
+        dlat = np.degrees(radius_m / EARTH_R)
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        r0 = int(np.floor((lat - dlat + 90) / self.cell_deg))
+        r1 = int(np.floor((lat + dlat + 90) / self.cell_deg))
+        c0 = max(0, int(np.floor((lon - dlon + 180) / self.cell_deg)))
+        c1 = min(self.ncols - 1, int(np.floor((lon + dlon + 180) / self.cell_deg)))
+        rows = np.arange(r0, r1 + 1, dtype=np.int64) * self.ncols
+        lo = np.searchsorted(self.cells, rows + c0, side="left")
+        hi = np.searchsorted(self.cells, rows + c1, side="right")
+        spans = [(self.starts[a], self.starts[b]) for a, b in zip(lo, hi) if b > a]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e, dtype=np.int64) for s, e in spans])
+
+    def search(self, lat: float, lon: float, query: str = "", radius_m: float = 5000, limit: int = 5) -> List[dict]:
+        idx = self._candidates(lat, lon, radius_m)
+        if len(idx) and query:
+            toks = self.tok[idx]
+            cats = self.cat[idx]
+            keep = np.ones(len(idx), dtype=bool)
+            for t in tokenize(query):
+                # every query token must prefix-match a name token or the category
+                lo, hi = self._token_range(t)
+                if lo == hi:
+                    return []
+                cat_hit = np.array([any(lo <= c < hi for c in ct) for ct in self._cat_tokens], dtype=bool)
+                keep &= ((toks >= lo) & (toks < hi)).any(axis=1) | cat_hit[cats]
+            idx = idx[keep]
+        if not len(idx):
+            return []
+        dist = haversine_m(lat, lon, self.lat[idx], self.lon[idx])
+        inside = dist <= radius_m
+        idx, dist = idx[inside], dist[inside]
+        if len(idx) > limit:
+            top = np.argpartition(dist, limit)[:limit]
+            idx, dist = idx[top], dist[top]
+        order = np.argsort(dist, kind="stable")
+        out = []
+        for k in order:
+            i = int(idx[k])
+            item = {"name": self.names[i], "lat": round(float(self.lat[i]), 6),
+                    "lon": round(float(self.lon[i]), 6), "distance_m": round(float(dist[k]), 1)}
+            addr = self.addrs[i]
+            if addr:
+                item["address"] = addr
+            out.append(item)
+        return out
+
+
+# demo / benchmark data: chain brands spread around city centres
+BRANDS = (
+    ("Starbucks 星巴克", "coffee"), ("Luckin 瑞幸咖啡", "coffee"),
+    ("Tesla Supercharger 特斯拉超充", "charging station"), ("State Grid 国家电网充电站", "charging station"),
+    ("Sinopec 中国石化", "gas station"), ("PetroChina 中国石油", "gas station"),
+    ("P+R 停车场", "parking"), ("公共厕所", "restroom"),
+    ("Haidilao 海底捞", "restaurant"), ("Community Hospital 社区医院", "hospital"),
+)
+DISTRICTS = ("人民广场", "陆家嘴", "徐家汇", "静安寺", "五角场", "虹桥", "张江", "世纪公园", "中山公园", "新天地")
+SHANGHAI = (31.23, 121.47)
+
+
+def synthetic_pois(n: int, seed: int = 0, centers: Sequence[Tuple[float, float]] = (SHANGHAI,),
+                   spread_deg: float = 0.15):
+    """(names, lat, lon, categories, addresses) with a Gaussian cluster per centre."""
+    rng = np.random.default_rng(seed)
+    c = np.asarray(centers, dtype=np.float64)[rng.integers(len(centers), size=n)]
+    lat = c[:, 0] + rng.normal(0, spread_deg, n)
+    lon = c[:, 1] + rng.normal(0, spread_deg, n)
+    names_t = [f"{b} {d}店" for b, _ in BRANDS for d in DISTRICTS]
+    addr_t = [f"上海市{d}附近" for _ in BRANDS for d in DISTRICTS]
+    k = rng.integers(len(BRANDS), size=n) * len(DISTRICTS) + rng.integers(len(DISTRICTS), size=n)
+    names = [names_t[i] for i in k]
+    cats = [BRANDS[i // len(DISTRICTS)][1] for i in k]
+    addrs = [addr_t[i] for i in k]
+    return names, lat, lon, cats, addrs
+
+
+NAV_POI_INDEX = os.getenv("NAV_POI_INDEX", "")
+SEED_DIR = os.path.join(tempfile.gettempdir(), f"cockpit_poi_seed_v{VERSION}")
+
+
+@lru_cache(maxsize=1)
+def get_index() -> PoiIndex:
+    """NAV_POI_INDEX if set; otherwise a small synthetic Shanghai dataset, built once."""
+    if NAV_POI_INDEX:
+        return PoiIndex(NAV_POI_INDEX)
+    if not os.path.exists(os.path.join(SEED_DIR, "meta.json")):
+        tmp = f"{SEED_DIR}.{os.getpid()}.tmp"
+        build_index(tmp, *synthetic_pois(5000))
+        try:
+            os.replace(tmp, SEED_DIR)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)   # another worker won the race
+    return PoiIndex(SEED_DIR)
+
+
+def main(argv: List[str]) -> None:
+    if len(argv) != 3 or argv[0] != "build":
+        print("usage: python -m services.nav_service.providers.poi_index build <pois.csv> <out_dir>")
+        sys.exit(2)
+    n = build_from_csv(argv[1], argv[2])
+    print(f"indexed {n} POIs into {argv[2]}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
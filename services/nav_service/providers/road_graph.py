@@ -0,0 +1,170 @@
+"""
+Road graph in CSR arrays, memory-mapped from a directory of .npy files.
+
+    meta.json                       version, n, m, max_speed_mps, roads (name per road id)
+    lat.npy lon.npy                 float64 per node
+    indptr.npy                      int64 [n+1]; out-edges of u are indptr[u]:indptr[u+1]
+    dst.npy length.npy time.npy     int32 / float32 / float32 per edge
+    road.npy flags.npy              int32 road id / uint8 FLAG_* per edge
+    rev_indptr.npy rev_src.npy rev_edge.npy
+                                    in-edges of v, for backward searches
+    snap_cells.npy snap_starts.npy snap_nodes.npy
+                                    nodes bucketed by grid cell, for snapping
+"""
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .poi_index import EARTH_R, _cell_keys, haversine_m
+
+VERSION = 1
+SNAP_CELL_DEG = 0.005
+
+FLAG_HIGHWAY = 1
+FLAG_TOLL = 2
+FLAG_FERRY = 4
+AVOID_FLAGS = {"highway": FLAG_HIGHWAY, "toll": FLAG_TOLL, "ferry": FLAG_FERRY}
+
+
+def build_graph(out_dir: str, lat, lon, src, dst, length_m, time_s, road, flags, roads: Sequence[str]) -> None:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    src = np.asarray(src, dtype=np.int64)
+    n, m = len(lat), len(src)
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    dst = np.asarray(dst, dtype=np.int32)[order]
+    rev = np.argsort(dst, kind="stable")
+    rev_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=n), out=rev_indptr[1:])
+    keys = _cell_keys(lat, lon, SNAP_CELL_DEG)
+    snap_nodes = np.argsort(keys, kind="stable")
+    snap_cells, snap_starts = np.unique(keys[snap_nodes], return_index=True)
+
+    length_m = np.asarray(length_m, dtype=np.float32)
+    time_s = np.asarray(time_s, dtype=np.float32)
+    # admissible A* heuristic: nothing is faster than the fastest edge
+    max_speed = float((length_m / np.maximum(time_s, 1e-3)).max()) if m else 1.0
+
+    os.makedirs(out_dir, exist_ok=True)
+    save = lambda name, arr: np.save(os.path.join(out_dir, name), arr)  # noqa: E731
+    save("lat.npy", lat)
+    save("lon.npy", lon)
+    save("indptr.npy", indptr)
+    save("dst.npy", dst)
+    save("length.npy", length_m[order])
+    save("time.npy", time_s[order])
+    save("road.npy", np.asarray(road, dtype=np.int32)[order])
+    save("flags.npy", np.asarray(flags, dtype=np.uint8)[order])
+    save("rev_indptr.npy", rev_indptr)
+    save("rev_src.npy", src[order][rev].astype(np.int32))
+    save("rev_edge.npy", rev.astype(np.int32))
+    save("snap_cells.npy", snap_cells)
+    save("snap_starts.npy", np.append(snap_starts, n).astype(np.int64))
+    save("snap_nodes.npy", snap_nodes.astype(np.int32))
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "n": n, "m": m, "max_speed_mps": max_speed, "roads": list(roads)},
+                  f, ensure_ascii=False)
+
+
+class RoadGraph:
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != VERSION:
+            raise ValueError(f"road graph version {meta.get('version')} != {VERSION}")
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self.path = path
+        self.n = meta["n"]
+        self.m = meta["m"]
+        self.roads: List[str] = meta["roads"]
+        self.lat = load("lat.npy")
+        self.lon = load("lon.npy")
+        self.indptr = load("indptr.npy")
+        self.dst = load("dst.npy")
+        self.length = load("length.npy")
+        self.time = load("time.npy")
+        self.road = load("road.npy")
+        self.flags = load("flags.npy")
+        self.rev_indptr = load("rev_indptr.npy")
+        self.rev_src = load("rev_src.npy")
+        self.rev_edge = load("rev_edge.npy")
+        self.snap_cells = load("snap_cells.npy")
+        self.snap_starts = load("snap_starts.npy")
+        self.snap_nodes = load("snap_nodes.npy")
+        self.ncols = int(np.ceil(360 / SNAP_CELL_DEG))
+        self.max_speed_mps: float = meta["max_speed_mps"]
+
+    def snap(self, lat: float, lon: float, max_rings: int = 8) -> Optional[int]:
+        """Nearest node, searching grid cells in growing square rings."""
+        r0 = int(np.floor((lat + 90) / SNAP_CELL_DEG))
+        c0 = int(np.floor((lon + 180) / SNAP_CELL_DEG))
+        for ring in range(max_rings + 1):
+            # the first hit in the centre cell may still lose to a node just across its edge
+            rows = np.arange(r0 - ring, r0 + ring + 1, dtype=np.int64) * self.ncols
+            lo = np.searchsorted(self.snap_cells, rows + c0 - ring, side="left")
+            hi = np.searchsorted(self.snap_cells, rows + c0 + ring, side="right")
+            spans = [(self.snap_starts[a], self.snap_starts[b]) for a, b in zip(lo, hi) if b > a]
+            if spans:
+                if ring == 0 and max_rings:
+                    continue
+                nodes = np.concatenate([self.snap_nodes[s:e] for s, e in spans])
+                d = haversine_m(lat, lon, self.lat[nodes], self.lon[nodes])
+                return int(nodes[int(np.argmin(d))])
+        return None
+
+    def edge_between(self, u: int, v: int) -> int:
+        """Fastest edge id u -> v."""
+        a, b = int(self.indptr[u]), int(self.indptr[u + 1])
+        best, best_t = -1, float("inf")
+        for e, (w, t) in enumerate(zip(self.dst[a:b].tolist(), self.time[a:b].tolist()), start=a):
+            if w == v and t < best_t:
+                best, best_t = e, t
+        return best
+
+
+def synthetic_grid(rows: int, cols: int, center: Tuple[float, float] = (31.23, 121.47), spacing_m: float = 200.0,
+                   drop: float = 0.05, seed: int = 0):
+    """
+    City-like grid: local streets at 30 km/h, every 10th street an arterial at
+    60 km/h, every 40th an elevated highway at 80 km/h. Returns build_graph() args.
+    """
+    rng = np.random.default_rng(seed)
+    dlat = spacing_m / 111_320
+    dlon = dlat / np.cos(np.radians(center[0]))
+    r, c = np.mgrid[0:rows, 0:cols]
+    lat = center[0] + (r - rows / 2) * dlat + rng.normal(0, dlat * 0.1, r.shape)
+    lon = center[1] + (c - cols / 2) * dlon + rng.normal(0, dlon * 0.1, c.shape)
+    node = (r * cols + c)
+    roads = [f"纬{i}路" for i in range(rows)] + [f"经{j}路" for j in range(cols)]
+
+    def speed(k: np.ndarray) -> np.ndarray:
+        return np.where(k % 40 == 0, 80.0, np.where(k % 10 == 0, 60.0, 30.0)) / 3.6
+
+    # horizontal segments lie on row streets, vertical on column streets
+    h_u, h_v, h_road = node[:, :-1].ravel(), node[:, 1:].ravel(), r[:, :-1].ravel()
+    v_u, v_v, v_road = node[:-1, :].ravel(), node[1:, :].ravel(), rows + c[:-1, :].ravel()
+    u = np.concatenate([h_u, v_u])
+    v = np.concatenate([h_v, v_v])
+    road = np.concatenate([h_road, v_road])
+    street = np.concatenate([r[:, :-1].ravel(), c[:-1, :].ravel()])
+    keep = (rng.random(len(u)) >= drop) | (street % 10 == 0)   # arterials stay intact
+    u, v, road, street = u[keep], v[keep], road[keep], street[keep]
+    lat_f, lon_f = lat.ravel(), lon.ravel()
+    length = _pair_lengths(lat_f, lon_f, u, v)
+    time_s = length / speed(street)
+    flags = np.where(street % 40 == 0, FLAG_HIGHWAY, 0)
+    # both directions
+    src = np.concatenate([u, v])
+    dst = np.concatenate([v, u])
+    return (lat_f, lon_f, src, dst, np.tile(length, 2), np.tile(time_s, 2), np.tile(road, 2),
+            np.tile(flags, 2), roads)
+
+
+def _pair_lengths(lat: np.ndarray, lon: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Haversine length of each (u[i], v[i]) node pair."""
+    p1, p2 = np.radians(lat[u]), np.radians(lat[v])
+    dl = np.radians(lon[v] - lon[u])
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
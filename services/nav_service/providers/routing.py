@@ -0,0 +1,480 @@
+"""
+Route engine over a RoadGraph.
+
+Queries run on a contraction hierarchy when one has been built for the
+graph (<graph>/ch/, memory-mapped like the graph itself) and fall back to
+bidirectional A* otherwise, or when the request has `avoid` flags (the
+hierarchy is built without them).
+
+    python -m services.nav_service.providers.routing grid 300 300 /data/road_graph
+    python -m services.nav_service.providers.routing ch /data/road_graph
+"""
+import heapq
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .poi_index import EARTH_R
+from .road_graph import AVOID_FLAGS, RoadGraph, build_graph, synthetic_grid
+
+CH_VERSION = 1
+WITNESS_SETTLE_LIMIT = 60
+INF = float("inf")
+
+NAV_ROAD_GRAPH = os.getenv("NAV_ROAD_GRAPH", "")
+ROUTE_CACHE_SIZE = int(os.getenv("NAV_ROUTE_CACHE", "1024"))
+
+
+def _hav_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_R * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def astar_bidir(g: RoadGraph, s: int, t: int, avoid: int = 0) -> Optional[Tuple[float, List[int]]]:
+    """
+    Bidirectional A* with the average potential p(v) = (h_t(v) - h_s(v)) / 2.
+    Both directions then see the same consistent reduced costs, so the
+    search can stop once top_f + top_b >= best. Returns (seconds, edge ids).
+    """
+    if s == t:
+        return 0.0, []
+    vmax = g.max_speed_mps * 1.001   # float32 edge lengths round both ways
+    lat, lon = g.lat, g.lon
+    slat, slon, tlat, tlon = float(lat[s]), float(lon[s]), float(lat[t]), float(lon[t])
+    pot: Dict[int, float] = {}
+
+    def p(v: int) -> float:
+        r = pot.get(v)
+        if r is None:
+            vl, vo = float(lat[v]), float(lon[v])
+            r = pot[v] = (_hav_m(vl, vo, tlat, tlon) - _hav_m(vl, vo, slat, slon)) / (2 * vmax)
+        return r
+
+    df, db = {s: 0.0}, {t: 0.0}
+    pf: Dict[int, Tuple[int, int]] = {}     # v -> (edge, node it came from)
+    pb: Dict[int, Tuple[int, int]] = {}     # u -> (edge, node it leads to)
+    hf, hb = [(p(s), s)], [(-p(t), t)]
+    done_f, done_b = set(), set()
+    mu, meet = INF, -1
+    indptr, dst, etime, flags = g.indptr, g.dst, g.time, g.flags
+    rptr, rsrc, redge = g.rev_indptr, g.rev_src, g.rev_edge
+    while hf and hb and hf[0][0] + hb[0][0] < mu:
+        if hf[0][0] <= hb[0][0]:
+            u = heapq.heappop(hf)[1]
+            if u in done_f:
+                continue
+            done_f.add(u)
+            du = df[u]
+            a, b = int(indptr[u]), int(indptr[u + 1])
+            fl = flags[a:b].tolist() if avoid else None
+            for i, (v, w) in enumerate(zip(dst[a:b].tolist(), etime[a:b].tolist())):
+                if fl is not None and fl[i] & avoid:
+                    continue
+                nd = du + w
+                if nd < df.get(v, INF):
+                    df[v] = nd
+                    pf[v] = (a + i, u)
+                    heapq.heappush(hf, (nd + p(v), v))
+                    if v in db and nd + db[v] < mu:
+                        mu, meet = nd + db[v], v
+        else:
+            v = heapq.heappop(hb)[1]
+            if v in done_b:
+                continue
+            done_b.add(v)
+            dv = db[v]
+            a, b = int(rptr[v]), int(rptr[v + 1])
+            edges = redge[a:b].tolist()
+            times = etime[edges].tolist()
+            fl = flags[edges].tolist() if avoid else None
+            for i, (u, e) in enumerate(zip(rsrc[a:b].tolist(), edges)):
+                if fl is not None and fl[i] & avoid:
+                    continue
+                nd = dv + times[i]
+                if nd < db.get(u, INF):
+                    db[u] = nd
+                    pb[u] = (e, v)
+                    heapq.heappush(hb, (nd - p(u), u))
+                    if u in df and nd + df[u] < mu:
+                        mu, meet = nd + df[u], u
+    if meet < 0:
+        return None
+    path: List[int] = []
+    v = meet
+    while v != s:
+        e, v = pf[v]
+        path.append(e)
+    path.reverse()
+    v = meet
+    while v != t:
+        e, v = pb[v]
+        path.append(e)
+    return mu, path
+
+
+# -- contraction hierarchies ---------------------------------------------------
+
+def build_ch(g: RoadGraph, out_dir: Optional[str] = None, log=None) -> str:
+    """
+    Contracts nodes in edge-difference order (lazy updates, hop-limited
+    witness searches) and writes the upward / downward graphs as CSR .npy
+    files. Each CH edge keeps either its original edge id or, for a
+    shortcut, the contracted middle node for unpacking.
+    """
+    out_dir = out_dir or os.path.join(g.path, "ch")
+    n = g.n
+    # out[u][v] = (weight, original edge id or -1, middle node or -1); keep the fastest parallel edge
+    out: List[Dict[int, Tuple[float, int, int]]] = [dict() for _ in range(n)]
+    inn: List[Dict[int, float]] = [dict() for _ in range(n)]
+    indptr = g.indptr[:].tolist()
+    dst = g.dst[:].tolist()
+    wt = g.time[:].tolist()
+    for u in range(n):
+        ou = out[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v, w = dst[e], wt[e]
+            if v != u and w < ou.get(v, (INF,))[0]:
+                ou[v] = (w, e, -1)
+                inn[v][u] = w
+    contracted = bytearray(n)
+    deleted = [0] * n
+
+    def witness(src: int, skip: int, limit: float) -> Dict[int, float]:
+        dist = {src: 0.0}
+        heap = [(0.0, src)]
+        settled = 0
+        while heap and settled < WITNESS_SETTLE_LIMIT:
+            d, x = heapq.heappop(heap)
+            if d > limit:
+                break
+            if d > dist[x]:
+                continue
+            settled += 1
+            for y, (w, _e, _m) in out[x].items():
+                if y == skip or contracted[y]:
+                    continue
+                nd = d + w
+                if nd < dist.get(y, INF):
+                    dist[y] = nd
+                    heapq.heappush(heap, (nd, y))
+        return dist
+
+    def shortcuts(v: int) -> List[Tuple[int, int, float]]:
+        ins = [(u, w) for u, w in inn[v].items() if not contracted[u]]
+        outs = [(x, w) for x, (w, _e, _m) in out[v].items() if not contracted[x]]
+        found = []
+        if not ins or not outs:
+            return found
+        max_out = max(w for _x, w in outs)
+        for u, wu in ins:
+            dist = witness(u, v, wu + max_out)
+            for x, wx in outs:
+                if x != u and dist.get(x, INF) > wu + wx:
+                    found.append((u, x, wu + wx))
+        return found
+
+    def priority(v: int) -> int:
+        deg = sum(1 for u in inn[v] if not contracted[u]) + sum(1 for x in out[v] if not contracted[x])
+        return len(shortcuts(v)) - deg + deleted[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = [0] * n
+    r = 0
+    while heap:
+        _p, v = heapq.heappop(heap)
+        if contracted[v]:
+            continue
+        p = priority(v)
+        if heap and p > heap[0][0]:
+            heapq.heappush(heap, (p, v))
+            continue
+        for u, x, w in shortcuts(v):
+            if w < out[u].get(x, (INF,))[0]:
+                out[u][x] = (w, -1, v)
+                inn[x][u] = w
+        contracted[v] = 1
+        rank[v] = r
+        r += 1
+        for y in list(inn[v]) + list(out[v]):
+            deleted[y] += 1
+        if log and r % 10000 == 0:
+            log(f"contracted {r}/{n}")
+
+    # split every edge into upward (stored at its tail) or downward (stored at its head)
+    up: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(n)]
+    dn: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(n)]
+    for u in range(n):
+        for x, (w, e, mid) in out[u].items():
+            if rank[x] > rank[u]:
+                up[u].append((x, w, e, mid))
+            else:
+                dn[x].append((u, w, e, mid))
+    tmp = out_dir + f".{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, adj in (("up", up), ("dn", dn)):
+        ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in adj], out=ptr[1:])
+        flat = [item for a in adj for item in a]
+        np.save(os.path.join(tmp, f"{name}_indptr.npy"), ptr)
+        np.save(os.path.join(tmp, f"{name}_node.npy"), np.array([f[0] for f in flat], dtype=np.int32))
+        np.save(os.path.join(tmp, f"{name}_w.npy"), np.array([f[1] for f in flat], dtype=np.float64))
+        np.save(os.path.join(tmp, f"{name}_edge.npy"), np.array([f[2] for f in flat], dtype=np.int32))
+        np.save(os.path.join(tmp, f"{name}_mid.npy"), np.array([f[3] for f in flat], dtype=np.int32))
+    np.save(os.path.join(tmp, "rank.npy"), np.array(rank, dtype=np.int32))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": CH_VERSION, "n": n, "edges": int(sum(len(a) for a in up) + sum(len(a) for a in dn))}, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return out_dir
+
+
+class CH:
+    """Memory-mapped hierarchy; up_* is indexed by tail, dn_* by head (node = the other end)."""
+
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != CH_VERSION:
+            raise ValueError(f"ch version {meta.get('version')} != {CH_VERSION}")
+        for name in ("up", "dn"):
+            for part in ("indptr", "node", "w", "edge", "mid"):
+                setattr(self, f"{name}_{part}", np.load(os.path.join(path, f"{name}_{part}.npy"), mmap_mode="r"))
+        self.rank = np.load(os.path.join(path, "rank.npy"), mmap_mode="r")
+
+    def query(self, s: int, t: int) -> Optional[Tuple[float, List[int]]]:
+        """(seconds, original edge ids)."""
+        if s == t:
+            return 0.0, []
+        dist = ({s: 0.0}, {t: 0.0})
+        pred: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})  # v -> (ch edge pos, prev)
+        heaps = ([(0.0, s)], [(0.0, t)])
+        graphs = ((self.up_indptr, self.up_node, self.up_w), (self.dn_indptr, self.dn_node, self.dn_w))
+        mu, meet = INF, -1
+        while True:
+            side = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            if not heaps[side] or heaps[side][0][0] >= mu:
+                break   # the smaller top already can't improve mu, so neither can the other side
+            d, u = heapq.heappop(heaps[side])
+            mine, other = dist[side], dist[1 - side]
+            if d > mine[u]:
+                continue
+            ptr, node, w = graphs[side]
+            a, b = int(ptr[u]), int(ptr[u + 1])
+            for i, (v, wv) in enumerate(zip(node[a:b].tolist(), w[a:b].tolist())):
+                nd = d + wv
+                if nd < mine.get(v, INF):
+                    mine[v] = nd
+                    pred[side][v] = (a + i, u)
+                    heapq.heappush(heaps[side], (nd, v))
+                    if v in other and nd + other[v] < mu:
+                        mu, meet = nd + other[v], v
+            if u in other and d + other[u] < mu:
+                mu, meet = d + other[u], u
+        if meet < 0:
+            return None
+        fwd: List[Tuple[str, int]] = []
+        v = meet
+        while v != s:
+            pos, v = pred[0][v]
+            fwd.append(("up", pos))
+        fwd.reverse()
+        v = meet
+        while v != t:
+            pos, v = pred[1][v]
+            fwd.append(("dn", pos))
+        edges: List[int] = []
+        for kind, pos in fwd:
+            self._unpack(kind, pos, edges)
+        return mu, edges
+
+    def _find(self, a: int, b: int) -> Tuple[str, int]:
+        """CH edge a -> b: stored at a if it goes up, at b if it goes down."""
+        if self.rank[b] > self.rank[a]:
+            kind, at, other = "up", a, b
+        else:
+            kind, at, other = "dn", b, a
+        ptr, node, w = getattr(self, f"{kind}_indptr"), getattr(self, f"{kind}_node"), getattr(self, f"{kind}_w")
+        lo, hi = int(ptr[at]), int(ptr[at + 1])
+        best, best_w = -1, INF
+        for i, (x, wx) in enumerate(zip(node[lo:hi].tolist(), w[lo:hi].tolist())):
+            if x == other and wx < best_w:
+                best, best_w = lo + i, wx
+        return kind, best
+
+    def _unpack(self, kind: str, pos: int, out: List[int]) -> None:
+        stack = [(kind, pos)]
+        while stack:
+            kind, pos = stack.pop()
+            e = int(getattr(self, f"{kind}_edge")[pos])
+            if e >= 0:
+                out.append(e)
+                continue
+            mid = int(getattr(self, f"{kind}_mid")[pos])
+            # tail/head of this CH edge
+            ptr = getattr(self, f"{kind}_indptr")
+            at = int(np.searchsorted(ptr, pos, side="right")) - 1
+            other = int(getattr(self, f"{kind}_node")[pos])
+            a, b = (at, other) if kind == "up" else (other, at)
+            # push second half first so the first half is unpacked first
+            stack.append(self._find(mid, b))
+            stack.append(self._find(a, mid))
+
+
+# -- results -------------------------------------------------------------------
+
+def encode_polyline(points: Sequence[Tuple[float, float]], precision: int = 5) -> str:
+    """Google encoded polyline format."""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            v = ~(delta << 1) if delta < 0 else delta << 1
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1F)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def _bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lon2 - lon1)
+    y = math.sin(dl) * math.cos(p2)
+    x = math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dl)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def _turn(before: float, after: float) -> str:
+    delta = (after - before + 540) % 360 - 180
+    if abs(delta) < 30:
+        return "直行"
+    if abs(delta) > 150:
+        return "掉头"
+    return "右转" if delta > 0 else "左转"
+
+
+def describe_path(g: RoadGraph, s: int, edges: List[int]) -> dict:
+    """distance_m / duration_s / summary / polyline / steps for a list of edge ids."""
+    lat, lon = g.lat, g.lon
+    nodes = [s] + [int(g.dst[e]) for e in edges]
+    coords = [(float(lat[v]), float(lon[v])) for v in nodes]
+    lengths = g.length[edges].astype(np.float64) if edges else np.zeros(0)
+    roads = g.road[edges].tolist() if edges else []
+    steps = []
+    by_road: Dict[int, float] = {}
+    i = 0
+    while i < len(edges):
+        j = i
+        while j + 1 < len(edges) and roads[j + 1] == roads[i]:
+            j += 1
+        name = g.roads[roads[i]]
+        dist = float(lengths[i:j + 1].sum())
+        by_road[roads[i]] = by_road.get(roads[i], 0.0) + dist
+        if i == 0:
+            instruction = f"沿{name}出发"
+        else:
+            before = _bearing(*coords[i - 1], *coords[i])
+            after = _bearing(*coords[i], *coords[i + 1])
+            instruction = f"{_turn(before, after)}进入{name}"
+        steps.append({"instruction": instruction, "distance_m": round(dist, 1)})
+        i = j + 1
+    steps.append({"instruction": "到达目的地", "distance_m": 0})
+    main = sorted(by_road, key=by_road.get, reverse=True)[:2]
+    return {
+        "distance_m": round(float(lengths.sum()), 1),
+        "duration_s": round(float(g.time[edges].astype(np.float64).sum()) if edges else 0.0, 1),
+        "summary": "途经" + "、".join(g.roads[k] for k in main) if main else "已在目的地附近",
+        "polyline": encode_polyline(coords),
+        "steps": steps,
+    }
+
+
+class RouteEngine:
+    """Snap -> LRU cache on (from node, to node, avoid) -> CH or bidirectional A* -> result payload."""
+
+    def __init__(self, graph: RoadGraph, ch: Optional[CH] = None, cache_size: int = ROUTE_CACHE_SIZE) -> None:
+        self.graph = graph
+        self.ch = ch
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, int, int], Optional[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def route(self, origin: Tuple[float, float], destination: Tuple[float, float],
+              avoid: Sequence[str] = ()) -> Optional[dict]:
+        """None when either end can't be snapped or no path exists."""
+        g = self.graph
+        s, t = g.snap(*origin), g.snap(*destination)
+        if s is None or t is None:
+            return None
+        mask = 0
+        for a in avoid:
+            mask |= AVOID_FLAGS.get(a, 0)
+        key = (s, t, mask)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        if self.ch is not None and not mask:
+            found = self.ch.query(s, t)
+        else:
+            found = astar_bidir(g, s, t, mask)
+        result = describe_path(g, s, found[1]) if found is not None else None
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+SEED_DIR = os.path.join(tempfile.gettempdir(), "cockpit_road_seed_v1")
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> RouteEngine:
+    """NAV_ROAD_GRAPH (plus its ch/ if built); otherwise a small synthetic Shanghai grid, built once."""
+    path = NAV_ROAD_GRAPH
+    if not path:
+        path = SEED_DIR
+        if not os.path.exists(os.path.join(path, "ch", "meta.json")):
+            tmp = f"{SEED_DIR}.{os.getpid()}.tmp"
+            build_graph(tmp, *synthetic_grid(40, 40))   # ~8 km square, CH builds in ~2 s
+            build_ch(RoadGraph(tmp), os.path.join(tmp, "ch"))
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)   # another worker won the race
+    g = RoadGraph(path)
+    ch_dir = os.path.join(path, "ch")
+    return RouteEngine(g, CH(ch_dir) if os.path.exists(os.path.join(ch_dir, "meta.json")) else None)
+
+
+def main(argv: List[str]) -> None:
+    if len(argv) == 4 and argv[0] == "grid":
+        build_graph(argv[3], *synthetic_grid(int(argv[1]), int(argv[2])))
+        print(f"wrote {argv[1]}x{argv[2]} grid graph to {argv[3]}")
+    elif len(argv) == 2 and argv[0] == "ch":
+        print(f"wrote {build_ch(RoadGraph(argv[1]), log=print)}")
+    else:
+        print("usage: python -m services.nav_service.providers.routing grid <rows> <cols> <out_dir>\n"
+              "       python -m services.nav_service.providers.routing ch <graph_dir>")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
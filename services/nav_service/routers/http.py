@@ -1,6 +1,10 @@
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from libs.log.tracing import now_ms, mk_trace, new_id
+from libs.log.spans import bind
+from libs.schema_utils.validate import SchemaValidationError, validate_message
+from ..providers.poi_index import get_index
+from ..providers.routing import get_engine
 
 router = APIRouter()
 
@@ -23,25 +27,32 @@ def health():
 
 @router.post("/route")
 def route(req: dict):
+    try:
+        validate_message(req, "schemas/nav/nav_route_request.schema.json")
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
     meta = req.get("meta", {})
     session_id = meta.get("session_id", "demo")
     trace = meta.get("trace")
-    # stub result
-    return envelope("nav.route.result", session_id, trace, {
-        "distance_m": 5200,
-        "duration_s": 780,
-        "summary": "（stub）推荐路线",
-        "polyline": "",
-        "steps": [{"instruction": "直行 1 公里", "distance_m": 1000}]
-    })
+    bind(trace)
+    p = req["payload"]
+    result = get_engine().route((p["origin"]["lat"], p["origin"]["lon"]),
+                                (p["destination"]["lat"], p["destination"]["lon"]), p.get("avoid") or ())
+    if result is None:
+        raise HTTPException(status_code=404, detail={"code": "no_route", "message": "no route between origin and destination", "retryable": False})
+    return envelope("nav.route.result", session_id, trace, result)
 
 @router.post("/poi")
 def poi(req: dict):
+    try:
+        validate_message(req, "schemas/nav/nav_poi_request.schema.json")
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
     meta = req.get("meta", {})
     session_id = meta.get("session_id", "demo")
     trace = meta.get("trace")
-    return envelope("nav.poi.result", session_id, trace, {
-        "items": [
-            {"name": "（stub）Starbucks", "lat": 31.23, "lon": 121.47, "address": "Somewhere", "distance_m": 850}
-        ]
-    })
\ No newline at end of file
+    bind(trace)
+    p = req["payload"]
+    items = get_index().search(p["center"]["lat"], p["center"]["lon"], p["query"],
+                               p.get("radius_m", 5000), p.get("limit", 5))
+    return envelope("nav.poi.result", session_id, trace, {"items": items})
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+from services.nav_service.mcp import server
+from services.nav_service.mcp.server import INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR, NavMCPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+CENTER = (31.23, 121.47)
+
+
+def call(req_id, name, arguments):
+    return {"jsonrpc": "2.0", "id": req_id, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+
+
+def poi(req_id, query="coffee"):
+    return call(req_id, "nav.poi", {"center": {"lat": CENTER[0], "lon": CENTER[1]}, "query": query})
+
+
+def route(req_id, a=CENTER, b=(31.235, 121.475)):
+    return call(req_id, "nav.route", {"origin": {"lat": a[0], "lon": a[1]}, "destination": {"lat": b[0], "lon": b[1]}})
+
+
+def test_slow_call_does_not_hold_up_later_ones_and_cancel_sends_nothing(monkeypatch):
+    gate = threading.Event()
+
+    def blocked_route(args):
+        gate.wait(5)
+        return {"distance_m": 1.0}
+
+    monkeypatch.setitem(server.HANDLERS, "nav.route", blocked_route)
+    monkeypatch.setitem(server.HANDLERS, "nav.poi", lambda args: {"items": []})
+
+    async def go():
+        out = []
+        srv = NavMCPServer(out.append, workers=4)
+        srv.handle(route(1))
+        srv.handle(route(2))
+        srv.handle(poi(3))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if out:
+                break
+        assert [m["id"] for m in out] == [3]               # answered while both routes are still running
+        srv.handle({"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 2}})
+        gate.set()
+        while srv.inflight:
+            await asyncio.sleep(0.01)
+        assert [m["id"] for m in out] == [3, 1]            # the cancelled request gets no reply
+        assert srv.stats == {"requests": 3, "cancelled": 1, "errors": 0}
+        await srv.close()
+
+    asyncio.run(go())
+
+
+def test_protocol_errors():
+    async def go():
+        out = []
+        srv = NavMCPServer(out.append, workers=1)
+        srv.handle({"jsonrpc": "2.0", "id": 1, "method": "nope"})
+        srv.handle(call(2, "nav.teleport", {}))
+        srv.handle(call(3, "nav.poi", {"query": "coffee"}))   # no center
+        srv.handle({"id": 4, "method": "ping"})                 # not JSON-RPC 2.0
+        srv.handle({"jsonrpc": "2.0", "id": 5, "method": "ping"})
+        while srv.inflight:
+            await asyncio.sleep(0.01)
+        got = {m["id"]: m.get("error", {}).get("code") for m in out}
+        assert got == {1: METHOD_NOT_FOUND, 2: INVALID_PARAMS, 3: INVALID_PARAMS, 4: -32600, 5: None}
+        await srv.close()
+
+    asyncio.run(go())
+
+
+def test_stdio_answers_every_pipelined_request():
+    rng = random.Random(0)
+    msgs = [{"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {"protocolVersion": "2025-06-18"}}]
+    for i in range(1, 301):
+        jitter = (CENTER[0] + rng.uniform(-0.01, 0.01), CENTER[1] + rng.uniform(-0.01, 0.01))
+        msgs.append(route(i, CENTER, jitter) if i % 2 else poi(i, rng.choice(["coffee", "parking", "gas"])))
+    lines = [json.dumps(m) for m in msgs] + ["{not json"]
+    proc = subprocess.run([sys.executable, "-m", "services.nav_service.mcp.server"], cwd=ROOT, timeout=120,
+                          input="\n".join(lines) + "\n", capture_output=True, text=True)
+    replies = [json.loads(line) for line in proc.stdout.splitlines()]
+    by_id = {m["id"]: m for m in replies if m["id"] is not None}
+    assert sorted(by_id) == list(range(301))
+    assert by_id[0]["result"]["serverInfo"]["name"] == "cockpit-nav"
+    for i in range(1, 301):
+        assert by_id[i]["result"]["isError"] is False, by_id[i]
+    assert [m["error"]["code"] for m in replies if m["id"] is None] == [PARSE_ERROR]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from services.nav_service.providers.poi_index import (MAX_TOKENS, SHANGHAI, PoiIndex, build_index, haversine_m,
+                                                      synthetic_pois, tokenize)
+
+CENTERS = (SHANGHAI, (31.30, 121.50), (0.0, 179.99))   # the last one sits on the antimeridian edge
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    names, lat, lon, cats, addrs = synthetic_pois(20000, seed=5, centers=CENTERS, spread_deg=0.05)
+    path = str(tmp_path_factory.mktemp("poi"))
+    build_index(path, names, lat, lon, cats, addrs)
+    return PoiIndex(path), (names, np.asarray(lat, np.float32), np.asarray(lon, np.float32), cats)
+
+
+def brute_force(data, lat, lon, query, radius_m, limit):
+    names, lats, lons, cats = data
+    qtoks = tokenize(query)
+    dist = haversine_m(lat, lon, lats, lons)
+    hits = []
+    for i in np.flatnonzero(dist <= radius_m):
+        toks = list(dict.fromkeys(tokenize(names[i])))[:MAX_TOKENS] + tokenize(cats[i])
+        if all(any(t.startswith(q) for t in toks) for q in qtoks):
+            hits.append((round(float(dist[i]), 1), names[i]))
+    return sorted(hits)[:limit]
+
+
+@pytest.mark.parametrize("query", ["", "coffee", "星巴克", "char sta", "tes", "gas 中国", "nothing-like-this"])
+@pytest.mark.parametrize("center, radius_m", [(SHANGHAI, 800), (SHANGHAI, 5000), ((31.30, 121.50), 2500),
+                                              ((0.0, 179.99), 3000), ((45.0, 10.0), 5000)])
+def test_search_matches_brute_force(data, query, center, radius_m):
+    index, raw = data
+    got = index.search(*center, query=query, radius_m=radius_m, limit=10)
+    assert [(p["distance_m"], p["name"]) for p in got] == brute_force(raw, *center, query, radius_m, 10)
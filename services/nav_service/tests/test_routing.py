@@ -0,0 +1,86 @@
+import heapq
+import random
+import pytest
+from services.nav_service.providers.road_graph import FLAG_HIGHWAY, RoadGraph, build_graph, synthetic_grid
+from services.nav_service.providers.routing import CH, RouteEngine, astar_bidir, build_ch
+
+
+@pytest.fixture(scope="module")
+def graph(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("road"))
+    build_graph(path, *synthetic_grid(24, 24, drop=0.15, seed=3))
+    g = RoadGraph(path)
+    return g, CH(build_ch(g))
+
+
+def dijkstra(g: RoadGraph, s: int, t: int, avoid: int = 0):
+    dist, heap = {s: 0.0}, [(0.0, s)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == t:
+            return d
+        if d > dist[u]:
+            continue
+        for e in range(int(g.indptr[u]), int(g.indptr[u + 1])):
+            if avoid and int(g.flags[e]) & avoid:
+                continue
+            v, nd = int(g.dst[e]), d + float(g.time[e])
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return None
+
+
+def check_path(g: RoadGraph, s: int, t: int, edges, avoid: int = 0) -> float:
+    """The edges chain from s to t; returns their total time."""
+    at, total = s, 0.0
+    for e in edges:
+        assert int(g.indptr[at]) <= e < int(g.indptr[at + 1])
+        assert not int(g.flags[e]) & avoid
+        at = int(g.dst[e])
+        total += float(g.time[e])
+    assert at == t
+    return total
+
+
+def pairs(g: RoadGraph, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [(rng.randrange(g.n), rng.randrange(g.n)) for _ in range(n)]
+
+
+def test_ch_and_astar_match_dijkstra(graph):
+    g, ch = graph
+    for s, t in pairs(g, 60):
+        want = dijkstra(g, s, t)
+        for found in (ch.query(s, t), astar_bidir(g, s, t)):
+            if want is None:
+                assert found is None
+                continue
+            cost, edges = found
+            assert cost == pytest.approx(want, rel=1e-5)
+            assert check_path(g, s, t, edges) == pytest.approx(want, rel=1e-5)
+
+
+def test_astar_with_avoid_matches_dijkstra(graph):
+    g, _ = graph
+    for s, t in pairs(g, 40, seed=1):
+        want = dijkstra(g, s, t, FLAG_HIGHWAY)
+        found = astar_bidir(g, s, t, FLAG_HIGHWAY)
+        if want is None:
+            assert found is None
+            continue
+        assert found[0] == pytest.approx(want, rel=1e-5)
+        check_path(g, s, t, found[1], FLAG_HIGHWAY)
+
+
+def test_engine_caches_and_describes(graph):
+    g, ch = graph
+    engine = RouteEngine(g, ch)
+    a = (float(g.lat[0]), float(g.lon[0]))
+    b = (float(g.lat[g.n - 1]), float(g.lon[g.n - 1]))
+    first = engine.route(a, b)
+    assert first is not None and first == engine.route(a, b)
+    assert (engine.hits, engine.misses) == (1, 1)
+    assert first["duration_s"] == pytest.approx(dijkstra(g, 0, g.n - 1), abs=0.1)
+    here = engine.route(a, a)
+    assert here["distance_m"] == 0 and here["steps"] == [{"instruction": "到达目的地", "distance_m": 0}]
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIO = {
+    "name": "dry", "duration_s": 2, "warmup_s": 0.5, "seed": 1,
+    "workloads": {
+        "chat": {"sessions": 3, "interval_s": 0.3},
+        "vehicle": {"sessions": 2, "interval_s": 0.3},
+        "nav": {"sessions": 2, "interval_s": 0.3, "route_ratio": 0.5},
+        "dms": {"sessions": 1, "fps": 5},
+        "audio": {"sessions": 1, "chunk_ms": 20, "utterance_s": 0.5, "pause_s": 0.2},
+    },
+}
+
+
+def test_dry_run_against_the_inproc_target(tmp_path):
+    scenario = dict(SCENARIO, trace_dir=str(tmp_path / "traces"))
+    (tmp_path / "dry.json").write_text(json.dumps(scenario))
+    out = tmp_path / "run.json"
+    # a process of its own: inproc sets TRACE_* before the services are imported
+    subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "loadgen.py"), str(tmp_path / "dry.json"),
+                    "--target", "inproc", "--out", str(out)], cwd=ROOT, check=True, timeout=120)
+    result = json.loads(out.read_text())
+    assert result["target"] == "inproc" and result["unfinished_sessions"] == 0
+    ops = result["ops"]
+    assert {"chat", "vehicle.command", "nav.poi", "dms.frame", "audio.utterance"} <= set(ops)
+    for op, r in ops.items():
+        assert r["requests"] > 0 and r["errors"] == 0, (op, r["error_codes"])
+    # client records joined to the services' spans by trace id
+    assert ops["chat"]["stitched"] == 1.0 and "agent:POST /chat" in ops["chat"]["hops"]
+    assert "vehicle:POST /command" in ops["vehicle.command"]["hops"]
+
+    # a run compared with itself has nothing to report
+    subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "loadgen.py"), str(tmp_path / "dry.json"),
+                    "--target", "inproc", "--duration", "1", "--out", str(tmp_path / "again.json"),
+                    "--compare", str(out), "--threshold", "100"], cwd=ROOT, check=True, timeout=120)
@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+from libs.log.spans import load_trace
+from services.agent_service.core.vehicle_state import VEHICLE_STATE
+from services.agent_service.routers.http import env
+from services.agent_service.tools.dispatch import NAV, VEHICLE
+
+
+@pytest.fixture(scope="module")
+def client():
+    from services.monolith import app
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        # back to what a standalone agent has: loopback HTTP and no local delta feed
+        VEHICLE.local = NAV.local = None
+        VEHICLE_STATE.local_feed = False
+
+
+def chat(client, text: str) -> dict:
+    r = client.post("/agent/chat", json=env("test", "agent.user_utterance", "mono", None,
+                                            {"text": text, "input_modality": "api"}))
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_agent_calls_vehicle_in_process(client):
+    out = chat(client, "把副驾窗开到30%，温度调到24度")
+    assert "车控成功" in out["payload"]["text"]
+    state = client.get("/vehicle/state").json()["payload"]
+    assert state["windows"]["FR"] == 30 and state["ac"]["temp_c"] == 24.0
+    assert VEHICLE._client is None           # no loopback HTTP client was ever opened
+
+    # the hop span and the callee's request span hang off the same trace
+    spans = load_trace(out["meta"]["trace"]["trace_id"], directory="")
+    assert {"vehicle local /commands", "POST /commands"} <= {s["name"] for s in spans}
+    assert {s["service"] for s in spans if s["name"] == "POST /commands"} == {"vehicle"}
+
+
+def test_agent_calls_nav_in_process(client):
+    out = chat(client, "附近的充电站")
+    assert out["payload"]["text"].startswith("为你找到") or out["payload"]["text"] == "附近没有找到相关地点。"
+    assert NAV._client is None
+
+
+def test_sub_apps_and_shared_metrics(client):
+    assert client.get("/health").json()["services"] == ["audio", "agent", "vehicle", "dms", "nav"]
+    for name in ("audio", "agent", "vehicle", "dms", "nav"):
+        assert client.get(f"/{name}/health").status_code == 200
+    assert client.get("/metrics").text.count("# TYPE cockpit_http_request_duration_seconds") == 1
@@ -1,7 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from libs.log.debug import install
+from libs.log.metrics import register_collector
 from .routers.http import router as http_router
-from .routers.ws import router as ws_router
+from .routers.sim import get_fleet, router as sim_router, sim_ticker
+from .routers.ws import delta_ticker, router as ws_router
 
-app = FastAPI(title="vehicle_service")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    tickers = [asyncio.create_task(delta_ticker())]
+    if get_fleet() is not None:
+        tickers.append(asyncio.create_task(sim_ticker()))
+    yield
+    for t in tickers:
+        t.cancel()
+
+app = FastAPI(title="vehicle_service", lifespan=lifespan)
+install(app, "vehicle")
+if get_fleet() is not None:
+    register_collector(get_fleet().metrics)
 app.include_router(http_router)
-app.include_router(ws_router)
\ No newline at end of file
+app.include_router(ws_router)
+app.include_router(sim_router)
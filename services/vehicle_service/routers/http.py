@@ -1,7 +1,11 @@
 from typing import Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Response
+from libs.event_bus.client import get_bus
 from libs.log.tracing import now_ms, mk_trace, new_id
-from ..simulator.state import STATE
+from libs.log.spans import bind
+from libs.schema_utils.validate import SchemaValidationError, validate_envelope, validate_message
+from ..simulator.commands import ALL_OR_NOTHING, resolve, resolve_batch
+from ..simulator.state import STORE
 
 router = APIRouter()
 
@@ -23,70 +27,98 @@ def health():
     return {"ok": True}
 
 @router.get("/state")
-def get_state():
-    return envelope("vehicle", "vehicle.state", "demo", None, {
-        "speed_kph": STATE.speed_kph,
-        "gear": STATE.gear,
-        "windows": STATE.windows,
-        "ac": STATE.ac
-    })
+def get_state(response: Response):
+    version, state = STORE.snapshot()
+    response.headers["ETag"] = str(version)
+    return envelope("vehicle", "vehicle.state", "demo", None, state)
+
+def _expected_version(if_match: Optional[str]) -> Optional[int]:
+    # If-Match: <version> turns the write into a compare-and-set
+    v = if_match.strip('"') if if_match else ""
+    return int(v) if v.isdigit() else None
+
+def _commit(changes: list, expected: Optional[int]):
+    ok, version, state, _ops = STORE.apply(changes, expected)
+    if ok:
+        return version, state, None
+    return version, state, {"code": "version_conflict", "message": f"state is at version {version}",
+                            "detail": {"expected": expected, "version": version}, "retryable": True}
 
 @router.post("/command")
-def command(req: dict):
+async def command(req: dict, response: Response, if_match: Optional[str] = Header(None)):
+    # args are checked by the command registry so bad args still come back as command_rejected
+    try:
+        validate_envelope(req)
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
     meta = req.get("meta", {})
     session_id = meta.get("session_id", "demo")
     trace = meta.get("trace")
-    cmd = (req.get("payload") or {})
-    c = cmd.get("command")
-    args = cmd.get("args") or {}
+    bind(trace)
 
-    err = None
-    if c == "set_window":
-        pos, pct = args.get("position"), args.get("percent")
-        if pos in STATE.windows and isinstance(pct, int) and 0 <= pct <= 100:
-            STATE.windows[pos] = pct
-        else:
-            err = {"code": "bad_args", "message": "invalid window args", "detail": {"args": args}, "retryable": False}
-    elif c == "set_ac":
-        temp, on = args.get("temp_c"), args.get("ac_on")
-        if isinstance(temp, (int, float)) and 16 <= temp <= 30 and isinstance(on, bool):
-            STATE.ac["temp_c"] = float(temp)
-            STATE.ac["ac_on"] = on
-        else:
-            err = {"code": "bad_args", "message": "invalid ac args", "detail": {"args": args}, "retryable": False}
-    elif c == "set_fan_speed":
-        lvl = args.get("level")
-        if isinstance(lvl, int) and 1 <= lvl <= 7:
-            STATE.ac["fan_level"] = lvl
-        else:
-            err = {"code": "bad_args", "message": "invalid fan args", "detail": {"args": args}, "retryable": False}
-    elif c == "set_ac_mode":
-        mode = args.get("mode")
-        if mode in ["face", "feet", "defrost", "auto"]:
-            STATE.ac["mode"] = mode
-        else:
-            err = {"code": "bad_args", "message": "invalid mode", "detail": {"args": args}, "retryable": False}
-    elif c == "set_recirc":
-        ro = args.get("recirc_on")
-        if isinstance(ro, bool):
-            STATE.ac["recirc_on"] = ro
-        else:
-            err = {"code": "bad_args", "message": "invalid recirc arg", "detail": {"args": args}, "retryable": False}
-    elif c == "get_state":
-        pass
+    changes, err = resolve(req.get("payload") or {})
+    if err:
+        version, state = STORE.snapshot()
     else:
-        err = {"code": "unknown_command", "message": f"unknown command: {c}", "detail": {"command": c}, "retryable": False}
+        version, state, err = _commit(changes, _expected_version(if_match))
 
     event_payload = {
         "event": "command_rejected" if err else "state_changed",
-        "state": {
-            "speed_kph": STATE.speed_kph,
-            "gear": STATE.gear,
-            "windows": STATE.windows,
-            "ac": STATE.ac
-        }
+        "state": state,
+        "version": version
+    }
+    if err:
+        event_payload["error"] = err
+
+    response.headers["ETag"] = str(version)
+    out = envelope("vehicle", "vehicle.event", session_id, trace, event_payload)
+    await get_bus().publish("vehicle.event", out)
+    return out
+
+@router.post("/commands")
+async def commands(req: dict, response: Response, if_match: Optional[str] = Header(None)):
+    """
+    Ordered batch of vehicle_command payloads applied as one state version.
+    payload: {"commands": [...], "mode": "all_or_nothing" | "best_effort"}
+    """
+    try:
+        validate_message(req, "schemas/vehicle/vehicle_command_batch.schema.json")
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
+    meta = req.get("meta", {})
+    session_id = meta.get("session_id", "demo")
+    trace = meta.get("trace")
+    bind(trace)
+    payload = req.get("payload") or {}
+
+    changes, results, all_ok = resolve_batch(payload.get("commands") or [], payload.get("mode", ALL_OR_NOTHING))
+    applied = any(r["ok"] for r in results) or all_ok
+    if applied:
+        version, state, err = _commit(changes, _expected_version(if_match))
+        if err:
+            applied = False
+            for r in results:
+                if r["ok"]:
+                    r["ok"] = False
+                    r["error"] = err
+    else:
+        version, state = STORE.snapshot()
+        err = None
+    if err is None and not all_ok:
+        failed = sum(1 for r in results if not r["ok"])
+        err = {"code": "batch_partial" if applied else "batch_rejected",
+               "message": f"{failed}/{len(results)} commands failed", "retryable": False}
+
+    event_payload = {
+        "event": "state_changed" if applied else "command_rejected",
+        "state": state,
+        "version": version,
+        "results": results
     }
     if err:
         event_payload["error"] = err
 
-    return envelope("vehicle", "vehicle.event", session_id, trace, event_payload)
\ No newline at end of file
+    response.headers["ETag"] = str(version)
+    out = envelope("vehicle", "vehicle.event", session_id, trace, event_payload)
+    await get_bus().publish("vehicle.event", out)
+    return out
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from fastapi import APIRouter, HTTPException, Response
+from libs.event_bus.client import get_bus
+from libs.log.metrics import histogram
+from libs.log.spans import bind
+from libs.schema_utils.validate import SchemaValidationError, validate_envelope
+from ..simulator.commands import resolve
+from .http import envelope
+
+router = APIRouter()
+
+VEHICLE_SIM_FLEET = int(os.getenv("VEHICLE_SIM_FLEET", "0"))   # simulated vehicles; 0 = off
+VEHICLE_SIM_HZ = float(os.getenv("VEHICLE_SIM_HZ", "10"))
+VEHICLE_SIM_DRIVE = os.getenv("VEHICLE_SIM_DRIVE", "1") != "0"  # random driver moves the fleet
+EVENT_TOPIC = "vehicle.event"
+
+SIM_TICK_SECONDS = histogram("cockpit_vehicle_sim_tick_seconds",
+                             "Simulated fleet: one tick, including publishing its vehicle.event deltas.")
+
+_FLEET = None     # simulator.physics.Fleet; imported (with NumPy) only when the fleet is on
+_STATS = {"overruns": 0}
+
+
+def get_fleet():
+    global _FLEET
+    if _FLEET is None and VEHICLE_SIM_FLEET > 0:
+        from ..simulator.physics import Fleet
+        _FLEET = Fleet(VEHICLE_SIM_FLEET, drive=VEHICLE_SIM_DRIVE,
+                       ids=[f"sim-{i:05d}" for i in range(VEHICLE_SIM_FLEET)])
+    return _FLEET
+
+
+async def sim_ticker() -> None:
+    """
+    One task per process: ticks the fleet at VEHICLE_SIM_HZ and publishes a
+    vehicle.event per changed vehicle, session_id = vehicle id. Steps are
+    fixed (1 / VEHICLE_SIM_HZ) so the simulation doesn't depend on
+    scheduling; a tick that runs late drops the backlog instead of bursting.
+    """
+    fleet = get_fleet()
+    bus = get_bus()
+    h = SIM_TICK_SECONDS.labels()
+    period = 1 / VEHICLE_SIM_HZ
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+    while True:
+        due += period
+        delay = due - loop.time()
+        if delay < 0:
+            _STATS["overruns"] += 1
+            due = loop.time()
+        await asyncio.sleep(max(delay, 0))
+        t0 = time.perf_counter_ns()
+        for i, payload in fleet.events(fleet.tick(period)):
+            await bus.publish(EVENT_TOPIC, envelope("vehicle", "vehicle.event", fleet.ids[i], None, payload))
+        h.observe_ns(time.perf_counter_ns() - t0)
+
+
+def _vehicle(vehicle_id: str) -> int:
+    fleet = get_fleet()
+    i = fleet.index.get(vehicle_id) if fleet is not None else None
+    if i is None:
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": f"no simulated vehicle {vehicle_id}",
+                                                     "detail": {"vehicle_id": vehicle_id}, "retryable": False})
+    return i
+
+
+@router.get("/sim")
+async def sim_stats():
+    fleet = get_fleet()
+    if fleet is None:
+        return {"vehicles": 0}
+    return {"vehicles": fleet.n, "hz": VEHICLE_SIM_HZ, "drive": fleet.drive, "ticks": fleet.ticks,
+            "events": fleet.events_out, "overruns": _STATS["overruns"]}
+
+
+@router.get("/sim/{vehicle_id}/state")
+async def sim_state(vehicle_id: str, response: Response):
+    i = _vehicle(vehicle_id)
+    version, state = get_fleet().state(i)
+    response.headers["ETag"] = str(version)
+    return envelope("vehicle", "vehicle.state", vehicle_id, None, state)
+
+
+@router.post("/sim/{vehicle_id}/command")
+async def sim_command(vehicle_id: str, req: dict, response: Response):
+    """
+    Same vehicle_command envelope as /command, for one simulated vehicle. It
+    sets targets: the state moves over the next ticks and arrives as
+    vehicle.event deltas, so the reply carries the state as published now.
+    """
+    try:
+        validate_envelope(req)
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=e.to_error())
+    i = _vehicle(vehicle_id)
+    trace = req.get("meta", {}).get("trace")
+    bind(trace)
+    changes, err = resolve(req.get("payload") or {})
+    fleet = get_fleet()
+    if not err:
+        fleet.command(i, changes)
+    version, state = fleet.state(i)
+    payload = {"event": "command_rejected" if err else "state_changed", "state": state, "version": version}
+    if err:
+        payload["error"] = err
+    response.headers["ETag"] = str(version)
+    return envelope("vehicle", "vehicle.event", vehicle_id, trace, payload)
@@ -1,10 +1,83 @@
-from fastapi import APIRouter, WebSocket
+import asyncio
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from libs.event_bus.client import get_bus
+from libs.log.tracing import now_ms, mk_trace, new_id
+from ..simulator.state import STORE
 
 router = APIRouter()
 
+DELTA_TOPIC = "vehicle.delta"
+# bursts of writes inside one tick go out as a single coalesced frame
+TICK_S = float(os.getenv("VEHICLE_DELTA_TICK_MS", "100")) / 1000
+
+def _frame(typ: str, payload: dict) -> str:
+    out = {
+        "meta": {
+            "message_id": new_id("m_"),
+            "timestamp_ms": now_ms(),
+            "source": "vehicle",
+            "type": typ,
+            "session_id": "demo",
+            "trace": mk_trace(None),
+        },
+        "payload": payload
+    }
+    return json.dumps(out, ensure_ascii=False)
+
+def catch_up_frame(since: Optional[int]) -> str:
+    if since is not None:
+        version, ops = STORE.delta_since(since)
+        if ops is not None:
+            return _frame("vehicle.state.delta", {"from_version": since, "version": version, "ops": ops})
+    version, state = STORE.snapshot()
+    return _frame("vehicle.state.snapshot", {"version": version, "state": state})
+
+async def delta_ticker() -> None:
+    """One task per process: publishes coalesced deltas to every /ws/vehicle client."""
+    bus = get_bus()
+    last = STORE.version
+    while True:
+        await asyncio.sleep(TICK_S)
+        if STORE.version == last:
+            continue
+        version, ops = STORE.delta_since(last)
+        if ops is None:
+            version, state = STORE.snapshot()
+            data = _frame("vehicle.state.snapshot", {"version": version, "state": state})
+        else:
+            data = _frame("vehicle.state.delta", {"from_version": last, "version": version, "ops": ops})
+        await bus.publish(DELTA_TOPIC, data)
+        last = version
+
+def _since(raw: Optional[str]) -> Optional[int]:
+    return int(raw) if raw is not None and raw.isdigit() else None
+
 @router.websocket("/ws/vehicle")
 async def ws_vehicle(ws: WebSocket):
-    # Demo: keep connection alive; later push vehicle.event from simulator
+    """
+    Pushes vehicle.state.snapshot once, then vehicle.state.delta frames.
+    Connect with ?since=<version> (or send {"since": N}) to resume; frames
+    whose version is not newer than what the client holds can be ignored.
+    """
     await ws.accept()
-    while True:
-        await ws.receive_text()
\ No newline at end of file
+    bus = get_bus()
+    # subscribe before reading the store so no delta falls in between; catch-up goes through the
+    # subscription's queue (the bus's sender task is the only writer) and supersedes deltas queued before it
+    await bus.subscribe(DELTA_TOPIC, ws)
+    try:
+        await bus.send(DELTA_TOPIC, ws, [catch_up_frame(_since(ws.query_params.get("since")))], replace=True)
+        while True:
+            raw = await ws.receive_text()
+            try:
+                since = json.loads(raw).get("since")
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(since, int):
+                await bus.send(DELTA_TOPIC, ws, [catch_up_frame(since)], replace=True)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await bus.unsubscribe(DELTA_TOPIC, ws)
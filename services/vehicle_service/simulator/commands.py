@@ -0,0 +1,85 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from libs.schema_utils.validate import SchemaValidationError, get_registry
+from .state import Change
+
+COMMAND_SCHEMA = "schemas/vehicle/vehicle_command.schema.json"
+
+ALL_OR_NOTHING = "all_or_nothing"
+BEST_EFFORT = "best_effort"
+
+
+class CommandSpec:
+    __slots__ = ("name", "validate", "changes")
+
+    def __init__(self, name: str, validate: Callable[[Any], None], changes: Callable[[dict], List[Change]]) -> None:
+        self.name = name
+        self.validate = validate
+        self.changes = changes
+
+
+def _args_schemas() -> Dict[str, dict]:
+    # per-command `args` subschemas from the if/then blocks of vehicle_command.schema.json
+    out = {}
+    for rule in get_registry().raw(COMMAND_SCHEMA).get("allOf", ()):
+        name = rule["if"]["properties"]["command"]["const"]
+        out[name] = rule["then"]["properties"]["args"]
+    return out
+
+
+COMMANDS: Dict[str, CommandSpec] = {}
+
+
+def register(name: str, changes: Callable[[dict], List[Change]]) -> None:
+    schema = _ARGS.get(name, {"type": "object"})
+    COMMANDS[name] = CommandSpec(name, get_registry().compile(schema, f"{COMMAND_SCHEMA}#{name}"), changes)
+
+
+_ARGS = _args_schemas()
+
+register("set_window", lambda a: [(("windows", a["position"]), int(a["percent"]))])
+register("set_ac", lambda a: [(("ac", "temp_c"), float(a["temp_c"])), (("ac", "ac_on"), a["ac_on"])])
+register("set_fan_speed", lambda a: [(("ac", "fan_level"), int(a["level"]))])
+register("set_ac_mode", lambda a: [(("ac", "mode"), a["mode"])])
+register("set_recirc", lambda a: [(("ac", "recirc_on"), a["recirc_on"])])
+register("get_state", lambda a: [])
+
+
+def resolve(cmd: dict) -> Tuple[List[Change], Optional[dict]]:
+    """(changes, error) for one vehicle_command payload; error follows error.schema.json."""
+    c = cmd.get("command")
+    spec = COMMANDS.get(c)
+    if spec is None:
+        return [], {"code": "unknown_command", "message": f"unknown command: {c}", "detail": {"command": c}, "retryable": False}
+    args = cmd.get("args") or {}
+    try:
+        spec.validate(args)
+    except SchemaValidationError as e:
+        return [], {"code": "bad_args", "message": f"invalid {c} args: {e.message}", "detail": {"args": args, "path": e.path}, "retryable": False}
+    return spec.changes(args), None
+
+
+def resolve_batch(cmds: List[dict], mode: str = ALL_OR_NOTHING) -> Tuple[List[Change], List[dict], bool]:
+    """
+    Resolve an ordered batch. Returns (changes to apply, per-command results,
+    all_ok). In all_or_nothing mode any failure leaves `changes` empty.
+    """
+    changes: List[Change] = []
+    results: List[dict] = []
+    all_ok = True
+    for i, cmd in enumerate(cmds):
+        ch, err = resolve(cmd if isinstance(cmd, dict) else {})
+        res = {"index": i, "command": str(cmd.get("command") if isinstance(cmd, dict) else ""), "ok": err is None}
+        if err:
+            res["error"] = err
+            all_ok = False
+        else:
+            changes.extend(ch)
+        results.append(res)
+    if not all_ok and mode == ALL_OR_NOTHING:
+        aborted = {"code": "batch_aborted", "message": "another command in the batch failed", "retryable": False}
+        for res in results:
+            if res["ok"]:
+                res["ok"] = False
+                res["error"] = aborted
+        return [], results, False
+    return changes, results, all_ok
@@ -0,0 +1,209 @@
+"""
+Tick-based physics for a fleet of simulated vehicles.
+
+The fleet is a struct of NumPy arrays, one row per vehicle, so tick()
+moves thousands of vehicles in a handful of vectorized steps instead of a
+Python loop per vehicle:
+
+    fleet = Fleet(5000, drive=True, seed=1)
+    fleet.command(42, [(("windows", "FR"), 100)])   # changes as produced by commands.resolve()
+    changed = fleet.tick(0.1)                       # indices whose published state moved
+    for i, payload in fleet.events(changed):        # vehicle.event payloads for just those
+        ...
+
+- window motors travel WINDOW_PCT_PER_S toward their target position
+- the cabin relaxes toward the AC setpoint (faster at a higher fan level),
+  or toward the outside temperature with the AC off
+- speed follows its target within acceleration / braking limits and stops
+  before changing direction; the gear follows (P parked, D forward, R back)
+- with drive=True a random driver picks target speeds, window positions and
+  setpoints, so an idle fleet still produces a realistic event stream
+
+Every tick quantizes the published fields the way vehicle_state.schema.json
+has them (window % as int, speed and temperatures to 0.1) into one int16
+matrix and compares it with what each vehicle last published; only rows
+with a difference become events, carrying the replace ops of the fields
+that changed and a per-vehicle version.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from .state import Change, VehicleSimState
+
+WINDOWS = ("FL", "FR", "RL", "RR")
+GEARS = ("P", "R", "N", "D", "S")
+AC_MODES = ("face", "feet", "defrost", "auto")
+_P, _R, _D = GEARS.index("P"), GEARS.index("R"), GEARS.index("D")
+
+WINDOW_PCT_PER_S = 25.0     # full travel in 4 s
+ACCEL_KPH_S = 10.0          # ~2.8 m/s^2
+BRAKE_KPH_S = 18.0          # ~5 m/s^2
+AC_TAU_S = 90.0             # cabin time constant at fan level 7; proportionally slower below
+AMBIENT_TAU_S = 600.0       # drift toward the outside temperature with the AC off
+MOVING_KPH = 0.05
+
+# random driver: mean seconds between decisions of each kind, and what it picks from
+DRIVE_SPEED_HOLD_S = 30.0
+DRIVE_WINDOW_HOLD_S = 120.0
+DRIVE_SETPOINT_HOLD_S = 300.0
+DRIVE_SPEEDS = np.array([0, 0, 30, 50, 60, 80, 110, -8], dtype=np.float32)
+DRIVE_WINDOW = np.array([0, 0, 30, 100], dtype=np.float32)
+DRIVE_SETPOINTS = np.arange(18.0, 26.5, 0.5, dtype=np.float32)
+
+# columns of the published matrix: JSON-patch path and int16 -> JSON value
+_tenths = (lambda v: v / 10)
+COLUMNS: Tuple[Tuple[str, object], ...] = (
+    *((f"/windows/{w}", int) for w in WINDOWS),
+    ("/speed_kph", _tenths),
+    ("/gear", GEARS.__getitem__),
+    ("/cabin_temp_c", _tenths),
+    ("/ac/temp_c", _tenths),
+    ("/ac/ac_on", bool),
+    ("/ac/fan_level", int),
+    ("/ac/mode", AC_MODES.__getitem__),
+    ("/ac/recirc_on", bool),
+)
+_PATHS = [p for p, _ in COLUMNS]
+_DECODE = [d for _, d in COLUMNS]
+
+# command path -> (array, column) it sets
+_TARGETS = {
+    **{("windows", w): ("window_target", k) for k, w in enumerate(WINDOWS)},
+    ("speed_kph",): ("velocity_target", None),
+    ("ac", "temp_c"): ("setpoint", None),
+    ("ac", "ac_on"): ("ac_on", None),
+    ("ac", "fan_level"): ("fan", None),
+    ("ac", "mode"): ("ac_mode", None),
+    ("ac", "recirc_on"): ("recirc", None),
+}
+
+
+class Fleet:
+    def __init__(self, n: int, initial: Optional[VehicleSimState] = None, ambient_c: float = 28.0,
+                 drive: bool = False, seed: Optional[int] = None, ids: Optional[Sequence[str]] = None) -> None:
+        s = initial or VehicleSimState()
+        f32 = np.float32
+        self.n = n
+        self.ids = list(ids) if ids is not None else [f"veh-{i:05d}" for i in range(n)]
+        self.index = {vid: i for i, vid in enumerate(self.ids)}
+        self.drive = drive
+        self.rng = np.random.default_rng(seed)
+        # physical state and the targets it moves toward
+        self.window = np.tile(np.array([s.windows[w] for w in WINDOWS], f32), (n, 1))
+        self.window_target = self.window.copy()
+        self.velocity = np.full(n, s.speed_kph, f32)     # kph, negative while reversing
+        self.velocity_target = self.velocity.copy()
+        self.gear = np.full(n, GEARS.index(s.gear), np.int8)
+        self.ambient = np.full(n, ambient_c, f32)
+        self.cabin = self.ambient.copy()
+        # settings: changed by commands (or the driver) and published as they are
+        self.setpoint = np.full(n, s.ac["temp_c"], f32)
+        self.ac_on = np.full(n, s.ac["ac_on"], bool)
+        self.fan = np.full(n, s.ac["fan_level"], np.int8)
+        self.ac_mode = np.full(n, AC_MODES.index(s.ac["mode"]), np.int8)
+        self.recirc = np.full(n, s.ac["recirc_on"], bool)
+        self.version = np.zeros(n, np.int64)
+        self.ticks = 0
+        self.events_out = 0
+        # published fields as of the last tick, and as each vehicle last published them
+        self._q = np.zeros((n, len(COLUMNS)), np.int16)
+        self._quantize()
+        self._pub = self._q.copy()
+
+    def command(self, i: int, changes: Iterable[Change]) -> None:
+        """Set targets and settings from vehicle command changes; motion follows over the next ticks."""
+        for path, value in changes:
+            name, col = _TARGETS[tuple(path)]
+            if name == "ac_mode":
+                value = AC_MODES.index(value)
+            if col is None:
+                getattr(self, name)[i] = value
+            else:
+                getattr(self, name)[i, col] = value
+
+    def tick(self, dt: float) -> np.ndarray:
+        """Advance every vehicle by dt seconds; indices of the vehicles whose published state changed."""
+        if self.drive:
+            self._drive(dt)
+        step = WINDOW_PCT_PER_S * dt
+        self.window += np.clip(self.window_target - self.window, -step, step)
+
+        v = self.velocity
+        target = np.where(v * self.velocity_target < 0, 0, self.velocity_target)
+        limit = np.where(np.abs(target) > np.abs(v), ACCEL_KPH_S * dt, BRAKE_KPH_S * dt)
+        v += np.clip(target - v, -limit, limit)
+        self.gear = np.select([v > MOVING_KPH, v < -MOVING_KPH, target > 0, target < 0],
+                              [_D, _R, _D, _R], _P).astype(np.int8)
+
+        rate = np.where(self.ac_on, self.fan / np.float32(7 * AC_TAU_S), np.float32(1 / AMBIENT_TAU_S))
+        goal = np.where(self.ac_on, self.setpoint, self.ambient)
+        self.cabin += (goal - self.cabin) * -np.expm1(-rate * dt)
+
+        self.ticks += 1
+        self._quantize()
+        return np.flatnonzero((self._q != self._pub).any(axis=1))
+
+    def events(self, idx: np.ndarray) -> List[Tuple[int, dict]]:
+        """(vehicle index, vehicle.event payload) for the given vehicles, marking their state published."""
+        if not len(idx):
+            return []
+        rows = self._q[idx]
+        diff = rows != self._pub[idx]
+        self._pub[idx] = rows
+        self.version[idx] += 1
+        out = []
+        for i, row, d, version in zip(idx.tolist(), rows.tolist(), diff.tolist(), self.version[idx].tolist()):
+            ops = [{"op": "replace", "path": _PATHS[c], "value": _DECODE[c](row[c])} for c, x in enumerate(d) if x]
+            out.append((i, {"event": "state_changed", "state": _state(row), "version": version, "ops": ops}))
+        self.events_out += len(out)
+        return out
+
+    def state(self, i: int) -> Tuple[int, dict]:
+        """(version, state) as vehicle i last published it."""
+        return int(self.version[i]), _state(self._pub[i].tolist())
+
+    def metrics(self) -> list:
+        """Collector for libs.log.metrics."""
+        return [
+            ("cockpit_vehicle_sim_vehicles", "gauge", "Simulated vehicles.", [({}, self.n)]),
+            ("cockpit_vehicle_sim_moving", "gauge", "Simulated vehicles in motion.",
+             [({}, int(np.count_nonzero(np.abs(self.velocity) > MOVING_KPH)))]),
+            ("cockpit_vehicle_sim_ticks_total", "counter", "Simulation ticks.", [({}, self.ticks)]),
+            ("cockpit_vehicle_sim_events_total", "counter", "vehicle.event deltas emitted.", [({}, self.events_out)]),
+        ]
+
+    def _quantize(self) -> None:
+        q = self._q
+        q[:, 0:4] = np.rint(self.window)
+        q[:, 4] = np.rint(np.abs(self.velocity) * 10)
+        q[:, 5] = self.gear
+        q[:, 6] = np.rint(self.cabin * 10)
+        q[:, 7] = np.rint(self.setpoint * 10)
+        q[:, 8] = self.ac_on
+        q[:, 9] = self.fan
+        q[:, 10] = self.ac_mode
+        q[:, 11] = self.recirc
+
+    def _drive(self, dt: float) -> None:
+        rng, n = self.rng, self.n
+        r = rng.random((3, n), dtype=np.float32)
+        pick = np.flatnonzero(r[0] < dt / DRIVE_SPEED_HOLD_S)
+        if pick.size:
+            self.velocity_target[pick] = rng.choice(DRIVE_SPEEDS, pick.size)
+        pick = np.flatnonzero(r[1] < dt / DRIVE_WINDOW_HOLD_S)
+        if pick.size:
+            self.window_target[pick, rng.integers(0, len(WINDOWS), pick.size)] = rng.choice(DRIVE_WINDOW, pick.size)
+        pick = np.flatnonzero(r[2] < dt / DRIVE_SETPOINT_HOLD_S)
+        if pick.size:
+            self.setpoint[pick] = rng.choice(DRIVE_SETPOINTS, pick.size)
+
+
+def _state(row: List[int]) -> dict:
+    d = _DECODE
+    return {
+        "speed_kph": d[4](row[4]),
+        "gear": d[5](row[5]),
+        "windows": {w: row[k] for k, w in enumerate(WINDOWS)},
+        "ac": {"ac_on": d[8](row[8]), "temp_c": d[7](row[7]), "fan_level": row[9], "mode": d[10](row[10]),
+               "recirc_on": d[11](row[11])},
+        "cabin_temp_c": d[6](row[6]),
+    }
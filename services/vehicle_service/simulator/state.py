@@ -1,4 +1,7 @@
+import threading
+from collections import deque
 from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
 
 @dataclass
 class VehicleSimState:
@@ -9,4 +12,92 @@ class VehicleSimState:
         "ac_on": True, "temp_c": 24.0, "fan_level": 2, "mode": "auto", "recirc_on": False
     })
 
-STATE = VehicleSimState()
\ No newline at end of file
+    def to_dict(self) -> dict:
+        return {"speed_kph": self.speed_kph, "gear": self.gear, "windows": dict(self.windows), "ac": dict(self.ac)}
+
+
+# ("windows", "FR") / ("speed_kph",) -> value
+Path = Tuple[str, ...]
+Change = Tuple[Path, Any]
+
+HISTORY = 1024
+
+
+class VehicleStateStore:
+    """
+    Versioned, copy-on-write vehicle state.
+
+    Snapshots are never mutated after publication, so readers share them
+    without copying. Every effective write bumps `version` and records the
+    JSON-patch-style ops in a bounded history used to serve deltas.
+    """
+
+    def __init__(self, initial: Optional[VehicleSimState] = None, history: int = HISTORY) -> None:
+        self._state = (initial or VehicleSimState()).to_dict()
+        self._version = 0
+        self._history: Deque[Tuple[int, List[dict]]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self) -> Tuple[int, dict]:
+        # (version, state) read together; state must be treated as read-only
+        with self._lock:
+            return self._version, self._state
+
+    def apply(self, changes: Sequence[Change], expected_version: Optional[int] = None) -> Tuple[bool, int, dict, List[dict]]:
+        """
+        Compare-and-set: applies all changes atomically if `expected_version`
+        is None or still current. Returns (ok, version, state, ops).
+        """
+        with self._lock:
+            if expected_version is not None and expected_version != self._version:
+                return False, self._version, self._state, []
+            ops = []
+            new = None
+            for path, value in changes:
+                cur = new if new is not None else self._state
+                for k in path:
+                    cur = cur[k]
+                if cur == value and type(cur) is type(value):
+                    continue
+                if new is None:
+                    new = dict(self._state)
+                if len(path) == 1:
+                    new[path[0]] = value
+                else:
+                    section = new[path[0]]
+                    if section is self._state[path[0]]:
+                        section = new[path[0]] = dict(section)
+                    section[path[1]] = value
+                ops.append({"op": "replace", "path": "/" + "/".join(path), "value": value})
+            if new is not None:
+                self._state = new
+                self._version += 1
+                self._history.append((self._version, ops))
+            return True, self._version, self._state, ops
+
+    def delta_since(self, version: int) -> Tuple[int, Optional[List[dict]]]:
+        """
+        (current_version, ops) taking a client from `version` to current, with
+        the last write per path winning. ops is None when the history no longer
+        reaches back that far and the client needs a full snapshot.
+        """
+        with self._lock:
+            cur = self._version
+            if version == cur:
+                return cur, []
+            if version > cur or not self._history or self._history[0][0] > version + 1:
+                return cur, None
+            merged: Dict[str, dict] = {}
+            for v, ops in self._history:
+                if v > version:
+                    for op in ops:
+                        merged.pop(op["path"], None)
+                        merged[op["path"]] = op
+            return cur, list(merged.values())
+
+
+STORE = VehicleStateStore()
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from services.vehicle_service.app import app
+from services.vehicle_service.routers.http import envelope
+from services.vehicle_service.simulator.state import STORE
+
+
+def message(typ: str, payload: dict) -> dict:
+    return envelope("agent", typ, "s1", None, payload)
+
+
+def window(position: str, percent: int) -> dict:
+    return {"command": "set_window", "args": {"position": position, "percent": percent}}
+
+
+BAD = {"command": "set_window", "args": {"position": "XX", "percent": 10}}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def batch(client, commands, mode, **headers):
+    r = client.post("/commands", json=message("vehicle.command_batch", {"commands": commands, "mode": mode}),
+                    headers=headers)
+    assert r.status_code == 200
+    return r.json()["payload"], r.headers["ETag"]
+
+
+def test_all_or_nothing_applies_nothing_on_one_failure(client):
+    before = STORE.version
+    out, etag = batch(client, [window("FL", 11), BAD], "all_or_nothing")
+    assert out["event"] == "command_rejected" and out["error"]["code"] == "batch_rejected"
+    assert [r["ok"] for r in out["results"]] == [False, False]
+    assert out["results"][0]["error"]["code"] == "batch_aborted"
+    assert out["results"][1]["error"]["code"] == "bad_args"
+    assert STORE.version == before and etag == str(before)
+
+
+def test_best_effort_applies_the_rest_as_one_version(client):
+    before = STORE.version
+    out, etag = batch(client, [window("FL", 12), BAD, window("FR", 13)], "best_effort")
+    assert out["event"] == "state_changed" and out["error"]["code"] == "batch_partial"
+    assert [r["ok"] for r in out["results"]] == [True, False, True]
+    assert out["state"]["windows"]["FL"] == 12 and out["state"]["windows"]["FR"] == 13
+    assert out["version"] == before + 1 and etag == str(before + 1)
+
+
+def test_if_match_is_a_compare_and_set(client):
+    version = int(client.get("/state").headers["ETag"])
+    r = client.post("/command", json=message("vehicle.command", window("RL", 21)), headers={"If-Match": f'"{version}"'})
+    assert r.json()["payload"]["event"] == "state_changed" and r.headers["ETag"] == str(version + 1)
+
+    # a second writer still holding the old version loses
+    r = client.post("/command", json=message("vehicle.command", window("RL", 22)), headers={"If-Match": str(version)})
+    out = r.json()["payload"]
+    assert out["event"] == "command_rejected" and out["error"]["code"] == "version_conflict"
+    assert out["error"]["detail"] == {"expected": version, "version": version + 1}
+    assert out["state"]["windows"]["RL"] == 21
+
+    out, _ = batch(client, [window("RR", 23)], "best_effort", **{"If-Match": str(version)})
+    assert out["event"] == "command_rejected" and out["results"][0]["error"]["code"] == "version_conflict"
+    assert STORE.version == version + 1
@@ -0,0 +1,69 @@
+import numpy as np
+from services.vehicle_service.simulator import physics
+from services.vehicle_service.simulator.physics import Fleet
+
+
+def still_fleet(n: int = 3) -> Fleet:
+    # cabin already at the setpoint: nothing moves until told to
+    return Fleet(n, ambient_c=24.0)
+
+
+def test_windows_travel_at_the_motor_rate():
+    f = still_fleet()
+    f.command(1, [(("windows", "FR"), 100), (("windows", "RL"), 30)])
+    f.tick(1.0)
+    assert f.window[1].tolist() == [0, physics.WINDOW_PCT_PER_S, physics.WINDOW_PCT_PER_S, 0]
+    f.tick(1.0)
+    assert f.window[1].tolist() == [0, 50, 30, 0]          # RL stops at its target
+    for _ in range(3):
+        f.tick(1.0)
+    assert f.window[1].tolist() == [0, 100, 30, 0]
+    assert not f.window[0].any() and not f.window[2].any()
+
+
+def test_speed_follows_accel_and_brake_limits_and_the_gear_follows():
+    f = still_fleet(1)
+    f.command(0, [(("speed_kph",), 30)])
+    f.tick(0.5)
+    assert np.isclose(f.velocity[0], physics.ACCEL_KPH_S * 0.5)
+    assert physics.GEARS[f.gear[0]] == "D"
+    for _ in range(10):
+        f.tick(0.5)
+    assert np.isclose(f.velocity[0], 30)
+
+    f.command(0, [(("speed_kph",), -8)])                    # reverse: brake to a stop first
+    f.tick(1.0)
+    assert np.isclose(f.velocity[0], 30 - physics.BRAKE_KPH_S)
+    assert physics.GEARS[f.gear[0]] == "D"
+    f.tick(1.0)
+    assert np.isclose(f.velocity[0], 0) and physics.GEARS[f.gear[0]] == "P"   # standstill before reversing
+    f.tick(0.5)
+    assert np.isclose(f.velocity[0], -5) and physics.GEARS[f.gear[0]] == "R"
+
+    f.command(0, [(("speed_kph",), 0)])
+    f.tick(1.0)
+    assert f.velocity[0] == 0 and physics.GEARS[f.gear[0]] == "P"
+
+
+def test_events_only_for_changed_rows_with_versions():
+    f = still_fleet()
+    assert f.tick(0.1).tolist() == []
+    f.command(2, [(("ac", "fan_level"), 5), (("ac", "mode"), "defrost")])
+    changed = f.tick(0.1)
+    assert changed.tolist() == [2]
+    [(i, ev)] = f.events(changed)
+    assert i == 2 and ev["version"] == 1
+    assert ev["ops"] == [{"op": "replace", "path": "/ac/fan_level", "value": 5},
+                         {"op": "replace", "path": "/ac/mode", "value": "defrost"}]
+    assert ev["state"]["ac"]["fan_level"] == 5 and f.state(2) == (1, ev["state"])
+    assert f.tick(0.1).tolist() == []                       # published: no repeat
+
+    f.command(2, [(("windows", "FL"), 10)])
+    f.command(0, [(("windows", "FL"), 10)])
+    f.tick(0.2)                                             # 5%: one window step, two vehicles
+    events = dict(f.events(f.tick(0.0)))
+    assert sorted(events) == [0, 2]
+    assert events[2]["version"] == 2 and events[0]["version"] == 1
+    assert events[0]["ops"] == [{"op": "replace", "path": "/windows/FL", "value": 5}]
+    assert f.state(1) == (0, f.state(1)[1]) and f.events_out == 3
+
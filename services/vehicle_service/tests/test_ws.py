@@ -0,0 +1,51 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from libs.event_bus.bus import TopicBus
+from services.vehicle_service.app import app
+from services.vehicle_service.simulator.state import STORE
+
+
+class Sink:
+    """Stands in for a WebSocket; send_text yields like a real socket write."""
+
+    def __init__(self) -> None:
+        self.frames = []
+
+    async def send_text(self, data: str) -> None:
+        await asyncio.sleep(0)
+        self.frames.append(data)
+
+
+def test_catch_up_goes_through_the_subscriber_queue():
+    async def go():
+        bus, ws = TopicBus(), Sink()
+        await bus.subscribe("t", ws)
+        await bus.publish("t", "live-1")
+        assert await bus.send("t", ws, ["replay-1", "replay-2"])
+        await bus.publish("t", "live-2")
+        await asyncio.sleep(0.01)
+        assert ws.frames == ["live-1", "replay-1", "replay-2", "live-2"]
+
+        ws.frames.clear()
+        for i in range(3):
+            await bus.publish("t", f"old-{i}")
+        await bus.send("t", ws, ["snapshot"], replace=True)   # supersedes what is still queued
+        await asyncio.sleep(0.01)
+        assert ws.frames[-1] == "snapshot" and "old-2" not in ws.frames
+
+        assert not await bus.send("other", ws, ["x"])
+        await bus.unsubscribe("t", ws)
+
+    asyncio.run(go())
+
+
+def test_ws_vehicle_snapshot_then_resume():
+    with TestClient(app) as client, client.websocket_connect("/ws/vehicle") as ws:
+        first = json.loads(ws.receive_text())
+        assert first["meta"]["type"] == "vehicle.state.snapshot"
+        version = first["payload"]["version"]
+        assert version == STORE.version
+        ws.send_text(json.dumps({"since": version}))
+        again = json.loads(ws.receive_text())
+        assert again["payload"]["version"] == version